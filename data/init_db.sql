@@ -7,11 +7,14 @@ CREATE SCHEMA IF NOT EXISTS projet;
 SET search_path TO projet;
 
 -- Tables
+DROP TABLE IF EXISTS qrcode_supprime CASCADE;
+DROP TABLE IF EXISTS journal_segments_appliques CASCADE;
 DROP TABLE IF EXISTS logs_scan CASCADE;
 DROP TABLE IF EXISTS statistique CASCADE;
 DROP TABLE IF EXISTS qrcode CASCADE;
 DROP TABLE IF EXISTS token CASCADE;
 DROP TABLE IF EXISTS utilisateur CASCADE;
+DROP SEQUENCE IF EXISTS qrcode_revision_seq CASCADE;
 
 CREATE TABLE utilisateur (
   id_user SERIAL PRIMARY KEY,
@@ -30,6 +33,9 @@ CREATE TABLE token (
 CREATE UNIQUE INDEX IF NOT EXISTS uq_token_jeton ON token(jeton);
 CREATE INDEX IF NOT EXISTS idx_token_id_user ON token(id_user);
 
+-- Révision globale des QR codes : filigrane de l'export incrémental des redirections
+CREATE SEQUENCE qrcode_revision_seq;
+
 CREATE TABLE qrcode (
   id_qrcode SERIAL PRIMARY KEY,
   url TEXT NOT NULL,
@@ -38,21 +44,65 @@ CREATE TABLE qrcode (
   type_qrcode BOOLEAN,
   couleur TEXT,
   logo TEXT,
+  -- Incrémentée à chaque modification (ETag des redirections mises en cache)
+  version INT NOT NULL DEFAULT 1,
+  -- Durée de cache HTTP (s) de la redirection d'un QR statique ; NULL = valeur par défaut
+  cache_max_age INT CHECK (cache_max_age >= 0),
+  -- Nouvelle valeur de qrcode_revision_seq à chaque insertion / modification (trigger)
+  revision BIGINT NOT NULL DEFAULT nextval('qrcode_revision_seq'),
   FOREIGN KEY (id_proprietaire) REFERENCES utilisateur(id_user) ON DELETE CASCADE
 );
-CREATE INDEX IF NOT EXISTS idx_qrcode_id_proprietaire ON qrcode(id_proprietaire);
+-- Listes par propriétaire, paginées par curseur (id_qrcode) : couvre aussi id_proprietaire seul
+CREATE INDEX IF NOT EXISTS idx_qrcode_proprietaire_id ON qrcode(id_proprietaire, id_qrcode);
+CREATE INDEX IF NOT EXISTS idx_qrcode_revision ON qrcode(revision);
+
+-- QR codes supprimés (y compris en cascade), pour l'export incrémental des redirections
+CREATE TABLE qrcode_supprime (
+  id_qrcode INT PRIMARY KEY,
+  revision BIGINT NOT NULL DEFAULT nextval('qrcode_revision_seq'),
+  date_suppression TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS idx_qrcode_supprime_revision ON qrcode_supprime(revision);
+
+CREATE OR REPLACE FUNCTION qrcode_nouvelle_revision() RETURNS TRIGGER AS $$
+BEGIN
+  NEW.revision := nextval('qrcode_revision_seq');
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_qrcode_revision
+BEFORE UPDATE ON qrcode
+FOR EACH ROW EXECUTE FUNCTION qrcode_nouvelle_revision();
+
+CREATE OR REPLACE FUNCTION qrcode_noter_suppression() RETURNS TRIGGER AS $$
+BEGIN
+  INSERT INTO qrcode_supprime (id_qrcode) VALUES (OLD.id_qrcode)
+  ON CONFLICT (id_qrcode) DO UPDATE
+    SET revision = nextval('qrcode_revision_seq'), date_suppression = NOW();
+  RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_qrcode_suppression
+AFTER DELETE ON qrcode
+FOR EACH ROW EXECUTE FUNCTION qrcode_noter_suppression();
 
 CREATE TABLE statistique (
   id_stat SERIAL PRIMARY KEY,
   id_qrcode INT NOT NULL,
   nombre_vue INT DEFAULT 0 CHECK (nombre_vue >= 0),
   date_des_vues DATE NOT NULL,
+  -- Compteur réparti (STAT_SHARDS) : plusieurs lignes par (QR, jour), sommées à la lecture
+  shard SMALLINT NOT NULL DEFAULT 0,
   FOREIGN KEY (id_qrcode) REFERENCES qrcode(id_qrcode) ON DELETE CASCADE
 );
 CREATE INDEX IF NOT EXISTS idx_stat_id_qrcode ON statistique(id_qrcode);
+-- Fenêtre des vues récentes (QR codes les plus scannés, préchauffage des caches)
+CREATE INDEX IF NOT EXISTS idx_stat_date ON statistique(date_des_vues);
 
--- Contrainte unique pour l'UPSERT journalier des vues
-CREATE UNIQUE INDEX IF NOT EXISTS uq_stat_qrcode_date ON statistique(id_qrcode, date_des_vues);
+-- Contrainte unique pour l'UPSERT journalier des vues (une ligne par shard)
+CREATE UNIQUE INDEX IF NOT EXISTS uq_stat_qrcode_date ON statistique(id_qrcode, date_des_vues, shard);
 
 -- Journal optionnel des scans (si tu souhaites garder le log détaillé)
 CREATE TABLE IF NOT EXISTS logs_scan (
@@ -66,6 +116,17 @@ CREATE TABLE IF NOT EXISTS logs_scan (
   -- AJOUTS POUR LA GÉOLOCALISATION
   geo_country TEXT,
   geo_region TEXT,
-  geo_city TEXT
+  geo_city TEXT,
+  -- FALSE tant que la géolocalisation (différée) n'a pas été calculée
+  geo_enrichi BOOLEAN NOT NULL DEFAULT TRUE
+);
+CREATE INDEX IF NOT EXISTS idx_logs_scan_id_qrcode ON logs_scan(id_qrcode);
+-- Index partiel : lignes en attente d'enrichissement géographique
+CREATE INDEX IF NOT EXISTS idx_logs_scan_a_enrichir ON logs_scan(id_scan) WHERE NOT geo_enrichi;
+
+-- Segments du journal local des scans déjà chargés (rejeu idempotent)
+CREATE TABLE IF NOT EXISTS journal_segments_appliques (
+  nom TEXT PRIMARY KEY,
+  nb_scans INT NOT NULL DEFAULT 0,
+  date_application TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
-CREATE INDEX IF NOT EXISTS idx_logs_scan_id_qrcode ON logs_scan(id_qrcode);
\ No newline at end of file
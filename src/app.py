@@ -1,24 +1,23 @@
 import os
+import json
 import logging
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 # AJOUTÉ : Imports pour la sécurité, les services et le formulaire de login
-from fastapi import FastAPI, HTTPException, Request, Depends, status
+from fastapi import FastAPI, HTTPException, Request, Depends, Query, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from fastapi.responses import RedirectResponse, JSONResponse, FileResponse
+from fastapi.responses import RedirectResponse, JSONResponse, FileResponse, Response, StreamingResponse
+from starlette.routing import Mount
 from pydantic import BaseModel, Field
 from typing import Optional
 from dotenv import load_dotenv
-import requests 
 
 load_dotenv()  
 
 from service.qrcode_service import QRCodeService
-from dao.qrcode_dao import QRCodeDao
-from dao.db_connection import DBConnection
 from service.statistique_service import StatistiqueService
 from service.log_scan_service import LogScanService
 from dao.statistique_dao import StatistiqueDao 
-from dao.log_scan_dao import LogScanDao   
 from service.qrcode_service import QRCodeService, QRCodeNotFoundError, UnauthorizedError
 
 # --- AJOUT : Imports des services et DAO pour l'authentification ---
@@ -27,58 +26,77 @@ from service.token_service import TokenService
 from dao.token_dao import TokenDao
 from dao.utilisateur_dao import UtilisateurDao
 from business_object.token import Token # Importé pour la vérification
+from service.scan_service import ScanService
+from conteneur import Conteneur
+from scan_asgi import ScanASGI
 
 # Logging de base
 logging.basicConfig(level=logging.INFO, format="%(asctime=s) - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
+QR_OUTPUT_DIR = os.getenv("QRCODE_OUTPUT_DIR", "static/qrcodes")
+# Pagination des listes de QR codes (taille par défaut, maximale, et des pages d'un export en flux)
+QR_PAGE_TAILLE = int(os.getenv("QR_PAGE_TAILLE", 100))
+QR_PAGE_TAILLE_MAX = int(os.getenv("QR_PAGE_TAILLE_MAX", 1000))
+QR_FLUX_PAGE_TAILLE = int(os.getenv("QR_FLUX_PAGE_TAILLE", 1000))
+
+# --- Composants partagés par tout le processus (caches, tampons, tâches de fond, services) ---
+conteneur = Conteneur()
+
+# Raccourcis
+filtre_scans = conteneur.filtre_scans
+admission_scans = conteneur.admission_scans
+cache_redirection = conteneur.cache_redirection
+cache_tokens = conteneur.cache_tokens
+# Appels bloquants des routes : base de données (psycopg2) et rendu des images (PIL)
+executeur_bdd = conteneur.executeur_bdd
+executeur_rendu = conteneur.executeur_rendu
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Démarre le conteneur (pools, services, tâches de fond, table de
+    redirections) ; à l'arrêt, vide les tampons et ferme les pools.
+    """
+    await conteneur.demarrer()
+    yield
+    await conteneur.arreter()
+
+
 # --- Initialisation de l'application ---
 root_path = os.getenv("ROOT_PATH", "") 
-app = FastAPI()
-
-QR_OUTPUT_DIR = os.getenv("QRCODE_OUTPUT_DIR", "static/qrcodes")
+app = FastAPI(lifespan=lifespan)
 
 # -------------------------------------------------------------
 # 🔹 INJECTION DE DÉPENDANCES (SERVICES)
 # -------------------------------------------------------------
 
-def get_qrcode_service():
-    return QRCodeService(QRCodeDao())
+def get_qrcode_service() -> QRCodeService:
+    return conteneur.qrcode_service
+
+def get_statistique_service() -> StatistiqueService:
+    return conteneur.statistique_service
 
-def get_statistique_service():
-    return StatistiqueService() 
+def get_log_scan_service() -> LogScanService:
+    return conteneur.log_scan_service
 
-def get_log_scan_service():
-    return LogScanService(LogScanDao())
+def get_scan_buffer_service():
+    return conteneur.tampon_scans
 
 # --- AJOUT : Dépendances pour les services d'authentification ---
-def get_utilisateur_service():
-    return UtilisateurService()
+def get_utilisateur_service() -> UtilisateurService:
+    return conteneur.utilisateur_service
 
-def get_token_service():
-    return TokenService()
+def get_token_service() -> TokenService:
+    return conteneur.token_service
 
-def get_token_dao():
-    return TokenDao()
+def get_token_dao() -> TokenDao:
+    return conteneur.token_dao
 # --- Fin Ajout ---
 
-
-# --- NOUVELLE FONCTION : Helper de Géolocalisation ---
-def _get_geolocation_from_ip(ip: str) -> (Optional[str], Optional[str], Optional[str]):
-    # ... (votre fonction de géolocalisation reste inchangée) ...
-    try:
-        response = requests.get(f"http://ip-api.com/json/{ip}?fields=status,country,regionName,city", timeout=0.5)
-        response.raise_for_status() 
-        data = response.json()
-        if data.get("status") == "success":
-            return (data.get("country"), data.get("regionName"), data.get("city"))
-        else:
-            logger.warning(f"Échec de la géolocalisation pour l'IP {ip}: {data.get('message')}")
-            return (None, None, None)
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Erreur lors de l'appel à l'API de géolocalisation pour {ip}: {e}")
-        return (None, None, None)
-# --- FIN DE LA NOUVELLE FONCTION ---
+def get_scan_service() -> ScanService:
+    return conteneur.scan_service
 
 
 # --- Modèles d’entrée pour l’API ---
@@ -93,12 +111,16 @@ class QRCodeCreateModel(BaseModel):
     type_qrcode: Optional[bool] = True
     couleur: Optional[str] = "black"
     logo: Optional[str] = None
+    cache_max_age: Optional[int] = Field(None, ge=0)
 
 class QRCodeUpdateModel(BaseModel):
     url: Optional[str] = None
     type_qrcode: Optional[bool] = None
     couleur: Optional[str] = None
     logo: Optional[str] = None
+    cache_max_age: Optional[int] = Field(None, ge=0)
+    # True : revient à la durée de cache par défaut (QR_STATIQUE_CACHE_MAX_AGE_S)
+    reinitialiser_cache_max_age: bool = False
 
 # -------------------------------------------------------------
 # 🔹 NOUVEAU : Configuration de la sécurité (OAuth2)
@@ -124,7 +146,7 @@ async def verifier_token_valide(
     """
     try:
         # 1. Récupérer l'objet Token complet basé sur la chaîne du token
-        token_obj = token_service.trouver_par_jeton(token_str)
+        token_obj = await token_service.trouver_par_jeton_async(token_str)
         
         # 2. L'objet token est-il valide (existant ET non expiré) ?
         if not token_obj or not token_service.est_valide_token(token_obj): 
@@ -150,7 +172,7 @@ async def login_pour_access_token(
     et retourne un token Bearer s'ils sont valides.
     """
     # 1. Vérifier l'utilisateur
-    user = user_service.se_connecter(form_data.username, form_data.password)
+    user = await executeur_bdd.executer(user_service.se_connecter, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -161,7 +183,7 @@ async def login_pour_access_token(
     # 2. Créer un token
     # (On pourrait d'abord chercher un token valide existant, 
     # mais en créer un nouveau à chaque login est aussi une stratégie)
-    token = token_service.creer_token(user.id_user)
+    token = await executeur_bdd.executer(token_service.creer_token, user.id_user)
     if not token:
         raise HTTPException(status_code=500, detail="Impossible de créer le token")
 
@@ -181,14 +203,14 @@ async def register_user(
     """
     try:
         # 1. Vérifier si le nom_user est déjà pris
-        if user_service.nom_user_deja_utilise(data.nom_user):
+        if await executeur_bdd.executer(user_service.nom_user_deja_utilise, data.nom_user):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Le nom d'utilisateur '{data.nom_user}' est déjà utilisé."
             )
             
         # 2. Créer l'utilisateur
-        user = user_service.creer_user(data.nom_user, data.mdp)
+        user = await executeur_bdd.executer(user_service.creer_user, data.nom_user, data.mdp)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -219,18 +241,24 @@ async def creer_qrc(
 ):
     """
     Créer un QR code (authentification requise).
+    L'insertion s'exécute dans l'exécuteur de la base, le rendu de l'image
+    dans celui du rendu : la boucle d'événements continue de servir les scans.
     """
     try:
         # Force la création au nom de l'utilisateur authentifié
         data.id_proprietaire = str(current_user_id)
 
-        created = qrcode_service.creer_qrc(
+        created = await executeur_bdd.executer(
+            qrcode_service.creer_qrc,
             url=data.url,
             id_proprietaire=data.id_proprietaire,
             type_qrcode=data.type_qrcode, 
             couleur=data.couleur,
             logo=data.logo,
-        ) 
+            cache_max_age=data.cache_max_age,
+            generer_image=False,
+        )
+        await executeur_rendu.executer(qrcode_service.generer_image, created)
 
         response_data = created.to_dict()
         response_data["scan_url"] = getattr(created, '_scan_url', None)
@@ -247,15 +275,58 @@ async def creer_qrc(
 @app.get("/qrcode/utilisateur/me", tags=["QR Codes"])
 async def qrcodes_par_utilisateur_connecte(
     current_user_id: int = Depends(verifier_token_valide), # <- PROTÉGÉ
-    qrcode_service: QRCodeService = Depends(get_qrcode_service)
+    qrcode_service: QRCodeService = Depends(get_qrcode_service),
+    limit: int = Query(QR_PAGE_TAILLE, ge=1, le=QR_PAGE_TAILLE_MAX),
+    after: Optional[int] = Query(None, ge=0, description="Curseur : en-tête X-Next-After de la page précédente"),
+    type_qrcode: Optional[bool] = None,
+    cree_depuis: Optional[datetime] = None,
+    cree_avant: Optional[datetime] = None,
+    flux: bool = Query(False, description="Export complet en NDJSON (un QR code par ligne)"),
 ):
-    """Lister tous les QR codes de l'utilisateur authentifié."""
+    """
+    Lister les QR codes de l'utilisateur authentifié, les plus récents d'abord.
+
+    - Par pages de `limit` QR codes (pagination par curseur) : s'il reste
+      des QR codes, l'en-tête X-Next-After donne la valeur de `after` de la
+      page suivante. Le coût d'une page ne dépend pas de la taille du compte.
+    - Filtres appliqués en base : `type_qrcode`, `cree_depuis` (inclus),
+      `cree_avant` (exclu).
+    - `flux=true` : tous les QR codes (filtrés) en NDJSON, lus page par page
+      et envoyés au fil de l'eau. Une erreur en cours de flux est signalée
+      par une dernière ligne {"erreur": ...}.
+    """
+    filtres = dict(type_qrcode=type_qrcode, cree_depuis=cree_depuis, cree_avant=cree_avant)
+    if flux:
+        return StreamingResponse(
+            _flux_qrcodes(qrcode_service, str(current_user_id), after, filtres),
+            media_type="application/x-ndjson",
+        )
     try:
-        qrs = qrcode_service.trouver_qrc_par_id_user(str(current_user_id))
-        return [q.to_dict() for q in qrs]
+        qrs, suivant = await executeur_bdd.executer(
+            qrcode_service.lister_page, str(current_user_id), limit, after, **filtres
+        )
     except Exception as e:
         logger.exception(f"Erreur lors du listing des QR codes pour user {current_user_id} : {e}")
-        return [] 
+        return []
+    entetes = {"X-Next-After": str(suivant)} if suivant is not None else None
+    return JSONResponse([q.to_dict() for q in qrs], headers=entetes)
+
+
+async def _flux_qrcodes(qrcode_service: QRCodeService, id_user: str, apres: Optional[int], filtres: dict):
+    """Lignes NDJSON des QR codes d'un utilisateur, une page (QR_FLUX_PAGE_TAILLE) à la fois."""
+    while True:
+        try:
+            qrs, apres = await executeur_bdd.executer(
+                qrcode_service.lister_page, id_user, QR_FLUX_PAGE_TAILLE, apres, **filtres
+            )
+        except Exception as e:
+            logger.exception(f"Erreur lors de l'export des QR codes pour user {id_user} : {e}")
+            yield json.dumps({"erreur": "Lecture des QR codes interrompue"}) + "\n"
+            return
+        if qrs:
+            yield "".join(json.dumps(q.to_dict()) + "\n" for q in qrs)
+        if apres is None:
+            return
 
 @app.delete("/qrcode/{id_qrcode}", tags=["QR Codes"])
 async def supprimer_qrcode(
@@ -266,7 +337,7 @@ async def supprimer_qrcode(
     """Supprimer un QR code (seulement par le propriétaire authentifié)"""
     try:
         # Le service attend un str pour id_user
-        ok = qrcode_service.supprimer_qrc(id_qrcode, str(current_user_id))
+        ok = await executeur_bdd.executer(qrcode_service.supprimer_qrc, id_qrcode, str(current_user_id))
         if not ok:
             # Le service lève déjà UnauthorizedError ou QRCodeNotFoundError
             raise HTTPException(status_code=500, detail="Erreur lors de la suppression")
@@ -291,16 +362,21 @@ async def modifier_qrcode(
 ):
     """Modifier un QR code (seulement par le propriétaire authentifié)."""
     try:
-        updated = qrcode_service.modifier_qrc(
+        updated = await executeur_bdd.executer(
+            qrcode_service.modifier_qrc,
             id_qrcode=id_qrcode,
             id_user=str(current_user_id), # Le service attend un str
             url=data.url,
             type_qrcode=data.type_qrcode,
             couleur=data.couleur,
-            logo=data.logo
+            logo=data.logo,
+            cache_max_age=data.cache_max_age,
+            reinitialiser_cache_max_age=data.reinitialiser_cache_max_age,
+            generer_image=False,
         )
         if not updated:
             raise HTTPException(status_code=404, detail="Mise à jour échouée")
+        await executeur_rendu.executer(qrcode_service.generer_image, updated)
             
         return updated.to_dict()
         
@@ -319,65 +395,36 @@ async def modifier_qrcode(
 async def scan_qrcode(
     id_qrcode: int, 
     request: Request, 
-    qrcode_service: QRCodeService = Depends(get_qrcode_service),
-    stat_service: StatistiqueService = Depends(get_statistique_service),
-    log_service: LogScanService = Depends(get_log_scan_service)
+    scan_service: ScanService = Depends(get_scan_service),
 ):
     """
     Route publique pour le scan.
-    (fonctionnement inchangé)
+    Le scan est déposé dans le tampon d'écriture différée : la redirection
+    part sans attendre les écritures en base (vidées en lot en arrière-plan).
+    Avec SCAN_ECRITURE_DIFFEREE=false, il est écrit immédiatement, vue et log
+    en un seul aller-retour.
+    Robots, préchargements et re-scans rapprochés sont redirigés sans écriture.
+    Sous charge, l'enregistrement se dégrade (sans géolocalisation, sans log,
+    puis comptage en mémoire) mais la redirection est toujours servie.
+
+    Avec SCAN_ASGI=true (défaut), les requêtes sont servies par la voie
+    rapide ScanASGI montée devant cette route, avec le même traitement.
     """
     try:
-        qr = qrcode_service.trouver_qrc_par_id(id_qrcode)
-        if not qr:
-            raise HTTPException(status_code=404, detail="QR code introuvable")
-
-        if qr.type_qrcode is False: 
-            logger.info(f"Scan NON enregistré (QR non-suivi) pour QRCode {id_qrcode}")
-            return RedirectResponse(url=qr.url, status_code=307)
-
-        # --- Collecter les données ---
-        user_agent = request.headers.get("user-agent", "inconnu")
-        client_host = request.headers.get("x-forwarded-for")
-        if client_host:
-            client_host = client_host.split(',')[0].strip()
-        else:
-            client_host = request.client.host if request.client else "inconnu"
-        date_vue = datetime.now(timezone.utc)
-        referer = request.headers.get("referer") 
-        language = request.headers.get("accept-language")
-
-        # --- Géolocalisation ---
-        geo_country, geo_region, geo_city = _get_geolocation_from_ip(client_host)
-        
-        # --- Enregistrement ---
-        stat_service.enregistrer_vue(id_qrcode, date_vue.date())
-        
-        log_service.enregistrer_log(
-            id_qrcode=id_qrcode,
-            client_host=client_host,
-            user_agent=user_agent,
-            referer=referer,
-            accept_language=language,
-            geo_country=geo_country,
-            geo_region=geo_region,
-            geo_city=geo_city
+        reponse = await scan_service.traiter(
+            id_qrcode, request.headers, request.client.host if request.client else None
         )
-        
-        logger.info(f"Scan ENREGISTRÉ (QR suivi) pour QRCode {id_qrcode} depuis {client_host} ({geo_city}, {geo_country})")
-
-        # 6. Rediriger l'utilisateur
-        destination_url = qr.url
-        if not destination_url.startswith("http://") and not destination_url.startswith("https://"):
-            destination_url = f"http://{destination_url}"
-
-        return RedirectResponse(url=destination_url, status_code=307)
-    
-    except HTTPException:
-        raise
     except Exception as e:
         logger.exception("Erreur lors du scan : %s", e)
         raise HTTPException(status_code=500, detail=str(e))
+    if reponse is None:
+        raise HTTPException(status_code=404, detail="QR code introuvable")
+    return Response(status_code=reponse.statut, headers=reponse.entetes)
+
+
+# Voie rapide des scans : montée avant toutes les routes, sans la pile FastAPI
+if os.getenv("SCAN_ASGI", "true").lower() in ("1", "true", "oui"):
+    app.router.routes.insert(0, Mount("/scan", app=ScanASGI(get_scan_service)))
 
 
 # -------------------------------------------------------------
@@ -387,7 +434,8 @@ async def scan_qrcode(
 async def details_qrcode(id_qrcode: int, qrcode_service: QRCodeService = Depends(get_qrcode_service)):
     """Retourne les informations détaillées d'un QR code (Publique)"""
     # Note: Si vous voulez la protéger, ajoutez : current_user_id: int = Depends(verifier_token_valide)
-    qr = qrcode_service.trouver_qrc_par_id(id_qrcode)
+    # Une seule lecture en base : la table / le cache de redirection peuvent être en retard sur elle
+    qr = await executeur_bdd.executer(qrcode_service.trouver_qrc_par_id, id_qrcode)
     if not qr:
         raise HTTPException(status_code=404, detail="QR code introuvable")
     return qr.to_dict() 
@@ -398,8 +446,7 @@ async def details_qrcode(id_qrcode: int, qrcode_service: QRCodeService = Depends
 @app.get("/qrcode/{id_qrcode}/image", tags=["QR Codes"])
 async def image_qrcode(id_qrcode: int, qrcode_service: QRCodeService = Depends(get_qrcode_service)):
     """Renvoie le fichier image PNG pré-généré du QR code (Publique)"""
-    # (Inchangé)
-    qr = qrcode_service.trouver_qrc_par_id(id_qrcode)
+    qr = await qrcode_service.trouver_redirection_async(id_qrcode)
     if not qr:
         raise HTTPException(status_code=404, detail="QR code introuvable")
     file_name = f"qrcode_{id_qrcode}.png"
@@ -425,7 +472,7 @@ async def stats_qrcode(
     Vérifie également que l'utilisateur est propriétaire.
     """
     # 1. Vérification de l'existence
-    qr = qrcode_service.trouver_qrc_par_id(id_qrcode)
+    qr = await qrcode_service.trouver_redirection_async(id_qrcode)
     if not qr:
         raise HTTPException(status_code=404, detail="QR code introuvable")
 
@@ -438,13 +485,32 @@ async def stats_qrcode(
 
     # 3. Appel du service (qui gère TOUTE la logique BDD)
     try:
-        result = stat_service.get_statistiques_qr_code(id_qrcode, detail)
+        result = await stat_service.get_statistiques_qr_code_async(id_qrcode, detail)
         return result
     except Exception as e:
         logger.exception(f"Erreur inattendue lors de la récupération des stats : {e}")
         raise HTTPException(status_code=500, detail="Erreur serveur lors de la récupération des statistiques.")
 
 
+# -------------------------------------------------------------
+# 🔹 MÉTRIQUES INTERNES
+# -------------------------------------------------------------
+@app.get("/metrics", tags=["Monitoring"])
+async def metriques():
+    """Compteurs internes (tampon d'écriture des scans, caches, pool de connexions)."""
+    return conteneur.metriques()
+
+
+@app.get("/ready", tags=["Monitoring"])
+async def pret():
+    """
+    Disponibilité du worker (sonde de readiness) : 200 une fois le démarrage
+    terminé (caches préchauffés), 503 avant et pendant l'arrêt.
+    """
+    corps = {"pret": conteneur.pret, "prechauffage": conteneur.prechauffage}
+    return JSONResponse(corps, status_code=200 if conteneur.pret else 503)
+
+
 # -------------------------------------------------------------
 # 🔹 ROUTE PAR DÉFAUT
 # -------------------------------------------------------------
@@ -16,7 +16,8 @@ class LogScan:
         geo_region: Optional[str] = None,
         geo_city: Optional[str] = None,
         id_scan: Optional[int] = None,
-        date_scan: Optional[datetime] = None
+        date_scan: Optional[datetime] = None,
+        geo_enrichi: bool = True
     ):
         if not isinstance(id_qrcode, int):
             raise ValueError("id_qrcode doit être un entier.")
@@ -32,6 +33,8 @@ class LogScan:
         self.__geo_city = geo_city
         self.__id_scan = id_scan
         self.__date_scan = date_scan
+        # False : géolocalisation à calculer plus tard (enrichissement différé)
+        self.__geo_enrichi = geo_enrichi
 
     # --- Propriétés (Getters/Setters) ---
 
@@ -121,6 +124,16 @@ class LogScan:
     def geo_city(self, value: Optional[str]):
         self.__geo_city = value
 
+    @property
+    def geo_enrichi(self) -> bool:
+        return self.__geo_enrichi
+
+    @geo_enrichi.setter
+    def geo_enrichi(self, value: bool):
+        if not isinstance(value, bool):
+            raise ValueError("geo_enrichi doit être un booléen.")
+        self.__geo_enrichi = value
+
     def __repr__(self) -> str:
         return (
             f"LogScan(id_scan={self.__id_scan}, id_qrcode={self.__id_qrcode}, "
@@ -22,6 +22,9 @@ class Qrcode:
         type_qrcode : bool (True = QR dynamique, False = statique)
         couleur : couleur optionnelle
         logo : chemin de logo optionnel
+        version : numéro de version, incrémenté à chaque modification
+        cache_max_age : durée (s) de cache HTTP de la redirection d'un QR statique
+            (None = valeur par défaut de l'application, 0 = pas de cache)
     
     """
 
@@ -34,6 +37,8 @@ class Qrcode:
         type_qrcode: bool = True,
         couleur: Optional[str] = None,
         logo: Optional[str] = None,
+        version: int = 1,
+        cache_max_age: Optional[int] = None,
     ):
         # Attributs privés
         self.__id_qrcode = id_qrcode
@@ -45,6 +50,8 @@ class Qrcode:
         self.__type_qrcode = None
         self.__couleur = None
         self.__logo = None
+        self.__version = version
+        self.__cache_max_age = None
 
         # Application des validations via setters
         self.url = url
@@ -54,6 +61,8 @@ class Qrcode:
             self.couleur = couleur
         if logo is not None:
             self.logo = logo
+        if cache_max_age is not None:
+            self.cache_max_age = cache_max_age
 
     # ------------------------
     # GETTERS / SETTERS
@@ -124,6 +133,24 @@ class Qrcode:
             raise TypeError("Le logo doit être une chaîne (chemin/nom).")
         self.__logo = l
 
+    @property
+    def version(self) -> int:
+        return self.__version
+
+    @version.setter
+    def version(self, v: int) -> None:
+        self.__version = v
+
+    @property
+    def cache_max_age(self) -> Optional[int]:
+        return self.__cache_max_age
+
+    @cache_max_age.setter
+    def cache_max_age(self, secondes: Optional[int]) -> None:
+        if secondes is not None and (not isinstance(secondes, int) or secondes < 0):
+            raise ValueError("cache_max_age doit être un entier positif ou None.")
+        self.__cache_max_age = secondes
+
     # ------------------------
     # UTILITAIRES
     # ------------------------
@@ -140,6 +167,8 @@ class Qrcode:
             "type_qrcode": self.type_qrcode,
             "couleur": self.couleur,
             "logo": self.logo,
+            "version": self.version,
+            "cache_max_age": self.cache_max_age,
         }
 
     def __repr__(self) -> str:
@@ -0,0 +1,384 @@
+# src/conteneur.py
+import asyncio
+import logging
+import os
+from typing import Optional, Union
+
+from dao.asynchrone.db_connection_async import DBConnectionAsync
+from dao.asynchrone.log_scan_dao_async import LogScanDaoAsync
+from dao.asynchrone.qrcode_dao_async import QRCodeDaoAsync
+from dao.db_connection import DBConnection
+from dao.log_scan_dao import LogScanDao
+from dao.qrcode_dao import QRCodeDao
+from dao.statistique_dao import NB_SHARDS
+from dao.token_dao import TokenDao
+from service.admission_scans_service import ControleurAdmission
+from service.compaction_statistique_service import CompactionStatistiqueService
+from service.compteur_vues_service import CompteurVuesService
+from service.enrichissement_geo_service import EnrichissementGeoService
+from service.filtre_scans_service import (
+    FiltreDoublons,
+    FiltrePrechargement,
+    FiltreRobots,
+    FiltreScansService,
+)
+from service.invalidation_cache_service import InvalidationCacheService
+from service.journal_scans_service import JournalScansService
+from service.log_scan_service import LogScanService
+from service.prechauffage_service import PrechauffageService
+from service.qrcode_service import QRCodeService
+from service.scan_buffer_service import ScanBufferService
+from service.scan_service import ScanService
+from service.statistique_service import StatistiqueService
+from service.token_service import TokenService
+from service.utilisateur_service import UtilisateurService
+from utils.cache_resultat import invalider_tag, statistiques_caches, vider_caches
+from utils.cache_ttl import CacheTTL
+from utils.executeurs import arreter_executeurs, executeur, metriques_executeurs
+from utils.geolocalisation import GeolocalisationLocale, creer_fournisseur
+from utils.journal_scans import JournalScans
+from utils.table_redirections import TableRedirections
+
+logger = logging.getLogger(__name__)
+
+
+def _vrai(nom: str, defaut: str) -> bool:
+    return os.getenv(nom, defaut).lower() in ("1", "true", "oui")
+
+
+class Conteneur:
+    """
+    Composants de l'application, partagés par toutes les requêtes du processus.
+
+    - À la construction (sans accès à la base) : caches, tampons et tâches de
+      fond, configurés par les variables d'environnement.
+    - `demarrer()` (début du lifespan) : ouvre les pools de connexions, crée
+      une fois les DAO et les services injectés dans les routes, démarre les
+      tâches de fond et reconstruit la table de redirections.
+    - `arreter()` (fin du lifespan) : vide les tampons en base, arrête les
+      tâches de fond puis ferme les pools.
+
+    Un nouveau démarrage (plusieurs lifespans dans le même processus, comme
+    dans les tests) réutilise les mêmes composants.
+    """
+
+    def __init__(self):
+        # --- Écriture différée des scans (tampon partagé par tout le processus) ---
+        # false : chaque scan est écrit pendant la requête (une instruction vue + log)
+        self.scan_ecriture_differee = _vrai("SCAN_ECRITURE_DIFFEREE", "true")
+        self.scan_buffer = ScanBufferService(
+            taille_lot=int(os.getenv("SCAN_BATCH_TAILLE", 100)),
+            intervalle_ms=int(os.getenv("SCAN_BATCH_INTERVALLE_MS", 200)),
+            capacite_max=int(os.getenv("SCAN_BATCH_CAPACITE", 10000)),
+            attente_max_s=float(os.getenv("SCAN_BATCH_ATTENTE_MAX_S", 30)),
+        )
+
+        # --- Journal local durable des scans (optionnel) : remplace le tampon mémoire ---
+        dossier_journal = os.getenv("SCAN_JOURNAL_DOSSIER", "")
+        self.journal_scans: Optional[JournalScansService] = (
+            JournalScansService(
+                JournalScans(
+                    dossier_journal,
+                    taille_segment_max=int(os.getenv("SCAN_JOURNAL_SEGMENT_OCTETS", 4 * 1024 * 1024)),
+                ),
+                intervalle_fsync_ms=int(os.getenv("SCAN_JOURNAL_FSYNC_MS", 100)),
+                age_segment_max_s=float(os.getenv("SCAN_JOURNAL_SEGMENT_AGE_S", 1)),
+                intervalle_chargement_s=float(os.getenv("SCAN_JOURNAL_CHARGEMENT_S", 1)),
+            )
+            if dossier_journal else None
+        )
+        # Backlog du journal (octets non chargés) correspondant à une pression de 1.0
+        self.journal_attente_max_octets = max(1, int(os.getenv("SCAN_JOURNAL_ATTENTE_MAX_OCTETS", 64 * 1024 * 1024)))
+
+        # --- Filtrage des scans avant écriture (robots, préchargements, doublons) ---
+        fenetre_doublons_s = float(os.getenv("SCAN_DOUBLON_FENETRE_S", 10))
+        filtres = [FiltrePrechargement()]
+        if _vrai("SCAN_FILTRE_ROBOTS", "true"):
+            filtres.append(FiltreRobots(taille_cache=int(os.getenv("SCAN_FILTRE_ROBOTS_CACHE", 10000))))
+        if fenetre_doublons_s > 0:
+            filtres.append(FiltreDoublons(
+                fenetre_s=fenetre_doublons_s,
+                cles_max=int(os.getenv("SCAN_DOUBLON_CLES_MAX", 100000)),
+            ))
+        self.filtre_scans = FiltreScansService(filtres)
+
+        # --- Agrégation mémoire des vues (StatistiqueService.enregistrer_vue) ---
+        self.compteur_vues = CompteurVuesService(
+            intervalle_ms=int(os.getenv("STAT_COMPTEUR_INTERVALLE_MS", 1000)),
+            cles_max=int(os.getenv("STAT_COMPTEUR_CLES_MAX", 10000)),
+            cles_limite=int(os.getenv("STAT_COMPTEUR_CLES_LIMITE", 100000)),
+        )
+
+        # --- Délestage de l'enregistrement des scans (la redirection est toujours servie) ---
+        self.admission_attente_max_ms = float(os.getenv("SCAN_ADMISSION_ATTENTE_MAX_MS", 200))
+        self.admission_scans = ControleurAdmission(
+            sondes={
+                "pool_saturation": self._sonde_pool_saturation,
+                "pool_attente": self._sonde_pool_attente,
+                "tampon_ecriture": self._sonde_tampon,
+            },
+            seuils=[float(x) for x in os.getenv("SCAN_ADMISSION_SEUILS", "0.7,0.85,0.95").split(",") if x.strip()],
+            ecritures_max=int(os.getenv("SCAN_ADMISSION_ECRITURES_MAX", os.getenv("POSTGRES_POOL_MAX", 10))),
+            compteur=self.compteur_vues,
+        )
+
+        # --- Compteurs répartis (STAT_SHARDS > 1) : repli quotidien des shards ---
+        self.compaction_statistique = CompactionStatistiqueService(
+            intervalle_s=float(os.getenv("STAT_COMPACTION_INTERVALLE_S", 3600)),
+        )
+
+        # --- Cache des cibles de redirection (id_qrcode -> url, type, propriétaire) ---
+        self.cache_redirection = CacheTTL(
+            taille_max=int(os.getenv("QR_CACHE_TAILLE", 10000)),
+            ttl=float(os.getenv("QR_CACHE_TTL_S", 60)),
+            ttl_negatif=float(os.getenv("QR_CACHE_TTL_NEGATIF_S", 10)),
+        )
+
+        # --- Table de redirections projetée en mémoire, partagée par les workers (optionnel) ---
+        chemin_table = os.getenv("QR_TABLE_CHEMIN", "")
+        self.table_redirections: Optional[TableRedirections] = (
+            TableRedirections(chemin_table, verification_s=float(os.getenv("QR_TABLE_VERIFICATION_S", 1)))
+            if chemin_table else None
+        )
+
+        # --- Cache des tokens validés (jeton -> Token), borné par leur date d'expiration ---
+        self.cache_tokens = CacheTTL(
+            taille_max=int(os.getenv("TOKEN_CACHE_TAILLE", 10000)),
+            ttl=float(os.getenv("TOKEN_CACHE_TTL_S", 60)),
+            ttl_negatif=0,
+        )
+
+        # --- Invalidation des caches entre workers (PostgreSQL LISTEN / NOTIFY) ---
+        # Un QR code ou un token modifié par un autre worker est évincé des caches locaux ;
+        # la suppression d'un utilisateur (tokens et QR codes en cascade) les vide
+        self.invalidation_active = _vrai("CACHE_INVALIDATION", "true")
+        self.invalidation_cache = InvalidationCacheService(
+            verification_s=float(os.getenv("CACHE_INVALIDATION_VERIFICATION_S", 30)),
+        )
+        self.invalidation_cache.abonner("qrcode", self._invalider_qrcode, self._vider_redirections)
+        self.invalidation_cache.abonner("token", self.cache_tokens.invalider, self.cache_tokens.vider)
+        self.invalidation_cache.abonner("utilisateur", self._invalider_utilisateur, lambda: None)
+        # Caches de résultats des DAO (utils.cache_resultat), invalidés par tag "<domaine>:<clé>"
+        for domaine in ("qrcode", "utilisateur", "proprietaire"):
+            self.invalidation_cache.abonner(
+                domaine, lambda cle, domaine=domaine: invalider_tag(f"{domaine}:{cle}"), vider_caches
+            )
+
+        # --- Géolocalisation (moteur local hors ligne, sans appel réseau) ---
+        self.geolocalisation = creer_fournisseur()
+
+        # --- Redirection des QR statiques (non suivis) : durée de cache HTTP par défaut ---
+        # 0 : redirection 307 non cacheable ; > 0 : 301 avec Cache-Control / ETag
+        # (surchargée QR par QR par la colonne cache_max_age)
+        self.qr_statique_cache_max_age_s = int(os.getenv("QR_STATIQUE_CACHE_MAX_AGE_S", 0))
+
+        # --- Géolocalisation différée : la route de scan n'appelle plus le fournisseur ---
+        self.geo_enrichissement_differe = _vrai("GEO_ENRICHISSEMENT_DIFFERE", "false")
+        self.enrichissement_geo = EnrichissementGeoService(
+            self.geolocalisation,
+            taille_lot=int(os.getenv("GEO_ENRICHISSEMENT_TAILLE", 500)),
+            intervalle_s=float(os.getenv("GEO_ENRICHISSEMENT_INTERVALLE_S", 2)),
+        )
+        # Le délestage (niveau SANS_GEO) écrit aussi des logs geo_enrichi = FALSE :
+        # le worker tourne dès que ce niveau est atteignable
+        self.geo_enrichissement_actif = self.geo_enrichissement_differe or bool(self.admission_scans.seuils)
+
+        # --- Exécuteurs des appels bloquants des routes (EXECUTEUR_BDD_TAILLE, EXECUTEUR_RENDU_TAILLE) ---
+        # Base (psycopg2, HTTP) et rendu d'images (PIL) séparés : un rendu lent
+        # n'occupe pas les threads des lectures en base
+        self.executeur_bdd = executeur("bdd")
+        self.executeur_rendu = executeur("rendu")
+
+        # --- Préchauffage des caches au démarrage (QR codes les plus scannés) ---
+        # PRECHAUFFAGE_NB = 0 le désactive ; l'application n'est prête (/ready) qu'après
+        self.prechauffage_nb = int(os.getenv("PRECHAUFFAGE_NB", 1000))
+        self.prechauffage_jours = int(os.getenv("PRECHAUFFAGE_JOURS", 7))
+        self.prechauffage_proprietaires = _vrai("PRECHAUFFAGE_PROPRIETAIRES", "false")
+        self.prechauffage: Optional[dict] = None
+        self.pret = False
+
+        # --- DAO et services injectés dans les routes (créés par demarrer) ---
+        self.qrcode_service: Optional[QRCodeService] = None
+        self.statistique_service: Optional[StatistiqueService] = None
+        self.log_scan_service: Optional[LogScanService] = None
+        self.utilisateur_service: Optional[UtilisateurService] = None
+        self.token_service: Optional[TokenService] = None
+        self.token_dao: Optional[TokenDao] = None
+        self.scan_service: Optional[ScanService] = None
+
+    # ------------------------------------------------------------------
+    # Sondes du contrôleur d'admission
+    # ------------------------------------------------------------------
+
+    def _sonde_pool_saturation(self) -> float:
+        return DBConnection().metriques()["saturation"]
+
+    def _sonde_pool_attente(self) -> float:
+        return DBConnection().metriques()["attente_ms"]["recente"] / self.admission_attente_max_ms
+
+    def _sonde_tampon(self) -> float:
+        if self.journal_scans is not None:
+            # Le journal remplace le tampon mémoire : son retard se lit sur le disque
+            return self.journal_scans.journal.taille_en_attente() / self.journal_attente_max_octets
+        return self.scan_buffer.metriques()["profondeur"] / self.scan_buffer.capacite_max
+
+    # ------------------------------------------------------------------
+    # Invalidations reçues des autres workers
+    # ------------------------------------------------------------------
+
+    def _invalider_qrcode(self, cle: str) -> None:
+        if not cle.isdigit():
+            return
+        if self.qrcode_service is not None:
+            self.qrcode_service.invalider_cache(int(cle))
+            # La table est consultée avant le cache : elle doit suivre la base
+            self.qrcode_service.rafraichir_redirection(int(cle))
+        else:
+            self.cache_redirection.invalider(int(cle))
+
+    def _invalider_utilisateur(self, cle: str) -> None:
+        self.cache_tokens.vider()
+        self.cache_redirection.vider()
+        invalider_tag(f"proprietaire:{cle}")
+        if self.qrcode_service is not None and cle.isdigit():
+            # Suppression en cascade des QR codes de l'utilisateur : pas de notification par QR
+            self.qrcode_service.rafraichir_redirections_proprietaire(int(cle))
+
+    def _vider_redirections(self) -> None:
+        """Après une coupure de l'écoute (notifications perdues) : cache vidé, table reconstruite."""
+        self.cache_redirection.vider()
+        # Au démarrage, la table est reconstruite par `demarrer`
+        if self.pret and self.table_redirections is not None:
+            try:
+                self.qrcode_service.reconstruire_table_redirections()
+            except Exception as e:
+                logger.warning(f"Table de redirections non reconstruite après reconnexion : {e}")
+
+    # ------------------------------------------------------------------
+    # Cycle de vie
+    # ------------------------------------------------------------------
+
+    @property
+    def tampon_scans(self) -> Union[JournalScansService, ScanBufferService]:
+        """Destination des scans en écriture différée : le journal local s'il est configuré."""
+        return self.journal_scans or self.scan_buffer
+
+    def _creer_services(self) -> None:
+        """Crée une fois les DAO et les services (ouvre le pool de connexions)."""
+        if self.qrcode_service is not None:
+            return
+        self.qrcode_service = QRCodeService(
+            QRCodeDao(),
+            cache=self.cache_redirection,
+            dao_async=QRCodeDaoAsync(),
+            table=self.table_redirections,
+        )
+        self.statistique_service = StatistiqueService(compteur=self.compteur_vues)
+        self.log_scan_service = LogScanService(LogScanDao(), dao_async=LogScanDaoAsync())
+        self.utilisateur_service = UtilisateurService()
+        self.token_service = TokenService(cache=self.cache_tokens)
+        self.token_dao = TokenDao()
+        self.scan_service = ScanService(
+            self.qrcode_service,
+            self.log_scan_service,
+            self.tampon_scans,
+            self.filtre_scans,
+            self.admission_scans,
+            self.compteur_vues,
+            self.geolocalisation,
+            ecriture_differee=self.scan_ecriture_differee,
+            geo_differee=self.geo_enrichissement_differe,
+            cache_max_age_defaut=self.qr_statique_cache_max_age_s,
+            geo_bloquante=not isinstance(self.geolocalisation, GeolocalisationLocale),
+        )
+
+    async def demarrer(self) -> None:
+        """Ouvre les pools, crée les services, démarre les tâches de fond, préchauffe les caches."""
+        await asyncio.to_thread(self._creer_services)
+        if self.invalidation_active:
+            # Première connexion d'écoute avant de servir : les caches partent d'un état à jour
+            await asyncio.to_thread(self.invalidation_cache.demarrer)
+        if DBConnectionAsync().actif:
+            try:
+                await DBConnectionAsync().ouvrir()
+            except Exception as e:
+                # Le pool asynchrone sera ouvert à la première requête qui en a besoin
+                logger.warning(f"Pool de connexions asynchrone non ouvert au démarrage : {e}")
+
+        self.scan_buffer.demarrer()
+        if self.journal_scans is not None:
+            self.journal_scans.demarrer()
+        self.compteur_vues.demarrer()
+        if NB_SHARDS > 1:
+            self.compaction_statistique.demarrer()
+        if self.geo_enrichissement_actif:
+            self.enrichissement_geo.demarrer()
+
+        if self.table_redirections is not None:
+            try:
+                nb = await asyncio.to_thread(self.qrcode_service.reconstruire_table_redirections)
+                logger.info(f"Table de redirections reconstruite ({nb} QR codes)")
+            except Exception as e:
+                # Base indisponible : la table existante continue de servir les scans
+                logger.warning(f"Table de redirections non reconstruite, la précédente est conservée : {e}")
+
+        if self.prechauffage_nb > 0:
+            try:
+                self.prechauffage = await asyncio.to_thread(PrechauffageService(
+                    self.qrcode_service,
+                    self.token_service,
+                    nb=self.prechauffage_nb,
+                    jours=self.prechauffage_jours,
+                    proprietaires=self.prechauffage_proprietaires,
+                ).executer)
+            except Exception as e:
+                # Caches froids : l'application sert quand même, plus lentement
+                logger.warning(f"Préchauffage des caches impossible : {e}")
+        self.pret = True
+
+    async def arreter(self) -> None:
+        """Vide les tampons en base, arrête les tâches de fond puis ferme les pools."""
+        self.pret = False
+        self.scan_buffer.arreter()
+        if self.journal_scans is not None:
+            self.journal_scans.arreter()
+        self.admission_scans.restituer_vues()
+        self.compteur_vues.arreter()
+        self.compaction_statistique.arreter()
+        self.enrichissement_geo.arreter()
+        self.invalidation_cache.arreter()
+        arreter_executeurs()
+        await DBConnectionAsync().fermer()
+        DBConnection().fermer()
+
+    def metriques(self) -> dict:
+        """Compteurs de tous les composants (route /metrics)."""
+        resultat = {
+            "scan_buffer": self.scan_buffer.metriques(),
+            "filtre_scans": self.filtre_scans.metriques(),
+            "admission_scans": self.admission_scans.metriques(),
+            "compteur_vues": self.compteur_vues.metriques(),
+            "compaction_statistique": self.compaction_statistique.metriques(),
+            "cache_redirection": self.cache_redirection.statistiques(),
+            "cache_tokens": self.cache_tokens.statistiques(),
+            "caches_dao": statistiques_caches(),
+            "pool_bdd": DBConnection().metriques(),
+            "pool_bdd_async": DBConnectionAsync().metriques(),
+            "executeurs": metriques_executeurs(),
+        }
+        if hasattr(self.geolocalisation, "statistiques"):
+            resultat["cache_geolocalisation"] = self.geolocalisation.statistiques()
+        if self.geo_enrichissement_actif:
+            resultat["enrichissement_geo"] = self.enrichissement_geo.metriques()
+        if self.journal_scans is not None:
+            resultat["journal_scans"] = self.journal_scans.metriques()
+        if self.table_redirections is not None:
+            resultat["table_redirections"] = self.table_redirections.statistiques()
+        if self.invalidation_active:
+            resultat["invalidation_cache"] = self.invalidation_cache.metriques()
+        if self.qrcode_service is not None:
+            resultat["single_flight"] = {
+                "redirection": self.qrcode_service.vols.statistiques(),
+                "statistiques": self.statistique_service.vols.statistiques(),
+            }
+        return resultat
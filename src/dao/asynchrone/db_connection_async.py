@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+import dotenv
+
+from dao.db_connection import DBConnection
+from utils.singleton import Singleton
+
+try:
+    import asyncpg
+    HAS_ASYNCPG = True
+except ImportError:  # pilote optionnel : repli sur les DAO synchrones
+    asyncpg = None
+    HAS_ASYNCPG = False
+
+logger = logging.getLogger(__name__)
+
+
+class DBConnectionAsync(metaclass=Singleton):
+    """
+    Pool de connexions asyncpg partagé par les DAO asynchrones.
+
+    - Le pool est créé à la première requête (ou par `ouvrir()` au démarrage
+      de l'application) et fermé par `fermer()`.
+    - Les paramètres de connexion (dont le schéma) sont ceux de DBConnection :
+      les deux pools visent toujours la même base.
+    - Un pool asyncpg est lié à une boucle d'événements : s'il a été créé
+      par une autre boucle (redémarrage, tests), il est recréé.
+    - Les requêtes renvoient des dictionnaires, comme le RealDictCursor
+      des DAO synchrones.
+
+    `actif` vaut False si asyncpg n'est pas installé ou si POSTGRES_ASYNC
+    est désactivé : les DAO asynchrones exécutent alors les DAO synchrones
+    dans l'exécuteur "bdd" (utils.executeurs), sans bloquer la boucle.
+    """
+
+    def __init__(self):
+        dotenv.load_dotenv()
+        self.actif = HAS_ASYNCPG and os.getenv("POSTGRES_ASYNC", "true").lower() in ("1", "true", "oui")
+        self._pool = None
+        self._boucle: Optional[asyncio.AbstractEventLoop] = None
+        self._verrou: Optional[asyncio.Lock] = None
+
+    async def ouvrir(self):
+        """Retourne le pool de la boucle courante, en le créant si besoin."""
+        boucle = asyncio.get_running_loop()
+        if self._pool is not None and self._boucle is boucle:
+            return self._pool
+        if self._verrou is None or self._boucle is not boucle:
+            if self._pool is not None:
+                self._pool.terminate()  # pool d'une boucle précédente, inutilisable ici
+            self._verrou = asyncio.Lock()
+            self._boucle = boucle
+            self._pool = None
+        async with self._verrou:
+            if self._pool is None:
+                p = DBConnection().parametres
+                self._pool = await asyncpg.create_pool(
+                    host=p["host"],
+                    port=int(p["port"]),
+                    database=p["database"],
+                    user=p["user"],
+                    password=p["password"],
+                    server_settings={"search_path": p["schema"]},
+                    min_size=int(os.getenv("POSTGRES_POOL_MIN", 1)),
+                    max_size=int(os.getenv("POSTGRES_POOL_MAX", 10)),
+                    max_inactive_connection_lifetime=float(os.getenv("POSTGRES_POOL_INACTIVITE_S", 300)),
+                )
+        return self._pool
+
+    async def fermer(self) -> None:
+        """Ferme le pool s'il appartient à la boucle courante (sinon l'abandonne)."""
+        pool, self._pool = self._pool, None
+        if pool is None:
+            return
+        try:
+            if self._boucle is asyncio.get_running_loop():
+                await pool.close()
+            else:
+                pool.terminate()
+        except Exception as e:
+            logger.warning(f"Fermeture du pool asyncpg incomplète : {e}")
+
+    async def lire_tous(self, requete: str, *params) -> List[Dict[str, Any]]:
+        """Exécute une requête et renvoie toutes les lignes (dictionnaires)."""
+        pool = await self.ouvrir()
+        return [dict(r) for r in await pool.fetch(requete, *params)]
+
+    async def lire_un(self, requete: str, *params) -> Optional[Dict[str, Any]]:
+        """Exécute une requête et renvoie la première ligne (ou None)."""
+        pool = await self.ouvrir()
+        row = await pool.fetchrow(requete, *params)
+        return dict(row) if row is not None else None
+
+    def metriques(self) -> dict:
+        """Taille du pool asyncpg (vide si le pool n'est pas ouvert)."""
+        if not self.actif or self._pool is None:
+            return {"actif": self.actif, "ouvertes": 0, "libres": 0}
+        return {
+            "actif": True,
+            "ouvertes": self._pool.get_size(),
+            "libres": self._pool.get_idle_size(),
+            "taille_min": self._pool.get_min_size(),
+            "taille_max": self._pool.get_max_size(),
+        }
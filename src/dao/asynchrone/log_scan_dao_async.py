@@ -0,0 +1,106 @@
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from business_object.log_scan import LogScan
+from dao.asynchrone.db_connection_async import DBConnectionAsync
+from dao.log_scan_dao import LogScanDao
+from dao.statistique_dao import StatistiqueDao, invalider_agregats
+from utils.executeurs import executeur
+from utils.singleton import Singleton
+
+logger = logging.getLogger(__name__)
+
+
+class LogScanDaoAsync(metaclass=Singleton):
+    """Variante asynchrone (asyncpg) de LogScanDao pour les routes."""
+
+    async def enregistrer_scan(self, log_scan: LogScan) -> bool:
+        """
+        Enregistre un scan complet (vue du jour + log) en une seule instruction.
+
+        Paramètres
+        ----------
+        log_scan : LogScan
+            Objet métier construit par le service. Si date_scan est None,
+            l'heure courante (UTC) est utilisée pour le log et pour la vue.
+
+        Retour
+        ------
+        bool
+            - True si le scan a été enregistré (id_scan et date_scan renseignés).
+            - False en cas d'erreur : rien n'est écrit.
+        """
+        db = DBConnectionAsync()
+        if not db.actif:
+            return await executeur("bdd").executer(LogScanDao().enregistrer_scan, log_scan)
+        if log_scan.date_scan is None:
+            log_scan.date_scan = datetime.now(timezone.utc)
+        try:
+            row = await db.lire_un(
+                """
+                WITH vues AS (
+                    INSERT INTO statistique (id_qrcode, date_des_vues, nombre_vue, shard)
+                    VALUES ($1, $2, 1, $12)
+                    ON CONFLICT (id_qrcode, date_des_vues, shard)
+                    DO UPDATE SET nombre_vue = statistique.nombre_vue + 1
+                ),
+                logs AS (
+                    INSERT INTO logs_scan (id_qrcode, client_host, user_agent, date_scan,
+                                           referer, accept_language,
+                                           geo_country, geo_region, geo_city, geo_enrichi)
+                    VALUES ($1, $3, $4, $5, $6, $7, $8, $9, $10, $11)
+                    RETURNING id_scan, date_scan
+                )
+                SELECT id_scan, date_scan FROM logs;
+                """,
+                log_scan.id_qrcode,
+                log_scan.date_scan.date(),
+                log_scan.client_host,
+                log_scan.user_agent,
+                log_scan.date_scan,
+                log_scan.referer,
+                log_scan.accept_language,
+                log_scan.geo_country,
+                log_scan.geo_region,
+                log_scan.geo_city,
+                log_scan.geo_enrichi,
+                StatistiqueDao.choisir_shard(),
+            )
+        except Exception as e:
+            logger.exception(f"Erreur lors de l'enregistrement du scan : {e}")
+            return False
+        invalider_agregats([log_scan.id_qrcode])
+
+        log_scan.id_scan = row["id_scan"]
+        log_scan.date_scan = row["date_scan"]
+        return True
+
+    async def get_scans_recents(self, id_qrcode: int, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Récupère les derniers scans d’un QR code, du plus récent au plus ancien.
+
+        Retour
+        ------
+        List[Dict[str, Any]]
+            Liste de dictionnaires (colonnes de logs_scan) ; vide en cas d'erreur.
+        """
+        db = DBConnectionAsync()
+        if not db.actif:
+            return await executeur("bdd").executer(LogScanDao().get_scans_recents, id_qrcode, limit)
+        try:
+            return await db.lire_tous(
+                """
+                SELECT id_scan, id_qrcode, client_host, user_agent, date_scan,
+                       referer, accept_language, geo_country, geo_region, geo_city
+                FROM logs_scan
+                WHERE id_qrcode = $1
+                ORDER BY date_scan DESC, id_scan DESC
+                LIMIT $2;
+                """,
+                id_qrcode,
+                limit,
+            )
+        except Exception as e:
+            logger.exception(f"Erreur DAO en récupérant les scans récents : {e}")
+            return []
@@ -0,0 +1,61 @@
+import logging
+from typing import Optional
+
+from business_object.qr_code import Qrcode
+from dao.asynchrone.db_connection_async import DBConnectionAsync
+from dao.qrcode_dao import QRCodeDao
+from utils.executeurs import executeur
+from utils.singleton import Singleton
+
+logger = logging.getLogger(__name__)
+
+
+class QRCodeDaoAsync(metaclass=Singleton):
+    """Variante asynchrone (asyncpg) des lectures de QRCodeDao utilisées par les routes."""
+
+    async def trouver_qrc_par_id_qrc(self, id_qrcode: int) -> Optional[Qrcode]:
+        """
+        Recherche un QR code par son identifiant unique.
+
+        Paramètres
+        ----------
+        id_qrcode : int
+            Identifiant du QR code à rechercher.
+
+        Retour
+        ------
+        Optional[Qrcode]
+            - L’objet Qrcode correspondant si trouvé.
+            - None si aucun résultat ou en cas d’erreur.
+        """
+        db = DBConnectionAsync()
+        if not db.actif:
+            return await executeur("bdd").executer(QRCodeDao().trouver_qrc_par_id_qrc, id_qrcode)
+        try:
+            row = await db.lire_un(
+                """
+                SELECT id_qrcode, url, id_proprietaire, date_creation, type_qrcode, couleur, logo,
+                       version, cache_max_age
+                FROM qrcode
+                WHERE id_qrcode = $1;
+                """,
+                id_qrcode,
+            )
+        except Exception as e:
+            logger.exception(f"Erreur lors de la recherche du QR code {id_qrcode} : {e}")
+            return None
+
+        if not row:
+            logger.warning(f"QR code introuvable (id={id_qrcode}).")
+            return None
+        return Qrcode(
+            id_qrcode=row["id_qrcode"],
+            url=row["url"],
+            id_proprietaire=str(row["id_proprietaire"]),
+            date_creation=row["date_creation"],
+            type_qrcode=row["type_qrcode"],
+            couleur=row["couleur"],
+            logo=row["logo"],
+            version=row["version"],
+            cache_max_age=row["cache_max_age"],
+        )
@@ -0,0 +1,75 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+from dao.asynchrone.db_connection_async import DBConnectionAsync
+from dao.statistique_dao import CACHE_AGREGATS_TTL_S, StatistiqueDao
+from utils.cache_resultat import cache_resultat
+from utils.executeurs import executeur
+from utils.singleton import Singleton
+
+
+class StatistiqueDaoAsync(metaclass=Singleton):
+    """Variante asynchrone (asyncpg) des lectures de StatistiqueDao utilisées par les routes."""
+
+    @cache_resultat(
+        ttl=CACHE_AGREGATS_TTL_S,
+        cle=lambda id_qrcode: int(id_qrcode),
+        tags=lambda id_qrcode: [f"qrcode:{int(id_qrcode)}"],
+        copier=dict,
+        backend=StatistiqueDao.get_agregats.cache,
+        nom=StatistiqueDao.get_agregats.__qualname__,
+    )
+    async def get_agregats(self, id_qrcode: int) -> Optional[Dict[str, Any]]:
+        """
+        Récupère total_vues, premiere_vue et derniere_vue d'un QR code.
+
+        Retour
+        ------
+        Optional[Dict[str, Any]]
+            Dictionnaire des agrégats, ou None en cas d'erreur.
+        """
+        db = DBConnectionAsync()
+        if not db.actif:
+            return await executeur("bdd").executer(StatistiqueDao().get_agregats, id_qrcode)
+        try:
+            return await db.lire_un(
+                """
+                SELECT
+                    COALESCE(SUM(nombre_vue), 0) AS total_vues,
+                    MIN(date_des_vues) AS premiere_vue,
+                    MAX(date_des_vues) AS derniere_vue
+                FROM statistique
+                WHERE id_qrcode = $1
+                """,
+                id_qrcode,
+            )
+        except Exception as e:
+            logging.exception(f"Erreur DAO en récupérant les agrégats stats : {e}")
+            return None
+
+    async def get_stats_par_jour(self, id_qrcode: int) -> List[Dict[str, Any]]:
+        """
+        Récupère les vues journalières d'un QR code (ordre chronologique).
+
+        Retour
+        ------
+        List[Dict[str, Any]]
+            Lignes {"date_des_vues", "nombre_vue"} ; liste vide en cas d'erreur.
+        """
+        db = DBConnectionAsync()
+        if not db.actif:
+            return await executeur("bdd").executer(StatistiqueDao().get_stats_par_jour, id_qrcode)
+        try:
+            return await db.lire_tous(
+                """
+                SELECT date_des_vues, SUM(nombre_vue)::int AS nombre_vue
+                FROM statistique
+                WHERE id_qrcode = $1
+                GROUP BY date_des_vues
+                ORDER BY date_des_vues ASC
+                """,
+                id_qrcode,
+            )
+        except Exception as e:
+            logging.exception(f"Erreur DAO en récupérant les stats par jour : {e}")
+            return []
@@ -0,0 +1,46 @@
+import logging
+
+from business_object.token import Token
+from dao.asynchrone.db_connection_async import DBConnectionAsync
+from dao.token_dao import TokenDao
+from utils.executeurs import executeur
+from utils.singleton import Singleton
+
+
+class TokenDaoAsync(metaclass=Singleton):
+    """Variante asynchrone (asyncpg) des lectures de TokenDao utilisées par les routes."""
+
+    async def trouver_token_par_jeton(self, jeton: str) -> Token | None:
+        """
+        Recherche un token à partir de sa valeur textuelle.
+
+        Paramètres
+        ----------
+        jeton : str
+            Chaîne de caractères représentant le jeton d’authentification.
+
+        Retour
+        ------
+        Token | None
+            - Renvoie un objet `Token` complet si le jeton existe en base.
+            - Renvoie None si aucun token ne correspond ou en cas d’erreur.
+        """
+        db = DBConnectionAsync()
+        if not db.actif:
+            return await executeur("bdd").executer(TokenDao().trouver_token_par_jeton, jeton)
+        try:
+            res = await db.lire_un(
+                "SELECT id_user, jeton, date_expiration FROM token WHERE jeton = $1;",
+                jeton,
+            )
+        except Exception as e:
+            logging.info(e)
+            return None
+
+        if res:
+            return Token(
+                id_user=res["id_user"],
+                jeton=res["jeton"],
+                date_expiration=res["date_expiration"],
+            )
+        return None
@@ -0,0 +1,90 @@
+import os
+import uuid
+
+import psycopg2
+import psycopg2.extensions
+
+from dao.db_connection import DBConnection
+
+# Canal PostgreSQL des notifications d'invalidation (LISTEN / NOTIFY)
+CANAL = os.getenv("CACHE_INVALIDATION_CANAL", "invalidation_cache")
+
+# Identifiant aléatoire du processus émetteur. Un PID peut être le même dans deux
+# conteneurs (souvent 1) ou être réutilisé : il ne suffit pas à reconnaître ses
+# propres notifications. Régénéré dans chaque processus fils (workers forkés).
+_identifiant = uuid.uuid4().hex
+
+
+def _regenerer_identifiant() -> None:
+    global _identifiant
+    _identifiant = uuid.uuid4().hex
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_regenerer_identifiant)
+
+
+def identifiant_processus() -> str:
+    """Identifiant aléatoire de ce processus, porté par ses notifications."""
+    return _identifiant
+
+
+def publier(cursor, domaine: str, cle) -> None:
+    """
+    Publie une notification d'invalidation dans la transaction du curseur.
+
+    PostgreSQL ne la délivre qu'au commit (jamais si la transaction est
+    annulée) ; elle porte l'identifiant du processus émetteur pour que
+    chaque processus ignore ses propres écritures, déjà invalidées localement.
+
+    Paramètres
+    ----------
+    cursor
+        Curseur de la transaction d'écriture.
+    domaine : str
+        Nature de la donnée modifiée : "qrcode", "token" ou "utilisateur".
+    cle
+        Clé de l'entrée modifiée (id_qrcode, jeton, id_user).
+    """
+    cursor.execute("SELECT pg_notify(%s, %s);", (CANAL, f"{domaine}:{identifiant_processus()}:{cle}"))
+
+
+def lire_notification(payload: str):
+    """
+    Décode une notification publiée par `publier`.
+
+    Retour
+    ------
+    tuple | None
+        (domaine, emetteur, cle), ou None si le message est mal formé.
+    """
+    morceaux = payload.split(":", 2)
+    if len(morceaux) != 3 or not morceaux[1].isalnum():
+        return None
+    domaine, emetteur, cle = morceaux
+    return domaine, emetteur, cle
+
+
+def ouvrir_ecoute(canal: str = CANAL):
+    """
+    Ouvre une connexion dédiée (hors pool, autocommit) abonnée au canal.
+
+    Retour
+    ------
+    connection
+        Connexion psycopg2 à surveiller (select + poll) ; ses
+        notifications arrivent dans `connection.notifies`.
+    """
+    p = DBConnection().parametres
+    conn = psycopg2.connect(
+        host=p["host"],
+        port=p["port"],
+        database=p["database"],
+        user=p["user"],
+        password=p["password"],
+        connect_timeout=10,
+    )
+    conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+    with conn.cursor() as cur:
+        cur.execute(f"LISTEN {psycopg2.extensions.quote_ident(canal, cur)};")
+    return conn
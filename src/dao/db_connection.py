@@ -1,31 +1,353 @@
+import logging
 import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
 import dotenv
 import psycopg2
 
 from psycopg2.extras import RealDictCursor
+from psycopg2.pool import PoolError
 from utils.singleton import Singleton
 
+logger = logging.getLogger(__name__)
+
+# Poids d'un nouvel emprunt dans la moyenne mobile des attentes, et demi-vie
+# (secondes) de cette moyenne quand aucun emprunt n'a lieu
+_POIDS_RECENT = 0.2
+_DEMI_VIE_RECENT_S = 5.0
+
+
+class PoolConnexions:
+    """
+    Pool de connexions psycopg2 borné (min / max), thread-safe.
+
+    - Emprunt par gestionnaire de contexte (`emprunter`) : commit en sortie
+      normale, rollback en cas d'exception, puis retour au pool.
+    - Vérification de santé à l'emprunt : une connexion fermée est remplacée ;
+      une connexion restée inactive plus de `verification_s` est testée par
+      un `SELECT 1`.
+    - Éviction des connexions inactives depuis plus de `inactivite_max_s`,
+      sans descendre sous `taille_min`.
+    - Si toutes les connexions sont utilisées, l'emprunt attend au plus
+      `timeout_s` secondes puis lève PoolError.
+    """
+
+    def __init__(
+        self,
+        fabrique,
+        taille_min: int = 1,
+        taille_max: int = 10,
+        timeout_s: float = 10.0,
+        inactivite_max_s: float = 300.0,
+        verification_s: float = 30.0,
+        horloge=time.monotonic,
+    ):
+        self._fabrique = fabrique
+        self.taille_max = max(1, int(taille_max))
+        self.taille_min = min(max(0, int(taille_min)), self.taille_max)
+        self.timeout_s = float(timeout_s)
+        self.inactivite_max_s = float(inactivite_max_s)
+        self.verification_s = float(verification_s)
+        self._horloge = horloge
+
+        # Connexions libres : (connexion, instant du dernier retour), la plus récente à droite
+        self._libres: deque = deque()
+        self._nb_ouvertes = 0
+        self._condition = threading.Condition()
+
+        # --- Compteurs ---
+        self._nb_emprunts = 0
+        self._nb_attentes = 0
+        self._nb_timeouts = 0
+        self._nb_creees = 0
+        self._nb_fermees = 0
+        self._nb_echecs_sante = 0
+        self._attente_totale_ms = 0.0
+        self._attente_max_ms = 0.0
+        # Moyenne mobile exponentielle des attentes (reflète la charge récente)
+        self._attente_recente_ms = 0.0
+        self._attente_recente_instant = horloge()
+        self._utilisees_max = 0
+
+        for _ in range(self.taille_min):
+            self._libres.append((self._ouvrir(), self._horloge()))
+
+    # ------------------------------------------------------------------
+    # Emprunt / retour
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def emprunter(self):
+        """
+        Emprunte une connexion pour la durée du bloc `with`.
+
+        La transaction est validée à la sortie du bloc, ou annulée si une
+        exception le traverse ; la connexion retourne ensuite au pool.
+        """
+        conn = self._acquerir()
+        try:
+            yield conn
+        except BaseException:
+            self._rendre(conn, succes=False)
+            raise
+        else:
+            self._rendre(conn, succes=True)
+
+    def _acquerir(self):
+        debut = time.perf_counter()
+        echeance = self._horloge() + self.timeout_s
+        a_attendu = False
+        with self._condition:
+            while True:
+                self._evincer_inactives()
+                if self._libres:
+                    conn, dernier_usage = self._libres.pop()
+                    break
+                if self._nb_ouvertes < self.taille_max:
+                    # Réserve la place ; la connexion est ouverte hors verrou
+                    self._nb_ouvertes += 1
+                    conn, dernier_usage = None, None
+                    break
+                restant = echeance - self._horloge()
+                if restant <= 0:
+                    self._nb_timeouts += 1
+                    self._noter_attente(self.timeout_s * 1000)
+                    raise PoolError(
+                        f"Pool de connexions saturé ({self.taille_max} connexions) "
+                        f"après {self.timeout_s} s d'attente"
+                    )
+                a_attendu = True
+                self._condition.wait(restant)
+
+        try:
+            if conn is None:
+                conn = self._ouvrir(reservee=True)
+            elif not self._est_saine(conn, dernier_usage):
+                self._fermer(conn)
+                conn = self._ouvrir(reservee=True)
+        except BaseException:
+            with self._condition:
+                self._nb_ouvertes -= 1
+                self._condition.notify()
+            raise
+
+        attente_ms = (time.perf_counter() - debut) * 1000
+        with self._condition:
+            self._nb_emprunts += 1
+            if a_attendu:
+                self._nb_attentes += 1
+            self._attente_totale_ms += attente_ms
+            self._attente_max_ms = max(self._attente_max_ms, attente_ms)
+            self._noter_attente(attente_ms)
+            self._utilisees_max = max(self._utilisees_max, self._nb_ouvertes - len(self._libres))
+        return conn
+
+    def _attente_recente(self) -> float:
+        """Moyenne mobile des attentes, atténuée depuis le dernier emprunt (verrou tenu)."""
+        ecoule = max(0.0, self._horloge() - self._attente_recente_instant)
+        return self._attente_recente_ms * 0.5 ** (ecoule / _DEMI_VIE_RECENT_S)
+
+    def _noter_attente(self, attente_ms: float) -> None:
+        """Intègre une attente à la moyenne mobile (verrou tenu)."""
+        recente = self._attente_recente()
+        self._attente_recente_ms = recente + _POIDS_RECENT * (attente_ms - recente)
+        self._attente_recente_instant = self._horloge()
+
+    def _rendre(self, conn, succes: bool) -> None:
+        try:
+            if not conn.closed:
+                if succes:
+                    conn.commit()
+                else:
+                    conn.rollback()
+        except Exception as e:
+            logger.warning(f"Connexion rendue inutilisable, elle est fermée : {e}")
+            self._fermer(conn)
+
+        with self._condition:
+            if conn.closed:
+                self._nb_ouvertes -= 1
+            else:
+                self._libres.append((conn, self._horloge()))
+            self._condition.notify()
+
+    # ------------------------------------------------------------------
+    # Ouverture, santé, éviction
+    # ------------------------------------------------------------------
+
+    def _ouvrir(self, reservee: bool = False):
+        """Ouvre une connexion ; `reservee` indique que la place est déjà comptée."""
+        conn = self._fabrique()
+        with self._condition:
+            self._nb_creees += 1
+            if not reservee:
+                self._nb_ouvertes += 1
+        return conn
+
+    def _fermer(self, conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._condition:
+            self._nb_fermees += 1
+
+    def _est_saine(self, conn, dernier_usage: float) -> bool:
+        if conn.closed:
+            with self._condition:
+                self._nb_echecs_sante += 1
+            return False
+        if self._horloge() - dernier_usage < self.verification_s:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception as e:
+            logger.warning(f"Connexion au SGBD invalide, elle est remplacée : {e}")
+            with self._condition:
+                self._nb_echecs_sante += 1
+            return False
+
+    def _evincer_inactives(self) -> None:
+        """Ferme les connexions libres les plus anciennes au-delà de taille_min (verrou tenu)."""
+        limite = self._horloge() - self.inactivite_max_s
+        while (
+            self._libres
+            and self._nb_ouvertes > self.taille_min
+            and self._libres[0][1] < limite
+        ):
+            conn, _ = self._libres.popleft()
+            self._nb_ouvertes -= 1
+            try:
+                conn.close()
+            except Exception:
+                pass
+            self._nb_fermees += 1
+
+    def fermer(self) -> None:
+        """Ferme les connexions libres (le pool reste utilisable et se rouvrira à la demande)."""
+        with self._condition:
+            while self._libres:
+                conn, _ = self._libres.pop()
+                self._nb_ouvertes -= 1
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+                self._nb_fermees += 1
+
+    # ------------------------------------------------------------------
+    # Métriques
+    # ------------------------------------------------------------------
+
+    def metriques(self) -> dict:
+        """
+        Retourne les compteurs du pool.
+
+        Retour
+        ------
+        dict
+            taille_min, taille_max, ouvertes, libres, utilisees, utilisees_max,
+            saturation (utilisees / taille_max), emprunts, attentes, timeouts,
+            creees, fermees, echecs_sante, attente_ms (moyenne / max / recente).
+        """
+        with self._condition:
+            utilisees = self._nb_ouvertes - len(self._libres)
+            return {
+                "taille_min": self.taille_min,
+                "taille_max": self.taille_max,
+                "ouvertes": self._nb_ouvertes,
+                "libres": len(self._libres),
+                "utilisees": utilisees,
+                "utilisees_max": self._utilisees_max,
+                "saturation": round(utilisees / self.taille_max, 4),
+                "emprunts": self._nb_emprunts,
+                "attentes": self._nb_attentes,
+                "timeouts": self._nb_timeouts,
+                "creees": self._nb_creees,
+                "fermees": self._nb_fermees,
+                "echecs_sante": self._nb_echecs_sante,
+                "attente_ms": {
+                    "moyenne": round(self._attente_totale_ms / self._nb_emprunts, 3)
+                    if self._nb_emprunts else 0.0,
+                    "max": round(self._attente_max_ms, 3),
+                    "recente": round(self._attente_recente(), 3),
+                },
+            }
+
+
+def erreur_permanente(e: BaseException) -> bool:
+    """
+    Indique si une erreur de base se reproduira à l'identique si l'écriture
+    est rejouée (contrainte violée, donnée invalide, requête erronée).
+
+    Les pannes de connexion, les interblocages et un pool saturé
+    (OperationalError, InterfaceError, PoolError) sont transitoires, comme
+    toute exception étrangère à psycopg2 : l'écriture peut être rejouée.
+    """
+    return (
+        isinstance(e, psycopg2.Error)
+        and not isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError, PoolError))
+    )
+
 
 class DBConnection(metaclass=Singleton):
     """
     Classe de connexion à la base de données
-    Elle permet de n'ouvrir qu'une seule et unique connexion
+    Elle gère un pool de connexions partagé par tous les DAO :
+    `with DBConnection().connection as conn:` emprunte une connexion du pool
+    et la rend à la sortie du bloc (commit, ou rollback en cas d'exception).
     """
 
     def __init__(self):
-        """Ouverture de la connexion"""
+        """Création du pool (taille via POSTGRES_POOL_*)"""
         dotenv.load_dotenv()
 
-        self.__connection = psycopg2.connect(
+        self.__parametres = dict(
             host=os.environ["POSTGRES_HOST"],
             port=os.environ["POSTGRES_PORT"],
             database=os.environ["POSTGRES_DATABASE"],
             user=os.environ["POSTGRES_USER"],
             password=os.environ["POSTGRES_PASSWORD"],
-            options=f"-c search_path={os.environ['POSTGRES_SCHEMA']}",
-            cursor_factory=RealDictCursor,
+            schema=os.environ["POSTGRES_SCHEMA"],
         )
+        p = self.__parametres
+        self.__pool = PoolConnexions(
+            lambda: psycopg2.connect(
+                host=p["host"],
+                port=p["port"],
+                database=p["database"],
+                user=p["user"],
+                password=p["password"],
+                options=f"-c search_path={p['schema']}",
+                cursor_factory=RealDictCursor,
+            ),
+            taille_min=int(os.getenv("POSTGRES_POOL_MIN", 1)),
+            taille_max=int(os.getenv("POSTGRES_POOL_MAX", 10)),
+            timeout_s=float(os.getenv("POSTGRES_POOL_TIMEOUT_S", 10)),
+            inactivite_max_s=float(os.getenv("POSTGRES_POOL_INACTIVITE_S", 300)),
+            verification_s=float(os.getenv("POSTGRES_POOL_VERIFICATION_S", 30)),
+        )
+
+    @property
+    def parametres(self) -> dict:
+        """Paramètres de connexion lus à la création (host, port, database, user, password, schema)."""
+        return dict(self.__parametres)
 
     @property
     def connection(self):
-        return self.__connection
+        """Gestionnaire de contexte : emprunte une connexion du pool."""
+        return self.__pool.emprunter()
+
+    def fermer(self) -> None:
+        """Ferme les connexions inactives du pool."""
+        self.__pool.fermer()
+
+    def metriques(self) -> dict:
+        """Compteurs du pool (taille, saturation, temps d'attente…)."""
+        return self.__pool.metriques()
@@ -1,80 +1,505 @@
 # src/dao/log_scan_dao.py
+import io
 import logging
 from utils.singleton import Singleton
 from utils.log_decorator import log
 from dao.db_connection import DBConnection
+from dao.statistique_dao import StatistiqueDao, invalider_agregats
 from business_object.log_scan import LogScan
+from datetime import date, datetime, timezone
 from typing import List, Dict, Any
-from typing import Optional
+from typing import Optional, Tuple
+
+from psycopg2.extras import execute_values
 
 
 logger = logging.getLogger(__name__)
 
+
+def _valeur_copy(valeur) -> str:
+    """Formate une valeur pour COPY (format texte : \\N pour NULL, caractères spéciaux échappés)."""
+    if valeur is None:
+        return "\\N"
+    if isinstance(valeur, bool):
+        return "t" if valeur else "f"
+    if isinstance(valeur, datetime):
+        return valeur.isoformat()
+    return (
+        str(valeur)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _ligne_copy(ls: LogScan) -> str:
+    return "\t".join(
+        _valeur_copy(v)
+        for v in (
+            ls.id_qrcode,
+            ls.client_host,
+            ls.user_agent,
+            ls.date_scan,
+            ls.referer,
+            ls.accept_language,
+            ls.geo_country,
+            ls.geo_region,
+            ls.geo_city,
+            ls.geo_enrichi,
+        )
+    ) + "\n"
+
+
 class LogScanDao(metaclass=Singleton):
     """DAO pour la table logs_scan."""
 
     @log
-    def enregistrer_log(
-    self,
-    id_qrcode: int,
-    client_host: Optional[str] = None,
-    user_agent: Optional[str] = None,
-    referer: Optional[str] = None,
-    accept_language: Optional[str] = None,
-    geo_country: Optional[str] = None,
-    geo_region: Optional[str] = None,
-    geo_city: Optional[str] = None
-) -> Optional[LogScan]:
-        """
-        Enregistre un log de scan pour un QR code.
+    def creer_log(self, log_scan: LogScan) -> bool:
+        """
+        Insère un log de scan en base et hydrate l’objet.
 
         Paramètres
         ----------
-        id_qrcode : int
-            Identifiant du QR code scanné.
-        client_host : str, optionnel
-            Adresse IP du client ayant effectué le scan.
-        user_agent : str, optionnel
-            User-Agent du client (navigateur ou application).
-        referer : str, optionnel
-            URL de provenance du scan.
-        accept_language : str, optionnel
-            Chaîne indiquant la langue préférée du client.
-        geo_country : str, optionnel
-            Pays déduit de la géolocalisation.
-        geo_region : str, optionnel
-            Région déduite de la géolocalisation.
-        geo_city : str, optionnel
-            Ville déduite de la géolocalisation.
+        log_scan : LogScan
+            Objet métier construit par le service. Si date_scan est None,
+            la base utilise NOW().
 
         Retour
         ------
-        Optional[LogScan]
-            - Renvoie l’objet LogScan créé et enregistré en base si succès.
-            - Renvoie None si l’enregistrement échoue ou en cas d’erreur.
+        bool
+            - True si l’insertion a réussi (id_scan et date_scan renseignés).
+            - False en cas d’erreur (ex. id_qrcode inexistant).
 
         Notes
         -----
-        - L’objet LogScan est construit dans le service, puis transmis au DAO.
-        - Toute exception interne est interceptée et journalisée ; la méthode
-        renvoie alors None pour ne jamais interrompre le flux d’exécution.
+        - Toute exception SQL est journalisée et transformée en False.
         """
         try:
-            log_scan = LogScan(
-                id_qrcode=id_qrcode,
-                client_host=client_host,
-                user_agent=user_agent,
-                referer=referer,
-                accept_language=accept_language,
-                geo_country=geo_country,
-                geo_region=geo_region,
-                geo_city=geo_city
+            with DBConnection().connection as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        """
+                        INSERT INTO logs_scan (id_qrcode, client_host, user_agent, date_scan,
+                                               referer, accept_language,
+                                               geo_country, geo_region, geo_city, geo_enrichi)
+                        VALUES (%s, %s, %s, COALESCE(%s, NOW()), %s, %s, %s, %s, %s, %s)
+                        RETURNING id_scan, date_scan;
+                        """,
+                        (
+                            log_scan.id_qrcode,
+                            log_scan.client_host,
+                            log_scan.user_agent,
+                            log_scan.date_scan,
+                            log_scan.referer,
+                            log_scan.accept_language,
+                            log_scan.geo_country,
+                            log_scan.geo_region,
+                            log_scan.geo_city,
+                            log_scan.geo_enrichi,
+                        ),
+                    )
+                    row = cur.fetchone()
+                conn.commit()
+
+            log_scan.id_scan = row["id_scan"] if isinstance(row, dict) else row[0]
+            log_scan.date_scan = row["date_scan"] if isinstance(row, dict) else row[1]
+            return True
+
+        except Exception as e:
+            logger.exception(f"Erreur lors de l'enregistrement du log de scan : {e}")
+            return False
+
+    @staticmethod
+    def _requete_scans(cur, logs: List[LogScan], retour: str) -> str:
+        """
+        Construit l'instruction unique « UPSERT statistique + INSERT logs_scan ».
+
+        Les deux écritures sont des CTE modifiantes d'une même requête : un seul
+        aller-retour, une seule transaction. Les vues sont agrégées par
+        (QR, jour) et triées pour que deux lots concurrents verrouillent les
+        lignes de statistique dans le même ordre. Les scans d'un QR code
+        supprimé depuis (jointure sur qrcode) sont ignorés, comme dans
+        `charger_segment`.
+        """
+        increments: Dict[Tuple[int, date], int] = {}
+        for ls in logs:
+            cle = (ls.id_qrcode, ls.date_scan.date())
+            increments[cle] = increments.get(cle, 0) + 1
+
+        shard = StatistiqueDao.choisir_shard()
+        valeurs_vues = ",".join(
+            cur.mogrify("(%s::int, %s::date, %s::int, %s::int)", (id_qr, jour, nb, shard)).decode()
+            for (id_qr, jour), nb in sorted(increments.items())
+        )
+        valeurs_logs = ",".join(
+            cur.mogrify(
+                "(%s::int, %s::text, %s::text, %s::timestamptz, %s::text, %s::text,"
+                " %s::text, %s::text, %s::text, %s::boolean)",
+                (
+                    ls.id_qrcode,
+                    ls.client_host,
+                    ls.user_agent,
+                    ls.date_scan,
+                    ls.referer,
+                    ls.accept_language,
+                    ls.geo_country,
+                    ls.geo_region,
+                    ls.geo_city,
+                    ls.geo_enrichi,
+                ),
+            ).decode()
+            for ls in logs
+        )
+        return f"""
+            WITH vues_lot (id_qrcode, date_des_vues, nombre_vue, shard) AS (
+                VALUES {valeurs_vues}
+            ),
+            vues AS (
+                INSERT INTO statistique (id_qrcode, date_des_vues, nombre_vue, shard)
+                SELECT v.id_qrcode, v.date_des_vues, v.nombre_vue, v.shard
+                FROM vues_lot v
+                JOIN qrcode q ON q.id_qrcode = v.id_qrcode
+                ORDER BY v.id_qrcode, v.date_des_vues
+                ON CONFLICT (id_qrcode, date_des_vues, shard)
+                DO UPDATE SET nombre_vue = statistique.nombre_vue + EXCLUDED.nombre_vue
+            ),
+            logs_lot (id_qrcode, client_host, user_agent, date_scan, referer, accept_language,
+                      geo_country, geo_region, geo_city, geo_enrichi) AS (
+                VALUES {valeurs_logs}
+            ),
+            logs AS (
+                INSERT INTO logs_scan (id_qrcode, client_host, user_agent, date_scan,
+                                       referer, accept_language,
+                                       geo_country, geo_region, geo_city, geo_enrichi)
+                SELECT l.id_qrcode, l.client_host, l.user_agent, l.date_scan,
+                       l.referer, l.accept_language,
+                       l.geo_country, l.geo_region, l.geo_city, l.geo_enrichi
+                FROM logs_lot l
+                JOIN qrcode q ON q.id_qrcode = l.id_qrcode
+                RETURNING id_scan, date_scan
             )
-            
-            success = self.dao.creer_log(log_scan)
-            
-            return log_scan if success else None
-            
+            {retour};
+        """
+
+    @log
+    def enregistrer_scan(self, log_scan: LogScan) -> bool:
+        """
+        Enregistre un scan complet (vue du jour + log) en une seule instruction.
+
+        Paramètres
+        ----------
+        log_scan : LogScan
+            Objet métier construit par le service. Si date_scan est None,
+            l'heure courante (UTC) est utilisée pour le log et pour la vue.
+
+        Retour
+        ------
+        bool
+            - True si le scan a été enregistré (id_scan et date_scan renseignés).
+            - False si le QR code n'existe pas (ou plus) ou en cas d'erreur :
+              rien n'est écrit.
+
+        Notes
+        -----
+        Remplace la paire StatistiqueDao.incrementer_vue_jour + creer_log :
+        un aller-retour et un commit au lieu de deux.
+        """
+        if log_scan.date_scan is None:
+            log_scan.date_scan = datetime.now(timezone.utc)
+        try:
+            with DBConnection().connection as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        self._requete_scans(cur, [log_scan], "SELECT id_scan, date_scan FROM logs")
+                    )
+                    row = cur.fetchone()
+                conn.commit()
+            if row is None:
+                logger.warning(f"Scan ignoré : QR code {log_scan.id_qrcode} introuvable")
+                return False
+            invalider_agregats([log_scan.id_qrcode])
+
+            log_scan.id_scan = row["id_scan"] if isinstance(row, dict) else row[0]
+            log_scan.date_scan = row["date_scan"] if isinstance(row, dict) else row[1]
+            return True
+
         except Exception as e:
-            logging.exception(f"Erreur dans LogScanService : {e}")
-            return None
+            logger.exception(f"Erreur lors de l'enregistrement du scan : {e}")
+            return False
+
+    def enregistrer_scans(self, logs: List[LogScan]) -> int:
+        """
+        Enregistre un lot de scans (vues agrégées + logs) en une seule instruction.
+
+        Paramètres
+        ----------
+        logs : List[LogScan]
+            Scans à enregistrer ; date_scan doit être renseignée (elle fixe le
+            jour de la vue). Les objets ne sont pas hydratés.
+
+        Retour
+        ------
+        int
+            Nombre de logs insérés (les scans d'un QR code supprimé sont ignorés).
+
+        Notes
+        -----
+        - Pas de décorateur @log : méthode appelée en boucle par le tampon d'écriture.
+        - Les exceptions sont propagées : l'appelant décide de rejouer le lot.
+        """
+        if not logs:
+            return 0
+
+        with DBConnection().connection as conn:
+            with conn.cursor() as cur:
+                cur.execute(self._requete_scans(cur, logs, "SELECT COUNT(*) AS nb FROM logs"))
+                row = cur.fetchone()
+            conn.commit()
+        invalider_agregats(ls.id_qrcode for ls in logs)
+        nb = row["nb"] if isinstance(row, dict) else row[0]
+        if nb < len(logs):
+            logger.warning(f"Lot de scans : {len(logs) - nb} scans ignorés (QR code supprimé)")
+        return nb
+
+    def charger_segment(self, nom: str, logs: List[LogScan]) -> Optional[int]:
+        """
+        Charge un segment du journal local des scans (vues + logs), une seule fois.
+
+        Paramètres
+        ----------
+        nom : str
+            Nom (unique) du segment.
+        logs : List[LogScan]
+            Scans du segment ; date_scan renseignée (UTC).
+
+        Retour
+        ------
+        Optional[int]
+            - Nombre de logs insérés.
+            - None si le segment a déjà été chargé (rien n'est écrit).
+
+        Notes
+        -----
+        - Le nom du segment est inscrit dans journal_segments_appliques dans la
+          même transaction que les scans : un segment rejoué après un arrêt
+          entre le commit et la suppression du fichier n'est pas compté deux fois.
+        - Les scans sont envoyés par COPY dans une table temporaire, puis
+          répartis en une instruction (UPSERT statistique + INSERT logs_scan).
+        - Les scans d'un QR code supprimé entre-temps sont ignorés.
+        - Les exceptions sont propagées : le segment est conservé et rejoué.
+        """
+        with DBConnection().connection as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    INSERT INTO journal_segments_appliques (nom, nb_scans)
+                    VALUES (%s, %s)
+                    ON CONFLICT (nom) DO NOTHING
+                    RETURNING nom;
+                    """,
+                    (nom, len(logs)),
+                )
+                if cur.fetchone() is None:
+                    return None
+                if not logs:
+                    return 0
+
+                cur.execute(
+                    """
+                    CREATE TEMP TABLE scans_a_charger (
+                        id_qrcode INT, client_host TEXT, user_agent TEXT,
+                        date_scan TIMESTAMPTZ, referer TEXT, accept_language TEXT,
+                        geo_country TEXT, geo_region TEXT, geo_city TEXT,
+                        geo_enrichi BOOLEAN
+                    ) ON COMMIT DROP;
+                    """
+                )
+                cur.copy_expert(
+                    """
+                    COPY scans_a_charger (id_qrcode, client_host, user_agent, date_scan,
+                                          referer, accept_language,
+                                          geo_country, geo_region, geo_city, geo_enrichi)
+                    FROM STDIN
+                    """,
+                    io.StringIO("".join(_ligne_copy(ls) for ls in logs)),
+                )
+                cur.execute(
+                    """
+                    WITH charges AS (
+                        SELECT s.*
+                        FROM scans_a_charger s
+                        JOIN qrcode q ON q.id_qrcode = s.id_qrcode
+                    ),
+                    vues AS (
+                        INSERT INTO statistique (id_qrcode, date_des_vues, nombre_vue, shard)
+                        SELECT id_qrcode, (date_scan AT TIME ZONE 'UTC')::date, COUNT(*), %s
+                        FROM charges
+                        GROUP BY 1, 2
+                        ORDER BY 1, 2
+                        ON CONFLICT (id_qrcode, date_des_vues, shard)
+                        DO UPDATE SET nombre_vue = statistique.nombre_vue + EXCLUDED.nombre_vue
+                    ),
+                    logs AS (
+                        INSERT INTO logs_scan (id_qrcode, client_host, user_agent, date_scan,
+                                               referer, accept_language,
+                                               geo_country, geo_region, geo_city, geo_enrichi)
+                        SELECT id_qrcode, client_host, user_agent, date_scan,
+                               referer, accept_language,
+                               geo_country, geo_region, geo_city, geo_enrichi
+                        FROM charges
+                        RETURNING 1
+                    )
+                    SELECT COUNT(*) AS nb FROM logs;
+                    """,
+                    (StatistiqueDao.choisir_shard(),),
+                )
+                row = cur.fetchone()
+            conn.commit()
+        invalider_agregats(ls.id_qrcode for ls in logs)
+        nb = row["nb"] if isinstance(row, dict) else row[0]
+        if nb < len(logs):
+            logger.warning(f"Segment {nom} : {len(logs) - nb} scans ignorés (QR code supprimé)")
+        return nb
+
+    def purger_segments_appliques(self, jours: int = 7) -> int:
+        """
+        Supprime les traces des segments chargés depuis plus de `jours` jours.
+
+        Retour
+        ------
+        int
+            Nombre de lignes supprimées.
+        """
+        with DBConnection().connection as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    DELETE FROM journal_segments_appliques
+                    WHERE date_application < NOW() - make_interval(days => %s);
+                    """,
+                    (int(jours),),
+                )
+                nb = cur.rowcount
+            conn.commit()
+        return nb
+
+    @log
+    def get_scans_recents(self, id_qrcode: int, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Récupère les derniers scans d’un QR code, du plus récent au plus ancien.
+
+        Paramètres
+        ----------
+        id_qrcode : int
+            Identifiant du QR code.
+        limit : int, par défaut 20
+            Nombre maximal de logs renvoyés.
+
+        Retour
+        ------
+        List[Dict[str, Any]]
+            Liste de dictionnaires (colonnes de logs_scan).
+            Liste vide si aucun log ou en cas d’erreur.
+        """
+        try:
+            with DBConnection().connection as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        """
+                        SELECT id_scan, id_qrcode, client_host, user_agent, date_scan,
+                               referer, accept_language, geo_country, geo_region, geo_city
+                        FROM logs_scan
+                        WHERE id_qrcode = %s
+                        ORDER BY date_scan DESC, id_scan DESC
+                        LIMIT %s;
+                        """,
+                        (id_qrcode, limit),
+                    )
+                    return cur.fetchall() or []
+        except Exception as e:
+            logger.exception(f"Erreur DAO en récupérant les scans récents : {e}")
+            return []
+
+    def lister_ips_a_enrichir(self, limite: int = 500) -> List[str]:
+        """
+        Liste, sans doublon, les adresses des plus anciens logs non géolocalisés.
+
+        Paramètres
+        ----------
+        limite : int, par défaut 500
+            Nombre maximal de lignes logs_scan examinées (et donc d'adresses).
+
+        Retour
+        ------
+        List[str]
+            Adresses distinctes ('' pour un client_host NULL).
+
+        Notes
+        -----
+        S'appuie sur l'index partiel idx_logs_scan_a_enrichir (WHERE NOT geo_enrichi).
+        """
+        with DBConnection().connection as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT DISTINCT ip
+                    FROM (
+                        SELECT COALESCE(client_host, '') AS ip
+                        FROM logs_scan
+                        WHERE NOT geo_enrichi
+                        ORDER BY id_scan
+                        LIMIT %s
+                    ) AS a_enrichir;
+                    """,
+                    (limite,),
+                )
+                rows = cur.fetchall()
+        return [r["ip"] if isinstance(r, dict) else r[0] for r in rows]
+
+    def enrichir_geo(
+        self, resultats: Dict[str, Tuple[Optional[str], Optional[str], Optional[str]]]
+    ) -> int:
+        """
+        Renseigne la géolocalisation de tous les logs en attente pour un lot d'adresses.
+
+        Paramètres
+        ----------
+        resultats : Dict[str, Tuple[str | None, str | None, str | None]]
+            {adresse: (pays, region, ville)} ; une adresse non localisée est
+            associée à (None, None, None) et n'est plus reprise ensuite.
+
+        Retour
+        ------
+        int
+            Nombre de lignes logs_scan mises à jour.
+
+        Notes
+        -----
+        Un seul UPDATE ... FROM (VALUES ...) ensembliste, quel que soit le
+        nombre de lignes concernées par adresse.
+        """
+        if not resultats:
+            return 0
+
+        with DBConnection().connection as conn:
+            with conn.cursor() as cur:
+                execute_values(
+                    cur,
+                    """
+                    UPDATE logs_scan AS l
+                       SET geo_country = v.pays,
+                           geo_region  = v.region,
+                           geo_city    = v.ville,
+                           geo_enrichi = TRUE
+                      FROM (VALUES %s) AS v(ip, pays, region, ville)
+                     WHERE NOT l.geo_enrichi
+                       AND COALESCE(l.client_host, '') = v.ip;
+                    """,
+                    [(ip, *lieu) for ip, lieu in resultats.items()],
+                    template="(%s, %s::text, %s::text, %s::text)",
+                    page_size=len(resultats),
+                )
+                nb = cur.rowcount
+            conn.commit()
+        return nb
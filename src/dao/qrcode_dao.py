@@ -1,7 +1,10 @@
 import logging
-from typing import List, Optional
+from datetime import date, datetime
+from typing import Iterator, List, Optional
 from utils.log_decorator import log
+from utils.cache_resultat import cache_resultat, invalider_tag
 from dao.db_connection import DBConnection
+from dao.bus_invalidation import publier
 from business_object.qr_code import Qrcode
 
 logger = logging.getLogger(__name__)
@@ -23,6 +26,10 @@ class QRCodeDao:
     - Lecture via propriétés de Qrcode
     - Les méthodes de création et modification retournent l’objet (avec id)
     - Les méthodes de suppression retournent un bool
+    - Les écritures publient une notification d'invalidation des caches
+      (dao.bus_invalidation), délivrée aux autres workers au commit
+    - La liste des QR codes d'un propriétaire est mise en cache (tag
+      "proprietaire:<id_user>", invalidé par les écritures)
     """
 
     def __init__(self):
@@ -60,9 +67,10 @@ class QRCodeDao:
                     if qrcode.id_qrcode is not None:
                         cur.execute(
                             """
-                            INSERT INTO qrcode (id_qrcode, url, id_proprietaire, type_qrcode, couleur, logo)
-                            VALUES (%s, %s, %s, %s, %s, %s)
-                            RETURNING id_qrcode, date_creation;
+                            INSERT INTO qrcode (id_qrcode, url, id_proprietaire, type_qrcode, couleur, logo,
+                                                cache_max_age)
+                            VALUES (%s, %s, %s, %s, %s, %s, %s)
+                            RETURNING id_qrcode, date_creation, version;
                             """,
                             (
                                 qrcode.id_qrcode,
@@ -71,14 +79,15 @@ class QRCodeDao:
                                 qrcode.type_qrcode,
                                 qrcode.couleur,
                                 qrcode.logo,
+                                qrcode.cache_max_age,
                             ),
                         )
                     else:
                         cur.execute(
                             """
-                            INSERT INTO qrcode (url, id_proprietaire, type_qrcode, couleur, logo)
-                            VALUES (%s, %s, %s, %s, %s)
-                            RETURNING id_qrcode, date_creation;
+                            INSERT INTO qrcode (url, id_proprietaire, type_qrcode, couleur, logo, cache_max_age)
+                            VALUES (%s, %s, %s, %s, %s, %s)
+                            RETURNING id_qrcode, date_creation, version;
                             """,
                             (
                                 qrcode.url,
@@ -86,6 +95,7 @@ class QRCodeDao:
                                 qrcode.type_qrcode,
                                 qrcode.couleur,
                                 qrcode.logo,
+                                qrcode.cache_max_age,
                             ),
                         )
 
@@ -97,15 +107,22 @@ class QRCodeDao:
                     if isinstance(res, dict):
                         new_id = res["id_qrcode"]
                         date_creation = res["date_creation"]
+                        version = res["version"]
                     else:
-                        new_id, date_creation = res
+                        new_id, date_creation, version = res
 
                     # Hydrate l’objet
                     qrcode.id_qrcode = new_id
                     qrcode.date_creation = date_creation
+                    qrcode.version = version
+
+                    # Un identifiant inconnu peut être en cache négatif chez les autres workers
+                    publier(cur, "qrcode", new_id)
+                    publier(cur, "proprietaire", int(qrcode.id_proprietaire))
 
                 conn.commit()
 
+            invalider_tag(f"proprietaire:{int(qrcode.id_proprietaire)}")
             logger.info(f"QR code créé avec succès : id={new_id}")
             return qrcode
 
@@ -137,11 +154,19 @@ class QRCodeDao:
         try:
             with self._db.connection as conn:
                 with conn.cursor() as cur:
-                    cur.execute("DELETE FROM qrcode WHERE id_qrcode = %s;", (id_qrcode,))
-                    deleted = cur.rowcount > 0
+                    cur.execute(
+                        "DELETE FROM qrcode WHERE id_qrcode = %s RETURNING id_proprietaire;", (id_qrcode,)
+                    )
+                    row = cur.fetchone()
+                    deleted = row is not None
+                    if deleted:
+                        id_proprietaire = row["id_proprietaire"] if isinstance(row, dict) else row[0]
+                        publier(cur, "qrcode", id_qrcode)
+                        publier(cur, "proprietaire", id_proprietaire)
                 conn.commit()
 
             if deleted:
+                invalider_tag(f"qrcode:{id_qrcode}", f"proprietaire:{id_proprietaire}")
                 logger.info(f"QR code {id_qrcode} supprimé avec succès.")
             else:
                 logger.warning(f"Tentative de suppression d’un QR code inexistant : {id_qrcode}.")
@@ -212,7 +237,8 @@ class QRCodeDao:
                 with conn.cursor() as cur:
                     cur.execute(
                         """
-                        SELECT id_qrcode, url, id_proprietaire, date_creation, type_qrcode, couleur, logo
+                        SELECT id_qrcode, url, id_proprietaire, date_creation, type_qrcode, couleur, logo,
+                               version, cache_max_age
                         FROM qrcode
                         WHERE id_qrcode = %s;
                         """,
@@ -238,6 +264,8 @@ class QRCodeDao:
                 type_qrcode=row["type_qrcode"],
                 couleur=row["couleur"],
                 logo=row["logo"],
+                version=row["version"],
+                cache_max_age=row["cache_max_age"],
             )
 
         except Exception as e:
@@ -245,6 +273,12 @@ class QRCodeDao:
             return None
 
     @log
+    @cache_resultat(
+        cle=lambda id_user: int(id_user),
+        tags=lambda id_user: [f"proprietaire:{int(id_user)}"],
+        cacher_si=bool,  # une liste vide (aucun QR ou erreur) n'est pas conservée
+        copier=list,
+    )
     def lister_par_proprietaire(self, id_user: int) -> List[Qrcode]:
         """
     Met à jour les champs d’un QR code existant.
@@ -277,7 +311,8 @@ class QRCodeDao:
                 with conn.cursor() as cur:
                     cur.execute(
                         """
-                        SELECT id_qrcode, url, id_proprietaire, date_creation, type_qrcode, couleur, logo
+                        SELECT id_qrcode, url, id_proprietaire, date_creation, type_qrcode, couleur, logo,
+                               version, cache_max_age
                         FROM qrcode
                         WHERE id_proprietaire = %s
                         ORDER BY date_creation DESC;
@@ -301,6 +336,8 @@ class QRCodeDao:
                         type_qrcode=r["type_qrcode"],
                         couleur=r["couleur"],
                         logo=r["logo"],
+                        version=r["version"],
+                        cache_max_age=r["cache_max_age"],
                     )
                 )
             logger.info(f"{len(qrcodes)} QR codes récupérés pour l’utilisateur {id_user}.")
@@ -310,6 +347,231 @@ class QRCodeDao:
             logger.exception(f"Erreur lors du listing des QR codes pour user {id_user} : {e}")
             return []
 
+    @log
+    def lister_page_par_proprietaire(
+        self,
+        id_user: int,
+        limite: int,
+        apres: Optional[int] = None,
+        type_qrcode: Optional[bool] = None,
+        cree_depuis: Optional[datetime] = None,
+        cree_avant: Optional[datetime] = None,
+    ) -> Optional[List[Qrcode]]:
+        """
+        Liste une page des QR codes d'un propriétaire (pagination par curseur).
+
+        Paramètres
+        ----------
+        id_user : int
+            Identifiant du propriétaire.
+        limite : int
+            Nombre maximal de QR codes renvoyés.
+        apres : int, optionnel
+            Curseur : dernier id_qrcode de la page précédente (None pour la première page).
+        type_qrcode : bool, optionnel
+            Ne garde que les QR suivis (True) ou statiques (False).
+        cree_depuis, cree_avant : datetime, optionnel
+            Bornes (incluse, exclue) de la date de création.
+
+        Retour
+        ------
+        Optional[List[Qrcode]]
+            QR codes par id_qrcode décroissant (les plus récents d'abord) ;
+            None en cas d'erreur.
+
+        Notes
+        -----
+        La page suivante commence sous le curseur (`id_qrcode < apres`) et
+        parcourt l'index (id_proprietaire, id_qrcode) : son coût ne dépend pas
+        du nombre de QR codes du compte ni du rang de la page, contrairement
+        à un OFFSET.
+        """
+        conditions = ["id_proprietaire = %s"]
+        params: list = [id_user]
+        if apres is not None:
+            conditions.append("id_qrcode < %s")
+            params.append(apres)
+        if type_qrcode is not None:
+            conditions.append("type_qrcode = %s")
+            params.append(type_qrcode)
+        if cree_depuis is not None:
+            conditions.append("date_creation >= %s")
+            params.append(cree_depuis)
+        if cree_avant is not None:
+            conditions.append("date_creation < %s")
+            params.append(cree_avant)
+        params.append(limite)
+
+        try:
+            with self._db.connection as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        f"""
+                        SELECT id_qrcode, url, id_proprietaire, date_creation, type_qrcode, couleur, logo,
+                               version, cache_max_age
+                        FROM qrcode
+                        WHERE {" AND ".join(conditions)}
+                        ORDER BY id_qrcode DESC
+                        LIMIT %s;
+                        """,
+                        params,
+                    )
+                    rows = cur.fetchall()
+        except Exception as e:
+            logger.exception(f"Erreur lors du listing paginé des QR codes pour user {id_user} : {e}")
+            return None
+
+        return [
+            Qrcode(
+                id_qrcode=r["id_qrcode"],
+                url=r["url"],
+                id_proprietaire=str(r["id_proprietaire"]),
+                date_creation=r["date_creation"],
+                type_qrcode=r["type_qrcode"],
+                couleur=r["couleur"],
+                logo=r["logo"],
+                version=r["version"],
+                cache_max_age=r["cache_max_age"],
+            )
+            for r in rows
+        ]
+
+    @log
+    def lister_plus_scannes(self, limite: int, depuis: date) -> List[Qrcode]:
+        """
+        Liste, en une requête, les QR codes les plus scannés depuis une date.
+
+        Paramètres
+        ----------
+        limite : int
+            Nombre maximal de QR codes.
+        depuis : date
+            Premier jour pris en compte (statistique.date_des_vues).
+
+        Retour
+        ------
+        List[Qrcode]
+            QR codes par nombre de vues décroissant ; liste vide en cas d'erreur.
+
+        Notes
+        -----
+        Utilisée pour préchauffer les caches au démarrage.
+        """
+        try:
+            with self._db.connection as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        """
+                        SELECT q.id_qrcode, q.url, q.id_proprietaire, q.date_creation, q.type_qrcode,
+                               q.couleur, q.logo, q.version, q.cache_max_age
+                        FROM (
+                            SELECT id_qrcode, SUM(nombre_vue) AS vues
+                            FROM statistique
+                            WHERE date_des_vues >= %s
+                            GROUP BY id_qrcode
+                            ORDER BY vues DESC
+                            LIMIT %s
+                        ) s
+                        JOIN qrcode q ON q.id_qrcode = s.id_qrcode
+                        ORDER BY s.vues DESC, q.id_qrcode;
+                        """,
+                        (depuis, limite),
+                    )
+                    rows = cur.fetchall()
+        except Exception as e:
+            logger.exception(f"Erreur lors de la recherche des QR codes les plus scannés : {e}")
+            return []
+
+        return [
+            Qrcode(
+                id_qrcode=r["id_qrcode"],
+                url=r["url"],
+                id_proprietaire=str(r["id_proprietaire"]),
+                date_creation=r["date_creation"],
+                type_qrcode=r["type_qrcode"],
+                couleur=r["couleur"],
+                logo=r["logo"],
+                version=r["version"],
+                cache_max_age=r["cache_max_age"],
+            )
+            for r in rows
+        ]
+
+    def lister_redirections(self) -> List[tuple]:
+        """
+        Liste ce dont la route de scan a besoin pour tous les QR codes.
+
+        Retour
+        ------
+        List[tuple]
+            (id_qrcode, url, type_qrcode, id_proprietaire, version, cache_max_age)
+            par ordre d'identifiant.
+
+        Notes
+        -----
+        Les exceptions sont propagées : une table de redirections ne doit pas
+        être reconstruite à vide parce que la base est indisponible.
+        """
+        with self._db.connection as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT id_qrcode, url, type_qrcode, id_proprietaire, version, cache_max_age
+                    FROM qrcode
+                    ORDER BY id_qrcode;
+                    """
+                )
+                rows = cur.fetchall()
+        return [
+            (r["id_qrcode"], r["url"], r["type_qrcode"], r["id_proprietaire"],
+             r["version"], r["cache_max_age"])
+            for r in rows
+        ]
+
+    def iterer_redirections_statiques(self, depuis: int = 0, taille_lot: int = 1000) -> Iterator[tuple]:
+        """
+        Parcourt les changements de redirections statiques postérieurs à une révision.
+
+        Paramètres
+        ----------
+        depuis : int, par défaut 0
+            Révision (qrcode_revision_seq) déjà exportée ; 0 pour tout parcourir.
+        taille_lot : int, par défaut 1000
+            Nombre de lignes lues par aller-retour (curseur serveur).
+
+        Retour
+        ------
+        Iterator[tuple]
+            (id_qrcode, url, revision) par révision croissante ; url vaut None
+            si le QR code n'a plus de redirection statique (supprimé, ou passé
+            en QR suivi).
+
+        Notes
+        -----
+        - Les lignes sont lues par un curseur côté serveur : un export complet
+        ne charge pas toute la table en mémoire.
+        - Le coût ne dépend que du nombre de changements (index sur revision).
+        - Les exceptions sont propagées.
+        """
+        with self._db.connection as conn:
+            with conn.cursor(name="iterer_redirections_statiques") as cur:
+                cur.itersize = taille_lot
+                cur.execute(
+                    """
+                    SELECT id_qrcode, CASE WHEN type_qrcode IS FALSE THEN url END AS url, revision
+                    FROM qrcode
+                    WHERE revision > %(depuis)s
+                    UNION ALL
+                    SELECT id_qrcode, NULL, revision
+                    FROM qrcode_supprime
+                    WHERE revision > %(depuis)s
+                    ORDER BY revision;
+                    """,
+                    {"depuis": depuis},
+                )
+                for r in cur:
+                    yield r["id_qrcode"], r["url"], r["revision"]
+
     @log
     def modifier_qrc(
         self,
@@ -319,6 +581,8 @@ class QRCodeDao:
         type_qrcode: Optional[bool] = None,
         couleur: Optional[str] = None,
         logo: Optional[str] = None,
+        cache_max_age: Optional[int] = None,
+        reinitialiser_cache_max_age: bool = False,
     ) -> Optional[Qrcode]:
         
         """
@@ -338,6 +602,11 @@ class QRCodeDao:
                 Nouvelle couleur du QR code.
             logo : str, optionnel
                 Nouveau logo à associer.
+            cache_max_age : int, optionnel
+                Nouvelle durée de cache HTTP (s) de la redirection d'un QR statique.
+            reinitialiser_cache_max_age : bool, par défaut False
+                True : remet cache_max_age à NULL (durée par défaut de l'application) ;
+                prioritaire sur `cache_max_age`.
 
             Retour
             ------
@@ -349,7 +618,9 @@ class QRCodeDao:
             -----
             - Vérifie l’existence du QR code : lève QRCodeNotFoundError si absent.
             - Vérifie les droits : lève UnauthorizedError si l’utilisateur n’est pas propriétaire.
-            - Utilise COALESCE pour ne modifier que les champs explicitement fournis.
+            - Utilise COALESCE pour ne modifier que les champs explicitement fournis
+              (None = inchangé ; d'où `reinitialiser_cache_max_age` pour effacer la durée de cache).
+            - Incrémente la version du QR code (invalide les ETag des redirections en cache).
             - Convertit automatiquement tuple → dict le cas échéant.
             - Journalise tout échec via logger.exception.
         """
@@ -376,15 +647,23 @@ class QRCodeDao:
                         SET url = COALESCE(%s, url),
                             type_qrcode = COALESCE(%s, type_qrcode),
                             couleur = COALESCE(%s, couleur),
-                            logo = COALESCE(%s, logo)
+                            logo = COALESCE(%s, logo),
+                            cache_max_age = CASE WHEN %s THEN NULL ELSE COALESCE(%s, cache_max_age) END,
+                            version = version + 1
                         WHERE id_qrcode = %s
-                        RETURNING id_qrcode, url, id_proprietaire, date_creation, type_qrcode, couleur, logo;
+                        RETURNING id_qrcode, url, id_proprietaire, date_creation, type_qrcode, couleur, logo,
+                                  version, cache_max_age;
                         """,
-                        (url, type_qrcode, couleur, logo, id_qrcode),
+                        (url, type_qrcode, couleur, logo, bool(reinitialiser_cache_max_age), cache_max_age, id_qrcode),
                     )
                     updated = cur.fetchone()
+                    if updated:
+                        publier(cur, "qrcode", id_qrcode)
+                        publier(cur, "proprietaire", owner_id)
                 conn.commit()
 
+            invalider_tag(f"proprietaire:{owner_id}")
+
             if not updated:
                 raise QRCodeNotFoundError(f"QR code {id_qrcode} introuvable après mise à jour.")
 
@@ -402,6 +681,8 @@ class QRCodeDao:
                 type_qrcode=updated["type_qrcode"],
                 couleur=updated["couleur"],
                 logo=updated["logo"],
+                version=updated["version"],
+                cache_max_age=updated["cache_max_age"],
             )
 
         except UnauthorizedError as e:
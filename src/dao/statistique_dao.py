@@ -1,16 +1,45 @@
 import logging
+import os
+import random
 
 from utils.singleton import Singleton
 from utils.log_decorator import log
+from utils.cache_resultat import cache_resultat, invalider_tag
 from datetime import date, datetime
 from dao.db_connection import DBConnection
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from business_object.statistique import Statistique
 
+from psycopg2.extras import execute_values
+
+# Nombre de lignes (shards) par (QR, jour) ; 1 = une seule ligne, comportement historique
+NB_SHARDS = max(1, int(os.getenv("STAT_SHARDS", 1)))
+
+# Durée (s) de cache des agrégats d'un QR code : périmés par les écritures de vues
+# du processus ; celles des autres workers n'y apparaissent qu'à l'expiration
+CACHE_AGREGATS_TTL_S = float(os.getenv("STAT_CACHE_TTL_S", 5))
+
+
+def invalider_agregats(ids_qrcode) -> None:
+    """Périme les agrégats en cache des QR codes dont des vues viennent d'être écrites."""
+    invalider_tag(*{f"qrcode:{id_qrcode}" for id_qrcode in ids_qrcode})
+
 
 class StatistiqueDao(metaclass=Singleton):
     """Classe contenant les méthodes pour accéder aux Statistiques dans la base de données"""
 
+    @staticmethod
+    def choisir_shard() -> int:
+        """
+        Choisit la ligne (shard) sur laquelle un écrivain incrémente le compteur.
+
+        Avec STAT_SHARDS = N > 1, les écritures concurrentes sur un même
+        (QR, jour) se répartissent sur N lignes au lieu de se sérialiser sur le
+        verrou d'une seule ; les lectures font la somme des shards et
+        `compacter_shards` les replie une fois le jour terminé.
+        """
+        return random.randrange(NB_SHARDS) if NB_SHARDS > 1 else 0
+
     @log
     def incrementer_vue_jour(self, id_qrcode: int, date_vue: date) -> bool:
         """
@@ -35,21 +64,131 @@ class StatistiqueDao(metaclass=Singleton):
                 with conn.cursor() as cur:
                     cur.execute(
                         """
-                        INSERT INTO statistique (id_qrcode, nombre_vue, date_des_vues)
-                        VALUES (%s, 1, %s)
-                        ON CONFLICT (id_qrcode, date_des_vues)
+                        INSERT INTO statistique (id_qrcode, nombre_vue, date_des_vues, shard)
+                        VALUES (%s, 1, %s, %s)
+                        ON CONFLICT (id_qrcode, date_des_vues, shard)
                         DO UPDATE SET nombre_vue = statistique.nombre_vue + 1;
                         """,
-                        (id_qrcode, date_vue),
+                        (id_qrcode, date_vue, self.choisir_shard()),
                     )
-                    # rowcount n'est pas fiable pour ON CONFLICT, 
-                    # mais on suppose que l'opération réussit si pas d'exception.
-                    return True
+            invalider_agregats([id_qrcode])
+            # rowcount n'est pas fiable pour ON CONFLICT,
+            # mais on suppose que l'opération réussit si pas d'exception.
+            return True
         except Exception as e:
             logging.exception(f"Erreur lors de l'incrémentation de la vue : {e}")
             return False
 
+    def incrementer_vues(self, increments: Dict[Tuple[int, date], int]) -> int:
+        """
+        Applique plusieurs incréments de vues en un seul UPSERT multi-lignes.
+
+        Paramètres
+        ----------
+        increments : Dict[Tuple[int, date], int]
+            Dictionnaire {(id_qrcode, date_vue): nombre_de_vues_a_ajouter}.
+
+        Retour
+        ------
+        int
+            Nombre de couples (id_qrcode, date) écrits.
+
+        Notes
+        -----
+        - Les lignes sont triées par (id_qrcode, date) pour que deux lots
+          concurrents verrouillent les lignes dans le même ordre (pas d'interblocage).
+        - Tout le lot écrit sur un même shard (voir `choisir_shard`).
+        - Les incréments d'un QR code supprimé entre-temps sont ignorés
+          (jointure sur qrcode).
+        - Les exceptions sont propagées : l'appelant décide de rejouer le lot.
+        """
+        if not increments:
+            return 0
+
+        shard = self.choisir_shard()
+        valeurs = sorted((id_qr, jour, nb, shard) for (id_qr, jour), nb in increments.items())
+        with DBConnection().connection as conn:
+            with conn.cursor() as cur:
+                execute_values(
+                    cur,
+                    """
+                    INSERT INTO statistique (id_qrcode, date_des_vues, nombre_vue, shard)
+                    SELECT v.id_qrcode, v.date_des_vues, v.nombre_vue, v.shard
+                    FROM (VALUES %s) AS v (id_qrcode, date_des_vues, nombre_vue, shard)
+                    JOIN qrcode q ON q.id_qrcode = v.id_qrcode
+                    ORDER BY v.id_qrcode, v.date_des_vues
+                    ON CONFLICT (id_qrcode, date_des_vues, shard)
+                    DO UPDATE SET nombre_vue = statistique.nombre_vue + EXCLUDED.nombre_vue;
+                    """,
+                    valeurs,
+                    template="(%s::int, %s::date, %s::int, %s::int)",
+                    page_size=len(valeurs),
+                )
+                nb = cur.rowcount
+            conn.commit()
+        invalider_agregats(id_qr for (id_qr, _) in increments)
+        if nb < len(valeurs):
+            logging.warning(f"Compteurs de vues : {len(valeurs) - nb} lignes ignorées (QR code supprimé)")
+        return nb
+
+    @log
+    def compacter_shards(self, avant: date) -> int:
+        """
+        Replie les shards des jours terminés sur une seule ligne (shard 0).
+
+        Paramètres
+        ----------
+        avant : date
+            Seuls les jours strictement antérieurs sont compactés (le jour en
+            cours continue de recevoir des écritures réparties).
+
+        Retour
+        ------
+        int
+            Nombre de lignes de shard supprimées (0 si rien à compacter ou en cas d'erreur).
+
+        Notes
+        -----
+        Une seule instruction (DELETE ... RETURNING puis UPSERT des sommes) :
+        le total d'un (QR, jour) n'est jamais visible à moitié compacté.
+        """
+        try:
+            with DBConnection().connection as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        """
+                        WITH repliees AS (
+                            DELETE FROM statistique
+                            WHERE date_des_vues < %s AND shard <> 0
+                            RETURNING id_qrcode, date_des_vues, nombre_vue
+                        ),
+                        sommes AS (
+                            INSERT INTO statistique (id_qrcode, date_des_vues, nombre_vue, shard)
+                            SELECT id_qrcode, date_des_vues, SUM(nombre_vue), 0
+                            FROM repliees
+                            GROUP BY id_qrcode, date_des_vues
+                            ORDER BY id_qrcode, date_des_vues
+                            ON CONFLICT (id_qrcode, date_des_vues, shard)
+                            DO UPDATE SET nombre_vue = statistique.nombre_vue + EXCLUDED.nombre_vue
+                        )
+                        SELECT COUNT(*) AS nb FROM repliees;
+                        """,
+                        (avant,),
+                    )
+                    row = cur.fetchone()
+                conn.commit()
+            return row["nb"] if isinstance(row, dict) else row[0]
+        except Exception as e:
+            logging.exception(f"Erreur lors de la compaction des shards de statistique : {e}")
+            return 0
+
     @log
+    @cache_resultat(
+        ttl=CACHE_AGREGATS_TTL_S,
+        cle=lambda id_qrcode: int(id_qrcode),
+        tags=lambda id_qrcode: [f"qrcode:{int(id_qrcode)}"],
+        copier=dict,
+    )
     def get_agregats(self, id_qrcode: int) -> Optional[Dict[str, Any]]:
         """
             Récupère les agrégats statistiques d’un QR code.
@@ -118,9 +257,10 @@ class StatistiqueDao(metaclass=Singleton):
                 with conn.cursor() as cur:
                     cur.execute(
                         """
-                        SELECT date_des_vues, nombre_vue
+                        SELECT date_des_vues, SUM(nombre_vue)::int AS nombre_vue
                         FROM statistique
                         WHERE id_qrcode = %s
+                        GROUP BY date_des_vues
                         ORDER BY date_des_vues ASC
                         """,
                         (id_qrcode,),
@@ -4,6 +4,7 @@ from utils.singleton import Singleton
 from utils.log_decorator import log
 
 from dao.db_connection import DBConnection
+from dao.bus_invalidation import publier
 
 from business_object.token import Token
 from business_object.utilisateur import Utilisateur
@@ -116,6 +117,9 @@ class TokenDao(metaclass=Singleton):
                         {"jeton": token.jeton}
                     )
                     res = cursor.rowcount  # nombre de lignes affectées
+                    if res:
+                        # Les autres workers évincent le token de leur cache
+                        publier(cursor, "token", token.jeton)
         except Exception as e:
             logging.info(f"Erreur lors de la suppression du token {token.jeton}: {e}")
             return False
@@ -167,6 +171,41 @@ class TokenDao(metaclass=Singleton):
             )
         return None
 
+    @log
+    def lister_valides_par_utilisateurs(self, ids_user: list[int]) -> list[Token]:
+        """
+        Liste, en une requête, les tokens non expirés d'un ensemble d'utilisateurs.
+
+        Paramètres
+        ----------
+        ids_user : list[int]
+            Identifiants des utilisateurs.
+
+        Retour
+        ------
+        list[Token]
+            Tokens dont la date d'expiration est future ; liste vide en cas d'erreur.
+        """
+        if not ids_user:
+            return []
+        try:
+            with DBConnection().connection as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT id_user, jeton, date_expiration "
+                        "FROM token WHERE id_user = ANY(%(ids)s) AND date_expiration > NOW();",
+                        {"ids": [int(i) for i in ids_user]},
+                    )
+                    rows = cursor.fetchall()
+        except Exception as e:
+            logging.info(e)
+            return []
+
+        return [
+            Token(id_user=r["id_user"], jeton=r["jeton"], date_expiration=r["date_expiration"])
+            for r in rows
+        ]
+
     @log
     def existe_token(self, jeton: str) -> bool:
         """ Vérifie si un token existe dans la base de données
@@ -1,8 +1,11 @@
+import copy
 import logging
 
 from utils.singleton import Singleton
 from utils.log_decorator import log
+from utils.cache_resultat import cache_resultat, invalider_tag
 from dao.db_connection import DBConnection
+from dao.bus_invalidation import publier
 from business_object.utilisateur import Utilisateur
 
 
@@ -55,6 +58,11 @@ class UtilisateurDao(metaclass=Singleton):
         return bool(res)
 
     @log
+    @cache_resultat(
+        cle=lambda id_user: int(id_user),
+        tags=lambda id_user: [f"utilisateur:{int(id_user)}"],
+        copier=copy.copy,
+    )
     def trouver_par_id_user(self, id_user: int) -> Utilisateur | None:
         """
         Recherche un utilisateur à partir de son identifiant unique.
@@ -143,6 +151,42 @@ class UtilisateurDao(metaclass=Singleton):
             mdp=row["mdp"] if isinstance(row, dict) else row[2],
         )
 
+    @log
+    def lister_par_ids(self, ids_user: list[int]) -> list[Utilisateur]:
+        """
+        Liste, en une requête, les utilisateurs d'un ensemble d'identifiants.
+
+        Paramètres
+        ----------
+        ids_user : list[int]
+            Identifiants recherchés (les inconnus sont ignorés).
+
+        Retour
+        ------
+        list[Utilisateur]
+            Utilisateurs trouvés, triés par id_user ; liste vide en cas d'erreur.
+        """
+        if not ids_user:
+            return []
+        try:
+            with DBConnection().connection as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        """
+                        SELECT id_user, nom_user, mdp
+                          FROM utilisateur
+                         WHERE id_user = ANY(%(ids)s)
+                         ORDER BY id_user;
+                        """,
+                        {"ids": [int(i) for i in ids_user]},
+                    )
+                    rows = cursor.fetchall()
+        except Exception as e:
+            logging.info(e)
+            return []
+
+        return [Utilisateur(id_user=r["id_user"], nom_user=r["nom_user"], mdp=r["mdp"]) for r in rows]
+
     @log
     def lister_tous(self) -> list[Utilisateur]:
         """
@@ -236,8 +280,12 @@ class UtilisateurDao(metaclass=Singleton):
                         },
                     )
                     res = cursor.rowcount
+                    if res:
+                        publier(cursor, "utilisateur", utilisateur.id_user)
         except Exception as e:
             logging.info(e)
+        if res:
+            invalider_tag(f"utilisateur:{utilisateur.id_user}")
         return res == 1
 
     @log
@@ -268,9 +316,14 @@ class UtilisateurDao(metaclass=Singleton):
                         {"id_user": utilisateur.id_user},
                     )
                     res = cursor.rowcount
+                    if res:
+                        # Supprime aussi (en cascade) ses tokens et QR codes
+                        publier(cursor, "utilisateur", utilisateur.id_user)
         except Exception as e:
             logging.info(e)
             raise
+        if res:
+            invalider_tag(f"utilisateur:{utilisateur.id_user}", f"proprietaire:{utilisateur.id_user}")
         return res > 0
 
     @log
@@ -0,0 +1,147 @@
+# src/scan_asgi.py
+import json
+import logging
+from typing import Callable, Optional
+
+from service.scan_service import ReponseScan, ScanService
+
+logger = logging.getLogger(__name__)
+
+
+def _entetes_reponse(entetes: dict, longueur: int, type_contenu: Optional[bytes] = None) -> list:
+    brut = [(nom.encode("latin-1"), valeur.encode("latin-1")) for nom, valeur in entetes.items()]
+    brut.append((b"content-length", str(longueur).encode("latin-1")))
+    if type_contenu:
+        brut.append((b"content-type", type_contenu))
+    return brut
+
+
+class ScanASGI:
+    """
+    Application ASGI minimale pour `/scan/{id_qrcode}`, montée devant la route FastAPI.
+
+    Les scans représentent l'essentiel du trafic : cette voie rapide lit
+    directement le chemin et les en-têtes du scope ASGI et envoie la
+    redirection, sans résolution de dépendances, validation Pydantic ni
+    pile d'exceptions de FastAPI. Le traitement (ScanService) est le même
+    que celui de la route, qui reste documentée dans /docs.
+
+    Les erreurs suivent le format de FastAPI (`{"detail": ...}`) :
+    404 pour un QR inconnu ou un identifiant non entier, 405 pour une
+    autre méthode que GET, 500 en cas d'erreur inattendue.
+    """
+
+    def __init__(self, obtenir_service: Callable[[], Optional[ScanService]]):
+        """
+        Paramètres
+        ----------
+        obtenir_service : Callable[[], ScanService]
+            Retourne le ScanService partagé (créé au démarrage de l'application).
+        """
+        self._obtenir_service = obtenir_service
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            return
+        if scope["method"] != "GET":
+            await self._erreur(send, 405, "Method Not Allowed", {"allow": "GET"})
+            return
+
+        # Chemin restant sous le point de montage : "/<id_qrcode>"
+        reste = scope["path"][len(scope.get("root_path", "")):]
+        segment = reste[1:]
+        if not (segment.isascii() and segment.isdigit()):
+            await self._erreur(send, 404, "Not Found")
+            return
+
+        entetes = {nom.decode("latin-1"): valeur.decode("latin-1") for nom, valeur in scope["headers"]}
+        client = scope.get("client")
+        try:
+            reponse = await self._obtenir_service().traiter(
+                int(segment), entetes, client[0] if client else None
+            )
+        except Exception as e:
+            logger.exception("Erreur lors du scan : %s", e)
+            await self._erreur(send, 500, str(e))
+            return
+        if reponse is None:
+            await self._erreur(send, 404, "QR code introuvable")
+            return
+        await self._envoyer(send, reponse)
+
+    @staticmethod
+    async def _envoyer(send, reponse: ReponseScan) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": reponse.statut,
+            "headers": _entetes_reponse(reponse.entetes, 0),
+        })
+        await send({"type": "http.response.body", "body": b""})
+
+    @staticmethod
+    async def _erreur(send, statut: int, detail: str, entetes: Optional[dict] = None) -> None:
+        corps = json.dumps({"detail": detail}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": statut,
+            "headers": _entetes_reponse(entetes or {}, len(corps), b"application/json"),
+        })
+        await send({"type": "http.response.body", "body": corps})
+
+
+if __name__ == "__main__":
+    # Benchmark : python src/scan_asgi.py [id_qrcode] [nb_requetes]
+    # Compare la voie rapide et la route FastAPI, appelées en mémoire (sans réseau)
+    import asyncio
+    import sys
+    import time
+
+    from starlette.routing import Mount
+
+    from app import app, conteneur
+
+    id_qrcode = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    nb_requetes = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+
+    async def requete(chemin: str) -> int:
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": chemin, "raw_path": chemin.encode(), "root_path": "",
+            "query_string": b"", "headers": [(b"user-agent", b"bench")], "client": ("127.0.0.1", 1),
+            "server": ("127.0.0.1", 80),
+        }
+        statut = 0
+
+        async def recevoir():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def envoyer(message):
+            nonlocal statut
+            if message["type"] == "http.response.start":
+                statut = message["status"]
+
+        await app(scope, recevoir, envoyer)
+        return statut
+
+    async def mesurer(nom: str) -> None:
+        statut = await requete(f"/scan/{id_qrcode}")  # chauffe le cache de redirection
+        t0 = time.perf_counter()
+        for _ in range(nb_requetes):
+            await requete(f"/scan/{id_qrcode}")
+        duree = time.perf_counter() - t0
+        print(f"{nom:<15} statut {statut} : {nb_requetes / duree:,.0f} requêtes/s "
+              f"({duree * 1e6 / nb_requetes:.1f} µs par requête)")
+
+    async def principal() -> None:
+        await conteneur.demarrer()
+        try:
+            await mesurer("voie rapide")
+            routes = app.router.routes
+            app.router.routes = [r for r in routes if not isinstance(r, Mount)]
+            await mesurer("route FastAPI")
+            app.router.routes = routes
+        finally:
+            await conteneur.arreter()
+
+    logging.disable(logging.INFO)
+    asyncio.run(principal())
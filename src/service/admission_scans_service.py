@@ -0,0 +1,186 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from service.compteur_vues_service import CompteurVuesService
+
+logger = logging.getLogger(__name__)
+
+# Niveaux de dégradation de l'enregistrement des scans (la redirection est toujours servie)
+COMPLET = 0      # géolocalisation + log + vue
+SANS_GEO = 1     # log + vue, géolocalisation laissée à l'enrichissement différé
+SANS_LOG = 2     # vue seule, agrégée en mémoire puis écrite par le compteur de vues
+MEMOIRE = 3      # vue comptée en mémoire, aucune écriture tant que la pression dure
+
+NOMS_NIVEAUX = ("complet", "sans_geo", "sans_log", "memoire")
+
+
+class ControleurAdmission:
+    """
+    Contrôleur d'admission de l'enregistrement des scans (délestage).
+
+    La pression est le maximum des sondes, chacune normalisée (1.0 = limite
+    atteinte) : saturation et temps d'attente du pool de connexions, profondeur
+    du tampon d'écriture, écritures en cours dans la route. Elle est évaluée au
+    plus toutes les `intervalle_s` secondes.
+
+    Au-delà de `seuils[i]`, le niveau de dégradation i + 1 s'applique
+    (SANS_GEO, SANS_LOG, MEMOIRE). Pour éviter les oscillations, le niveau ne
+    redescend que lorsque la pression repasse sous le seuil moins `marge`.
+
+    Les vues comptées au niveau MEMOIRE sont remises au compteur de vues dès
+    que le niveau redescend (ou par `restituer_vues()` à l'arrêt).
+    """
+
+    def __init__(
+        self,
+        sondes: Optional[Dict[str, Callable[[], float]]] = None,
+        seuils: Sequence[float] = (0.7, 0.85, 0.95),
+        marge: float = 0.1,
+        ecritures_max: int = 10,
+        compteur: Optional[CompteurVuesService] = None,
+        intervalle_s: float = 0.1,
+        horloge: Callable[[], float] = time.monotonic,
+    ):
+        self.sondes: Dict[str, Callable[[], float]] = dict(sondes or {})
+        self.seuils = tuple(sorted(float(s) for s in seuils))[:MEMOIRE]
+        self.marge = max(0.0, float(marge))
+        self.ecritures_max = max(1, int(ecritures_max))
+        self._compteur = compteur
+        self.intervalle_s = max(0.0, float(intervalle_s))
+        self._horloge = horloge
+
+        self._verrou = threading.Lock()
+        self._niveau = COMPLET
+        self._pression = 0.0
+        self._signaux: Dict[str, float] = {}
+        self._prochaine_evaluation = 0.0
+        self._ecritures_en_cours = 0
+        self._vues_memoire: Dict[Tuple[int, date], int] = {}
+
+        # --- Compteurs ---
+        self._nb_par_niveau = [0] * len(NOMS_NIVEAUX)
+        self._nb_changements = 0
+
+    # ------------------------------------------------------------------
+    # Décision
+    # ------------------------------------------------------------------
+
+    def admettre(self) -> int:
+        """
+        Retourne le niveau de dégradation à appliquer au scan courant (et le compte).
+
+        Retour
+        ------
+        int
+            COMPLET, SANS_GEO, SANS_LOG ou MEMOIRE.
+        """
+        maintenant = self._horloge()
+        if maintenant >= self._prochaine_evaluation:
+            self._evaluer(maintenant)
+        with self._verrou:
+            niveau = self._niveau
+            self._nb_par_niveau[niveau] += 1
+        return niveau
+
+    def _evaluer(self, maintenant: float) -> None:
+        signaux = {"ecritures_en_cours": self._ecritures_en_cours / self.ecritures_max}
+        for nom, sonde in self.sondes.items():
+            try:
+                signaux[nom] = float(sonde())
+            except Exception as e:
+                logger.warning(f"Sonde d'admission {nom} indisponible : {e}")
+        pression = max(signaux.values())
+
+        with self._verrou:
+            self._prochaine_evaluation = maintenant + self.intervalle_s
+            self._pression, self._signaux = pression, signaux
+            ancien = self._niveau
+            niveau = sum(1 for s in self.seuils if pression >= s)
+            if niveau < ancien:
+                # Hystérésis : un niveau est conservé tant que la pression reste au-dessus de seuil - marge
+                maintenu = sum(1 for s in self.seuils if pression >= s - self.marge)
+                niveau = max(niveau, min(ancien, maintenu))
+            if niveau == ancien:
+                return
+            self._niveau = niveau
+            self._nb_changements += 1
+
+        if niveau > ancien:
+            logger.warning(
+                f"Scans en mode dégradé : {NOMS_NIVEAUX[ancien]} -> {NOMS_NIVEAUX[niveau]} "
+                f"(pression {pression:.2f}, {signaux})"
+            )
+        else:
+            logger.info(
+                f"Scans : retour au niveau {NOMS_NIVEAUX[niveau]} (pression {pression:.2f})"
+            )
+        if ancien == MEMOIRE:
+            self.restituer_vues()
+
+    @contextmanager
+    def ecriture(self):
+        """Encadre une écriture faite pendant la requête (compte les écritures en cours)."""
+        with self._verrou:
+            self._ecritures_en_cours += 1
+        try:
+            yield
+        finally:
+            with self._verrou:
+                self._ecritures_en_cours -= 1
+
+    # ------------------------------------------------------------------
+    # Comptage en mémoire (niveau MEMOIRE)
+    # ------------------------------------------------------------------
+
+    def compter_en_memoire(self, id_qrcode: int, date_vue: date) -> None:
+        """Retient une vue en mémoire, sans aucune écriture."""
+        cle = (id_qrcode, date_vue)
+        with self._verrou:
+            self._vues_memoire[cle] = self._vues_memoire.get(cle, 0) + 1
+
+    def restituer_vues(self) -> int:
+        """
+        Remet les vues retenues en mémoire au compteur de vues (écrites à son prochain vidage).
+
+        Retour
+        ------
+        int
+            Nombre de vues restituées.
+        """
+        with self._verrou:
+            vues, self._vues_memoire = self._vues_memoire, {}
+        if self._compteur is None:
+            return 0
+        for (id_qrcode, date_vue), nombre in vues.items():
+            self._compteur.ajouter(id_qrcode, date_vue, nombre)
+        return sum(vues.values())
+
+    # ------------------------------------------------------------------
+    # Métriques
+    # ------------------------------------------------------------------
+
+    def metriques(self) -> dict:
+        """
+        Retourne l'état du contrôleur.
+
+        Retour
+        ------
+        dict
+            niveau (nom), pression, signaux, seuils, ecritures_en_cours,
+            vues_en_memoire, changements, scans_par_niveau.
+        """
+        with self._verrou:
+            return {
+                "niveau": NOMS_NIVEAUX[self._niveau],
+                "pression": round(self._pression, 4),
+                "signaux": {k: round(v, 4) for k, v in self._signaux.items()},
+                "seuils": list(self.seuils),
+                "ecritures_en_cours": self._ecritures_en_cours,
+                "vues_en_memoire": sum(self._vues_memoire.values()),
+                "changements": self._nb_changements,
+                "scans_par_niveau": dict(zip(NOMS_NIVEAUX, self._nb_par_niveau)),
+            }
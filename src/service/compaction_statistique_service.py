@@ -0,0 +1,74 @@
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+from dao.statistique_dao import StatistiqueDao
+
+logger = logging.getLogger(__name__)
+
+
+class CompactionStatistiqueService:
+    """
+    Tâche périodique de compaction des compteurs répartis (STAT_SHARDS > 1).
+
+    Toutes les `intervalle_s` secondes (et au démarrage), les shards des jours
+    terminés (UTC, comme les dates de scan) sont repliés sur une seule ligne
+    par (QR, jour) via StatistiqueDao.compacter_shards.
+    """
+
+    def __init__(self, dao: Optional[StatistiqueDao] = None, intervalle_s: float = 3600.0):
+        self._dao = dao
+        self.intervalle_s = max(1.0, float(intervalle_s))
+        self._evenement_arret = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # --- Compteurs ---
+        self._nb_executions = 0
+        self._nb_lignes_repliees = 0
+
+    def demarrer(self) -> None:
+        """Démarre le thread de compaction (sans effet s'il tourne déjà)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._evenement_arret.clear()
+        self._thread = threading.Thread(
+            target=self._boucle, name="compaction-statistique", daemon=True
+        )
+        self._thread.start()
+
+    def arreter(self, timeout: float = 10.0) -> None:
+        """Arrête le thread de compaction."""
+        self._evenement_arret.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def executer(self) -> int:
+        """
+        Compacte les jours antérieurs à aujourd'hui (UTC).
+
+        Retour
+        ------
+        int
+            Nombre de lignes de shard repliées.
+        """
+        aujourd_hui = datetime.now(timezone.utc).date()
+        nb = (self._dao or StatistiqueDao()).compacter_shards(aujourd_hui)
+        self._nb_executions += 1
+        self._nb_lignes_repliees += nb
+        if nb:
+            logger.info(f"Compaction des statistiques : {nb} lignes de shard repliées.")
+        return nb
+
+    def _boucle(self) -> None:
+        while not self._evenement_arret.is_set():
+            self.executer()
+            self._evenement_arret.wait(self.intervalle_s)
+
+    def metriques(self) -> dict:
+        """Retourne executions et lignes_repliees."""
+        return {
+            "executions": self._nb_executions,
+            "lignes_repliees": self._nb_lignes_repliees,
+        }
@@ -0,0 +1,205 @@
+import logging
+import threading
+import time
+from datetime import date
+from typing import Dict, Optional, Tuple
+
+from dao.db_connection import erreur_permanente
+from dao.statistique_dao import StatistiqueDao
+
+logger = logging.getLogger(__name__)
+
+
+class CompteurVuesService:
+    """
+    Agrégateur mémoire des vues, écrit périodiquement dans statistique.
+
+    Chaque vue incrémente un compteur en mémoire par (QR, jour) ; un thread de
+    fond écrit toutes les `intervalle_ms` millisecondes les deltas accumulés
+    en un seul UPSERT multi-lignes (`nombre_vue + delta`). Un QR code scanné
+    des milliers de fois par seconde ne coûte donc qu'une mise à jour de ligne
+    par vidage.
+
+    - Changement de jour : le jour fait partie de la clé ; la première vue
+      d'un nouveau jour déclenche un vidage immédiat des deltas de la veille.
+    - Au-delà de `cles_max` couples (QR, jour) en attente, un vidage est
+      déclenché sans attendre l'échéance.
+    - La mémoire est bornée par `cles_limite` couples en attente (base
+      indisponible) : au-delà, les vues d'un nouveau couple sont perdues
+      (et comptées).
+    - Un lot refusé par la base pour une erreur permanente est abandonné
+      (et compté) au lieu d'être rejoué indéfiniment.
+    - `arreter()` écrit les deltas restants.
+    """
+
+    def __init__(
+        self,
+        dao: Optional[StatistiqueDao] = None,
+        intervalle_ms: int = 1000,
+        cles_max: int = 10000,
+        cles_limite: Optional[int] = None,
+    ):
+        self._dao = dao
+        self.intervalle_ms = max(1, int(intervalle_ms))
+        self.cles_max = max(1, int(cles_max))
+        self.cles_limite = max(self.cles_max, int(cles_limite or 10 * self.cles_max))
+
+        self._deltas: Dict[Tuple[int, date], int] = {}
+        self._dernier_jour: Optional[date] = None
+        self._condition = threading.Condition()
+        self._vidage_demande = False
+        # Sérialise les vidages (thread de fond, arrêt, appel manuel)
+        self._verrou_vidage = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._arret_demande = False
+
+        # --- Compteurs ---
+        self._nb_vues = 0
+        self._nb_vues_ecrites = 0
+        self._nb_lignes_ecrites = 0
+        self._nb_vidages = 0
+        self._nb_echecs = 0
+        self._nb_vues_perdues = 0
+
+    # ------------------------------------------------------------------
+    # Cycle de vie
+    # ------------------------------------------------------------------
+
+    def demarrer(self) -> None:
+        """Démarre le thread de vidage (sans effet s'il tourne déjà)."""
+        with self._condition:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._arret_demande = False
+            self._thread = threading.Thread(
+                target=self._boucle, name="compteur-vues", daemon=True
+            )
+            self._thread.start()
+
+    def arreter(self, timeout: float = 10.0) -> None:
+        """Arrête le thread de vidage puis écrit les deltas restants."""
+        with self._condition:
+            self._arret_demande = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.vider()
+
+    # ------------------------------------------------------------------
+    # Comptage
+    # ------------------------------------------------------------------
+
+    def ajouter(self, id_qrcode: int, date_vue: date, nombre: int = 1) -> None:
+        """
+        Ajoute `nombre` vues au compteur mémoire de (id_qrcode, date_vue).
+
+        Paramètres
+        ----------
+        id_qrcode : int
+            Identifiant du QR code.
+        date_vue : date
+            Jour de la vue.
+        nombre : int, par défaut 1
+            Nombre de vues à ajouter.
+        """
+        cle = (id_qrcode, date_vue)
+        with self._condition:
+            self._nb_vues += nombre
+            if cle not in self._deltas and len(self._deltas) >= self.cles_limite:
+                self._nb_vues_perdues += nombre
+                self._vidage_demande = True
+                self._condition.notify()
+                return
+            self._deltas[cle] = self._deltas.get(cle, 0) + nombre
+            nouveau_jour = self._dernier_jour is not None and date_vue > self._dernier_jour
+            if self._dernier_jour is None or date_vue > self._dernier_jour:
+                self._dernier_jour = date_vue
+            if nouveau_jour or len(self._deltas) >= self.cles_max:
+                self._vidage_demande = True
+                self._condition.notify()
+
+    def vider(self) -> int:
+        """
+        Écrit tous les deltas en attente en un seul UPSERT multi-lignes.
+
+        Retour
+        ------
+        int
+            Nombre de lignes (QR, jour) écrites (0 si rien à écrire ou en cas d'échec).
+
+        Notes
+        -----
+        Après une erreur transitoire (base indisponible), les deltas sont
+        réintégrés au compteur mémoire (additionnés aux vues arrivées
+        entre-temps, dans la limite de `cles_limite`) pour le vidage suivant.
+        Après une erreur permanente, ils sont abandonnés.
+        """
+        with self._verrou_vidage:
+            with self._condition:
+                deltas, self._deltas = self._deltas, {}
+                self._vidage_demande = False
+            if not deltas:
+                return 0
+
+            try:
+                (self._dao or StatistiqueDao()).incrementer_vues(deltas)
+            except Exception as e:
+                logger.exception(f"Échec de l'écriture des compteurs de vues ({len(deltas)} lignes) : {e}")
+                permanente = erreur_permanente(e)
+                with self._condition:
+                    self._nb_echecs += 1
+                    for cle, nombre in deltas.items():
+                        if permanente or (cle not in self._deltas and len(self._deltas) >= self.cles_limite):
+                            self._nb_vues_perdues += nombre
+                        else:
+                            self._deltas[cle] = self._deltas.get(cle, 0) + nombre
+                return 0
+
+            with self._condition:
+                self._nb_vidages += 1
+                self._nb_lignes_ecrites += len(deltas)
+                self._nb_vues_ecrites += sum(deltas.values())
+            return len(deltas)
+
+    def _boucle(self) -> None:
+        """Boucle du thread de fond : vide à l'échéance, ou plus tôt si demandé."""
+        intervalle_s = self.intervalle_ms / 1000
+        while True:
+            echeance = time.monotonic() + intervalle_s
+            with self._condition:
+                while not self._arret_demande and not self._vidage_demande:
+                    restant = echeance - time.monotonic()
+                    if restant <= 0:
+                        break
+                    self._condition.wait(restant)
+                if self._arret_demande:
+                    return
+            self.vider()
+
+    # ------------------------------------------------------------------
+    # Métriques
+    # ------------------------------------------------------------------
+
+    def metriques(self) -> dict:
+        """
+        Retourne les compteurs de l'agrégateur.
+
+        Retour
+        ------
+        dict
+            cles_en_attente, vues_en_attente, vues, vues_ecrites,
+            lignes_ecrites, vidages, echecs, vues_perdues (mémoire pleine
+            ou lot refusé par la base).
+        """
+        with self._condition:
+            return {
+                "cles_en_attente": len(self._deltas),
+                "vues_en_attente": sum(self._deltas.values()),
+                "vues": self._nb_vues,
+                "vues_ecrites": self._nb_vues_ecrites,
+                "lignes_ecrites": self._nb_lignes_ecrites,
+                "vidages": self._nb_vidages,
+                "echecs": self._nb_echecs,
+                "vues_perdues": self._nb_vues_perdues,
+            }
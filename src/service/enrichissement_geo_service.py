@@ -0,0 +1,141 @@
+import logging
+import threading
+from typing import Dict, Optional
+
+from dao.log_scan_dao import LogScanDao
+from utils.geolocalisation import INCONNU, Lieu
+
+logger = logging.getLogger(__name__)
+
+
+class EnrichissementGeoService:
+    """
+    Worker de géolocalisation différée des logs de scan.
+
+    Lorsque la route de scan enregistre les logs sans géolocalisation
+    (geo_enrichi = FALSE), ce worker les reprend en arrière-plan, par lots :
+    - lecture des adresses distinctes des plus anciens logs en attente,
+    - résolution de chaque adresse une seule fois via le fournisseur,
+    - un UPDATE ensembliste qui renseigne tous les logs de ces adresses.
+    """
+
+    def __init__(
+        self,
+        geolocalisation,
+        dao: Optional[LogScanDao] = None,
+        taille_lot: int = 500,
+        intervalle_s: float = 2.0,
+    ):
+        self._geolocalisation = geolocalisation
+        self._dao = dao
+        self.taille_lot = max(1, int(taille_lot))
+        self.intervalle_s = max(0.01, float(intervalle_s))
+
+        self._evenement_arret = threading.Event()
+        self._verrou = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+        # --- Compteurs ---
+        self._nb_lots = 0
+        self._nb_ips = 0
+        self._nb_logs = 0
+        self._nb_echecs = 0
+
+    # ------------------------------------------------------------------
+    # Cycle de vie
+    # ------------------------------------------------------------------
+
+    def demarrer(self) -> None:
+        """Démarre le thread d'enrichissement (sans effet s'il tourne déjà)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._evenement_arret.clear()
+        self._thread = threading.Thread(
+            target=self._boucle, name="enrichissement-geo", daemon=True
+        )
+        self._thread.start()
+
+    def arreter(self, timeout: float = 10.0) -> None:
+        """Arrête le thread d'enrichissement (les logs restants seront repris au redémarrage)."""
+        self._evenement_arret.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # ------------------------------------------------------------------
+    # Traitement
+    # ------------------------------------------------------------------
+
+    def executer_lot(self) -> int:
+        """
+        Enrichit un lot de logs en attente.
+
+        Retour
+        ------
+        int
+            Nombre de logs mis à jour (0 si rien à faire ou en cas d'échec).
+
+        Notes
+        -----
+        Une adresse dont la résolution lève une exception est laissée en
+        attente et sera retentée au lot suivant.
+        """
+        with self._verrou:
+            dao = self._dao or LogScanDao()
+            try:
+                ips = dao.lister_ips_a_enrichir(self.taille_lot)
+            except Exception as e:
+                logger.exception(f"Échec de lecture des logs à géolocaliser : {e}")
+                self._nb_echecs += 1
+                return 0
+            if not ips:
+                return 0
+
+            resultats: Dict[str, Lieu] = {}
+            for ip in ips:
+                if not ip:
+                    resultats[ip] = INCONNU
+                    continue
+                try:
+                    resultats[ip] = tuple(self._geolocalisation.localiser(ip))
+                except Exception as e:
+                    logger.warning(f"Géolocalisation différée impossible pour {ip} : {e}")
+
+            try:
+                nb = dao.enrichir_geo(resultats)
+            except Exception as e:
+                logger.exception(f"Échec de l'enrichissement géographique ({len(resultats)} adresses) : {e}")
+                self._nb_echecs += 1
+                return 0
+
+            self._nb_lots += 1
+            self._nb_ips += len(resultats)
+            self._nb_logs += nb
+            return nb
+
+    def _boucle(self) -> None:
+        """Boucle du thread : enchaîne les lots tant qu'il y a du travail, sinon attend."""
+        while not self._evenement_arret.is_set():
+            if self.executer_lot() == 0:
+                self._evenement_arret.wait(self.intervalle_s)
+
+    # ------------------------------------------------------------------
+    # Métriques
+    # ------------------------------------------------------------------
+
+    def metriques(self) -> dict:
+        """
+        Retourne les compteurs du worker.
+
+        Retour
+        ------
+        dict
+            lots, ips_resolues, logs_enrichis, echecs.
+        """
+        # Lecture sans verrou : ne bloque pas pendant un lot en cours
+        return {
+            "lots": self._nb_lots,
+            "ips_resolues": self._nb_ips,
+            "logs_enrichis": self._nb_logs,
+            "echecs": self._nb_echecs,
+        }
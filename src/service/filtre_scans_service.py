@@ -0,0 +1,202 @@
+import logging
+import re
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Set, Tuple
+
+from utils.cache_ttl import CacheTTL
+
+logger = logging.getLogger(__name__)
+
+# Robots, aperçus de liens (messageries, réseaux sociaux) et clients HTTP scriptés
+MOTIFS_ROBOTS = (
+    r"bot\b", r"crawl", r"spider", r"slurp", r"preview", r"prefetch",
+    r"facebookexternalhit", r"facebot", r"whatsapp", r"telegram", r"skypeuripreview",
+    r"slack-imgproxy", r"embedly", r"pinterest", r"vkshare", r"bitlybot",
+    r"headlesschrome", r"lighthouse", r"python-requests", r"python-urllib",
+    r"curl/", r"wget/", r"go-http-client", r"okhttp", r"java/", r"libwww-perl",
+)
+
+# En-têtes posés par les navigateurs lors d'un préchargement spéculatif
+ENTETES_PRECHARGEMENT = ("purpose", "sec-purpose", "x-purpose", "x-moz")
+
+
+class ContexteScan(NamedTuple):
+    """Ce que les filtres voient d'un scan."""
+    id_qrcode: int
+    client_host: Optional[str]
+    user_agent: Optional[str]
+    entetes: Mapping[str, str]
+
+
+class FiltrePrechargement:
+    """Rejette les requêtes de préchargement / prérendu (en-têtes Purpose, Sec-Purpose…)."""
+
+    nom = "prechargement"
+
+    def rejeter(self, contexte: ContexteScan) -> bool:
+        for entete in ENTETES_PRECHARGEMENT:
+            valeur = contexte.entetes.get(entete)
+            if valeur and ("prefetch" in valeur.lower() or "preview" in valeur.lower()
+                           or "prerender" in valeur.lower()):
+                return True
+        return False
+
+
+class FiltreRobots:
+    """
+    Rejette les user agents de robots et d'aperçus de liens.
+
+    Les motifs sont compilés en une seule expression régulière ; le verdict
+    de chaque user agent est mis en cache (les mêmes valeurs reviennent sans cesse).
+    """
+
+    nom = "robot"
+
+    def __init__(self, motifs: Iterable[str] = MOTIFS_ROBOTS, taille_cache: int = 10000):
+        self._expression = re.compile("|".join(f"(?:{m})" for m in motifs), re.IGNORECASE)
+        self.cache = CacheTTL(taille_max=taille_cache, ttl=24 * 3600)
+
+    def rejeter(self, contexte: ContexteScan) -> bool:
+        user_agent = contexte.user_agent or ""
+        return self.cache.obtenir(user_agent, lambda: self._expression.search(user_agent) is not None)
+
+
+class FiltreDoublons:
+    """
+    Rejette la répétition d'un scan (même client_host, même QR) dans une fenêtre glissante.
+
+    Les clés vues sont rangées dans `nb_tranches` ensembles couvrant chacun
+    fenetre_s / nb_tranches secondes ; les tranches sorties de la fenêtre sont
+    libérées d'un bloc. La mémoire est bornée par `cles_max` : au-delà, la
+    tranche la plus ancienne est libérée par anticipation (un doublon peut
+    alors passer, jamais un scan légitime être rejeté à tort).
+    """
+
+    nom = "doublon"
+
+    def __init__(
+        self,
+        fenetre_s: float = 10.0,
+        cles_max: int = 100000,
+        nb_tranches: int = 10,
+        horloge: Callable[[], float] = time.monotonic,
+    ):
+        self.fenetre_s = max(0.001, float(fenetre_s))
+        self.cles_max = max(1, int(cles_max))
+        self.nb_tranches = max(1, int(nb_tranches))
+        self._duree_tranche = self.fenetre_s / self.nb_tranches
+        self._horloge = horloge
+        # (numéro de tranche, clés vues pendant la tranche), la plus récente à droite
+        self._tranches: "deque[Tuple[int, Set[Tuple[int, str]]]]" = deque()
+        self._nb_cles = 0
+        self._verrou = threading.Lock()
+
+    def rejeter(self, contexte: ContexteScan) -> bool:
+        if not contexte.client_host:
+            return False
+        cle = (contexte.id_qrcode, contexte.client_host)
+        numero = int(self._horloge() // self._duree_tranche)
+        with self._verrou:
+            self._expirer(numero)
+            if any(cle in cles for _, cles in self._tranches):
+                return True
+            if not self._tranches or self._tranches[-1][0] != numero:
+                self._tranches.append((numero, set()))
+            self._tranches[-1][1].add(cle)
+            self._nb_cles += 1
+            while self._nb_cles > self.cles_max and len(self._tranches) > 1:
+                _, cles = self._tranches.popleft()
+                self._nb_cles -= len(cles)
+            return False
+
+    def _expirer(self, numero: int) -> None:
+        """Libère les tranches sorties de la fenêtre (verrou tenu)."""
+        plus_ancienne = numero - self.nb_tranches + 1
+        while self._tranches and self._tranches[0][0] < plus_ancienne:
+            _, cles = self._tranches.popleft()
+            self._nb_cles -= len(cles)
+
+    def vider(self) -> None:
+        """Oublie tous les scans vus."""
+        with self._verrou:
+            self._tranches.clear()
+            self._nb_cles = 0
+
+    def __len__(self) -> int:
+        return self._nb_cles
+
+
+class FiltreScansService:
+    """
+    Étape de filtrage des scans avant écriture en base.
+
+    Les filtres sont appliqués dans l'ordre ; le premier qui rejette le scan
+    donne le motif. Un scan filtré est tout de même redirigé, mais n'est ni
+    compté dans statistique ni journalisé dans logs_scan. Chaque décision
+    est comptée (acceptes, puis un compteur par filtre).
+
+    Un filtre est un objet avec un attribut `nom` et une méthode
+    `rejeter(contexte: ContexteScan) -> bool`.
+    """
+
+    def __init__(self, filtres: Iterable = ()):
+        self.filtres: List = list(filtres)
+        self._verrou = threading.Lock()
+        self._nb_acceptes = 0
+        self._nb_rejetes: Dict[str, int] = {f.nom: 0 for f in self.filtres}
+
+    def evaluer(
+        self,
+        id_qrcode: int,
+        client_host: Optional[str] = None,
+        user_agent: Optional[str] = None,
+        entetes: Optional[Mapping[str, str]] = None,
+    ) -> Optional[str]:
+        """
+        Décide si un scan doit être enregistré.
+
+        Retour
+        ------
+        Optional[str]
+            None si le scan est à enregistrer, sinon le nom du filtre qui l'a rejeté.
+        """
+        contexte = ContexteScan(id_qrcode, client_host, user_agent, entetes or {})
+        for filtre in self.filtres:
+            try:
+                rejete = filtre.rejeter(contexte)
+            except Exception as e:
+                logger.warning(f"Filtre de scans {filtre.nom} en erreur, scan conservé : {e}")
+                continue
+            if rejete:
+                with self._verrou:
+                    self._nb_rejetes[filtre.nom] = self._nb_rejetes.get(filtre.nom, 0) + 1
+                return filtre.nom
+        with self._verrou:
+            self._nb_acceptes += 1
+        return None
+
+    def vider(self) -> None:
+        """Réinitialise l'état des filtres qui en ont un (doublons en mémoire)."""
+        for filtre in self.filtres:
+            if hasattr(filtre, "vider"):
+                filtre.vider()
+
+    def metriques(self) -> dict:
+        """
+        Retourne les décisions du filtre.
+
+        Retour
+        ------
+        dict
+            acceptes, rejetes (par filtre), taux_rejet.
+        """
+        with self._verrou:
+            rejetes = dict(self._nb_rejetes)
+            total = self._nb_acceptes + sum(rejetes.values())
+            return {
+                "acceptes": self._nb_acceptes,
+                "rejetes": rejetes,
+                "taux_rejet": round(sum(rejetes.values()) / total, 4) if total else 0.0,
+            }
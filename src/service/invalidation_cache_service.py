@@ -0,0 +1,228 @@
+import logging
+import select
+import socket
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from dao.bus_invalidation import CANAL, identifiant_processus, lire_notification, ouvrir_ecoute
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidationCacheService:
+    """
+    Invalidation des caches locaux entre workers (PostgreSQL LISTEN / NOTIFY).
+
+    Les écritures des DAO (QR codes, tokens, utilisateurs) publient une
+    notification dans leur transaction (dao.bus_invalidation.publier). Chaque
+    worker écoute le canal sur une connexion dédiée et, pour chaque
+    notification émise par un autre processus, appelle les fonctions
+    d'invalidation abonnées au domaine (ex. éviction d'un id_qrcode du cache
+    de redirection).
+
+    Une notification émise pendant une coupure est perdue : après chaque
+    (re)connexion, tous les caches abonnés sont vidés. La connexion est
+    testée (`SELECT 1`) après `verification_s` secondes sans message, et
+    rouverte avec une attente croissante (jusqu'à `delai_max_s`) si elle
+    est perdue.
+    """
+
+    def __init__(
+        self,
+        canal: str = CANAL,
+        verification_s: float = 30.0,
+        delai_max_s: float = 30.0,
+        connecter: Optional[Callable] = None,
+    ):
+        """
+        Paramètres
+        ----------
+        canal : str
+            Canal écouté (CACHE_INVALIDATION_CANAL).
+        verification_s : float
+            Inactivité (s) au-delà de laquelle la connexion est testée.
+        delai_max_s : float
+            Attente maximale (s) entre deux tentatives de reconnexion.
+        connecter : Callable, optionnel
+            Ouvre la connexion d'écoute (par défaut `ouvrir_ecoute(canal)`).
+        """
+        self.canal = canal
+        self.verification_s = max(1.0, float(verification_s))
+        self.delai_max_s = max(1.0, float(delai_max_s))
+        self._connecter = connecter or (lambda: ouvrir_ecoute(canal))
+        # Émetteur dont les notifications sont ignorées (par défaut ce processus)
+        self.emetteur: Optional[str] = None
+        self._abonnements: Dict[str, List[Tuple[Callable[[str], None], Callable[[], None]]]] = {}
+        self._conn = None
+        self._derniere_activite = 0.0
+        self._evenement_arret = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Réveille le thread bloqué dans select() à l'arrêt (socketpair : aussi sous Windows)
+        self._reveil_lecture, self._reveil_ecriture = socket.socketpair()
+        self._reveil_lecture.setblocking(False)
+
+        # --- Compteurs ---
+        self._nb_recues = 0
+        self._nb_appliquees = 0
+        self._nb_ignorees = 0
+        self._nb_connexions = 0
+        self._nb_pertes = 0
+        self._nb_resynchronisations = 0
+
+    def abonner(self, domaine: str, invalider: Callable[[str], None], vider: Callable[[], None]) -> None:
+        """
+        Abonne un cache aux notifications d'un domaine.
+
+        Paramètres
+        ----------
+        domaine : str
+            "qrcode", "token" ou "utilisateur".
+        invalider : Callable[[str], None]
+            Évince une clé (reçue sous forme de chaîne).
+        vider : Callable[[], None]
+            Vide tout le cache (après une coupure du bus).
+        """
+        self._abonnements.setdefault(domaine, []).append((invalider, vider))
+
+    # ------------------------------------------------------------------
+    # Cycle de vie
+    # ------------------------------------------------------------------
+
+    def demarrer(self) -> None:
+        """
+        Ouvre la connexion d'écoute puis démarre le thread (sans effet s'il
+        tourne déjà). Une première connexion impossible est retentée par le thread.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._evenement_arret.clear()
+        self._essayer_connexion()
+        self._thread = threading.Thread(target=self._boucle, name="invalidation-cache", daemon=True)
+        self._thread.start()
+
+    def arreter(self, timeout: float = 10.0) -> None:
+        """Arrête le thread et ferme la connexion d'écoute."""
+        self._evenement_arret.set()
+        try:
+            self._reveil_ecriture.send(b"\0")
+        except OSError:
+            pass
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._fermer_connexion()
+
+    # ------------------------------------------------------------------
+    # Traitement
+    # ------------------------------------------------------------------
+
+    def traiter(self, payload: str) -> bool:
+        """
+        Applique une notification.
+
+        Retour
+        ------
+        bool
+            True si des caches ont été invalidés, False si la notification
+            est ignorée (propre processus, domaine sans abonné, format invalide).
+        """
+        self._nb_recues += 1
+        message = lire_notification(payload)
+        if message is None or message[1] == (self.emetteur or identifiant_processus()) or message[0] not in self._abonnements:
+            self._nb_ignorees += 1
+            return False
+        domaine, _, cle = message
+        for invalider, _ in self._abonnements[domaine]:
+            try:
+                invalider(cle)
+            except Exception as e:
+                logger.warning(f"Invalidation {domaine}:{cle} impossible : {e}")
+        self._nb_appliquees += 1
+        return True
+
+    def resynchroniser(self) -> None:
+        """Vide tous les caches abonnés (des notifications ont pu être perdues)."""
+        for domaine, abonnes in self._abonnements.items():
+            for _, vider in abonnes:
+                try:
+                    vider()
+                except Exception as e:
+                    logger.warning(f"Vidage du cache {domaine} impossible : {e}")
+        self._nb_resynchronisations += 1
+
+    def _boucle(self) -> None:
+        delai = 1.0
+        while not self._evenement_arret.is_set():
+            if self._conn is None:
+                if not self._essayer_connexion():
+                    self._evenement_arret.wait(delai)
+                    delai = min(delai * 2, self.delai_max_s)
+                    continue
+                delai = 1.0
+            try:
+                self._attendre()
+            except Exception as e:
+                logger.warning(f"Connexion d'écoute des invalidations perdue : {e}")
+                self._nb_pertes += 1
+                self._fermer_connexion()
+
+    def _essayer_connexion(self) -> bool:
+        try:
+            self._conn = self._connecter()
+        except Exception as e:
+            logger.warning(f"Écoute des invalidations de cache indisponible : {e}")
+            return False
+        self._nb_connexions += 1
+        self._derniere_activite = time.monotonic()
+        # Abonnement effectif : tout ce qui a été écrit avant est oublié
+        self.resynchroniser()
+        return True
+
+    def _attendre(self) -> None:
+        """Attend une notification (ou l'arrêt) et applique les notifications reçues."""
+        conn = self._conn
+        lisibles, _, _ = select.select([conn, self._reveil_lecture], [], [], self.verification_s)
+        if self._reveil_lecture in lisibles:
+            try:
+                self._reveil_lecture.recv(64)
+            except OSError:
+                pass
+        if conn not in lisibles:
+            if time.monotonic() - self._derniere_activite >= self.verification_s:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1;")
+                self._derniere_activite = time.monotonic()
+            return
+        conn.poll()
+        self._derniere_activite = time.monotonic()
+        while conn.notifies:
+            self.traiter(conn.notifies.pop(0).payload)
+
+    def _fermer_connexion(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def metriques(self) -> dict:
+        """
+        Retourne les compteurs.
+
+        Retour
+        ------
+        dict
+            connecte, recues, appliquees, ignorees, connexions, pertes,
+            resynchronisations.
+        """
+        return {
+            "connecte": self._conn is not None,
+            "recues": self._nb_recues,
+            "appliquees": self._nb_appliquees,
+            "ignorees": self._nb_ignorees,
+            "connexions": self._nb_connexions,
+            "pertes": self._nb_pertes,
+            "resynchronisations": self._nb_resynchronisations,
+        }
@@ -0,0 +1,254 @@
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from business_object.log_scan import LogScan
+from dao.log_scan_dao import LogScanDao
+from utils.journal_scans import JournalScans
+
+logger = logging.getLogger(__name__)
+
+
+class JournalScansService:
+    """
+    Écriture des scans via un journal local durable (spool), chargé en base en lot.
+
+    Alternative au tampon mémoire (ScanBufferService) quand la base peut être
+    lente ou indisponible : la route de scan ajoute l'événement au segment
+    actif du journal et redirige aussitôt, quelle que soit la latence de la base.
+
+    - Un thread de synchronisation rend les scans durables toutes les
+      `intervalle_fsync_ms` millisecondes (un fsync pour tous les scans reçus
+      entre-temps) et scelle le segment actif après `age_segment_max_s`.
+    - Un thread de chargement envoie chaque segment scellé en base
+      (LogScanDao.charger_segment, par COPY) puis le supprime. Si la base est
+      indisponible, les segments s'accumulent sur disque et sont chargés dès
+      son retour, y compris après un redémarrage.
+    - Le rejeu est idempotent : un segment déjà chargé n'est pas réécrit.
+    """
+
+    def __init__(
+        self,
+        journal: JournalScans,
+        log_dao: Optional[LogScanDao] = None,
+        intervalle_fsync_ms: int = 100,
+        age_segment_max_s: float = 1.0,
+        intervalle_chargement_s: float = 1.0,
+    ):
+        self.journal = journal
+        self._log_dao = log_dao
+        self.intervalle_fsync_ms = max(1, int(intervalle_fsync_ms))
+        self.age_segment_max_s = max(0.0, float(age_segment_max_s))
+        self.intervalle_chargement_s = max(0.01, float(intervalle_chargement_s))
+
+        self._evenement_arret = threading.Event()
+        self._evenement_chargement = threading.Event()
+        # Sérialise les chargements (thread de fond, arrêt, appel manuel)
+        self._verrou_chargement = threading.Lock()
+        self._threads = []
+        self._derniere_purge = 0.0
+
+        # --- Compteurs ---
+        self._nb_recus = 0
+        self._nb_rejetes = 0
+        self._nb_synchronisations = 0
+        self._nb_scans_charges = 0
+        self._nb_segments_charges = 0
+        self._nb_segments_deja_appliques = 0
+        self._nb_octets_ignores = 0
+        self._nb_echecs = 0
+
+    # ------------------------------------------------------------------
+    # Cycle de vie
+    # ------------------------------------------------------------------
+
+    def demarrer(self) -> None:
+        """Démarre les threads de synchronisation et de chargement (sans effet s'ils tournent)."""
+        if any(t.is_alive() for t in self._threads):
+            return
+        self._evenement_arret.clear()
+        self._threads = [
+            threading.Thread(target=self._boucle_synchronisation, name="journal-scans-fsync", daemon=True),
+            threading.Thread(target=self._boucle_chargement, name="journal-scans-chargement", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def arreter(self, timeout: float = 10.0) -> None:
+        """
+        Arrête les threads, scelle le segment actif puis tente un dernier chargement.
+
+        Les segments qui n'ont pas pu être chargés restent sur disque et seront
+        repris au prochain démarrage.
+        """
+        self._evenement_arret.set()
+        self._evenement_chargement.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self.journal.sceller()
+        self.charger()
+
+    # ------------------------------------------------------------------
+    # Écriture
+    # ------------------------------------------------------------------
+
+    def enregistrer_scan(
+        self,
+        id_qrcode: int,
+        client_host: Optional[str] = None,
+        user_agent: Optional[str] = None,
+        referer: Optional[str] = None,
+        accept_language: Optional[str] = None,
+        geo_country: Optional[str] = None,
+        geo_region: Optional[str] = None,
+        geo_city: Optional[str] = None,
+        date_scan: Optional[datetime] = None,
+        geo_enrichi: bool = True,
+    ) -> bool:
+        """
+        Ajoute un scan au journal local (non bloquant : pas de fsync ni d'accès base).
+
+        Paramètres
+        ----------
+        Identiques à ScanBufferService.enregistrer_scan.
+
+        Retour
+        ------
+        bool
+            - True si le scan a été écrit dans le journal.
+            - False si l'écriture disque a échoué (scan perdu, compté dans `rejetes`).
+        """
+        log_scan = LogScan(
+            id_qrcode=id_qrcode,
+            client_host=client_host,
+            user_agent=user_agent,
+            referer=referer,
+            accept_language=accept_language,
+            geo_country=geo_country,
+            geo_region=geo_region,
+            geo_city=geo_city,
+            date_scan=date_scan or datetime.now(timezone.utc),
+            geo_enrichi=geo_enrichi,
+        )
+        self._nb_recus += 1
+        try:
+            self.journal.ajouter(log_scan)
+        except OSError as e:
+            logger.error(f"Scan non journalisé pour QRCode {id_qrcode} : {e}")
+            self._nb_rejetes += 1
+            return False
+        return True
+
+    # ------------------------------------------------------------------
+    # Chargement
+    # ------------------------------------------------------------------
+
+    def charger(self) -> int:
+        """
+        Charge en base tous les segments scellés disponibles, du plus ancien au plus récent.
+
+        Retour
+        ------
+        int
+            Nombre de scans insérés.
+
+        Notes
+        -----
+        Au premier échec (base indisponible), le chargement s'interrompt : le
+        segment est conservé et retenté au passage suivant.
+        """
+        total = 0
+        with self._verrou_chargement:
+            dao = self._log_dao or LogScanDao()
+            for nom in self.journal.segments():
+                with self.journal.reserver(nom) as contenu:
+                    if contenu is None:
+                        continue
+                    logs, octets_ignores = contenu
+                    try:
+                        nb = dao.charger_segment(nom, logs)
+                    except Exception as e:
+                        logger.exception(f"Échec du chargement du segment {nom} ({len(logs)} scans) : {e}")
+                        self._nb_echecs += 1
+                        break
+                    self.journal.supprimer(nom)
+
+                if octets_ignores:
+                    logger.warning(f"Segment {nom} : {octets_ignores} octets illisibles ignorés en fin de fichier")
+                    self._nb_octets_ignores += octets_ignores
+                if nb is None:
+                    self._nb_segments_deja_appliques += 1
+                    continue
+                self._nb_segments_charges += 1
+                self._nb_scans_charges += nb
+                total += nb
+            self._purger(dao)
+        return total
+
+    def _purger(self, dao: LogScanDao) -> None:
+        """Purge au plus une fois par heure les traces des anciens segments chargés."""
+        maintenant = time.monotonic()
+        if self._derniere_purge and maintenant - self._derniere_purge < 3600:
+            return
+        self._derniere_purge = maintenant
+        try:
+            dao.purger_segments_appliques()
+        except Exception as e:
+            logger.warning(f"Purge des segments chargés impossible : {e}")
+
+    # ------------------------------------------------------------------
+    # Threads
+    # ------------------------------------------------------------------
+
+    def _boucle_synchronisation(self) -> None:
+        """fsync groupé à intervalle fixe ; scelle le segment actif devenu trop ancien."""
+        intervalle_s = self.intervalle_fsync_ms / 1000
+        while not self._evenement_arret.wait(intervalle_s):
+            try:
+                if self.journal.synchroniser():
+                    self._nb_synchronisations += 1
+                if self.journal.age_segment_actif() >= self.age_segment_max_s:
+                    self.journal.sceller()
+                    self._evenement_chargement.set()
+            except OSError as e:
+                logger.error(f"Synchronisation du journal de scans impossible : {e}")
+
+    def _boucle_chargement(self) -> None:
+        """Charge les segments scellés dès qu'il y en a, ou à intervalle fixe."""
+        while not self._evenement_arret.is_set():
+            self._evenement_chargement.wait(self.intervalle_chargement_s)
+            self._evenement_chargement.clear()
+            if self._evenement_arret.is_set():
+                return
+            self.charger()
+
+    # ------------------------------------------------------------------
+    # Métriques
+    # ------------------------------------------------------------------
+
+    def metriques(self) -> dict:
+        """
+        Retourne les compteurs du journal.
+
+        Retour
+        ------
+        dict
+            segments_en_attente, octets_en_attente (backlog sur disque, segment
+            actif compris), recus, rejetes, synchronisations, scans_charges,
+            segments_charges, segments_deja_appliques, octets_ignores, echecs.
+        """
+        return {
+            "segments_en_attente": len(self.journal.segments()),
+            "octets_en_attente": self.journal.taille_en_attente(),
+            "recus": self._nb_recus,
+            "rejetes": self._nb_rejetes,
+            "synchronisations": self._nb_synchronisations,
+            "scans_charges": self._nb_scans_charges,
+            "segments_charges": self._nb_segments_charges,
+            "segments_deja_appliques": self._nb_segments_deja_appliques,
+            "octets_ignores": self._nb_octets_ignores,
+            "echecs": self._nb_echecs,
+        }
@@ -2,6 +2,8 @@
 from utils.log_decorator import log
 from business_object.log_scan import LogScan
 from dao.log_scan_dao import LogScanDao
+from dao.asynchrone.log_scan_dao_async import LogScanDaoAsync
+from datetime import datetime
 from typing import Optional
 import logging
 
@@ -11,8 +13,17 @@ import logging
 class LogScanService:
     """Service pour la gestion des logs de scan."""
 
-    def __init__(self, dao: LogScanDao = LogScanDao()):
-        self.dao = dao
+    def __init__(self, dao: Optional[LogScanDao] = None, dao_async: Optional[LogScanDaoAsync] = None):
+        """
+        Paramètres
+        ----------
+        dao : LogScanDao, optionnel
+            DAO synchrone (créé à la construction du service si absent).
+        dao_async : LogScanDaoAsync, optionnel
+            DAO asynchrone utilisé par `enregistrer_scan_async`.
+        """
+        self.dao = dao or LogScanDao()
+        self.dao_async = dao_async or LogScanDaoAsync()
 
     @log
     def enregistrer_log(
@@ -79,3 +90,84 @@ class LogScanService:
         except Exception as e:
             logging.exception(f"Erreur dans LogScanService : {e}")
             return None
+
+    def enregistrer_scan(
+        self,
+        id_qrcode: int,
+        client_host: Optional[str] = None,
+        user_agent: Optional[str] = None,
+        referer: Optional[str] = None,
+        accept_language: Optional[str] = None,
+        geo_country: Optional[str] = None,
+        geo_region: Optional[str] = None,
+        geo_city: Optional[str] = None,
+        date_scan: Optional[datetime] = None,
+        geo_enrichi: bool = True,
+    ) -> Optional[LogScan]:
+        """
+        Enregistre un scan complet : vue du jour (statistique) et log (logs_scan).
+
+        Paramètres
+        ----------
+        Identiques à `enregistrer_log`, plus :
+        date_scan : datetime, optionnel
+            Horodatage du scan (maintenant en UTC par défaut) ; fixe aussi le
+            jour de la vue.
+        geo_enrichi : bool, par défaut True
+            False si la géolocalisation est laissée au worker d'enrichissement.
+
+        Retour
+        ------
+        Optional[LogScan]
+            - Le LogScan enregistré si succès.
+            - None en cas d'échec (ni la vue ni le log ne sont écrits).
+
+        Notes
+        -----
+        Les deux écritures partent en une seule instruction SQL
+        (LogScanDao.enregistrer_scan) : un aller-retour, un commit.
+        """
+        log_scan = LogScan(
+            id_qrcode=id_qrcode,
+            client_host=client_host,
+            user_agent=user_agent,
+            referer=referer,
+            accept_language=accept_language,
+            geo_country=geo_country,
+            geo_region=geo_region,
+            geo_city=geo_city,
+            date_scan=date_scan,
+            geo_enrichi=geo_enrichi,
+        )
+        return log_scan if self.dao.enregistrer_scan(log_scan) else None
+
+    async def enregistrer_scan_async(
+        self,
+        id_qrcode: int,
+        client_host: Optional[str] = None,
+        user_agent: Optional[str] = None,
+        referer: Optional[str] = None,
+        accept_language: Optional[str] = None,
+        geo_country: Optional[str] = None,
+        geo_region: Optional[str] = None,
+        geo_city: Optional[str] = None,
+        date_scan: Optional[datetime] = None,
+        geo_enrichi: bool = True,
+    ) -> Optional[LogScan]:
+        """
+        Variante asynchrone de `enregistrer_scan` (mêmes paramètres), via
+        LogScanDaoAsync : la route n'occupe pas de thread pendant l'écriture.
+        """
+        log_scan = LogScan(
+            id_qrcode=id_qrcode,
+            client_host=client_host,
+            user_agent=user_agent,
+            referer=referer,
+            accept_language=accept_language,
+            geo_country=geo_country,
+            geo_region=geo_region,
+            geo_city=geo_city,
+            date_scan=date_scan,
+            geo_enrichi=geo_enrichi,
+        )
+        return log_scan if await self.dao_async.enregistrer_scan(log_scan) else None
@@ -0,0 +1,89 @@
+import logging
+import time
+from datetime import date, timedelta
+from typing import Optional
+
+from dao.token_dao import TokenDao
+from dao.utilisateur_dao import UtilisateurDao
+from service.qrcode_service import QRCodeService
+from service.token_service import TokenService
+
+logger = logging.getLogger(__name__)
+
+
+class PrechauffageService:
+    """
+    Préchauffage des caches au démarrage d'un worker.
+
+    Après un déploiement, chaque worker démarre avec des caches vides et les
+    premières minutes de trafic retombent sur PostgreSQL. Les `nb` QR codes
+    les plus scannés des `jours` derniers jours sont lus en une requête et
+    écrits dans le cache de redirection. En option, les tokens valides et
+    les utilisateurs de leurs propriétaires sont lus en lot (une requête
+    chacun) et mis en cache.
+    """
+
+    def __init__(
+        self,
+        qrcode_service: QRCodeService,
+        token_service: Optional[TokenService] = None,
+        nb: int = 1000,
+        jours: int = 7,
+        proprietaires: bool = False,
+    ):
+        """
+        Paramètres
+        ----------
+        qrcode_service : QRCodeService
+            Service dont le cache de redirection est préchauffé.
+        token_service : TokenService, optionnel
+            Service dont le cache de tokens est préchauffé (avec `proprietaires`).
+        nb : int, par défaut 1000
+            Nombre de QR codes chargés ; 0 désactive le préchauffage.
+        jours : int, par défaut 7
+            Fenêtre (jours) des vues prises en compte.
+        proprietaires : bool, par défaut False
+            Charge aussi les tokens et les utilisateurs des propriétaires.
+        """
+        self.qrcode_service = qrcode_service
+        self.token_service = token_service
+        self.nb = max(0, int(nb))
+        self.jours = max(1, int(jours))
+        self.proprietaires = proprietaires
+
+    def executer(self, aujourd_hui: Optional[date] = None) -> dict:
+        """
+        Préchauffe les caches.
+
+        Paramètres
+        ----------
+        aujourd_hui : date, optionnel
+            Fin de la fenêtre des vues (par défaut la date du jour).
+
+        Retour
+        ------
+        dict
+            qrcodes, tokens, utilisateurs (entrées mises en cache) et duree_ms.
+        """
+        debut = time.perf_counter()
+        resultat = {"qrcodes": 0, "tokens": 0, "utilisateurs": 0}
+        if self.nb:
+            depuis = (aujourd_hui or date.today()) - timedelta(days=self.jours)
+            qrcodes = self.qrcode_service.dao.lister_plus_scannes(self.nb, depuis)
+            resultat["qrcodes"] = self.qrcode_service.prechauffer_cache(qrcodes)
+
+            if self.proprietaires and qrcodes:
+                ids_user = sorted({int(qr.id_proprietaire) for qr in qrcodes})
+                if self.token_service is not None:
+                    tokens = TokenDao().lister_valides_par_utilisateurs(ids_user)
+                    resultat["tokens"] = self.token_service.prechauffer_cache(tokens)
+                for utilisateur in UtilisateurDao().lister_par_ids(ids_user):
+                    UtilisateurDao.trouver_par_id_user.precharger(utilisateur, utilisateur.id_user)
+                    resultat["utilisateurs"] += 1
+
+        resultat["duree_ms"] = round((time.perf_counter() - debut) * 1000, 1)
+        logger.info(
+            f"Caches préchauffés : {resultat['qrcodes']} QR codes, {resultat['tokens']} tokens, "
+            f"{resultat['utilisateurs']} utilisateurs en {resultat['duree_ms']} ms"
+        )
+        return resultat
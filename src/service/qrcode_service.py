@@ -1,11 +1,18 @@
-from typing import List, Optional
+from typing import List, NamedTuple, Optional, Tuple
 from datetime import datetime
 from business_object.qr_code import Qrcode  # ta classe métier
 from dao.qrcode_dao import QRCodeDao
+from dao.asynchrone.qrcode_dao_async import QRCodeDaoAsync
 from utils.qrcode_generator import generate_and_save_qr_png, filepath_to_public_url
+from utils.cache_ttl import CacheTTL
+from utils.single_flight import SingleFlight
+from utils.table_redirections import TableRedirections
+import logging
 import os
 from utils.log_decorator import log
 
+logger = logging.getLogger(__name__)
+
 # assume env/config
 QR_OUTPUT_DIR = os.getenv("QRCODE_OUTPUT_DIR", "static/qrcodes")
 # Lit l'URL de scan depuis l'env (utilisée si type_qrcode is True)
@@ -22,11 +29,52 @@ class UnauthorizedError(Exception):
     pass
 
 
+class CibleRedirection(NamedTuple):
+    """Entrée compacte du cache de redirection (ce dont la route de scan a besoin)."""
+    url: str
+    type_qrcode: bool
+    id_proprietaire: str
+    version: int = 1
+    cache_max_age: Optional[int] = None
+
+
 class QRCodeService:
     """Service métier pour la gestion des QR codes."""
 
-    def __init__(self, dao: QRCodeDao):
+    def __init__(
+        self,
+        dao: QRCodeDao,
+        cache: Optional[CacheTTL] = None,
+        dao_async: Optional[QRCodeDaoAsync] = None,
+        table: Optional[TableRedirections] = None,
+    ):
+        """
+        Paramètres
+        ----------
+        dao : QRCodeDao
+            DAO d'accès à la table qrcode.
+        cache : CacheTTL, optionnel
+            Cache partagé id_qrcode -> CibleRedirection (None si inconnu).
+            Sans cache, chaque recherche interroge la base.
+        dao_async : QRCodeDaoAsync, optionnel
+            DAO asynchrone utilisé par les méthodes `*_async` (routes).
+        table : TableRedirections, optionnel
+            Table de redirections projetée en mémoire, partagée par les
+            workers ; consultée avant le cache et la base.
+
+        Notes
+        -----
+        Les recherches concurrentes d'un même identifiant absent du cache
+        partagent une seule lecture en base (SingleFlight).
+        """
         self.dao = dao
+        self.cache = cache
+        self.dao_async = dao_async or QRCodeDaoAsync()
+        self.table = table
+        # Table suspendue après un échec d'écriture : elle n'est plus consultée
+        # jusqu'à sa prochaine reconstruction (elle primerait sur la base)
+        self._table_suspendue = False
+        self.vols = SingleFlight()
 
     @log
     def creer_qrc(
@@ -36,6 +84,8 @@ class QRCodeService:
         type_qrcode: bool = True,
         couleur: Optional[str] = None,
         logo: Optional[str] = None,
+        cache_max_age: Optional[int] = None,
+        generer_image: bool = True,
     ) -> Optional[Qrcode]:
         """
         Crée un QR code et génère son image PNG.
@@ -53,6 +103,12 @@ class QRCodeService:
             Couleur du QR code lors de la génération de l’image.
         logo : str, optionnel
             Chemin vers un fichier image à incruster au centre du QR code.
+        cache_max_age : int, optionnel
+            Durée (s) pendant laquelle la redirection d'un QR statique peut être
+            mise en cache par les navigateurs et proxys (défaut de l'application si None).
+        generer_image : bool, par défaut True
+            False : l'image n'est pas générée ici mais par un appel ultérieur
+            à `generer_image(qr)` (ex. dans l'exécuteur de rendu).
 
         Retour
         ------
@@ -77,10 +133,14 @@ class QRCodeService:
             type_qrcode=type_qrcode,
             couleur=couleur,
             logo=logo,
+            cache_max_age=cache_max_age,
         )
         created_qr = self.dao.creer_qrc(qrcode)
         if not created_qr:
             raise RuntimeError("Échec de création du QR code en base")
+        # Un identifiant auparavant inconnu peut être en cache négatif
+        self.invalider_cache(created_qr.id_qrcode)
+        self._publier_redirection(created_qr.id_qrcode, created_qr)
 
         scan_url = None
 
@@ -92,22 +152,52 @@ class QRCodeService:
         else:
             payload_url = created_qr.url
 
-        saved_path = generate_and_save_qr_png(
-            payload_url,
+        created_qr._scan_url = scan_url
+        created_qr._image_path = None
+        created_qr._image_url = None
+        created_qr._image_a_generer = dict(
+            tracking_url=payload_url,
             out_dir=QR_OUTPUT_DIR,
             filename=f"qrcode_{created_qr.id_qrcode}.png",
             fill_color=couleur or "black",
             logo_path=logo,
             logo_scale=0.18,
         )
-
-        public_url = filepath_to_public_url(saved_path)
-        created_qr._image_path = saved_path
-        created_qr._image_url = public_url
-        created_qr._scan_url = scan_url
+        if generer_image:
+            self.generer_image(created_qr)
 
         return created_qr
 
+    def generer_image(self, qr: Qrcode) -> Optional[str]:
+        """
+        Génère l'image PNG en attente d'un QR code créé ou modifié avec
+        `generer_image=False`.
+
+        Paramètres
+        ----------
+        qr : Qrcode
+            Objet renvoyé par `creer_qrc` ou `modifier_qrc`.
+
+        Retour
+        ------
+        Optional[str]
+            Chemin du fichier écrit, ou None si aucune image n'était à générer.
+
+        Notes
+        -----
+        Rendu PIL, gourmand en CPU : les routes l'exécutent dans l'exécuteur
+        "rendu", séparé des accès à la base. Renseigne `_image_path` et
+        `_image_url` sur l'objet.
+        """
+        parametres = getattr(qr, "_image_a_generer", None)
+        if not parametres:
+            return None
+        saved_path = generate_and_save_qr_png(**parametres)
+        qr._image_a_generer = None
+        qr._image_path = saved_path
+        qr._image_url = filepath_to_public_url(saved_path)
+        return saved_path
+
 
     def trouver_qrc_par_id_user(self, id_user: str) -> List[Qrcode]:
         """
@@ -135,6 +225,61 @@ class QRCodeService:
         return self.dao.lister_par_proprietaire(user_id_int)
 
 
+    def lister_page(
+        self,
+        id_user: str,
+        limite: int,
+        apres: Optional[int] = None,
+        type_qrcode: Optional[bool] = None,
+        cree_depuis: Optional[datetime] = None,
+        cree_avant: Optional[datetime] = None,
+    ) -> Tuple[List[Qrcode], Optional[int]]:
+        """
+        Récupère une page des QR codes d'un utilisateur (pagination par curseur).
+
+        Paramètres
+        ----------
+        id_user : str
+            Identifiant de l'utilisateur fourni par l’API.
+        limite : int
+            Taille de la page.
+        apres : int, optionnel
+            Curseur renvoyé avec la page précédente.
+        type_qrcode, cree_depuis, cree_avant : optionnels
+            Filtres appliqués en base (voir QRCodeDao.lister_page_par_proprietaire).
+
+        Retour
+        ------
+        Tuple[List[Qrcode], Optional[int]]
+            La page (les plus récents d'abord) et le curseur de la page
+            suivante, None s'il n'y en a plus.
+
+        Notes
+        -----
+        Une ligne de plus que la page est lue : la dernière page est
+        reconnue sans requête supplémentaire. Lève RuntimeError si la
+        lecture en base échoue.
+        """
+        try:
+            user_id_int = int(id_user)
+        except ValueError:
+            return [], None
+        qrcodes = self.dao.lister_page_par_proprietaire(
+            user_id_int,
+            limite + 1,
+            apres=apres,
+            type_qrcode=type_qrcode,
+            cree_depuis=cree_depuis,
+            cree_avant=cree_avant,
+        )
+        if qrcodes is None:
+            raise RuntimeError(f"Lecture des QR codes de l'utilisateur {id_user} impossible")
+        if len(qrcodes) <= limite:
+            return qrcodes, None
+        page = qrcodes[:limite]
+        return page, page[-1].id_qrcode
+
+
     def supprimer_qrc(self, id_qrcode: int, id_user: int) -> bool:
         """
         Supprime un QR code après vérification de son propriétaire.
@@ -157,6 +302,7 @@ class QRCodeService:
         - Vérifie que le QR code existe, sinon lève QRCodeNotFoundError.
         - Vérifie que l’utilisateur est bien propriétaire, sinon lève UnauthorizedError.
         - Tente de supprimer le fichier PNG associé (sans bloquer la suppression BDD).
+        - Invalide l'entrée du cache de redirection et de la table de redirections.
         """
         qr = self.dao.trouver_qrc_par_id_qrc(id_qrcode)
         if not qr:
@@ -173,7 +319,11 @@ class QRCodeService:
         except Exception as e:
             print(f"Avertissement: n'a pas pu supprimer le fichier image {file_path}: {e}")
 
-        return self.dao.supprimer_qrc(id_qrcode)
+        supprime = self.dao.supprimer_qrc(id_qrcode)
+        self.invalider_cache(id_qrcode)
+        if supprime:
+            self._publier_redirection(id_qrcode, None)
+        return supprime
 
 
     def trouver_qrc_par_id(self, id_qrcode: int) -> Optional[Qrcode]:
@@ -197,6 +347,190 @@ class QRCodeService:
         return self.dao.trouver_qrc_par_id_qrc(id_qrcode)
 
 
+    def trouver_redirection(self, id_qrcode: int) -> Optional[CibleRedirection]:
+        """
+        Trouve la cible de redirection d'un QR code, via le cache si configuré.
+
+        Paramètres
+        ----------
+        id_qrcode : int
+            Identifiant du QR code recherché.
+
+        Retour
+        ------
+        Optional[CibleRedirection]
+            (url, type_qrcode, id_proprietaire) ou None si le QR code n'existe pas.
+
+        Notes
+        -----
+        La table de redirections (si configurée) est consultée en premier ;
+        un identifiant absent de la table passe par le cache puis la base.
+        Les identifiants inconnus sont aussi mis en cache (cache négatif,
+        durée de vie plus courte). Les entrées sont invalidées par
+        `modifier_qrc` et `supprimer_qrc`.
+        """
+        cible = self._chercher_dans_table(id_qrcode)
+        if cible is not None:
+            return cible
+        if self.cache is None:
+            return self._charger_redirection(id_qrcode)
+        return self.cache.obtenir(id_qrcode, lambda: self._charger_redirection(id_qrcode))
+
+    async def trouver_redirection_async(self, id_qrcode: int) -> Optional[CibleRedirection]:
+        """
+        Variante asynchrone de `trouver_redirection` (même cache, DAO asyncpg).
+
+        Un succès de cache est servi sans attente ; seul un échec interroge la
+        base, sans bloquer la boucle d'événements.
+        """
+        cible = self._chercher_dans_table(id_qrcode)
+        if cible is not None:
+            return cible
+        if self.cache is not None:
+            trouve, cible = self.cache.lire(id_qrcode)
+            if trouve:
+                return cible
+        return await self.vols.executer_async(id_qrcode, lambda: self._charger_redirection_async(id_qrcode))
+
+    def _charger_redirection(self, id_qrcode: int) -> Optional[CibleRedirection]:
+        return self.vols.executer(
+            id_qrcode, lambda: self._vers_cible(self.dao.trouver_qrc_par_id_qrc(id_qrcode))
+        )
+
+    async def _charger_redirection_async(self, id_qrcode: int) -> Optional[CibleRedirection]:
+        # Exécutée une seule fois pour tous les appelants concurrents : le cache
+        # est écrit ici, avant que la clé ne soit libérée. La génération relevée
+        # avant la lecture empêche de réécrire une valeur invalidée entre-temps
+        # (lecture détachée par `invalider_cache`)
+        generation = self.cache.generation() if self.cache is not None else None
+        cible = self._vers_cible(await self.dao_async.trouver_qrc_par_id_qrc(id_qrcode))
+        if self.cache is not None:
+            self.cache.ecrire(id_qrcode, cible, generation=generation)
+        return cible
+
+    @staticmethod
+    def _vers_cible(qr: Optional[Qrcode]) -> Optional[CibleRedirection]:
+        if not qr:
+            return None
+        return CibleRedirection(
+            qr.url, qr.type_qrcode, str(qr.id_proprietaire), qr.version, qr.cache_max_age
+        )
+
+    def prechauffer_cache(self, qrcodes: List[Qrcode]) -> int:
+        """
+        Insère dans le cache de redirection des QR codes déjà lus (préchauffage).
+
+        Retour
+        ------
+        int
+            Nombre d'entrées écrites (0 sans cache).
+        """
+        if self.cache is None:
+            return 0
+        for qr in qrcodes:
+            self.cache.ecrire(qr.id_qrcode, self._vers_cible(qr))
+        return len(qrcodes)
+
+    def invalider_cache(self, id_qrcode: int) -> None:
+        """Évince un QR code du cache de redirection (modifié ici ou par un autre worker)."""
+        # Une lecture en cours peut précéder la modification : ne plus la partager
+        self.vols.oublier(id_qrcode)
+        if self.cache is not None:
+            self.cache.invalider(id_qrcode)
+
+    def _chercher_dans_table(self, id_qrcode: int) -> Optional[CibleRedirection]:
+        if self.table is None or self._table_suspendue:
+            return None
+        entree = self.table.chercher(id_qrcode)
+        if entree is None:
+            return None
+        return CibleRedirection(
+            entree.url, entree.suivi, str(entree.id_proprietaire), entree.version, entree.cache_max_age
+        )
+
+    def _publier_redirection(self, id_qrcode: int, qr: Optional[Qrcode]) -> None:
+        """Reporte une création / modification (ou suppression si qr est None) dans la table."""
+        if self.table is None:
+            return
+        try:
+            if qr is None:
+                self.table.mettre_a_jour(id_qrcode, None)
+            else:
+                self.table.mettre_a_jour(
+                    id_qrcode, qr.url, bool(qr.type_qrcode), int(qr.id_proprietaire),
+                    version=qr.version, cache_max_age=qr.cache_max_age,
+                )
+        except Exception as e:
+            # La table est lue avant le cache et la base : l'ancienne cible ne doit pas y rester
+            logger.exception(f"Échec de mise à jour de la table de redirections pour {id_qrcode} : {e}")
+            try:
+                self.table.mettre_a_jour(id_qrcode, None)
+            except Exception as e:
+                self._table_suspendue = True
+                logger.error(
+                    f"Entrée {id_qrcode} non retirée de la table de redirections ({e}) : "
+                    "table suspendue jusqu'à sa prochaine reconstruction"
+                )
+
+    def rafraichir_redirection(self, id_qrcode: int) -> None:
+        """
+        Reporte dans la table une modification faite par un autre processus
+        (notification d'invalidation) : l'entrée est relue en base et remplacée,
+        ou retirée si le QR code n'existe plus.
+
+        Notes
+        -----
+        Un id absent de la table n'est pas ajouté (il est servi par le cache
+        puis la base) ; une entrée déjà à la version de la base n'est pas réécrite.
+        """
+        if self.table is None:
+            return
+        entree = self.table.chercher(id_qrcode)
+        if entree is None:
+            return
+        qr = self.dao.trouver_qrc_par_id_qrc(id_qrcode)
+        if qr is None or qr.version != entree.version:
+            self._publier_redirection(id_qrcode, qr)
+
+    def rafraichir_redirections_proprietaire(self, id_user: int) -> None:
+        """
+        Variante de `rafraichir_redirection` pour tous les QR codes d'un
+        utilisateur modifié ou supprimé ailleurs (suppression en cascade :
+        aucune notification par QR code).
+        """
+        if self.table is None:
+            return
+        ids = self.table.ids_du_proprietaire(int(id_user))
+        if not ids:
+            return
+        actuels = {qr.id_qrcode: qr for qr in self.dao.lister_par_proprietaire(int(id_user))}
+        for id_qrcode in ids:
+            entree = self.table.chercher(id_qrcode)
+            qr = actuels.get(id_qrcode)
+            if entree is not None and (qr is None or qr.version != entree.version):
+                self._publier_redirection(id_qrcode, qr)
+
+    def reconstruire_table_redirections(self) -> int:
+        """
+        Reconstruit entièrement la table de redirections depuis la base.
+
+        Retour
+        ------
+        int
+            Nombre de QR codes écrits (0 si aucune table n'est configurée).
+
+        Notes
+        -----
+        Si la base est indisponible, l'exception est propagée et la table
+        existante est conservée : elle continue de servir les redirections.
+        """
+        if self.table is None:
+            return 0
+        nb = self.table.construire(self.dao.lister_redirections())
+        self._table_suspendue = False
+        return nb
+
+
     def modifier_qrc(
         self,
         id_qrcode: int,
@@ -204,7 +538,10 @@ class QRCodeService:
         url: Optional[str] = None,
         type_qrcode: Optional[bool] = None,
         couleur: Optional[str] = None,
-        logo: Optional[str] = None
+        logo: Optional[str] = None,
+        cache_max_age: Optional[int] = None,
+        generer_image: bool = True,
+        reinitialiser_cache_max_age: bool = False,
     ) -> Qrcode:
         """
         Modifie un QR code existant après vérification du propriétaire.
@@ -225,6 +562,14 @@ class QRCodeService:
             Nouvelle couleur du QR code.
         logo : str, optionnel
             Nouveau logo à intégrer dans l’image.
+        cache_max_age : int, optionnel
+            Nouvelle durée de cache HTTP (s) de la redirection d'un QR statique.
+        generer_image : bool, par défaut True
+            False : une image à régénérer ne l'est pas ici mais par un appel
+            ultérieur à `generer_image(qr)` sur l'objet renvoyé.
+        reinitialiser_cache_max_age : bool, par défaut False
+            True : efface la durée de cache propre au QR code (la valeur par
+            défaut QR_STATIQUE_CACHE_MAX_AGE_S s'applique de nouveau).
 
         Retour
         ------
@@ -241,6 +586,10 @@ class QRCodeService:
             * le changement de couleur,
             * le changement de logo.
         - Si nécessaire, la nouvelle image PNG écrase l’ancienne.
+        - Le DAO incrémente la version du QR code : l'ETag de sa redirection
+        change, les copies en cache chez les clients ne sont plus validées.
+        - Invalide l'entrée du cache de redirection et met à jour la table
+        de redirections.
         """
         qr = self.dao.trouver_qrc_par_id_qrc(id_qrcode)
         if not qr:
@@ -282,25 +631,36 @@ class QRCodeService:
                 regenerate_image = True
                 payload_url_a_encoder = scan_url
 
+        image = None
         if regenerate_image:
             print(f"Re-génération de l'image pour QR {id_qrcode}...")
 
             nouveau_couleur = couleur if couleur is not None else qr.couleur
             nouveau_logo = logo if logo is not None else qr.logo
 
-            generate_and_save_qr_png(
-                payload_url_a_encoder,
+            image = dict(
+                tracking_url=payload_url_a_encoder,
                 out_dir=QR_OUTPUT_DIR,
                 filename=f"qrcode_{qr.id_qrcode}.png",
                 fill_color=nouveau_couleur or "black",
                 logo_path=nouveau_logo,
             )
+            if generer_image:
+                generate_and_save_qr_png(**image)
+                image = None
 
-        return self.dao.modifier_qrc(
+        updated = self.dao.modifier_qrc(
             id_qrcode=id_qrcode,
             id_user=id_user,
             url=url,
             type_qrcode=type_qrcode,
             couleur=couleur,
-            logo=logo
+            logo=logo,
+            cache_max_age=cache_max_age,
+            reinitialiser_cache_max_age=reinitialiser_cache_max_age,
         )
+        self.invalider_cache(id_qrcode)
+        if updated:
+            self._publier_redirection(id_qrcode, updated)
+            updated._image_a_generer = image
+        return updated
@@ -0,0 +1,301 @@
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from business_object.log_scan import LogScan
+from dao.db_connection import erreur_permanente
+from dao.log_scan_dao import LogScanDao
+
+logger = logging.getLogger(__name__)
+
+
+class ScanBufferService:
+    """
+    Tampon d'écriture différée (write-behind) des scans.
+
+    La route de scan dépose un événement en mémoire et redirige immédiatement ;
+    un thread de fond vide le tampon en lot, par une seule instruction SQL
+    (LogScanDao.enregistrer_scans) qui combine :
+    - un UPSERT multi-lignes dans statistique (vues cumulées par (QR, jour)),
+    - un INSERT multi-lignes dans logs_scan.
+
+    Le vidage a lieu dès que `taille_lot` événements sont en attente, ou au plus
+    tard toutes les `intervalle_ms` millisecondes. La mémoire est bornée par
+    `capacite_max` : au-delà, les nouveaux scans sont rejetés (et comptés).
+
+    Un lot refusé par la base pour une erreur permanente (donnée invalide,
+    contrainte violée) est réécrit scan par scan : seuls les scans fautifs
+    sont abandonnés (et comptés), ils ne bloquent pas le tampon.
+
+    Après un vidage en échec (base indisponible), le thread attend avant de
+    réessayer : `intervalle_ms`, puis le double à chaque nouvel échec, jusqu'à
+    `attente_max_s`.
+    """
+
+    def __init__(
+        self,
+        log_dao: Optional[LogScanDao] = None,
+        taille_lot: int = 100,
+        intervalle_ms: int = 200,
+        capacite_max: int = 10000,
+        attente_max_s: float = 30.0,
+    ):
+        self._log_dao = log_dao
+        self.taille_lot = max(1, int(taille_lot))
+        self.intervalle_ms = max(1, int(intervalle_ms))
+        self.capacite_max = max(self.taille_lot, int(capacite_max))
+        self.attente_max_s = max(self.intervalle_ms / 1000, float(attente_max_s))
+
+        self._evenements: deque = deque()
+        self._condition = threading.Condition()
+        # Sérialise les vidages (thread de fond, arrêt, appel manuel)
+        self._verrou_vidage = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._arret_demande = False
+
+        # --- Compteurs ---
+        self._nb_recus = 0
+        self._nb_ecrits = 0
+        self._nb_rejetes = 0
+        self._nb_vidages = 0
+        self._nb_echecs = 0
+        self._nb_abandonnes = 0
+        self._derniere_latence_ms = 0.0
+        self._max_latence_ms = 0.0
+        self._total_latence_ms = 0.0
+
+    # ------------------------------------------------------------------
+    # Cycle de vie
+    # ------------------------------------------------------------------
+
+    def demarrer(self) -> None:
+        """Démarre le thread de vidage (sans effet s'il tourne déjà)."""
+        with self._condition:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._arret_demande = False
+            self._thread = threading.Thread(
+                target=self._boucle, name="scan-buffer", daemon=True
+            )
+            self._thread.start()
+
+    def arreter(self, timeout: float = 10.0) -> None:
+        """
+        Arrête le thread de vidage puis écrit les événements restants.
+
+        Paramètres
+        ----------
+        timeout : float
+            Temps maximal (secondes) d'attente de la fin du thread.
+        """
+        with self._condition:
+            self._arret_demande = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        # Vidage final (y compris si le thread n'a jamais été démarré)
+        while self._evenements:
+            if self.vider() == 0:
+                break
+
+    # ------------------------------------------------------------------
+    # Écriture
+    # ------------------------------------------------------------------
+
+    def enregistrer_scan(
+        self,
+        id_qrcode: int,
+        client_host: Optional[str] = None,
+        user_agent: Optional[str] = None,
+        referer: Optional[str] = None,
+        accept_language: Optional[str] = None,
+        geo_country: Optional[str] = None,
+        geo_region: Optional[str] = None,
+        geo_city: Optional[str] = None,
+        date_scan: Optional[datetime] = None,
+        geo_enrichi: bool = True,
+    ) -> bool:
+        """
+        Dépose un scan dans le tampon (non bloquant).
+
+        Paramètres
+        ----------
+        id_qrcode : int
+            Identifiant du QR code scanné.
+        client_host, user_agent, referer, accept_language : str, optionnel
+            Informations de la requête HTTP.
+        geo_country, geo_region, geo_city : str, optionnel
+            Résultat de la géolocalisation.
+        date_scan : datetime, optionnel
+            Horodatage du scan (maintenant en UTC par défaut). Il est conservé
+            tel quel en base, même si l'écriture a lieu plus tard.
+        geo_enrichi : bool, par défaut True
+            False si la géolocalisation est laissée au worker d'enrichissement.
+
+        Retour
+        ------
+        bool
+            - True si le scan a été mis en attente.
+            - False si le tampon est plein (scan perdu, compté dans `rejetes`).
+        """
+        log_scan = LogScan(
+            id_qrcode=id_qrcode,
+            client_host=client_host,
+            user_agent=user_agent,
+            referer=referer,
+            accept_language=accept_language,
+            geo_country=geo_country,
+            geo_region=geo_region,
+            geo_city=geo_city,
+            date_scan=date_scan or datetime.now(timezone.utc),
+            geo_enrichi=geo_enrichi,
+        )
+        with self._condition:
+            self._nb_recus += 1
+            if len(self._evenements) >= self.capacite_max:
+                self._nb_rejetes += 1
+                return False
+            self._evenements.append(log_scan)
+            if len(self._evenements) >= self.taille_lot:
+                self._condition.notify()
+        return True
+
+    def vider(self) -> int:
+        """
+        Écrit en base au plus `taille_lot` événements en attente.
+
+        Retour
+        ------
+        int
+            Nombre d'événements écrits (0 si rien à écrire ou en cas d'échec).
+
+        Notes
+        -----
+        - Après une erreur transitoire (base indisponible), le lot est remis
+          en tête du tampon (dans la limite de `capacite_max`) pour être
+          rejoué au prochain vidage.
+        - Après une erreur permanente, le lot est réécrit scan par scan ; les
+          scans refusés sont abandonnés (compteur `abandonnes`).
+        """
+        with self._verrou_vidage:
+            with self._condition:
+                n = min(self.taille_lot, len(self._evenements))
+                lot: List[LogScan] = [self._evenements.popleft() for _ in range(n)]
+            if not lot:
+                return 0
+
+            debut = time.perf_counter()
+            abandonnes = 0
+            try:
+                self._ecrire_lot(lot)
+                ecrits, a_rejouer = len(lot), []
+            except Exception as e:
+                if erreur_permanente(e):
+                    logger.error(f"Lot de scans refusé par la base, écriture scan par scan : {e}")
+                    ecrits, abandonnes, a_rejouer = self._isoler(lot)
+                else:
+                    logger.exception(f"Échec du vidage du tampon de scans ({len(lot)} événements) : {e}")
+                    ecrits, a_rejouer = 0, lot
+
+            latence_ms = (time.perf_counter() - debut) * 1000
+            with self._condition:
+                self._nb_abandonnes += abandonnes
+                if a_rejouer:
+                    self._nb_echecs += 1
+                    place = self.capacite_max - len(self._evenements)
+                    retenus = a_rejouer[:max(0, place)]
+                    self._nb_rejetes += len(a_rejouer) - len(retenus)
+                    self._evenements.extendleft(reversed(retenus))
+                if ecrits:
+                    self._nb_vidages += 1
+                    self._nb_ecrits += ecrits
+                    self._derniere_latence_ms = latence_ms
+                    self._max_latence_ms = max(self._max_latence_ms, latence_ms)
+                    self._total_latence_ms += latence_ms
+            return ecrits
+
+    def _isoler(self, lot: List[LogScan]) -> Tuple[int, int, List[LogScan]]:
+        """
+        Écrit un lot refusé scan par scan.
+
+        Retour
+        ------
+        Tuple[int, int, List[LogScan]]
+            (écrits, abandonnés, à rejouer) : une erreur transitoire
+            interrompt l'isolement, les scans restants sont rejoués.
+        """
+        ecrits = abandonnes = 0
+        for i, log_scan in enumerate(lot):
+            try:
+                self._ecrire_lot([log_scan])
+                ecrits += 1
+            except Exception as e:
+                if not erreur_permanente(e):
+                    logger.warning(f"Écriture scan par scan interrompue : {e}")
+                    return ecrits, abandonnes, lot[i:]
+                abandonnes += 1
+                logger.error(f"Scan abandonné (QR code {log_scan.id_qrcode}) : {e}")
+        return ecrits, abandonnes, []
+
+    def _ecrire_lot(self, lot: List[LogScan]) -> None:
+        """Écrit statistique et logs_scan en un aller-retour (une transaction)."""
+        (self._log_dao or LogScanDao()).enregistrer_scans(lot)
+
+    def _boucle(self) -> None:
+        """Boucle du thread de fond : attend un lot complet ou l'échéance."""
+        intervalle_s = self.intervalle_ms / 1000
+        attente_s = 0.0  # attente avant de réessayer après un échec (croissante)
+        while True:
+            with self._condition:
+                if attente_s > 0:
+                    # Les dépôts de scans ne raccourcissent pas l'attente : seul l'arrêt l'interrompt
+                    echeance = time.monotonic() + attente_s
+                    while not self._arret_demande and time.monotonic() < echeance:
+                        self._condition.wait(echeance - time.monotonic())
+                elif not self._arret_demande and len(self._evenements) < self.taille_lot:
+                    self._condition.wait(intervalle_s)
+                if self._arret_demande:
+                    return
+                echecs = self._nb_echecs
+            # Vide tant qu'il reste des lots complets, puis le reliquat
+            while self.vider() >= self.taille_lot:
+                pass
+            with self._condition:
+                echec = self._nb_echecs > echecs
+            attente_s = min(max(2 * attente_s, intervalle_s), self.attente_max_s) if echec else 0.0
+
+    # ------------------------------------------------------------------
+    # Métriques
+    # ------------------------------------------------------------------
+
+    def metriques(self) -> dict:
+        """
+        Retourne les compteurs du tampon.
+
+        Retour
+        ------
+        dict
+            profondeur (événements en attente), capacite_max, recus, ecrits,
+            rejetes, abandonnes (refusés par la base), vidages, echecs, latence_vidage_ms (derniere / max / moyenne).
+        """
+        with self._condition:
+            return {
+                "profondeur": len(self._evenements),
+                "capacite_max": self.capacite_max,
+                "recus": self._nb_recus,
+                "ecrits": self._nb_ecrits,
+                "rejetes": self._nb_rejetes,
+                "abandonnes": self._nb_abandonnes,
+                "vidages": self._nb_vidages,
+                "echecs": self._nb_echecs,
+                "latence_vidage_ms": {
+                    "derniere": round(self._derniere_latence_ms, 3),
+                    "max": round(self._max_latence_ms, 3),
+                    "moyenne": round(self._total_latence_ms / self._nb_vidages, 3)
+                    if self._nb_vidages else 0.0,
+                },
+            }
@@ -0,0 +1,203 @@
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Mapping, NamedTuple, Optional
+from urllib.parse import quote
+
+from service.admission_scans_service import MEMOIRE, NOMS_NIVEAUX, SANS_GEO, SANS_LOG, ControleurAdmission
+from service.compteur_vues_service import CompteurVuesService
+from service.filtre_scans_service import FiltreScansService
+from service.log_scan_service import LogScanService
+from service.qrcode_service import CibleRedirection, QRCodeService
+from utils.executeurs import executeur
+from utils.table_redirections import normaliser_url
+
+logger = logging.getLogger(__name__)
+
+# Caractères laissés tels quels dans l'en-tête Location (comme RedirectResponse)
+_SURS_LOCATION = ":/%#?=@[]!$&'()*+,;"
+
+
+class ReponseScan(NamedTuple):
+    """Réponse HTTP d'un scan : statut et en-têtes (dont Location)."""
+    statut: int
+    entetes: Dict[str, str]
+
+
+class ScanService:
+    """
+    Traitement d'un scan, indépendant du framework web.
+
+    Utilisé par la route FastAPI `/scan/{id_qrcode}` et par l'application
+    ASGI minimale montée devant elle (scan_asgi.py) : les deux renvoient
+    exactement les mêmes réponses.
+
+    - QR statique : redirection, cacheable si une durée de cache s'applique.
+    - QR suivi : filtrage (robots, préchargements, doublons), admission
+      (délestage), puis enregistrement du scan ; la redirection est servie
+      même si l'enregistrement échoue.
+    """
+
+    def __init__(
+        self,
+        qrcode_service: QRCodeService,
+        log_scan_service: LogScanService,
+        tampon,
+        filtre_scans: FiltreScansService,
+        admission_scans: ControleurAdmission,
+        compteur_vues: CompteurVuesService,
+        geolocalisation,
+        ecriture_differee: bool = True,
+        geo_differee: bool = False,
+        cache_max_age_defaut: int = 0,
+        geo_bloquante: bool = False,
+    ):
+        """
+        Paramètres
+        ----------
+        tampon : ScanBufferService | JournalScansService
+            Destination des scans en écriture différée.
+        geolocalisation
+            Fournisseur avec une méthode `localiser(ip) -> (pays, region, ville)`.
+        ecriture_differee : bool, par défaut True
+            False : chaque scan est écrit pendant la requête.
+        geo_differee : bool, par défaut False
+            True : la géolocalisation est laissée au worker d'enrichissement.
+        cache_max_age_defaut : int, par défaut 0
+            Durée de cache HTTP (s) des redirections de QR statiques sans
+            cache_max_age propre ; 0 = redirection 307 non cacheable.
+        geo_bloquante : bool, par défaut False
+            True si `localiser` peut faire un appel réseau (fournisseur
+            externe) : il est alors exécuté dans l'exécuteur "bdd".
+        """
+        self.qrcode_service = qrcode_service
+        self.log_scan_service = log_scan_service
+        self.tampon = tampon
+        self.filtre_scans = filtre_scans
+        self.admission_scans = admission_scans
+        self.compteur_vues = compteur_vues
+        self.geolocalisation = geolocalisation
+        self.ecriture_differee = ecriture_differee
+        self.geo_differee = geo_differee
+        self.cache_max_age_defaut = cache_max_age_defaut
+        self.geo_bloquante = geo_bloquante
+
+    async def traiter(
+        self,
+        id_qrcode: int,
+        entetes: Mapping[str, str],
+        client_host: Optional[str] = None,
+    ) -> Optional[ReponseScan]:
+        """
+        Traite un scan et construit la redirection.
+
+        Paramètres
+        ----------
+        id_qrcode : int
+            Identifiant scanné.
+        entetes : Mapping[str, str]
+            En-têtes de la requête, noms en minuscules.
+        client_host : str, optionnel
+            Adresse du pair TCP (utilisée sans X-Forwarded-For).
+
+        Retour
+        ------
+        Optional[ReponseScan]
+            La réponse à envoyer, ou None si le QR code est inconnu (404).
+        """
+        qr = await self.qrcode_service.trouver_redirection_async(id_qrcode)
+        if not qr:
+            return None
+
+        if qr.type_qrcode is False:
+            logger.info(f"Scan NON enregistré (QR non-suivi) pour QRCode {id_qrcode}")
+            return self._redirection_statique(id_qrcode, qr, entetes)
+
+        # --- Collecter les données ---
+        user_agent = entetes.get("user-agent", "inconnu")
+        transfert = entetes.get("x-forwarded-for")
+        if transfert:
+            client_host = transfert.split(',')[0].strip()
+        else:
+            client_host = client_host or "inconnu"
+        date_vue = datetime.now(timezone.utc)
+
+        # --- Filtrage : robots, préchargements et doublons sont redirigés sans écriture ---
+        motif = self.filtre_scans.evaluer(id_qrcode, client_host, user_agent, entetes)
+        if motif:
+            logger.info(f"Scan NON enregistré ({motif}) pour QRCode {id_qrcode} depuis {client_host}")
+            return _redirection(qr.url, 307)
+
+        # --- Admission : sous charge, l'enregistrement se dégrade, la redirection reste servie ---
+        niveau = self.admission_scans.admettre()
+        try:
+            if niveau >= MEMOIRE:
+                self.admission_scans.compter_en_memoire(id_qrcode, date_vue.date())
+            elif niveau >= SANS_LOG:
+                self.compteur_vues.ajouter(id_qrcode, date_vue.date())
+            else:
+                await self._enregistrer(id_qrcode, client_host, user_agent, entetes, date_vue, niveau)
+            logger.info(
+                f"Scan ENREGISTRÉ ({NOMS_NIVEAUX[niveau]}) pour QRCode {id_qrcode} depuis {client_host}"
+            )
+        except Exception as e:
+            # L'échec de l'enregistrement ne doit jamais empêcher la redirection
+            logger.exception(f"Scan NON enregistré pour QRCode {id_qrcode} : {e}")
+
+        return _redirection(qr.url, 307)
+
+    async def _enregistrer(self, id_qrcode, client_host, user_agent, entetes, date_vue, niveau) -> None:
+        # --- Géolocalisation (sauf si laissée au worker d'enrichissement) ---
+        geo_differee = self.geo_differee or niveau >= SANS_GEO
+        if geo_differee:
+            geo_country, geo_region, geo_city = None, None, None
+        elif self.geo_bloquante:
+            geo_country, geo_region, geo_city = await executeur("bdd").executer(
+                self.geolocalisation.localiser, client_host
+            )
+        else:
+            geo_country, geo_region, geo_city = self.geolocalisation.localiser(client_host)
+
+        # --- Enregistrement : statistique + logs_scan en une seule instruction,
+        #     en lot via le tampon (défaut) ou immédiatement ---
+        scan = dict(
+            id_qrcode=id_qrcode,
+            client_host=client_host,
+            user_agent=user_agent,
+            referer=entetes.get("referer"),
+            accept_language=entetes.get("accept-language"),
+            geo_country=geo_country,
+            geo_region=geo_region,
+            geo_city=geo_city,
+            date_scan=date_vue,
+            geo_enrichi=not geo_differee,
+        )
+        with self.admission_scans.ecriture():
+            if self.ecriture_differee:
+                self.tampon.enregistrer_scan(**scan)
+            else:
+                await self.log_scan_service.enregistrer_scan_async(**scan)
+
+    def _redirection_statique(self, id_qrcode: int, cible: CibleRedirection,
+                              entetes: Mapping[str, str]) -> ReponseScan:
+        """
+        Redirection d'un QR statique, cacheable par les navigateurs et les proxys.
+
+        Avec une durée de cache > 0 (cache_max_age du QR, sinon la valeur par
+        défaut), la réponse est un 301 portant Cache-Control et un ETag dérivé
+        de la version du QR code ; une requête conditionnelle (If-None-Match)
+        dont l'ETag est à jour reçoit un 304. Sinon, redirection 307 non cacheable.
+        """
+        max_age = cible.cache_max_age if cible.cache_max_age is not None else self.cache_max_age_defaut
+        if max_age <= 0:
+            return _redirection(cible.url, 307)
+
+        etag = f'"{id_qrcode}-{cible.version}"'
+        cache = {"cache-control": f"public, max-age={max_age}", "etag": etag}
+        if_none_match = entetes.get("if-none-match", "")
+        if if_none_match.strip() == "*" or etag in (v.strip().removeprefix("W/") for v in if_none_match.split(",")):
+            return ReponseScan(304, cache)
+        return _redirection(cible.url, 301, cache)
+
+
+def _redirection(url: str, statut: int, entetes: Optional[Dict[str, str]] = None) -> ReponseScan:
+    return ReponseScan(statut, {"location": quote(normaliser_url(url), safe=_SURS_LOCATION), **(entetes or {})})
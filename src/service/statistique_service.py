@@ -2,13 +2,35 @@ from utils.log_decorator import log
 from business_object.statistique import Statistique
 from dao.statistique_dao import StatistiqueDao
 from datetime import date 
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from dao.log_scan_dao import LogScanDao
+from dao.asynchrone.statistique_dao_async import StatistiqueDaoAsync
+from dao.asynchrone.log_scan_dao_async import LogScanDaoAsync
+from service.compteur_vues_service import CompteurVuesService
+from utils.single_flight import SingleFlight
+import asyncio
 
 
 class StatistiqueService:
     """Classe contenant les méthodes de service des Statistiques"""
 
+    def __init__(self, compteur: Optional[CompteurVuesService] = None):
+        """
+        Paramètres
+        ----------
+        compteur : CompteurVuesService, optionnel
+            Agrégateur mémoire partagé : les vues sont cumulées par (QR, jour)
+            puis écrites périodiquement. Sans compteur, chaque vue est écrite
+            immédiatement.
+
+        Notes
+        -----
+        Les demandes concurrentes de statistiques d'un même QR code (même
+        `detail`) partagent une seule série de lectures (SingleFlight).
+        """
+        self.compteur = compteur
+        self.vols = SingleFlight()
+
     @log
     def enregistrer_vue(self, id_qrcode: int, date_vue: date) -> bool:
         """
@@ -24,14 +46,18 @@ class StatistiqueService:
         Retour
         ------
         bool
-            - True si l’incrémentation a été effectuée avec succès.
+            - True si l’incrémentation a été effectuée (ou mise en attente) avec succès.
             - False en cas d’échec (ex. QR code inexistant).
 
         Notes
         -----
-        Le service délègue directement l’opération au StatistiqueDao
-        via la méthode `incrementer_vue_jour`.
+        Avec un compteur, la vue est ajoutée en mémoire et écrite au prochain
+        vidage (un UPSERT multi-lignes `nombre_vue + delta`). Sans compteur,
+        le service délègue directement au StatistiqueDao via `incrementer_vue_jour`.
         """
+        if self.compteur is not None:
+            self.compteur.ajouter(id_qrcode, date_vue)
+            return True
         return StatistiqueDao().incrementer_vue_jour(id_qrcode, date_vue)
 
 
@@ -70,14 +96,50 @@ class StatistiqueService:
         Les dates sont converties au format ISO 8601 pour assurer une compatibilité
         front-end et API.
         """
+        return self.vols.executer((id_qrcode, detail), lambda: self._lire_statistiques(id_qrcode, detail))
+
+    def _lire_statistiques(self, id_qrcode: int, detail: bool) -> Dict[str, Any]:
         # 1. Récupérer les agrégats (depuis StatistiqueDao)
         stat_dao = StatistiqueDao()
         agg = stat_dao.get_agregats(id_qrcode)
-        
+
+        # 2. Si 'detail' est demandé, récupérer les listes
+        rows, logs = [], []
+        if detail:
+            rows = stat_dao.get_stats_par_jour(id_qrcode)
+            logs = LogScanDao().get_scans_recents(id_qrcode)
+
+        return self._formater(id_qrcode, agg, detail, rows, logs)
+
+    async def get_statistiques_qr_code_async(self, id_qrcode: int, detail: bool = True) -> Dict[str, Any]:
+        """
+        Variante asynchrone de `get_statistiques_qr_code` (DAO asyncpg).
+
+        Les trois lectures (agrégats, vues par jour, scans récents) sont
+        lancées en parallèle sur des connexions distinctes du pool.
+        """
+        return await self.vols.executer_async(
+            (id_qrcode, detail), lambda: self._lire_statistiques_async(id_qrcode, detail)
+        )
+
+    async def _lire_statistiques_async(self, id_qrcode: int, detail: bool) -> Dict[str, Any]:
+        stat_dao = StatistiqueDaoAsync()
+        if detail:
+            agg, rows, logs = await asyncio.gather(
+                stat_dao.get_agregats(id_qrcode),
+                stat_dao.get_stats_par_jour(id_qrcode),
+                LogScanDaoAsync().get_scans_recents(id_qrcode),
+            )
+        else:
+            agg, rows, logs = await stat_dao.get_agregats(id_qrcode), [], []
+        return self._formater(id_qrcode, agg, detail, rows, logs)
+
+    @staticmethod
+    def _formater(id_qrcode: int, agg, detail: bool, rows, logs) -> Dict[str, Any]:
+        """Met en forme le résultat (dates ISO 8601) à partir des lignes des DAO."""
         if not agg:
             agg = {"total_vues": 0, "premiere_vue": None, "derniere_vue": None}
 
-        # 2. Construire le résultat de base
         result = {
             "id_qrcode": id_qrcode,
             "total_vues": int(agg.get("total_vues") or 0),
@@ -85,18 +147,14 @@ class StatistiqueService:
             "derniere_vue": agg.get("derniere_vue").isoformat() if agg.get("derniere_vue") else None,
         }
 
-        # 3. Si 'detail' est demandé, récupérer les listes
         if detail:
-            # 3.1. Stats par jour (depuis StatistiqueDao)
-            rows = stat_dao.get_stats_par_jour(id_qrcode)
+            # Stats par jour (depuis StatistiqueDao)
             result["par_jour"] = [
                 {"date": r["date_des_vues"].isoformat(), "vues": int(r.get("nombre_vue", 0))}
                 for r in rows
             ]
 
-            # 3.2. Scans récents (depuis LogScanDao)
-            log_dao = LogScanDao()
-            logs = log_dao.get_scans_recents(id_qrcode)
+            # Scans récents (depuis LogScanDao)
             result["scans_recents"] = [
                 {
                     "timestamp": log["date_scan"].isoformat(),
@@ -110,5 +168,5 @@ class StatistiqueService:
                 }
                 for log in logs
             ]
-            
+
         return result
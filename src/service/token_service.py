@@ -1,6 +1,9 @@
 from utils.log_decorator import log
 from dao.token_dao import TokenDao
+from dao.asynchrone.token_dao_async import TokenDaoAsync
 from business_object.token import Token
+from utils.cache_ttl import CacheTTL
+from typing import Optional
 
 import logging 
 from datetime import datetime, timedelta, timezone
@@ -11,6 +14,17 @@ import string
 class TokenService:
     """Classe contenant les méthodes de service pour la gestion des tokens"""
 
+    def __init__(self, cache: Optional[CacheTTL] = None):
+        """
+        Paramètres
+        ----------
+        cache : CacheTTL, optionnel
+            Cache partagé jeton -> Token des tokens validés. Une entrée ne vit
+            jamais au-delà de la date d'expiration du token ; sans cache,
+            chaque recherche interroge la base.
+        """
+        self.cache = cache
+
     @staticmethod
     def generer_jeton(longueur=32):
         """ Génère un jeton d'authentification sécurisé.
@@ -84,7 +98,10 @@ class TokenService:
         deleted : bool
             True si la suppression a réussi
             False sinon"""
-        return TokenDao().supprimer_token(token)
+        supprime = TokenDao().supprimer_token(token)
+        if self.cache is not None:
+            self.cache.invalider(token.jeton)
+        return supprime
 
 
     @staticmethod
@@ -149,6 +166,52 @@ class TokenService:
                 - Renvoie None si aucun token ne correspond à la valeur fournie.
 
         """
-        # Le service délègue l'appel au DAO
-        return TokenDao().trouver_token_par_jeton(jeton)
+        # Le service délègue l'appel au DAO (sauf si le token est en cache)
+        trouve, token = self._lire_cache(jeton)
+        if trouve:
+            return token
+        token = TokenDao().trouver_token_par_jeton(jeton)
+        self._ecrire_cache(jeton, token)
+        return token
+
+    async def trouver_par_jeton_async(self, jeton: str) -> Token | None:
+        """
+        Variante asynchrone de `trouver_par_jeton` (même cache, DAO asyncpg),
+        utilisée par la dépendance d'authentification des routes.
+        """
+        trouve, token = self._lire_cache(jeton)
+        if trouve:
+            return token
+        token = await TokenDaoAsync().trouver_token_par_jeton(jeton)
+        self._ecrire_cache(jeton, token)
+        return token
+
+    def prechauffer_cache(self, tokens: list[Token]) -> int:
+        """
+        Insère dans le cache des tokens déjà lus (préchauffage).
 
+        Retour
+        ------
+        int
+            Nombre de tokens mis en cache (seuls les tokens valides le sont).
+        """
+        if self.cache is None:
+            return 0
+        nb = 0
+        for token in tokens:
+            if TokenService.est_valide_token(token):
+                self._ecrire_cache(token.jeton, token)
+                nb += 1
+        return nb
+
+    def _lire_cache(self, jeton: str):
+        if self.cache is None:
+            return False, None
+        return self.cache.lire(jeton)
+
+    def _ecrire_cache(self, jeton: str, token: Token | None) -> None:
+        """Ne met en cache que les tokens valides, pour au plus leur durée de vie restante."""
+        if self.cache is None or token is None or not TokenService.est_valide_token(token):
+            return
+        restant = (token.date_expiration - datetime.now(timezone.utc)).total_seconds()
+        self.cache.ecrire(jeton, token, ttl=min(self.cache.ttl, restant))
@@ -1,11 +1,13 @@
+import json
 import os
 import pytest
 from unittest.mock import patch
 from fastapi.testclient import TestClient
+from starlette.routing import Mount
 
 # Assure que le PYTHONPATH est correct pour importer 'app'
 # (pytest gère ça, mais c'est pour la clarté)
-from app import app 
+from app import app, cache_redirection, cache_tokens, conteneur, filtre_scans, get_qrcode_service
 from utils.reset_database import ResetDatabase
 
 #
@@ -21,6 +23,10 @@ def setup_test_database():
     """
     with patch.dict(os.environ, {"POSTGRES_SCHEMA": "projet_test_dao"}):
         ResetDatabase().lancer(test_dao=True)
+    # La base vient d'être recréée : le cache ne doit rien retenir du test précédent
+    cache_redirection.vider()
+    cache_tokens.vider()
+    filtre_scans.vider()
     yield
 
 @pytest.fixture(scope="function")
@@ -128,11 +134,163 @@ def test_scan_ok_not_tracked(client):
     response = client.get("/scan/2", follow_redirects=False)
     assert response.status_code == 307
     assert response.headers["location"] == "https://t.local/u2/b"
+    assert "etag" not in response.headers
+
+def test_scan_not_tracked_cacheable(client, auth_headers_user2):
+    """
+    Avec une durée de cache, un QR non-suivi est redirigé en 301 cacheable ;
+    une revalidation à jour reçoit un 304, et une modification change l'ETag.
+    """
+    response = client.put("/qrcode/2", headers=auth_headers_user2, json={"cache_max_age": 3600})
+    assert response.status_code == 200
+    version = response.json()["version"]
+
+    response = client.get("/scan/2", follow_redirects=False)
+    assert response.status_code == 301
+    assert response.headers["location"] == "https://t.local/u2/b"
+    assert response.headers["cache-control"] == "public, max-age=3600"
+    etag = response.headers["etag"]
+    assert etag == f'"2-{version}"'
+
+    response = client.get("/scan/2", headers={"if-none-match": etag}, follow_redirects=False)
+    assert response.status_code == 304
+
+    response = client.put("/qrcode/2", headers=auth_headers_user2, json={"url": "https://t.local/new"})
+    assert response.json()["version"] == version + 1
+    response = client.get("/scan/2", headers={"if-none-match": etag}, follow_redirects=False)
+    assert response.status_code == 301
+    assert response.headers["location"] == "https://t.local/new"
+    assert response.headers["etag"] != etag
+
+    # Retour à la durée par défaut (0 : redirection 307 non cacheable)
+    response = client.put("/qrcode/2", headers=auth_headers_user2, json={"reinitialiser_cache_max_age": True})
+    assert response.json()["cache_max_age"] is None
+    assert client.get("/scan/2", follow_redirects=False).status_code == 307
+
+def test_scan_tracked_ecriture_differee(auth_headers_user1):
+    """
+    Teste que le scan d'un QR suivi est écrit en base au plus tard
+    à l'arrêt de l'application (vidage du tampon).
+    """
+    with TestClient(app) as c:
+        response = c.get("/scan/1", follow_redirects=False)
+        assert response.status_code == 307
+    # L'arrêt de l'application a vidé le tampon
+    with TestClient(app) as c:
+        data = c.get("/qrcode/1/stats", headers=auth_headers_user1).json()
+        assert data["total_vues"] == 6  # 5 + 1
+        assert len(data["scans_recents"]) == 3
+        assert c.get("/metrics").json()["scan_buffer"]["profondeur"] == 0
+
+def test_scan_ecriture_immediate(client, auth_headers_user1):
+    """
+    Teste que, sans tampon, le scan (vue + log) est en base
+    dès la réponse de la route.
+    """
+    with patch.object(conteneur.scan_service, "ecriture_differee", False):
+        response = client.get("/scan/1", follow_redirects=False)
+    assert response.status_code == 307
+    data = client.get("/qrcode/1/stats", headers=auth_headers_user1).json()
+    assert data["total_vues"] == 6  # 5 + 1
+    assert client.get("/metrics").json()["scan_buffer"]["profondeur"] == 0
+
+def test_scan_filtre_robots_et_doublons(client, auth_headers_user1):
+    """Robots et re-scans rapprochés sont redirigés sans être comptés."""
+    with patch.object(conteneur.scan_service, "ecriture_differee", False):
+        robot = client.get("/scan/1", headers={"user-agent": "facebookexternalhit/1.1"}, follow_redirects=False)
+        premier = client.get("/scan/1", follow_redirects=False)
+        doublon = client.get("/scan/1", follow_redirects=False)
+    assert [r.status_code for r in (robot, premier, doublon)] == [307, 307, 307]
+    data = client.get("/qrcode/1/stats", headers=auth_headers_user1).json()
+    assert data["total_vues"] == 6  # 5 + 1
+    metriques = client.get("/metrics").json()["filtre_scans"]
+    assert metriques["rejetes"]["robot"] == 1
+    assert metriques["rejetes"]["doublon"] == 1
+
+def test_scan_degrade_redirige_toujours(client, auth_headers_user1):
+    """En délestage maximal, ou si l'écriture échoue, la redirection est servie."""
+    with patch("app.admission_scans.admettre", return_value=3):
+        response = client.get("/scan/1", follow_redirects=False)
+    assert response.status_code == 307
+    assert client.get("/metrics").json()["admission_scans"]["vues_en_memoire"] == 1
+
+    with patch.object(conteneur.scan_service, "ecriture_differee", False), \
+            patch("app.LogScanService.enregistrer_scan_async", side_effect=RuntimeError("base saturée")):
+        response = client.get("/scan/1", headers={"x-forwarded-for": "9.9.9.9"}, follow_redirects=False)
+    assert response.status_code == 307
+    assert response.headers["location"] == "https://t.local/u1/a"
+
+def test_scan_utilise_le_cache(client, auth_headers_user1):
+    """
+    Teste que les scans répétés sont servis par le cache, et que la
+    modification d'un QR code invalide son entrée.
+    """
+    client.get("/scan/2", follow_redirects=False)
+    stats_avant = client.get("/metrics").json()["cache_redirection"]
+    client.get("/scan/2", follow_redirects=False)
+    stats_apres = client.get("/metrics").json()["cache_redirection"]
+    assert stats_apres["succes"] == stats_avant["succes"] + 1
+
+    client.get("/scan/1", follow_redirects=False)
+    response = client.put("/qrcode/1", headers=auth_headers_user1, json={"url": "https://t.local/new"})
+    assert response.status_code == 200
+    response = client.get("/scan/1", follow_redirects=False)
+    assert response.headers["location"] == "https://t.local/new"
+
+def test_token_valide_servi_par_le_cache(client, auth_headers_user1):
+    """Les appels répétés d'une route protégée ne relisent pas le token en base."""
+    client.get("/qrcode/1/stats", headers=auth_headers_user1)
+    avant = client.get("/metrics").json()["cache_tokens"]
+    client.get("/qrcode/1/stats", headers=auth_headers_user1)
+    apres = client.get("/metrics").json()["cache_tokens"]
+    assert apres["succes"] == avant["succes"] + 1
+    assert apres["echecs"] == avant["echecs"]
+
+def test_services_crees_une_fois():
+    """Les services injectés sont ceux du conteneur, réutilisés d'une requête et d'un démarrage à l'autre."""
+    with TestClient(app) as c:
+        service = get_qrcode_service()
+        assert service is conteneur.qrcode_service
+        assert service.cache is cache_redirection
+        c.get("/scan/2", follow_redirects=False)
+    with TestClient(app):
+        assert get_qrcode_service() is service
+
+def test_ready_apres_demarrage():
+    """Le worker n'est prêt qu'une fois démarré (caches préchauffés), plus après l'arrêt."""
+    with TestClient(app) as c:
+        response = c.get("/ready")
+        assert response.status_code == 200
+        assert response.json()["prechauffage"]["qrcodes"] >= 0
+    assert conteneur.pret is False
 
 def test_scan_not_found(client):
     """Teste le scan d'un QR code inexistant."""
     response = client.get("/scan/999", follow_redirects=False)
     assert response.status_code == 404
+    assert response.json() == {"detail": "QR code introuvable"}
+
+def test_scan_voie_rapide_et_route_fastapi_identiques(client):
+    """La voie rapide ScanASGI et la route FastAPI renvoient les mêmes réponses."""
+    def scanner():
+        filtre_scans.vider()
+        return [
+            (r.status_code, r.headers.get("location"), r.content)
+            for r in (client.get(f"/scan/{i}", follow_redirects=False) for i in (1, 2, 999))
+        ]
+
+    rapide = scanner()
+    routes_fastapi = [r for r in app.router.routes if not isinstance(r, Mount)]
+    assert len(routes_fastapi) == len(app.router.routes) - 1
+    with patch.object(app.router, "routes", routes_fastapi):
+        assert scanner() == rapide
+
+def test_scan_voie_rapide_erreurs(client):
+    """Identifiant non entier : 404 ; autre méthode que GET : 405."""
+    assert client.get("/scan/abc", follow_redirects=False).status_code == 404
+    response = client.post("/scan/1")
+    assert response.status_code == 405
+    assert response.headers["allow"] == "GET"
 
 ### 3. Routes QR Code (Protégées)
 
@@ -151,6 +309,34 @@ def test_get_my_qrcodes_ok(client, auth_headers_user1):
     assert data[0]["id_qrcode"] == 1
     assert data[0]["url"] == "https://t.local/u1/a"
 
+def test_get_my_qrcodes_pagine_et_flux(client, auth_headers_user1):
+    """Pages par curseur (en-tête X-Next-After), filtres et export NDJSON complet."""
+    for i in range(3):
+        payload = {"url": f"https://t.local/u1/p{i}", "id_proprietaire": "1", "type_qrcode": False}
+        assert client.post("/qrcode/", headers=auth_headers_user1, json=payload).status_code == 201
+
+    vus, after = [], None
+    while True:
+        params = {"limit": 2, **({"after": after} if after is not None else {})}
+        response = client.get("/qrcode/utilisateur/me", headers=auth_headers_user1, params=params)
+        assert response.status_code == 200
+        vus += [q["id_qrcode"] for q in response.json()]
+        after = response.headers.get("X-Next-After")
+        if after is None:
+            break
+    assert len(vus) == 4 and vus == sorted(vus, reverse=True)
+    assert vus[-1] == 1
+
+    suivis = client.get("/qrcode/utilisateur/me", headers=auth_headers_user1, params={"type_qrcode": True})
+    assert [q["id_qrcode"] for q in suivis.json()] == [1]
+
+    response = client.get("/qrcode/utilisateur/me", headers=auth_headers_user1, params={"flux": True})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lignes = [json.loads(l) for l in response.text.splitlines()]
+    assert [q["id_qrcode"] for q in lignes] == vus
+
+    assert client.get("/qrcode/utilisateur/me", headers=auth_headers_user1, params={"limit": 0}).status_code == 422
+
 def test_create_qrcode_ok(client, auth_headers_user1):
     """Teste la création d'un QR code en étant authentifié."""
     payload = {
@@ -164,6 +350,20 @@ def test_create_qrcode_ok(client, auth_headers_user1):
     assert data["url"] == "https://www.nouveau-site.com"
     assert data["id_proprietaire"] == "1" # Vérifie que le QR est bien lié à user 1
     assert "scan_url" in data # Preuve que c'est un QR suivi
+    assert data["image_url"]
+    # Insertion dans l'exécuteur de la base, rendu de l'image dans celui du rendu
+    executeurs = client.get("/metrics").json()["executeurs"]
+    assert executeurs["bdd"]["executes"] >= 1
+    assert executeurs["rendu"]["executes"] >= 1
+
+def test_details_qrcode_lu_en_base(client):
+    """Le détail d'un QR code est lu en base, même si le cache de redirection est en retard."""
+    cache_redirection.ecrire(1, None)  # entrée négative périmée (QR créé sur un autre hôte)
+    response = client.get("/qrcode/1")
+    assert response.status_code == 200
+    assert response.json()["id_qrcode"] == 1
+    assert client.get("/qrcode/9999").status_code == 404
+
 
 def test_delete_qrcode_unauthorized(client):
     """Teste la suppression sans token."""
@@ -0,0 +1,57 @@
+import time
+
+import pytest
+
+from dao.bus_invalidation import lire_notification, ouvrir_ecoute
+from dao.db_connection import DBConnection
+from dao.qrcode_dao import QRCodeDao
+from service.invalidation_cache_service import InvalidationCacheService
+from utils.reset_database import ResetDatabase
+
+
+@pytest.fixture(scope="function", autouse=True)
+def setup_test_environment():
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("POSTGRES_SCHEMA", "projet_test_dao")
+        ResetDatabase().lancer(test_dao=True)
+        yield
+
+
+def _attendre(condition, timeout=5.0):
+    echeance = time.monotonic() + timeout
+    while not condition() and time.monotonic() < echeance:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_ecriture_publiee_au_commit():
+    ecoute = ouvrir_ecoute()
+    try:
+        QRCodeDao().supprimer_qrc(2)
+        assert _attendre(lambda: ecoute.poll() or ecoute.notifies)
+        domaine, _, cle = lire_notification(ecoute.notifies.pop(0).payload)
+        assert (domaine, cle) == ("qrcode", "2")
+    finally:
+        ecoute.close()
+
+
+def test_ecouteur_invalide_et_se_reconnecte():
+    invalidees, vidages = [], []
+    service = InvalidationCacheService(delai_max_s=1)
+    service.emetteur = "autre"  # traite les notifications de ce processus comme celles d'un autre worker
+    service.abonner("qrcode", invalidees.append, lambda: vidages.append(1))
+    service.demarrer()
+    try:
+        assert vidages == [1]
+        QRCodeDao().modifier_qrc(1, 1, url="https://t.local/u1/nouvelle")
+        assert _attendre(lambda: invalidees == ["1"])
+
+        # Connexion d'écoute coupée par le serveur : reconnexion, puis caches vidés
+        with DBConnection().connection as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_terminate_backend(%s);", (service._conn.get_backend_pid(),))
+        assert _attendre(lambda: len(vidages) == 2)
+        assert service.metriques()["pertes"] == 1
+        assert service.metriques()["connexions"] == 2
+    finally:
+        service.arreter()
@@ -0,0 +1,80 @@
+import asyncio
+import os
+import pytest
+from unittest.mock import patch
+
+from utils.reset_database import ResetDatabase
+from dao.asynchrone.db_connection_async import DBConnectionAsync
+from dao.asynchrone.qrcode_dao_async import QRCodeDaoAsync
+from dao.asynchrone.token_dao_async import TokenDaoAsync
+from dao.asynchrone.statistique_dao_async import StatistiqueDaoAsync
+from dao.asynchrone.log_scan_dao_async import LogScanDaoAsync
+from dao.qrcode_dao import QRCodeDao
+from dao.statistique_dao import StatistiqueDao
+from business_object.log_scan import LogScan
+
+
+@pytest.fixture(scope="function", autouse=True)
+def setup_test_environment():
+    """Réinitialise la base de test avant chaque test."""
+    with patch.dict(os.environ, {"POSTGRES_SCHEMA": "projet_test_dao"}):
+        ResetDatabase().lancer(test_dao=True)
+    yield
+
+
+def _executer(coroutine):
+    """Exécute une coroutine dans une boucle neuve, puis ferme le pool de cette boucle."""
+    async def principal():
+        try:
+            return await coroutine
+        finally:
+            await DBConnectionAsync().fermer()
+    return asyncio.run(principal())
+
+
+def test_trouver_qrc_par_id_qrc_async_identique_au_sync():
+    """Le DAO asynchrone renvoie le même QR code que le DAO synchrone."""
+    qr = _executer(QRCodeDaoAsync().trouver_qrc_par_id_qrc(1))
+    attendu = QRCodeDao().trouver_qrc_par_id_qrc(1)
+
+    assert (qr.id_qrcode, qr.url, qr.id_proprietaire, qr.type_qrcode) == \
+        (attendu.id_qrcode, attendu.url, attendu.id_proprietaire, attendu.type_qrcode)
+    assert _executer(QRCodeDaoAsync().trouver_qrc_par_id_qrc(9999)) is None
+
+
+def test_trouver_token_par_jeton_async():
+    """Recherche d'un token existant et inexistant."""
+    token = _executer(TokenDaoAsync().trouver_token_par_jeton("tok_test_u1"))
+
+    assert token is not None and token.jeton == "tok_test_u1"
+    assert _executer(TokenDaoAsync().trouver_token_par_jeton("inconnu")) is None
+
+
+def test_enregistrer_scan_async_vue_et_log():
+    """Le scan asynchrone écrit la vue et le log en une instruction."""
+    avant = StatistiqueDao().get_agregats(1)["total_vues"]
+    log_scan = LogScan(id_qrcode=1, client_host="1.1.1.1")
+
+    assert _executer(LogScanDaoAsync().enregistrer_scan(log_scan)) is True
+
+    assert log_scan.id_scan is not None
+    assert _executer(StatistiqueDaoAsync().get_agregats(1))["total_vues"] == avant + 1
+    recents = _executer(LogScanDaoAsync().get_scans_recents(1))
+    assert recents[0]["id_scan"] == log_scan.id_scan
+
+
+def test_enregistrer_scan_async_perime_les_agregats_en_cache():
+    """Les agrégats mis en cache (DAO synchrone) sont relus après un scan asynchrone."""
+    avant = StatistiqueDao().get_agregats(1)["total_vues"]
+
+    assert _executer(LogScanDaoAsync().enregistrer_scan(LogScan(id_qrcode=1, client_host="1.1.1.1"))) is True
+
+    assert StatistiqueDao().get_agregats(1)["total_vues"] == avant + 1
+
+
+def test_repli_sur_les_dao_synchrones():
+    """Sans pilote asynchrone, les DAO délèguent aux DAO synchrones (dans un thread)."""
+    with patch.object(DBConnectionAsync(), "actif", False):
+        jours = _executer(StatistiqueDaoAsync().get_stats_par_jour(1))
+
+    assert jours == StatistiqueDao().get_stats_par_jour(1)
@@ -0,0 +1,181 @@
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+from psycopg2.pool import PoolError
+
+from dao.db_connection import PoolConnexions
+
+
+class Horloge:
+    """Horloge manipulable pour tester les délais sans attendre."""
+
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def _pool(**kwargs):
+    """Pool dont la fabrique produit des connexions simulées."""
+    creees = []
+
+    def fabrique():
+        conn = MagicMock()
+        conn.closed = 0
+        creees.append(conn)
+        return conn
+
+    return PoolConnexions(fabrique, **kwargs), creees
+
+
+def test_emprunt_reutilise_la_connexion_et_valide():
+    """Une connexion rendue est réutilisée ; la transaction est validée à la sortie."""
+    pool, creees = _pool(taille_min=1, taille_max=3)
+
+    with pool.emprunter() as c1:
+        pass
+    with pool.emprunter() as c2:
+        pass
+
+    assert c1 is c2
+    assert len(creees) == 1
+    assert c1.commit.call_count == 2
+    assert pool.metriques()["emprunts"] == 2
+
+
+def test_exception_annule_la_transaction():
+    """Une exception dans le bloc provoque un rollback, et la connexion revient au pool."""
+    pool, _ = _pool()
+
+    with pytest.raises(ValueError):
+        with pool.emprunter() as conn:
+            raise ValueError("erreur SQL")
+
+    conn.rollback.assert_called_once()
+    conn.commit.assert_not_called()
+    assert pool.metriques()["libres"] == 1
+
+
+def test_emprunts_concurrents_ouvrent_plusieurs_connexions():
+    """Deux emprunts simultanés utilisent deux connexions distinctes."""
+    pool, creees = _pool(taille_min=0, taille_max=2)
+
+    with pool.emprunter() as c1:
+        with pool.emprunter() as c2:
+            assert c1 is not c2
+            assert pool.metriques()["saturation"] == 1.0
+
+    assert len(creees) == 2
+    assert pool.metriques()["utilisees"] == 0
+
+
+def test_pool_sature_leve_apres_timeout():
+    """Au-delà de taille_max, l'emprunt attend puis lève PoolError."""
+    pool, _ = _pool(taille_min=0, taille_max=1, timeout_s=0.05)
+
+    with pool.emprunter():
+        with pytest.raises(PoolError):
+            with pool.emprunter():
+                pass
+
+    assert pool.metriques()["timeouts"] == 1
+
+
+def test_attente_servie_par_une_connexion_rendue():
+    """Un emprunt en attente récupère la connexion dès qu'elle est rendue."""
+    pool, creees = _pool(taille_min=0, taille_max=1, timeout_s=5)
+    empruntee = threading.Event()
+    liberer = threading.Event()
+
+    def occuper():
+        with pool.emprunter():
+            empruntee.set()
+            liberer.wait(5)
+
+    t = threading.Thread(target=occuper)
+    t.start()
+    empruntee.wait(5)
+    threading.Timer(0.05, liberer.set).start()
+    with pool.emprunter():
+        pass
+    t.join()
+
+    assert len(creees) == 1
+    m = pool.metriques()
+    assert m["attentes"] == 1
+    assert m["attente_ms"]["max"] > 0
+
+
+def test_connexion_fermee_remplacee_a_l_emprunt():
+    """Une connexion fermée côté serveur est remplacée au prochain emprunt."""
+    pool, creees = _pool(taille_min=1)
+    creees[0].closed = 2
+
+    with pool.emprunter() as conn:
+        assert conn is creees[1]
+
+    m = pool.metriques()
+    assert m["echecs_sante"] == 1
+    assert m["ouvertes"] == 1
+
+
+def test_connexion_inactive_verifiee_puis_remplacee():
+    """Après `verification_s` d'inactivité, la connexion est testée (SELECT 1)."""
+    horloge = Horloge()
+    pool, creees = _pool(taille_min=1, verification_s=30, horloge=horloge)
+    creees[0].cursor.return_value.__enter__.return_value.execute.side_effect = Exception("server closed")
+
+    horloge.t = 31
+    with pool.emprunter() as conn:
+        assert conn is creees[1]
+
+    creees[0].close.assert_called_once()
+
+
+def test_eviction_des_connexions_inactives():
+    """Les connexions inactives trop longtemps sont fermées, sans passer sous taille_min."""
+    horloge = Horloge()
+    pool, creees = _pool(taille_min=1, taille_max=3, inactivite_max_s=60, horloge=horloge)
+    with pool.emprunter():
+        with pool.emprunter():
+            with pool.emprunter():
+                pass
+    assert pool.metriques()["ouvertes"] == 3
+
+    horloge.t = 61
+    pool.metriques()  # la consultation n'évince rien
+    with pool.emprunter():
+        pass
+
+    m = pool.metriques()
+    assert m["ouvertes"] == 1
+    assert m["fermees"] == 2
+
+
+
+def test_attente_recente_apres_timeout():
+    """Un timeout pèse sur l'attente récente (signal de saturation)."""
+    pool, _ = _pool(taille_min=0, taille_max=1, timeout_s=0.05)
+
+    with pool.emprunter():
+        with pytest.raises(PoolError):
+            with pool.emprunter():
+                pass
+
+    assert pool.metriques()["attente_ms"]["recente"] > 5
+
+
+def test_attente_recente_s_attenue_sans_emprunt():
+    """Sans nouvel emprunt, l'attente récente décroît (demi-vie de 5 s)."""
+    horloge = Horloge()
+    pool, _ = _pool(taille_min=1, horloge=horloge)
+    with pool._condition:
+        pool._noter_attente(100.0)
+    avant = pool.metriques()["attente_ms"]["recente"]
+
+    horloge.t += 5.0
+
+    assert avant == pytest.approx(20.0)
+    assert pool.metriques()["attente_ms"]["recente"] == pytest.approx(10.0)
@@ -1,12 +1,13 @@
 import os
 import pytest
 from unittest.mock import patch
-from datetime import datetime
+from datetime import datetime, timezone
 
 
 # Importations nécessaires
 from utils.reset_database import ResetDatabase
 from dao.log_scan_dao import LogScanDao
+from dao.statistique_dao import StatistiqueDao
 from business_object.log_scan import LogScan
 
 #
@@ -205,5 +206,112 @@ def test_get_scans_recents_id_inexistant():
     assert len(logs) == 0
 
 
+def test_enregistrer_scan_vue_et_log():
+    """
+    Teste l'enregistrement combiné : la vue du jour et le log
+    sont écrits par la même instruction.
+    """
+    dao = LogScanDao()
+    stats_avant = StatistiqueDao().get_agregats(1)["total_vues"]
+    log_scan = LogScan(id_qrcode=1, client_host="1.1.1.1")
+
+    assert dao.enregistrer_scan(log_scan) is True
+
+    assert log_scan.id_scan is not None
+    assert StatistiqueDao().get_agregats(1)["total_vues"] == stats_avant + 1
+    assert dao.get_scans_recents(id_qrcode=1)[0]["id_scan"] == log_scan.id_scan
+
+
+def test_enregistrer_scan_qr_inexistant_n_ecrit_rien():
+    """Un QR inexistant : le scan est ignoré, rien n'est écrit."""
+    dao = LogScanDao()
+
+    assert dao.enregistrer_scan(LogScan(id_qrcode=9999)) is False
+    assert dao.get_scans_recents(id_qrcode=9999) == []
+
+
+def test_enregistrer_scans_lot():
+    """Un lot agrège ses vues par (QR, jour) et insère tous ses logs."""
+    dao = LogScanDao()
+    jour1 = datetime(2025, 11, 1, 12, 0, 0).astimezone()
+    jour2 = datetime(2025, 11, 2, 12, 0, 0).astimezone()
+    lot = [
+        LogScan(id_qrcode=2, date_scan=jour1),
+        LogScan(id_qrcode=2, date_scan=jour1),
+        LogScan(id_qrcode=2, date_scan=jour2),
+    ]
+
+    assert dao.enregistrer_scans(lot) == 3
+
+    par_jour = {r["date_des_vues"]: r["nombre_vue"] for r in StatistiqueDao().get_stats_par_jour(2)}
+    assert par_jour[jour1.date()] >= 2
+    assert par_jour[jour2.date()] >= 1
+    assert len(dao.get_scans_recents(id_qrcode=2)) == 3
+    assert dao.get_scans_recents(id_qrcode=2)[0]["date_scan"] == jour2
+
+
+def test_enregistrer_scans_ignore_les_qr_supprimes():
+    """Les scans d'un QR code supprimé entre-temps sont ignorés, le reste du lot est écrit."""
+    dao = LogScanDao()
+    maintenant = datetime.now().astimezone()
+    lot = [
+        LogScan(id_qrcode=2, date_scan=maintenant),
+        LogScan(id_qrcode=9999, date_scan=maintenant),
+        LogScan(id_qrcode=2, date_scan=maintenant),
+    ]
+
+    assert dao.enregistrer_scans(lot) == 2
+    assert len(dao.get_scans_recents(id_qrcode=2)) == 2
+    assert dao.get_scans_recents(id_qrcode=9999) == []
+
+
+def test_enrichir_geo_lot():
+    """
+    Teste l'enrichissement différé : une adresse listée une seule fois,
+    tous ses logs en attente mis à jour par un seul UPDATE.
+    """
+    dao = LogScanDao()
+    lot = [
+        LogScan(id_qrcode=2, client_host="1.1.1.1", geo_enrichi=False),
+        LogScan(id_qrcode=2, client_host="1.1.1.1", geo_enrichi=False),
+        LogScan(id_qrcode=2, client_host="2.2.2.2", geo_enrichi=False),
+        LogScan(id_qrcode=2, client_host="3.3.3.3", geo_country="France"),
+    ]
+    for log_scan in lot:
+        log_scan.date_scan = datetime.now().astimezone()
+    dao.enregistrer_scans(lot)
+
+    assert sorted(dao.lister_ips_a_enrichir()) == ["1.1.1.1", "2.2.2.2"]
+
+    nb = dao.enrichir_geo({
+        "1.1.1.1": ("Australia", "Queensland", "Brisbane"),
+        "2.2.2.2": (None, None, None),
+    })
+
+    assert nb == 3
+    assert dao.lister_ips_a_enrichir() == []
+    pays = {lg["client_host"]: lg["geo_country"] for lg in dao.get_scans_recents(id_qrcode=2)}
+    assert pays == {"1.1.1.1": "Australia", "2.2.2.2": None, "3.3.3.3": "France"}
+
+
+def test_charger_segment_idempotent():
+    """Un segment est chargé une seule fois ; les scans d'un QR inconnu sont ignorés."""
+    dao = LogScanDao()
+    jour = datetime(2025, 11, 3, 12, 0, 0, tzinfo=timezone.utc)
+    segment = [
+        LogScan(id_qrcode=2, date_scan=jour, user_agent="a\tb\\c"),
+        LogScan(id_qrcode=2, date_scan=jour),
+        LogScan(id_qrcode=9999, date_scan=jour),
+    ]
+
+    assert dao.charger_segment("seg-1", segment) == 2
+    assert dao.charger_segment("seg-1", segment) is None
+
+    par_jour = {r["date_des_vues"]: r["nombre_vue"] for r in StatistiqueDao().get_stats_par_jour(2)}
+    assert par_jour[jour.date()] == 2
+    agents = [lg["user_agent"] for lg in dao.get_scans_recents(id_qrcode=2)]
+    assert "a\tb\\c" in agents
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
\ No newline at end of file
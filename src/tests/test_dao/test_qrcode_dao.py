@@ -1,7 +1,7 @@
 import os
 import pytest
 from unittest.mock import MagicMock, patch
-from datetime import datetime
+from datetime import date, datetime
 
 
 from utils.reset_database import ResetDatabase
@@ -125,7 +125,8 @@ def test_modifier_qrc_success():
     None
         Le test valide que :
         - la modification renvoie un Qrcode,
-        - les champs modifiés (url) sont correctement mis à jour.
+        - les champs modifiés (url, cache_max_age) sont correctement mis à jour,
+        - la version du QR code est incrémentée.
 
     Notes
     -----
@@ -134,10 +135,16 @@ def test_modifier_qrc_success():
     dao = QRCodeDao()
 
     q = dao.creer_qrc(Qrcode(id_qrcode=None, url="https://old", id_proprietaire=3))
-    updated = dao.modifier_qrc(q.id_qrcode, 3, url="https://new")
+    updated = dao.modifier_qrc(q.id_qrcode, 3, url="https://new", cache_max_age=600)
 
     assert isinstance(updated, Qrcode)
     assert updated.url == "https://new"
+    assert updated.cache_max_age == 600
+    assert updated.version == q.version + 1
+
+    # None laisse la durée inchangée ; seule la réinitialisation la remet à NULL
+    assert dao.modifier_qrc(q.id_qrcode, 3, url="https://autre").cache_max_age == 600
+    assert dao.modifier_qrc(q.id_qrcode, 3, reinitialiser_cache_max_age=True).cache_max_age is None
 
 
 def test_modifier_qrc_raises_not_found():
@@ -276,7 +283,96 @@ def test_lister_par_proprietaire_aucun_resultat():
     assert len(resultats) == 0
 
 
+def test_lister_plus_scannes():
+    """QR codes par vues décroissantes sur la fenêtre demandée (pop_db_test.sql : 5, 3, 10 vues)."""
+    dao = QRCodeDao()
+
+    assert [q.id_qrcode for q in dao.lister_plus_scannes(10, date(2025, 10, 1))] == [3, 1, 2]
+    assert [q.id_qrcode for q in dao.lister_plus_scannes(2, date(2025, 10, 1))] == [3, 1]
+    assert [q.id_qrcode for q in dao.lister_plus_scannes(10, date(2025, 10, 3))] == [3]
+
+
+def test_lister_par_proprietaire_cache_invalide_par_les_ecritures():
+    """La liste mise en cache suit les créations, modifications et suppressions."""
+    dao = QRCodeDao()
+    assert len(dao.lister_par_proprietaire(3)) == 1
+
+    cree = dao.creer_qrc(Qrcode(None, "https://t.local/u3/d", "3", type_qrcode=False))
+    assert len(dao.lister_par_proprietaire(3)) == 2
+
+    dao.modifier_qrc(cree.id_qrcode, 3, url="https://t.local/u3/e")
+    assert "https://t.local/u3/e" in [q.url for q in dao.lister_par_proprietaire(3)]
+
+    dao.supprimer_qrc(cree.id_qrcode)
+    assert len(dao.lister_par_proprietaire(3)) == 1
+
+
+def test_lister_page_par_proprietaire_curseur_et_filtres():
+    """Pages par id_qrcode décroissant sous le curseur, filtres appliqués en base."""
+    dao = QRCodeDao()
+    ids = [dao.creer_qrc(Qrcode(None, f"https://t.local/u3/{i}", "3", type_qrcode=i % 2 == 0)).id_qrcode
+           for i in range(5)]
+    tous = sorted(ids + [3], reverse=True)
+
+    page = dao.lister_page_par_proprietaire(3, 4)
+    assert [q.id_qrcode for q in page] == tous[:4]
+    suite = dao.lister_page_par_proprietaire(3, 4, apres=page[-1].id_qrcode)
+    assert [q.id_qrcode for q in suite] == tous[4:]
+
+    statiques = dao.lister_page_par_proprietaire(3, 10, type_qrcode=False)
+    assert [q.id_qrcode for q in statiques] == [ids[3], ids[1]]
+    assert dao.lister_page_par_proprietaire(3, 10, cree_depuis=datetime(2100, 1, 1)) == []
+    assert len(dao.lister_page_par_proprietaire(3, 10, cree_avant=datetime(2100, 1, 1))) == 6
+    assert dao.lister_page_par_proprietaire(999, 10) == []
+
 
 if __name__ == "__main__":
     import pytest
     pytest.main([__file__])
+
+
+def test_lister_redirections():
+    """
+    Teste la liste compacte utilisée pour construire la table de redirections.
+
+    Retour
+    ------
+    None
+        Le test vérifie que chaque ligne est (id_qrcode, url, type_qrcode,
+        id_proprietaire, version, cache_max_age), triée par identifiant.
+    """
+    dao = QRCodeDao()
+
+    lignes = dao.lister_redirections()
+
+    assert len(lignes) >= 1
+    assert [l[0] for l in lignes] == sorted(l[0] for l in lignes)
+    assert ("https://t.local/u3/c", 3) in [(url, prop) for _, url, _, prop, _, _ in lignes]
+    assert all(version >= 1 for *_, version, _ in lignes)
+
+
+def test_iterer_redirections_statiques_depuis_une_revision():
+    """
+    Teste le parcours incrémental utilisé par l'export des redirections.
+
+    Retour
+    ------
+    None
+        Le test vérifie que seul le QR statique est exporté au départ, puis
+        qu'après le filigrane seuls les changements sont relus : modification,
+        passage en QR suivi et suppression (url None).
+    """
+    dao = QRCodeDao()
+
+    lignes = list(dao.iterer_redirections_statiques())
+    assert [(id_qr, url) for id_qr, url, _ in lignes if url] == [(2, "https://t.local/u2/b")]
+    filigrane = max(rev for *_, rev in lignes)
+
+    assert list(dao.iterer_redirections_statiques(filigrane)) == []
+
+    dao.modifier_qrc(2, 2, url="https://t.local/u2/new")
+    dao.modifier_qrc(1, 1, type_qrcode=False)
+    dao.supprimer_qrc(3)
+
+    changements = [(id_qr, url) for id_qr, url, _ in dao.iterer_redirections_statiques(filigrane, taille_lot=1)]
+    assert changements == [(2, "https://t.local/u2/new"), (1, "https://t.local/u1/a"), (3, None)]
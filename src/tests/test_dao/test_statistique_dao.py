@@ -98,6 +98,57 @@ def test_get_stats_par_jour_ok():
     assert historique[1]["date_des_vues"] == date(2025, 10, 2)
     assert historique[1]["nombre_vue"] == 5
 
+def test_incrementer_vues_lot():
+    """
+    Teste l'UPSERT multi-lignes : une ligne existante (QR 1, 2025-10-02)
+    est incrémentée, une nouvelle ligne est créée.
+    """
+    dao = StatistiqueDao()
+
+    nb = dao.incrementer_vues({
+        (1, date(2025, 10, 2)): 3,
+        (1, date(2025, 11, 1)): 2,
+    })
+
+    assert nb == 2
+    historique = {h["date_des_vues"]: h["nombre_vue"] for h in dao.get_stats_par_jour(1)}
+    assert historique[date(2025, 10, 2)] == 8  # 5 + 3
+    assert historique[date(2025, 11, 1)] == 2
+
+
+def test_incrementer_vues_ignore_les_qr_supprimes():
+    """Un incrément d'un QR code supprimé entre-temps est ignoré, le reste est écrit."""
+    dao = StatistiqueDao()
+
+    assert dao.incrementer_vues({(1, date(2025, 11, 1)): 2, (9999, date(2025, 11, 1)): 4}) == 1
+    historique = {h["date_des_vues"]: h["nombre_vue"] for h in dao.get_stats_par_jour(1)}
+    assert historique[date(2025, 11, 1)] == 2
+
+
+def test_shards_sommes_a_la_lecture_puis_compactes():
+    """
+    Avec des compteurs répartis, les lectures somment les shards ;
+    la compaction replie les jours terminés sur une seule ligne.
+    """
+    dao = StatistiqueDao()
+    jour = date(2025, 11, 1)
+    with patch("dao.statistique_dao.NB_SHARDS", 4):
+        for _ in range(20):
+            dao.incrementer_vue_jour(1, jour)
+        dao.incrementer_vues({(1, jour): 5})
+
+    par_jour = {s["date_des_vues"]: s["nombre_vue"] for s in dao.get_stats_par_jour(1)}
+    assert par_jour[jour] == 25
+    total = dao.get_agregats(1)["total_vues"]
+
+    assert dao.compacter_shards(date(2025, 11, 2)) > 0
+
+    assert dao.compacter_shards(date(2025, 11, 2)) == 0  # déjà compacté
+    assert dao.get_agregats(1)["total_vues"] == total
+    par_jour = {s["date_des_vues"]: s["nombre_vue"] for s in dao.get_stats_par_jour(1)}
+    assert par_jour[jour] == 25
+
+
 if __name__ == "__main__":
     import pytest
-    pytest.main([__file__])
\ No newline at end of file
+    pytest.main([__file__])
@@ -145,6 +145,18 @@ def test_existe_token_ko():
     resultat = dao.existe_token(jeton_inexistant)
     assert resultat is False
 
+def test_lister_valides_par_utilisateurs():
+    """Seuls les tokens non expirés des utilisateurs demandés sont listés."""
+    dao = TokenDao()
+    futur = datetime.now(timezone.utc) + timedelta(hours=1)
+    dao.creer_token(Token(id_user=1, jeton="tok_valide_u1", date_expiration=futur))
+    dao.creer_token(Token(id_user=3, jeton="tok_valide_u3", date_expiration=futur))
+
+    tokens = dao.lister_valides_par_utilisateurs([1, 2])
+
+    assert [t.jeton for t in tokens] == ["tok_valide_u1"]  # tok_test_u1 / u2 : sans expiration
+    assert dao.lister_valides_par_utilisateurs([]) == []
+
 if __name__ == "__main__":
     import pytest
     pytest.main([__file__])
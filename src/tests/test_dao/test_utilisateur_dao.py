@@ -144,6 +144,11 @@ def test_trouver_par_nom_user_non_existant():
     utilisateur = UtilisateurDao().trouver_par_nom_user("utilisateur_fantome_99")
     assert utilisateur is None
 
+def test_lister_par_ids():
+    """Lecture en lot ; les identifiants inconnus sont ignorés"""
+    utilisateurs = UtilisateurDao().lister_par_ids([3, 1, 999999])
+    assert [u.nom_user for u in utilisateurs] == ["test_u1", "test_u3"]
+
 if __name__ == "__main__":
     import pytest
     pytest.main([__file__])
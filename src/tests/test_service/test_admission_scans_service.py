@@ -0,0 +1,81 @@
+from datetime import date
+from unittest.mock import MagicMock
+
+from service.admission_scans_service import (
+    COMPLET,
+    MEMOIRE,
+    SANS_GEO,
+    SANS_LOG,
+    ControleurAdmission,
+)
+
+
+def _controleur(pression, **kwargs):
+    """Contrôleur piloté par une pression modifiable, réévaluée à chaque appel."""
+    etat = {"pression": pression}
+    controleur = ControleurAdmission(
+        sondes={"test": lambda: etat["pression"]},
+        seuils=(0.7, 0.85, 0.95),
+        marge=0.1,
+        intervalle_s=0,
+        **kwargs,
+    )
+    return controleur, etat
+
+
+def test_niveaux_selon_la_pression():
+    controleur, etat = _controleur(0.1)
+    assert controleur.admettre() == COMPLET
+    etat["pression"] = 0.75
+    assert controleur.admettre() == SANS_GEO
+    etat["pression"] = 0.9
+    assert controleur.admettre() == SANS_LOG
+    etat["pression"] = 1.2
+    assert controleur.admettre() == MEMOIRE
+
+    metriques = controleur.metriques()
+    assert metriques["niveau"] == "memoire"
+    assert metriques["changements"] == 3
+    assert metriques["scans_par_niveau"]["complet"] == 1
+
+
+def test_hysteresis_a_la_descente():
+    controleur, etat = _controleur(0.9)
+    assert controleur.admettre() == SANS_LOG
+    etat["pression"] = 0.8  # sous 0.85 mais au-dessus de 0.85 - 0.1
+    assert controleur.admettre() == SANS_LOG
+    etat["pression"] = 0.7
+    assert controleur.admettre() == SANS_GEO
+    etat["pression"] = 0.0
+    assert controleur.admettre() == COMPLET
+
+
+def test_ecritures_en_cours_comptent_dans_la_pression():
+    controleur, _ = _controleur(0.0, ecritures_max=2)
+    with controleur.ecriture(), controleur.ecriture():
+        assert controleur.admettre() == MEMOIRE
+    assert controleur.metriques()["ecritures_en_cours"] == 0
+
+
+def test_vues_en_memoire_restituees_au_retour():
+    compteur = MagicMock()
+    controleur, etat = _controleur(1.0, compteur=compteur)
+    assert controleur.admettre() == MEMOIRE
+    controleur.compter_en_memoire(1, date(2025, 11, 1))
+    controleur.compter_en_memoire(1, date(2025, 11, 1))
+    assert controleur.metriques()["vues_en_memoire"] == 2
+
+    etat["pression"] = 0.0
+    assert controleur.admettre() == COMPLET
+
+    compteur.ajouter.assert_called_once_with(1, date(2025, 11, 1), 2)
+    assert controleur.metriques()["vues_en_memoire"] == 0
+
+
+def test_sonde_en_erreur_ignoree():
+    def sonde():
+        raise RuntimeError("indisponible")
+
+    controleur = ControleurAdmission(sondes={"ko": sonde}, intervalle_s=0)
+
+    assert controleur.admettre() == COMPLET
@@ -0,0 +1,116 @@
+import psycopg2
+from unittest.mock import MagicMock
+from datetime import date
+import time
+
+from service.compteur_vues_service import CompteurVuesService
+from service.statistique_service import StatistiqueService
+
+
+def _compteur(**kwargs):
+    """Construit un agrégateur avec un DAO simulé."""
+    dao = MagicMock()
+    return CompteurVuesService(dao=dao, **kwargs), dao
+
+
+def test_vues_cumulees_par_qr_et_par_jour():
+    """Des milliers de vues sur un QR ne produisent qu'une ligne par jour."""
+    compteur, dao = _compteur()
+    jour = date(2025, 10, 1)
+    for _ in range(1000):
+        compteur.ajouter(1, jour)
+    compteur.ajouter(2, jour)
+
+    assert compteur.vider() == 2
+    dao.incrementer_vues.assert_called_once_with({(1, jour): 1000, (2, jour): 1})
+    assert compteur.metriques()["vues_en_attente"] == 0
+
+
+def test_echec_reintegre_les_deltas():
+    """Si l'écriture échoue, les deltas s'additionnent aux vues suivantes."""
+    compteur, dao = _compteur()
+    jour = date(2025, 10, 1)
+    dao.incrementer_vues.side_effect = Exception("BDD indisponible")
+    compteur.ajouter(1, jour)
+    compteur.ajouter(1, jour)
+
+    assert compteur.vider() == 0
+    compteur.ajouter(1, jour)
+    dao.incrementer_vues.side_effect = None
+    compteur.vider()
+
+    dao.incrementer_vues.assert_called_with({(1, jour): 3})
+    assert compteur.metriques()["echecs"] == 1
+
+
+def test_erreur_permanente_abandonne_les_deltas():
+    """Un lot refusé par la base n'est pas rejoué : les vues suivantes sont écrites."""
+    compteur, dao = _compteur()
+    jour = date(2025, 10, 1)
+    dao.incrementer_vues.side_effect = psycopg2.IntegrityError("violation de clé étrangère")
+    compteur.ajouter(1, jour)
+
+    assert compteur.vider() == 0
+    assert compteur.metriques()["vues_perdues"] == 1
+    dao.incrementer_vues.side_effect = None
+    compteur.ajouter(2, jour)
+    compteur.vider()
+
+    dao.incrementer_vues.assert_called_with({(2, jour): 1})
+
+
+def test_memoire_bornee_par_cles_limite():
+    """Base indisponible : au-delà de cles_limite couples, les vues de nouveaux couples sont perdues."""
+    compteur, dao = _compteur(cles_max=2, cles_limite=3)
+    jour = date(2025, 10, 1)
+    dao.incrementer_vues.side_effect = Exception("BDD indisponible")
+    for id_qrcode in range(5):
+        compteur.ajouter(id_qrcode, jour)
+    compteur.ajouter(0, jour)  # couple déjà présent : toujours compté
+
+    m = compteur.metriques()
+    assert m["cles_en_attente"] == 3
+    assert m["vues_en_attente"] == 4
+    assert m["vues_perdues"] == 2
+
+    assert compteur.vider() == 0
+    assert compteur.metriques()["cles_en_attente"] == 3
+
+
+def test_changement_de_jour_declenche_un_vidage():
+    """La première vue d'un nouveau jour écrit sans attendre les deltas de la veille."""
+    compteur, dao = _compteur(intervalle_ms=60000)
+    compteur.demarrer()
+    try:
+        compteur.ajouter(1, date(2025, 10, 1))
+        compteur.ajouter(1, date(2025, 10, 2))
+        for _ in range(100):
+            if dao.incrementer_vues.called:
+                break
+            time.sleep(0.01)
+        deltas = dao.incrementer_vues.call_args[0][0]
+        assert deltas[(1, date(2025, 10, 1))] == 1
+    finally:
+        compteur.arreter()
+
+
+def test_arreter_ecrit_les_deltas_restants():
+    """L'arrêt écrit tout ce qui est en attente."""
+    compteur, dao = _compteur(intervalle_ms=60000)
+    compteur.demarrer()
+    compteur.ajouter(1, date(2025, 10, 1))
+
+    compteur.arreter()
+
+    dao.incrementer_vues.assert_called_once_with({(1, date(2025, 10, 1)): 1})
+
+
+def test_enregistrer_vue_passe_par_le_compteur():
+    """Avec un compteur, le service n'écrit pas en base à chaque vue."""
+    compteur, dao = _compteur()
+    service = StatistiqueService(compteur=compteur)
+
+    assert service.enregistrer_vue(1, date(2025, 10, 1)) is True
+
+    dao.incrementer_vues.assert_not_called()
+    assert compteur.metriques()["vues_en_attente"] == 1
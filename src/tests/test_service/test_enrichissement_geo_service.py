@@ -0,0 +1,53 @@
+from unittest.mock import MagicMock
+
+from service.enrichissement_geo_service import EnrichissementGeoService
+
+
+def _service(ips, **kwargs):
+    """Construit un worker avec un DAO et un fournisseur simulés."""
+    dao = MagicMock()
+    dao.lister_ips_a_enrichir.return_value = ips
+    dao.enrichir_geo.side_effect = lambda resultats: len(resultats)
+    geo = MagicMock()
+    geo.localiser.side_effect = lambda ip: ("France", "Bretagne", "Rennes")
+    return EnrichissementGeoService(geo, dao=dao, **kwargs), dao, geo
+
+
+def test_executer_lot_resout_chaque_adresse_une_fois():
+    """Chaque adresse du lot est résolue une fois puis écrite en un seul appel."""
+    service, dao, geo = _service(["1.1.1.1", "2.2.2.2", ""], taille_lot=50)
+
+    assert service.executer_lot() == 3
+
+    dao.lister_ips_a_enrichir.assert_called_once_with(50)
+    assert geo.localiser.call_count == 2  # l'adresse vide n'est pas résolue
+    dao.enrichir_geo.assert_called_once_with({
+        "1.1.1.1": ("France", "Bretagne", "Rennes"),
+        "2.2.2.2": ("France", "Bretagne", "Rennes"),
+        "": (None, None, None),
+    })
+    assert service.metriques()["ips_resolues"] == 3
+
+
+def test_executer_lot_sans_travail():
+    """Aucun log en attente : pas d'écriture."""
+    service, dao, _ = _service([])
+
+    assert service.executer_lot() == 0
+    dao.enrichir_geo.assert_not_called()
+
+
+def test_adresse_en_erreur_laissee_en_attente():
+    """Une adresse dont la résolution échoue n'est pas marquée comme enrichie."""
+    service, dao, geo = _service(["1.1.1.1", "2.2.2.2"])
+
+    def localiser(ip):
+        if ip == "2.2.2.2":
+            raise TimeoutError("fournisseur indisponible")
+        return ("France", None, None)
+
+    geo.localiser.side_effect = localiser
+
+    service.executer_lot()
+
+    assert dao.enrichir_geo.call_args[0][0] == {"1.1.1.1": ("France", None, None)}
@@ -0,0 +1,74 @@
+from service.filtre_scans_service import (
+    ContexteScan,
+    FiltreDoublons,
+    FiltrePrechargement,
+    FiltreRobots,
+    FiltreScansService,
+)
+
+
+class HorlogeFactice:
+    """Horloge contrôlée par le test (secondes)."""
+
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def _contexte(id_qrcode=1, client_host="1.1.1.1", user_agent="Mozilla/5.0", entetes=None):
+    return ContexteScan(id_qrcode, client_host, user_agent, entetes or {})
+
+
+def test_filtre_robots_avec_cache():
+    filtre = FiltreRobots()
+
+    assert filtre.rejeter(_contexte(user_agent="Mozilla/5.0 (compatible; Googlebot/2.1)"))
+    assert filtre.rejeter(_contexte(user_agent="WhatsApp/2.23.20.0"))
+    assert not filtre.rejeter(_contexte(user_agent="Mozilla/5.0 (iPhone) Safari/604.1"))
+    assert not filtre.rejeter(_contexte(user_agent="Mozilla/5.0 (iPhone) Safari/604.1"))
+    assert filtre.cache.statistiques()["succes"] == 1
+
+
+def test_filtre_prechargement():
+    filtre = FiltrePrechargement()
+
+    assert filtre.rejeter(_contexte(entetes={"sec-purpose": "prefetch;prerender"}))
+    assert not filtre.rejeter(_contexte(entetes={"accept": "text/html"}))
+
+
+def test_filtre_doublons_fenetre():
+    horloge = HorlogeFactice()
+    filtre = FiltreDoublons(fenetre_s=10, nb_tranches=10, horloge=horloge)
+
+    assert not filtre.rejeter(_contexte())
+    horloge.t = 5
+    assert filtre.rejeter(_contexte())
+    assert not filtre.rejeter(_contexte(id_qrcode=2))
+    assert not filtre.rejeter(_contexte(client_host="2.2.2.2"))
+
+    horloge.t = 10.5  # la tranche du premier scan est sortie de la fenêtre
+    assert not filtre.rejeter(_contexte())
+
+
+def test_filtre_doublons_memoire_bornee():
+    horloge = HorlogeFactice()
+    filtre = FiltreDoublons(fenetre_s=10, cles_max=3, horloge=horloge)
+    for i in range(5):
+        horloge.t = i
+        filtre.rejeter(_contexte(client_host=f"10.0.0.{i}"))
+
+    assert len(filtre) <= 3
+
+
+def test_service_compte_les_decisions():
+    service = FiltreScansService([FiltreRobots(), FiltreDoublons()])
+
+    assert service.evaluer(1, "1.1.1.1", "curl/8.0") == "robot"
+    assert service.evaluer(1, "1.1.1.1", "Mozilla/5.0") is None
+    assert service.evaluer(1, "1.1.1.1", "Mozilla/5.0") == "doublon"
+
+    metriques = service.metriques()
+    assert metriques["acceptes"] == 1
+    assert metriques["rejetes"] == {"robot": 1, "doublon": 1}
@@ -0,0 +1,57 @@
+import os
+from unittest.mock import MagicMock
+
+from dao.bus_invalidation import identifiant_processus
+from service.invalidation_cache_service import InvalidationCacheService
+
+
+def _service():
+    service = InvalidationCacheService(connecter=MagicMock())
+    invalider, vider = MagicMock(), MagicMock()
+    service.abonner("qrcode", invalider, vider)
+    return service, invalider, vider
+
+
+def test_notification_d_un_autre_worker_appliquee():
+    service, invalider, _ = _service()
+
+    assert service.traiter("qrcode:3f2a9c:42") is True
+    invalider.assert_called_once_with("42")
+    assert service.metriques()["appliquees"] == 1
+
+
+def test_notifications_ignorees():
+    """Propre processus (déjà invalidé localement), domaine sans abonné, format invalide."""
+    service, invalider, _ = _service()
+
+    assert service.traiter(f"qrcode:{identifiant_processus()}:42") is False
+    assert service.traiter("token:1:abc") is False
+    assert service.traiter("n'importe quoi") is False
+    assert service.traiter("qrcode::42") is False
+    invalider.assert_not_called()
+    assert service.metriques()["ignorees"] == 4
+
+
+def test_connexion_vide_les_caches_puis_reconnexion():
+    """Toute (re)connexion suit une période sans écoute : les caches sont vidés."""
+    service, _, vider = _service()
+    service._connecter.side_effect = [OSError("base indisponible"), MagicMock()]
+
+    assert service._essayer_connexion() is False
+    vider.assert_not_called()
+    assert service._essayer_connexion() is True
+    vider.assert_called_once()
+    assert service.metriques()["connecte"] is True
+
+
+def test_identifiant_processus_aleatoire_et_regenere_apres_fork():
+    """Le PID ne suffit pas (PID 1 dans chaque conteneur) : identifiant aléatoire par processus."""
+    identifiant = identifiant_processus()
+    assert len(identifiant) == 32 and identifiant != str(os.getpid())
+    lecture, ecriture = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.write(ecriture, identifiant_processus().encode())
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert os.read(lecture, 64).decode() != identifiant
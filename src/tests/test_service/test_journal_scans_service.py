@@ -0,0 +1,65 @@
+from unittest.mock import MagicMock
+
+from service.journal_scans_service import JournalScansService
+from utils.journal_scans import JournalScans
+
+
+def _service(tmp_path):
+    dao = MagicMock()
+    dao.charger_segment.side_effect = lambda nom, logs: len(logs)
+    return JournalScansService(JournalScans(str(tmp_path)), log_dao=dao), dao
+
+
+def test_charger_segments_scelles(tmp_path):
+    service, dao = _service(tmp_path)
+    assert service.enregistrer_scan(1, client_host="1.1.1.1") is True
+    assert service.enregistrer_scan(2) is True
+    service.journal.sceller()
+    service.enregistrer_scan(3)  # segment actif : pas chargé
+
+    assert service.charger() == 2
+
+    (nom, logs), _ = dao.charger_segment.call_args
+    assert [ls.id_qrcode for ls in logs] == [1, 2]
+    assert logs[0].client_host == "1.1.1.1"
+    assert len(service.journal.segments()) == 1
+    assert service.metriques()["scans_charges"] == 2
+
+
+def test_echec_base_conserve_le_segment(tmp_path):
+    service, dao = _service(tmp_path)
+    service.enregistrer_scan(1)
+    service.journal.sceller()
+    dao.charger_segment.side_effect = ConnectionError("base indisponible")
+
+    assert service.charger() == 0
+    assert service.metriques()["segments_en_attente"] == 1
+    assert service.metriques()["echecs"] == 1
+
+    dao.charger_segment.side_effect = None
+    dao.charger_segment.return_value = 1
+    assert service.charger() == 1
+    assert service.metriques()["segments_en_attente"] == 0
+
+
+def test_segment_deja_applique_est_supprime(tmp_path):
+    service, dao = _service(tmp_path)
+    service.enregistrer_scan(1)
+    service.journal.sceller()
+    dao.charger_segment.side_effect = None
+    dao.charger_segment.return_value = None
+
+    assert service.charger() == 0
+    assert service.journal.segments() == []
+    assert service.metriques()["segments_deja_appliques"] == 1
+
+
+def test_arreter_scelle_et_charge(tmp_path):
+    service, dao = _service(tmp_path)
+    service.demarrer()
+    service.enregistrer_scan(1)
+
+    service.arreter()
+
+    assert service.journal.segments() == []
+    assert dao.charger_segment.call_count == 1
@@ -0,0 +1,51 @@
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+from business_object.qr_code import Qrcode
+from business_object.token import Token
+from business_object.utilisateur import Utilisateur
+from service.prechauffage_service import PrechauffageService
+from service.qrcode_service import QRCodeService
+from service.token_service import TokenService
+from utils.cache_ttl import CacheTTL
+
+
+def test_prechauffage_des_qr_codes_les_plus_scannes():
+    dao = MagicMock()
+    dao.lister_plus_scannes.return_value = [Qrcode(1, "https://ex.com/a", "3"), Qrcode(2, "ex.com/b", "4")]
+    cache = CacheTTL(ttl=60)
+    service = PrechauffageService(QRCodeService(dao, cache=cache), nb=50, jours=7)
+
+    resultat = service.executer(aujourd_hui=date(2025, 10, 8))
+
+    dao.lister_plus_scannes.assert_called_once_with(50, date(2025, 10, 1))
+    assert resultat["qrcodes"] == 2
+    assert cache.lire(2) == (True, ("ex.com/b", True, "4", 1, None))
+    dao.trouver_qrc_par_id_qrc.assert_not_called()
+
+
+def test_prechauffage_des_proprietaires():
+    dao = MagicMock()
+    dao.lister_plus_scannes.return_value = [Qrcode(1, "https://ex.com/a", "3"), Qrcode(2, "https://ex.com/b", "3")]
+    cache_tokens = CacheTTL(ttl=60)
+    futur = datetime.now(timezone.utc) + timedelta(hours=1)
+    service = PrechauffageService(
+        QRCodeService(dao, cache=CacheTTL(ttl=60)), TokenService(cache=cache_tokens), proprietaires=True
+    )
+
+    with patch("service.prechauffage_service.TokenDao") as token_dao, \
+         patch("service.prechauffage_service.UtilisateurDao") as utilisateur_dao:
+        token_dao.return_value.lister_valides_par_utilisateurs.return_value = [Token(3, "tok", futur)]
+        utilisateur_dao.return_value.lister_par_ids.return_value = [Utilisateur(3, "u3", "h")]
+        resultat = service.executer()
+
+    token_dao.return_value.lister_valides_par_utilisateurs.assert_called_once_with([3])
+    assert cache_tokens.lire("tok")[0]
+    utilisateur_dao.trouver_par_id_user.precharger.assert_called_once()
+    assert (resultat["tokens"], resultat["utilisateurs"]) == (1, 1)
+
+
+def test_prechauffage_desactive():
+    dao = MagicMock()
+    assert PrechauffageService(QRCodeService(dao), nb=0).executer()["qrcodes"] == 0
+    dao.lister_plus_scannes.assert_not_called()
@@ -1,10 +1,13 @@
 # tests/test_service/test_qrcode_service.py
 
-from unittest.mock import MagicMock, patch
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
 from datetime import datetime
 import pytest
 from service.qrcode_service import QRCodeService, QRCodeNotFoundError, UnauthorizedError
 from business_object.qr_code import Qrcode
+from utils.cache_ttl import CacheTTL
+from utils.table_redirections import TableRedirections
 
 
 # -------------------------------------------------------------
@@ -56,6 +59,53 @@ def test_creer_qrc_classique_ok():
     assert res._scan_url is None
 
 
+def test_creer_qrc_image_differee():
+    """
+    Avec generer_image=False, l'image n'est générée que par generer_image(qr)
+    (appelé par la route dans l'exécuteur de rendu), une seule fois.
+    """
+    fake_dao = MagicMock()
+    fake_dao.creer_qrc.return_value = Qrcode(id_qrcode=7, url="https://ex.com", id_proprietaire=3)
+
+    with patch("service.qrcode_service.generate_and_save_qr_png", return_value="/tmp/x.png") as gen_mock, \
+         patch("service.qrcode_service.filepath_to_public_url", return_value="http://x/x.png"):
+        service = QRCodeService(fake_dao)
+        res = service.creer_qrc("https://ex.com", 3, type_qrcode=False, generer_image=False)
+        gen_mock.assert_not_called()
+        assert res._image_url is None
+
+        assert service.generer_image(res) == "/tmp/x.png"
+        assert service.generer_image(res) is None
+
+    gen_mock.assert_called_once()
+    assert gen_mock.call_args.kwargs["tracking_url"] == "https://ex.com"
+    assert res._image_url == "http://x/x.png"
+
+
+def test_lister_page_curseur_suivant():
+    """Une ligne de plus est lue : elle indique qu'une page suivante existe."""
+    fake_dao = MagicMock()
+    fake_dao.lister_page_par_proprietaire.return_value = [
+        Qrcode(id_qrcode=i, url="https://ex.com", id_proprietaire=3) for i in (9, 8, 7)
+    ]
+    service = QRCodeService(fake_dao)
+
+    page, suivant = service.lister_page("3", 2, apres=10, type_qrcode=True)
+    assert [q.id_qrcode for q in page] == [9, 8]
+    assert suivant == 8
+    fake_dao.lister_page_par_proprietaire.assert_called_once_with(
+        3, 3, apres=10, type_qrcode=True, cree_depuis=None, cree_avant=None
+    )
+
+    page, suivant = service.lister_page("3", 5)
+    assert len(page) == 3 and suivant is None
+
+    assert service.lister_page("abc", 5) == ([], None)
+    fake_dao.lister_page_par_proprietaire.return_value = None
+    with pytest.raises(RuntimeError):
+        service.lister_page("3", 5)
+
+
 def test_creer_qrc_echec():
     """
     Si le DAO retourne None → le service lève RuntimeError.
@@ -185,6 +235,178 @@ def test_modifier_qrc_unauthorized():
 
     fake_dao.trouver_qrc_par_id_qrc.assert_called_once_with(20)
 
+# --- Tests pour trouver_redirection (cache) ---
+def test_trouver_redirection_sans_cache():
+    fake_dao = MagicMock()
+    fake_dao.trouver_qrc_par_id_qrc.return_value = Qrcode(1, "https://ex.com", "3", type_qrcode=False)
+    service = QRCodeService(fake_dao)
+
+    cible = service.trouver_redirection(1)
+
+    assert cible == ("https://ex.com", False, "3", 1, None)
+
+
+def test_trouver_redirection_avec_cache():
+    """La deuxième recherche est servie par le cache, y compris pour un id inconnu."""
+    fake_dao = MagicMock()
+    fake_dao.trouver_qrc_par_id_qrc.side_effect = lambda i: Qrcode(i, "https://ex.com", "3") if i == 1 else None
+    service = QRCodeService(fake_dao, cache=CacheTTL(ttl=60))
+
+    assert service.trouver_redirection(1).url == "https://ex.com"
+    assert service.trouver_redirection(1).url == "https://ex.com"
+    assert service.trouver_redirection(404) is None
+    assert service.trouver_redirection(404) is None
+
+    assert fake_dao.trouver_qrc_par_id_qrc.call_count == 2
+
+
+def test_trouver_redirection_async_concurrentes_une_seule_lecture():
+    """Un QR viral absent du cache : les scans simultanés partagent une lecture en base."""
+    fake_dao_async = MagicMock()
+
+    async def lecture(id_qrcode):
+        await asyncio.sleep(0.01)
+        return Qrcode(id_qrcode, "https://ex.com", "3")
+
+    fake_dao_async.trouver_qrc_par_id_qrc = AsyncMock(side_effect=lecture)
+    cache = CacheTTL(ttl=60)
+    service = QRCodeService(MagicMock(), cache=cache, dao_async=fake_dao_async)
+
+    async def scenario():
+        return await asyncio.gather(*(service.trouver_redirection_async(1) for _ in range(50)))
+
+    cibles = asyncio.run(scenario())
+    assert {c.url for c in cibles} == {"https://ex.com"}
+    assert fake_dao_async.trouver_qrc_par_id_qrc.await_count == 1
+    assert cache.lire(1)[0]
+
+
+def test_trouver_redirection_async_invalidee_pendant_la_lecture():
+    """Une modification pendant la lecture en base : l'ancienne cible n'est pas remise en cache."""
+    fake_dao_async = MagicMock()
+    cache = CacheTTL(ttl=60)
+    service = QRCodeService(MagicMock(), cache=cache, dao_async=fake_dao_async)
+
+    async def lecture(id_qrcode):
+        ancien = Qrcode(id_qrcode, "https://ancienne.com", "3")
+        service.invalider_cache(id_qrcode)  # modifié par un autre worker pendant la lecture
+        return ancien
+
+    fake_dao_async.trouver_qrc_par_id_qrc = AsyncMock(side_effect=lecture)
+
+    assert asyncio.run(service.trouver_redirection_async(1)).url == "https://ancienne.com"
+    assert cache.lire(1) == (False, None)
+
+
+def test_supprimer_qrc_invalide_le_cache():
+    fake_dao = MagicMock()
+    fake_dao.trouver_qrc_par_id_qrc.return_value = Qrcode(10, "https://ex.com", "3")
+    fake_dao.supprimer_qrc.return_value = True
+    cache = CacheTTL(ttl=60)
+    service = QRCodeService(fake_dao, cache=cache)
+    service.trouver_redirection(10)
+
+    service.supprimer_qrc(10, "3")
+
+    assert cache.lire(10) == (False, None)
+
+
+# --- Tests pour la table de redirections ---
+def test_trouver_redirection_servie_par_la_table(tmp_path):
+    """Un id présent dans la table ne passe ni par le cache ni par la base."""
+    fake_dao = MagicMock()
+    fake_dao.lister_redirections.return_value = [(1, "ex.com", True, 3, 4, None)]
+    table = TableRedirections(str(tmp_path / "redirections.bin"), verification_s=0)
+    service = QRCodeService(fake_dao, table=table)
+
+    assert service.reconstruire_table_redirections() == 1
+    assert service.trouver_redirection(1) == ("http://ex.com", True, "3", 4, None)
+    fake_dao.trouver_qrc_par_id_qrc.assert_not_called()
+
+    # Absent de la table : repli sur la base
+    fake_dao.trouver_qrc_par_id_qrc.return_value = None
+    assert service.trouver_redirection(2) is None
+    fake_dao.trouver_qrc_par_id_qrc.assert_called_once_with(2)
+
+
+def test_echec_de_mise_a_jour_de_la_table_retire_ou_suspend(tmp_path):
+    """Une table qui n'a pas pu être mise à jour ne doit plus servir l'ancienne cible."""
+    fake_dao = MagicMock()
+    fake_dao.lister_redirections.return_value = [(20, "https://old.com", False, 2, 1, None), (21, "https://b.com", False, 2, 1, None)]
+    fake_dao.trouver_qrc_par_id_qrc.side_effect = lambda i: Qrcode(i, "https://new.com", "2", type_qrcode=False, version=2)
+    table = TableRedirections(str(tmp_path / "redirections.bin"), verification_s=0)
+    service = QRCodeService(fake_dao, table=table)
+    service.reconstruire_table_redirections()
+    qr = Qrcode(20, "https://new.com", "2", type_qrcode=False, version=2)
+
+    # Écriture de la nouvelle cible impossible : l'entrée est retirée (repli sur la base)
+    mettre_a_jour = table.mettre_a_jour
+
+    def ecriture_impossible(id_qrcode, url, *args, **kwargs):
+        if url is not None:
+            raise OSError("disque plein")
+        mettre_a_jour(id_qrcode, url, *args, **kwargs)
+
+    with patch.object(table, "mettre_a_jour", side_effect=ecriture_impossible):
+        service._publier_redirection(20, qr)
+    assert table.chercher(20) is None
+    assert service.trouver_redirection(20).url == "https://new.com"
+
+    # Retrait impossible aussi : la table n'est plus consultée jusqu'à sa reconstruction
+    with patch.object(table, "mettre_a_jour", side_effect=OSError("disque plein")):
+        service._publier_redirection(21, qr)
+    assert service.trouver_redirection(21).url == "https://new.com"
+    service.reconstruire_table_redirections()
+    assert service.trouver_redirection(21).url == "https://b.com"
+
+
+def test_rafraichir_redirection_suit_les_modifications_d_un_autre_hote(tmp_path):
+    """Notification d'un autre processus : l'entrée de la table est relue, remplacée ou retirée."""
+    fake_dao = MagicMock()
+    fake_dao.lister_redirections.return_value = [
+        (20, "https://old.com", False, 2, 1, None),
+        (21, "https://b.com", False, 2, 1, None),
+        (22, "https://c.com", False, 3, 1, None),
+    ]
+    table = TableRedirections(str(tmp_path / "redirections.bin"), verification_s=0)
+    service = QRCodeService(fake_dao, table=table)
+    service.reconstruire_table_redirections()
+
+    fake_dao.trouver_qrc_par_id_qrc.return_value = Qrcode(20, "https://new.com", "2", type_qrcode=False, version=2)
+    service.rafraichir_redirection(20)
+    assert table.chercher(20).url == "https://new.com"
+
+    fake_dao.trouver_qrc_par_id_qrc.return_value = None
+    service.rafraichir_redirection(22)
+    assert table.chercher(22) is None
+
+    # Utilisateur 2 supprimé (cascade) : ses QR codes quittent la table
+    fake_dao.lister_par_proprietaire.return_value = []
+    service.rafraichir_redirections_proprietaire(2)
+    assert table.chercher(20) is None and table.chercher(21) is None
+    fake_dao.lister_par_proprietaire.assert_called_once_with(2)
+
+
+def test_modifier_et_supprimer_qrc_mettent_a_jour_la_table(tmp_path):
+    fake_dao = MagicMock()
+    fake_dao.lister_redirections.return_value = [(20, "https://old.com", False, 2, 1, None)]
+    fake_dao.trouver_qrc_par_id_qrc.return_value = Qrcode(20, "https://old.com", "2", type_qrcode=False)
+    fake_dao.modifier_qrc.return_value = Qrcode(
+        20, "https://new.com", "2", type_qrcode=False, version=2, cache_max_age=300
+    )
+    fake_dao.supprimer_qrc.return_value = True
+    table = TableRedirections(str(tmp_path / "redirections.bin"), verification_s=0)
+    service = QRCodeService(fake_dao, table=table)
+    service.reconstruire_table_redirections()
+
+    with patch("service.qrcode_service.generate_and_save_qr_png"):
+        service.modifier_qrc(20, 2, url="https://new.com")
+    assert table.chercher(20) == ("https://new.com", False, 2, 2, 300)
+
+    service.supprimer_qrc(20, 2)
+    assert table.chercher(20) is None
+
+
 # --- Tests pour trouver_qrc_par_id ---
 
 def test_trouver_qrc_par_id_ok():
@@ -251,6 +473,22 @@ def test_modifier_qrc_statique_change_url_regenere(mock_gen_png):
     
     mock_gen_png.assert_called_once() # L'image a été re-générée
 
+@patch("service.qrcode_service.generate_and_save_qr_png")
+def test_modifier_qrc_image_differee(mock_gen_png):
+    """Avec generer_image=False, la régénération est laissée à generer_image(qr)."""
+    fake_dao = MagicMock()
+    fake_dao.trouver_qrc_par_id_qrc.return_value = Qrcode(10, "https://old.com", 3, type_qrcode=False)
+    fake_dao.modifier_qrc.return_value = Qrcode(10, "https://new.com", 3, type_qrcode=False)
+
+    service = QRCodeService(fake_dao)
+    with patch("service.qrcode_service.filepath_to_public_url", return_value="http://x/f.png"):
+        res = service.modifier_qrc(id_qrcode=10, id_user=3, url="https://new.com", generer_image=False)
+        mock_gen_png.assert_not_called()
+        service.generer_image(res)
+
+    mock_gen_png.assert_called_once()
+    assert mock_gen_png.call_args.kwargs["tracking_url"] == "https://new.com"
+
 @patch("service.qrcode_service.generate_and_save_qr_png")
 def test_modifier_qrc_dynamique_change_url_ne_regenere_pas(mock_gen_png):
     """
@@ -0,0 +1,165 @@
+import psycopg2
+from unittest.mock import MagicMock
+from datetime import datetime, timezone
+import time
+
+from service.scan_buffer_service import ScanBufferService
+from business_object.log_scan import LogScan
+
+
+def _service(**kwargs):
+    """Construit un tampon avec un DAO simulé."""
+    log_dao = MagicMock()
+    service = ScanBufferService(log_dao=log_dao, **kwargs)
+    return service, log_dao
+
+
+def test_enregistrer_scan_ne_touche_pas_la_base():
+    """Le dépôt d'un scan est purement en mémoire."""
+    service, log_dao = _service()
+
+    assert service.enregistrer_scan(id_qrcode=1, client_host="1.1.1.1") is True
+
+    log_dao.enregistrer_scans.assert_not_called()
+    assert service.metriques()["profondeur"] == 1
+
+
+def test_vider_ecrit_le_lot_en_un_appel():
+    """Un vidage écrit tout le lot (vues + logs) en un seul appel DAO."""
+    service, log_dao = _service()
+    jour1 = datetime(2025, 10, 1, 23, 59, tzinfo=timezone.utc)
+    jour2 = datetime(2025, 10, 2, 0, 1, tzinfo=timezone.utc)
+
+    service.enregistrer_scan(id_qrcode=1, date_scan=jour1)
+    service.enregistrer_scan(id_qrcode=1, date_scan=jour1)
+    service.enregistrer_scan(id_qrcode=1, date_scan=jour2)
+    service.enregistrer_scan(id_qrcode=2, date_scan=jour2)
+
+    assert service.vider() == 4
+
+    log_dao.enregistrer_scans.assert_called_once()
+    lot = log_dao.enregistrer_scans.call_args[0][0]
+    assert len(lot) == 4
+    assert all(isinstance(ls, LogScan) for ls in lot)
+    assert lot[0].date_scan == jour1
+    assert service.metriques()["profondeur"] == 0
+    assert service.metriques()["ecrits"] == 4
+
+
+def test_capacite_max_borne_la_memoire():
+    """Au-delà de capacite_max, les scans sont rejetés et comptés."""
+    service, _ = _service(taille_lot=2, capacite_max=3)
+
+    resultats = [service.enregistrer_scan(id_qrcode=1) for _ in range(5)]
+
+    assert resultats == [True, True, True, False, False]
+    m = service.metriques()
+    assert m["profondeur"] == 3
+    assert m["rejetes"] == 2
+
+
+def test_vider_echec_remet_le_lot_en_attente():
+    """Si la base échoue, le lot est conservé pour le vidage suivant."""
+    service, log_dao = _service()
+    log_dao.enregistrer_scans.side_effect = Exception("BDD indisponible")
+    service.enregistrer_scan(id_qrcode=1)
+    service.enregistrer_scan(id_qrcode=2)
+
+    assert service.vider() == 0
+    assert service.metriques()["profondeur"] == 2
+    assert service.metriques()["echecs"] == 1
+
+    log_dao.enregistrer_scans.side_effect = None
+    assert service.vider() == 2
+    ids = [ls.id_qrcode for ls in log_dao.enregistrer_scans.call_args[0][0]]
+    assert ids == [1, 2]  # ordre conservé
+
+
+def test_vider_erreur_permanente_abandonne_seulement_les_scans_fautifs():
+    """Un lot refusé (contrainte violée) est réécrit scan par scan ; il ne bloque pas le tampon."""
+    service, log_dao = _service()
+
+    def ecrire(lot):
+        if any(ls.id_qrcode == 99 for ls in lot):
+            raise psycopg2.IntegrityError("violation de clé étrangère")
+        return len(lot)
+
+    log_dao.enregistrer_scans.side_effect = ecrire
+    for id_qrcode in (1, 99, 2):
+        service.enregistrer_scan(id_qrcode=id_qrcode)
+
+    assert service.vider() == 2
+    m = service.metriques()
+    assert m["profondeur"] == 0
+    assert m["abandonnes"] == 1
+    assert m["ecrits"] == 2
+    assert m["echecs"] == 0
+
+
+def test_vider_erreur_transitoire_pendant_l_isolement():
+    """Une panne pendant l'écriture scan par scan remet les scans restants en attente."""
+    service, log_dao = _service()
+    erreurs = [psycopg2.DataError("donnée invalide"), None, psycopg2.OperationalError("connexion perdue")]
+
+    def ecrire(lot):
+        erreur = erreurs.pop(0) if erreurs else None
+        if erreur is not None:
+            raise erreur
+        return len(lot)
+
+    log_dao.enregistrer_scans.side_effect = ecrire
+    for id_qrcode in (1, 2, 3):
+        service.enregistrer_scan(id_qrcode=id_qrcode)
+
+    assert service.vider() == 1
+    assert service.metriques()["profondeur"] == 2
+    assert service.vider() == 2
+
+
+def test_arreter_vide_le_tampon():
+    """L'arrêt écrit tous les événements restants, par lots."""
+    service, log_dao = _service(taille_lot=2)
+    for i in range(5):
+        service.enregistrer_scan(id_qrcode=i)
+
+    service.arreter()
+
+    assert log_dao.enregistrer_scans.call_count == 3
+    assert service.metriques()["profondeur"] == 0
+
+
+def test_thread_vide_des_que_le_lot_est_complet():
+    """Le thread de fond écrit dès que taille_lot événements sont en attente."""
+    service, log_dao = _service(taille_lot=3, intervalle_ms=60000)
+    service.demarrer()
+    try:
+        for _ in range(3):
+            service.enregistrer_scan(id_qrcode=1)
+        for _ in range(100):
+            if log_dao.enregistrer_scans.called:
+                break
+            time.sleep(0.01)
+        assert log_dao.enregistrer_scans.call_count == 1
+    finally:
+        service.arreter()
+
+
+def test_thread_attend_apres_un_echec():
+    """Base indisponible avec un lot complet en attente : pas de nouvel essai en boucle serrée."""
+    service, log_dao = _service(taille_lot=2, intervalle_ms=50, attente_max_s=0.2)
+    log_dao.enregistrer_scans.side_effect = psycopg2.OperationalError("base indisponible")
+    for _ in range(4):
+        service.enregistrer_scan(id_qrcode=1)
+    service.demarrer()
+    time.sleep(0.5)
+    log_dao.enregistrer_scans.side_effect = None
+    try:
+        # 0, 50, 150, 350 ms (attente doublée, plafonnée à 200 ms) : quelques essais seulement
+        assert 2 <= log_dao.enregistrer_scans.call_count <= 6
+        for _ in range(100):
+            if service.metriques()["profondeur"] == 0:
+                break
+            time.sleep(0.01)
+        assert service.metriques()["profondeur"] == 0
+    finally:
+        service.arreter()
@@ -0,0 +1,59 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from service.admission_scans_service import COMPLET, MEMOIRE
+from service.qrcode_service import CibleRedirection
+from service.scan_service import ScanService
+
+
+def _service(cible, niveau=COMPLET, **options):
+    qrcode_service = MagicMock()
+    qrcode_service.trouver_redirection_async = AsyncMock(return_value=cible)
+    filtre = MagicMock()
+    filtre.evaluer.return_value = None
+    admission = MagicMock()
+    admission.admettre.return_value = niveau
+    geolocalisation = MagicMock()
+    geolocalisation.localiser.return_value = ("FR", "IDF", "Paris")
+    return ScanService(
+        qrcode_service, MagicMock(), MagicMock(), filtre, admission, MagicMock(), geolocalisation, **options
+    )
+
+
+def test_scan_suivi_enregistre_puis_redirige():
+    service = _service(CibleRedirection("ex.com/a b", True, "1"))
+
+    reponse = asyncio.run(service.traiter(1, {"x-forwarded-for": "1.2.3.4, 10.0.0.1", "referer": "r"}, "127.0.0.1"))
+
+    assert reponse == (307, {"location": "http://ex.com/a%20b"})
+    scan = service.tampon.enregistrer_scan.call_args.kwargs
+    assert scan["client_host"] == "1.2.3.4"
+    assert scan["referer"] == "r"
+    assert scan["geo_city"] == "Paris"
+
+
+def test_scan_inconnu():
+    assert asyncio.run(_service(None).traiter(404, {})) is None
+
+
+def test_scan_memoire_et_echec_d_ecriture_redirigent():
+    service = _service(CibleRedirection("https://ex.com", True, "1"), niveau=MEMOIRE)
+    assert asyncio.run(service.traiter(1, {}, "h")).statut == 307
+    service.admission_scans.compter_en_memoire.assert_called_once()
+    service.tampon.enregistrer_scan.assert_not_called()
+
+    service = _service(CibleRedirection("https://ex.com", True, "1"))
+    service.tampon.enregistrer_scan.side_effect = RuntimeError("tampon plein")
+    assert asyncio.run(service.traiter(1, {}, "h")).statut == 307
+
+
+def test_scan_statique_cacheable():
+    service = _service(CibleRedirection("https://ex.com", False, "1", version=3), cache_max_age_defaut=60)
+
+    reponse = asyncio.run(service.traiter(7, {}))
+    assert reponse.statut == 301
+    assert reponse.entetes["etag"] == '"7-3"'
+    assert reponse.entetes["cache-control"] == "public, max-age=60"
+
+    assert asyncio.run(service.traiter(7, {"if-none-match": 'W/"7-3"'})).statut == 304
+    service.filtre_scans.evaluer.assert_not_called()
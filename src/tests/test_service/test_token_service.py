@@ -1,8 +1,9 @@
 from unittest.mock import patch, MagicMock
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import pytest
 from service.token_service import TokenService
 from business_object.token import Token
+from utils.cache_ttl import CacheTTL
 # TokenDao n'a pas besoin d'être importé car il est mocké ?
 
 
@@ -194,3 +195,70 @@ def test_trouver_par_jeton_ko(mock_trouver_dao):
 if __name__ == "__main__":
     import pytest
     pytest.main([__file__])
+
+
+## Tests du cache des tokens validés
+
+def _token(minutes_restantes):
+    return Token(
+        id_user=1,
+        jeton="JETON_CACHE",
+        date_expiration=datetime.now(timezone.utc) + timedelta(minutes=minutes_restantes),
+    )
+
+
+@patch("service.token_service.TokenDao.trouver_token_par_jeton")
+def test_trouver_par_jeton_utilise_le_cache(mock_trouver):
+    """Un token valide n'est lu qu'une fois en base."""
+    mock_trouver.return_value = _token(60)
+    cache = CacheTTL(ttl=60)
+    service = TokenService(cache=cache)
+
+    assert service.trouver_par_jeton("JETON_CACHE").id_user == 1
+    assert service.trouver_par_jeton("JETON_CACHE").id_user == 1
+
+    mock_trouver.assert_called_once_with("JETON_CACHE")
+    assert cache.statistiques()["succes"] == 1
+
+
+@patch("service.token_service.TokenDao.trouver_token_par_jeton")
+def test_cache_borne_par_date_expiration(mock_trouver):
+    """L'entrée expire avec le token, même si le TTL du cache est plus long."""
+    horloge = [0.0]
+    cache = CacheTTL(ttl=3600, horloge=lambda: horloge[0])
+    mock_trouver.return_value = _token(1)  # expire dans 60 s
+    service = TokenService(cache=cache)
+
+    service.trouver_par_jeton("JETON_CACHE")
+    horloge[0] = 61
+    service.trouver_par_jeton("JETON_CACHE")
+
+    assert mock_trouver.call_count == 2
+
+
+@patch("service.token_service.TokenDao.trouver_token_par_jeton")
+def test_token_expire_ou_inconnu_non_mis_en_cache(mock_trouver):
+    """Les tokens expirés ou inexistants ne sont pas mis en cache."""
+    cache = CacheTTL(ttl=60)
+    service = TokenService(cache=cache)
+
+    mock_trouver.return_value = _token(-1)
+    service.trouver_par_jeton("JETON_CACHE")
+    mock_trouver.return_value = None
+    service.trouver_par_jeton("AUTRE")
+
+    assert len(cache) == 0
+
+
+@patch("service.token_service.TokenDao.supprimer_token", return_value=True)
+@patch("service.token_service.TokenDao.trouver_token_par_jeton")
+def test_supprimer_token_invalide_le_cache(mock_trouver, mock_supprimer):
+    """Après suppression, le token n'est plus servi par le cache."""
+    token = _token(60)
+    mock_trouver.return_value = token
+    service = TokenService(cache=CacheTTL(ttl=60))
+    service.trouver_par_jeton("JETON_CACHE")
+
+    assert service.supprimer_token(token) is True
+    mock_trouver.return_value = None
+    assert service.trouver_par_jeton("JETON_CACHE") is None
@@ -0,0 +1 @@
+# Pour definir le repertoire courant comme un package
@@ -0,0 +1,116 @@
+import asyncio
+
+from utils.cache_resultat import cache_resultat, invalider_tag, statistiques_caches, vider_caches
+
+
+class DaoFactice:
+    def __init__(self):
+        self.appels = 0
+        self.nom = "a"
+
+    @cache_resultat(ttl=60, tags=lambda id_user: [f"test_utilisateur:{id_user}"], nom="test.trouver")
+    def trouver(self, id_user):
+        self.appels += 1
+        return {"id": id_user, "nom": self.nom}
+
+    @cache_resultat(ttl=60, cacher_si=bool, copier=list, nom="test.lister")
+    def lister(self, id_user):
+        self.appels += 1
+        return [1, 2] if id_user == 1 else []
+
+    @cache_resultat(ttl=60, nom="test.lire_async")
+    async def lire_async(self, cle):
+        self.appels += 1
+        return cle * 2
+
+
+def test_lecture_servie_par_le_cache_et_compteurs():
+    dao = DaoFactice()
+    vider_caches()
+
+    assert dao.trouver(1) == {"id": 1, "nom": "a"}
+    assert dao.trouver(1) == {"id": 1, "nom": "a"}
+    assert dao.trouver(id_user=2)["id"] == 2
+    assert dao.appels == 2
+
+    stats = statistiques_caches()["test.trouver"]
+    assert stats["succes"] == 1
+    assert stats["taille"] == 2
+
+
+def test_invalidation_par_tag():
+    dao = DaoFactice()
+    vider_caches()
+    dao.trouver(1)
+    dao.trouver(2)
+
+    dao.nom = "b"
+    invalider_tag("test_utilisateur:1")
+
+    assert dao.trouver(1)["nom"] == "b"
+    assert dao.trouver(2)["nom"] == "a"
+    assert dao.appels == 3
+
+
+def test_invalidation_pendant_le_chargement():
+    """Une écriture concurrente d'une lecture périme le résultat de cette lecture."""
+    vider_caches()
+
+    class DaoConcurrent(DaoFactice):
+        @cache_resultat(ttl=60, tags=lambda cle: [f"test_concurrent:{cle}"], nom="test.concurrent")
+        def lire(self, cle):
+            self.appels += 1
+            if self.appels == 1:
+                invalider_tag(f"test_concurrent:{cle}")
+            return self.appels
+
+    dao = DaoConcurrent()
+    assert dao.lire(1) == 1
+    assert dao.lire(1) == 2
+    assert dao.lire(1) == 2
+
+
+def test_cacher_si_et_copier():
+    dao = DaoFactice()
+    vider_caches()
+
+    dao.lister(1).append(3)
+    assert dao.lister(1) == [1, 2]
+    dao.lister(2)
+    dao.lister(2)
+    assert dao.appels == 3  # liste vide non conservée
+
+
+def test_methode_asynchrone():
+    dao = DaoFactice()
+    vider_caches()
+
+    async def scenario():
+        return await dao.lire_async(2), await dao.lire_async(2)
+
+    assert asyncio.run(scenario()) == (4, 4)
+    assert dao.appels == 1
+
+
+def test_vider_caches():
+    dao = DaoFactice()
+    vider_caches()
+    dao.trouver(1)
+    vider_caches()
+    dao.trouver(1)
+    assert dao.appels == 2
+
+
+def test_backend_partage_meme_vide():
+    """Un backend partagé encore vide (CacheTTL sans entrée) est bien réutilisé."""
+    dao = DaoFactice()
+
+    class DaoPartage:
+        @cache_resultat(ttl=60, backend=DaoFactice.trouver.cache, nom="test.trouver")
+        def trouver(self, id_user):
+            return None
+
+    vider_caches()
+    assert DaoPartage.trouver.cache is DaoFactice.trouver.cache
+    dao.trouver(5)
+    assert DaoPartage().trouver(5) == {"id": 5, "nom": "a"}
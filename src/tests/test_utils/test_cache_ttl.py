@@ -0,0 +1,118 @@
+from utils.cache_ttl import CacheTTL
+
+
+class HorlogeFactice:
+    """Horloge contrôlée par le test (secondes)."""
+
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def test_lire_ecrire_et_compteurs():
+    cache = CacheTTL(taille_max=10, ttl=60)
+
+    assert cache.lire(1) == (False, None)
+    cache.ecrire(1, "a")
+    assert cache.lire(1) == (True, "a")
+
+    stats = cache.statistiques()
+    assert stats["succes"] == 1
+    assert stats["echecs"] == 1
+    assert stats["taux_succes"] == 0.5
+
+
+def test_expiration_ttl():
+    horloge = HorlogeFactice()
+    cache = CacheTTL(ttl=10, horloge=horloge)
+    cache.ecrire("k", 42)
+
+    horloge.t = 9.9
+    assert cache.lire("k") == (True, 42)
+    horloge.t = 10.0
+    assert cache.lire("k") == (False, None)
+    assert cache.statistiques()["expirations"] == 1
+
+
+def test_cache_negatif_a_son_propre_ttl():
+    """Une valeur None est conservée (« n'existe pas ») avec ttl_negatif."""
+    horloge = HorlogeFactice()
+    cache = CacheTTL(ttl=60, ttl_negatif=5, horloge=horloge)
+    cache.ecrire(999, None)
+
+    assert cache.lire(999) == (True, None)
+    horloge.t = 5
+    assert cache.lire(999) == (False, None)
+
+
+def test_cache_negatif_desactive():
+    cache = CacheTTL(ttl=60, ttl_negatif=0)
+    cache.ecrire(999, None)
+    assert cache.lire(999) == (False, None)
+
+
+def test_eviction_lru():
+    """L'entrée la moins récemment utilisée est évincée en premier."""
+    cache = CacheTTL(taille_max=2, ttl=60)
+    cache.ecrire(1, "a")
+    cache.ecrire(2, "b")
+    cache.lire(1)          # 1 devient la plus récente
+    cache.ecrire(3, "c")   # évince 2
+
+    assert cache.lire(2) == (False, None)
+    assert cache.lire(1) == (True, "a")
+    assert cache.statistiques()["evictions"] == 1
+
+
+def test_obtenir_charge_une_seule_fois():
+    cache = CacheTTL(ttl=60)
+    appels = []
+
+    def chargeur():
+        appels.append(1)
+        return "valeur"
+
+    assert cache.obtenir("k", chargeur) == "valeur"
+    assert cache.obtenir("k", chargeur) == "valeur"
+    assert len(appels) == 1
+
+
+def test_invalider():
+    cache = CacheTTL(ttl=60)
+    cache.ecrire(1, "a")
+
+    assert cache.invalider(1) is True
+    assert cache.invalider(1) is False
+    assert cache.lire(1) == (False, None)
+
+
+def test_invalidation_pendant_le_chargement():
+    """Une invalidation reçue pendant `chargeur()` n'est pas écrasée par l'ancienne valeur."""
+    cache = CacheTTL(ttl=60)
+
+    def chargeur():
+        cache.invalider("k")  # modification concurrente, après la lecture de la source
+        return "ancienne"
+
+    assert cache.obtenir("k", chargeur) == "ancienne"
+    assert cache.lire("k") == (False, None)
+    assert cache.obtenir("k", lambda: "nouvelle") == "nouvelle"
+    assert cache.lire("k") == (True, "nouvelle")
+
+
+def test_generation_perimee_par_vider_et_registre_borne():
+    cache = CacheTTL(taille_max=2, ttl=60)
+    generation = cache.generation()
+    cache.vider()
+    cache.ecrire("k", "ancienne", generation=generation)
+    assert cache.lire("k") == (False, None)
+
+    generation = cache.generation()
+    for cle in ("a", "b", "c"):  # "a" sort du registre : plancher relevé
+        cache.invalider(cle)
+    cache.ecrire("z", "ancienne", generation=generation)
+    assert cache.lire("z") == (False, None)
+    cache.ecrire("z", "nouvelle", generation=cache.generation())
+    assert cache.lire("z") == (True, "nouvelle")
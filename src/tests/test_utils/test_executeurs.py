@@ -0,0 +1,120 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from utils.executeurs import Executeur, executeur, metriques_executeurs
+
+
+def test_resultat_exception_et_metriques():
+    pool = Executeur("test", taille=2)
+
+    async def scenario():
+        assert await pool.executer(lambda a, b=0: a + b, 1, b=2) == 3
+        with pytest.raises(ValueError):
+            await pool.executer(lambda: (_ for _ in ()).throw(ValueError("base indisponible")))
+
+    asyncio.run(scenario())
+    pool.arreter()
+
+    m = pool.metriques()
+    assert m["taille"] == 2
+    assert m["executes"] == 2
+    assert m["erreurs"] == 1
+    assert m["en_attente"] == 0 and m["en_cours"] == 0
+    assert set(m["attente_ms"]) == {"moyenne", "max"}
+    assert m["execution_ms"]["max"] >= 0
+
+
+def test_taille_bornee_et_attente_mesuree():
+    pool = Executeur("test", taille=2)
+    actifs, max_actifs = [0], [0]
+    verrou = threading.Lock()
+
+    def travail():
+        with verrou:
+            actifs[0] += 1
+            max_actifs[0] = max(max_actifs[0], actifs[0])
+        time.sleep(0.05)
+        with verrou:
+            actifs[0] -= 1
+
+    async def scenario():
+        await asyncio.gather(*(pool.executer(travail) for _ in range(6)))
+
+    asyncio.run(scenario())
+    pool.arreter()
+
+    assert max_actifs[0] == 2
+    m = pool.metriques()
+    assert m["executes"] == 6
+    # Les 4 derniers appels ont attendu un thread libre
+    assert m["attente_ms"]["max"] >= 40
+    assert m["execution_ms"]["moyenne"] >= 40
+
+
+def test_rendu_lent_ne_bloque_ni_la_boucle_ni_la_base():
+    bdd = Executeur("bdd-test", taille=2)
+    rendu = Executeur("rendu-test", taille=1)
+    fin_rendu = threading.Event()
+
+    async def scenario():
+        lents = [asyncio.ensure_future(rendu.executer(fin_rendu.wait, 5)) for _ in range(3)]
+        debut = time.perf_counter()
+        # La boucle tourne et les lectures en base passent pendant les rendus
+        await asyncio.sleep(0.01)
+        lectures = await asyncio.gather(*(bdd.executer(lambda i=i: i) for i in range(10)))
+        duree = time.perf_counter() - debut
+        assert rendu.metriques()["en_attente"] == 2
+        fin_rendu.set()
+        await asyncio.gather(*lents)
+        return lectures, duree
+
+    lectures, duree = asyncio.run(scenario())
+    bdd.arreter()
+    rendu.arreter()
+
+    assert lectures == list(range(10))
+    assert duree < 1
+    assert rendu.metriques()["executes"] == 3
+
+
+def test_appel_annule_avant_demarrage_retire_de_la_file():
+    pool = Executeur("test", taille=1)
+    occupe = threading.Event()
+    appels = []
+
+    async def scenario():
+        premier = asyncio.ensure_future(pool.executer(occupe.wait, 5))
+        second = asyncio.ensure_future(pool.executer(appels.append, 1))
+        await asyncio.sleep(0.02)
+        second.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await second
+        occupe.set()
+        await premier
+
+    asyncio.run(scenario())
+    pool.arreter()
+
+    assert appels == []
+    m = pool.metriques()
+    assert m["annules"] == 1 and m["en_attente"] == 0
+
+
+def test_redemarrage_apres_arret():
+    pool = Executeur("test", taille=1)
+    assert asyncio.run(pool.executer(lambda: 1)) == 1
+    pool.arreter()
+    assert asyncio.run(pool.executer(lambda: 2)) == 2
+    pool.arreter()
+    assert pool.metriques()["executes"] == 2
+
+
+def test_executeurs_nommes(monkeypatch):
+    monkeypatch.setenv("EXECUTEUR_TEST_NOMME_TAILLE", "3")
+    e = executeur("test_nomme")
+    assert e is executeur("test_nomme")
+    assert e.taille == 3
+    assert "test_nomme" in metriques_executeurs()
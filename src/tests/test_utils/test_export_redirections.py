@@ -0,0 +1,64 @@
+import pytest
+
+from dao.qrcode_dao import QRCodeDao
+from utils.export_redirections import ExportRedirections
+from utils.reset_database import ResetDatabase
+
+
+@pytest.fixture(scope="function", autouse=True)
+def setup_test_environment():
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("POSTGRES_SCHEMA", "projet_test_dao")
+        ResetDatabase().lancer(test_dao=True)
+        yield
+
+
+def _lignes(chemin):
+    return chemin.read_text(encoding="utf-8").splitlines()[1:]
+
+
+def test_export_complet_puis_incremental(tmp_path):
+    chemin = tmp_path / "redirections.map"
+    export = ExportRedirections(str(chemin), recouvrement=0)
+    dao = QRCodeDao()
+
+    resultat = export.lancer()
+    assert resultat["entrees"] == 1
+    assert _lignes(chemin) == ['"/scan/2" "https://t.local/u2/b";']
+
+    # Rien n'a changé : aucune ligne relue, fichier conservé
+    inode = chemin.stat().st_ino
+    resultat = export.lancer()
+    assert resultat["changements"] == 0
+    assert not resultat["reecrit"]
+    assert chemin.stat().st_ino == inode
+
+    dao.modifier_qrc(1, 1, type_qrcode=False, url="t.local/statique")
+    dao.supprimer_qrc(2)
+    resultat = export.lancer()
+    assert resultat["changements"] == 2
+    assert _lignes(chemin) == ['"/scan/1" "http://t.local/statique";']
+
+    dao.modifier_qrc(1, 1, type_qrcode=True)
+    assert export.lancer()["entrees"] == 0
+    assert _lignes(chemin) == []
+
+
+def test_url_non_exportable_laissee_a_l_api(tmp_path):
+    chemin = tmp_path / "redirections.map"
+    QRCodeDao().modifier_qrc(2, 2, url='https://t.local/$var"')
+
+    resultat = ExportRedirections(str(chemin)).lancer()
+
+    assert resultat["ignorees"] == 1
+    assert _lignes(chemin) == []
+
+
+def test_map_illisible_reconstruite(tmp_path):
+    chemin = tmp_path / "redirections.map"
+    chemin.write_text("n'importe quoi\n", encoding="utf-8")
+
+    resultat = ExportRedirections(str(chemin)).lancer()
+
+    assert resultat["entrees"] == 1
+    assert _lignes(chemin) == ['"/scan/2" "https://t.local/u2/b";']
@@ -0,0 +1,173 @@
+import os
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+from utils.geolocalisation import (
+    GeolocalisationLocale,
+    GeolocalisationIpApi,
+    GeolocalisationEnCache,
+    ErreurGeolocalisation,
+    creer_fournisseur,
+    ip_vers_entier,
+    INCONNU,
+)
+
+JEU_DE_DONNEES = """ip_debut,ip_fin,pays,region,ville
+10.0.0.0,10.0.0.255,France,Bretagne,Rennes
+1.0.0.0,1.0.0.255,Australia,Queensland,Brisbane
+8.8.8.0,8.8.8.255,United States,California,Mountain View
+2001:db8::,2001:db8::ffff,France,Île-de-France,Paris
+pas-une-ip,1.2.3.4,X,Y,Z
+"""
+
+
+@pytest.fixture
+def fichier_geo(tmp_path):
+    chemin = tmp_path / "geoip.csv"
+    chemin.write_text(JEU_DE_DONNEES, encoding="utf-8")
+    return str(chemin)
+
+
+def test_ip_vers_entier():
+    assert ip_vers_entier("0.0.0.1") == (4, 1)
+    assert ip_vers_entier("::ffff:10.0.0.1") == ip_vers_entier("10.0.0.1")
+    assert ip_vers_entier("2001:db8::1")[0] == 6
+    with pytest.raises(ValueError):
+        ip_vers_entier("inconnu")
+
+
+def test_localiser_ipv4(fichier_geo):
+    moteur = GeolocalisationLocale(fichier_geo)
+
+    assert len(moteur) == 4
+    assert moteur.localiser("10.0.0.42") == ("France", "Bretagne", "Rennes")
+    assert moteur.localiser("10.0.0.255") == ("France", "Bretagne", "Rennes")
+    assert moteur.localiser("1.0.0.0") == ("Australia", "Queensland", "Brisbane")
+    assert moteur.localiser("10.0.1.0") == INCONNU
+    assert moteur.localiser("0.0.0.1") == INCONNU
+
+
+def test_localiser_ipv6_et_adresse_invalide(fichier_geo):
+    moteur = GeolocalisationLocale(fichier_geo)
+
+    assert moteur.localiser("2001:db8::abcd") == ("France", "Île-de-France", "Paris")
+    assert moteur.localiser("2001:db8::1:0") == INCONNU
+    assert moteur.localiser("inconnu") == INCONNU
+
+
+def test_fichier_absent_renvoie_inconnu(tmp_path):
+    moteur = GeolocalisationLocale(str(tmp_path / "absent.csv"))
+    assert moteur.localiser("10.0.0.1") == INCONNU
+
+
+def test_rechargement_a_chaud(fichier_geo):
+    """Une modification du fichier est prise en compte sans redémarrage."""
+    moteur = GeolocalisationLocale(fichier_geo, intervalle_verification_s=0)
+    assert moteur.localiser("10.0.0.1")[2] == "Rennes"
+
+    with open(fichier_geo, "w", encoding="utf-8") as f:
+        f.write("10.0.0.0,10.0.0.255,France,Bretagne,Brest\n")
+    os.utime(fichier_geo, (1, 1))  # force un mtime différent
+
+    # La vérification est lancée en arrière-plan : la recherche ne l'attend pas
+    moteur.localiser("10.0.0.1")
+    moteur._rechargement.join(5)
+    assert moteur.localiser("10.0.0.1")[2] == "Brest"
+    assert len(moteur) == 1
+
+
+def test_fichier_illisible_conserve_la_version_precedente(fichier_geo):
+    moteur = GeolocalisationLocale(fichier_geo, intervalle_verification_s=0)
+
+    with open(fichier_geo, "wb") as f:
+        f.write(b"10.0.0.0,10.0.0.255,France,Bretagne,\xff\xfe\n")  # UTF-8 invalide
+    os.utime(fichier_geo, (1, 1))
+
+    assert moteur.recharger() is False
+    assert moteur.localiser("10.0.0.1")[2] == "Rennes"
+    assert len(moteur) == 4
+
+
+def test_fichier_absent_repli_sur_ip_api(tmp_path, fichier_geo):
+    assert isinstance(creer_fournisseur("locale", str(tmp_path / "absent.csv")), GeolocalisationEnCache)
+    assert isinstance(creer_fournisseur("locale", fichier_geo), GeolocalisationLocale)
+
+
+def test_ip_api_erreur_reseau():
+    import requests
+    with patch("utils.geolocalisation.requests.get", side_effect=requests.exceptions.Timeout()):
+        assert GeolocalisationIpApi().localiser("8.8.8.8") == INCONNU
+
+
+def test_ip_api_succes():
+    reponse = MagicMock()
+    reponse.json.return_value = {"status": "success", "country": "France", "regionName": "Bretagne", "city": "Rennes"}
+    with patch("utils.geolocalisation.requests.get", return_value=reponse):
+        assert GeolocalisationIpApi().localiser("1.2.3.4") == ("France", "Bretagne", "Rennes")
+
+
+# --- Cache devant un fournisseur (GeolocalisationEnCache) ---
+
+def test_cache_exact_et_prefixe():
+    """Une adresse du même /24 est servie par le cache de préfixe."""
+    fournisseur = MagicMock()
+    fournisseur.localiser.return_value = ("France", "Bretagne", "Rennes")
+    cache = GeolocalisationEnCache(fournisseur)
+
+    assert cache.localiser("10.0.0.1") == ("France", "Bretagne", "Rennes")
+    assert cache.localiser("10.0.0.1") == ("France", "Bretagne", "Rennes")   # exact
+    assert cache.localiser("10.0.0.200") == ("France", "Bretagne", "Rennes")  # préfixe /24
+    cache.localiser("10.0.1.1")                                               # autre /24
+
+    assert fournisseur.localiser.call_count == 2
+    stats = cache.statistiques()
+    assert stats["succes_exact"] == 1
+    assert stats["succes_prefixe"] == 1
+    assert stats["appels_fournisseur"] == 2
+    assert stats["taux_succes"] == 0.5
+
+
+def test_cache_prefixe_ipv6_48():
+    fournisseur = MagicMock()
+    fournisseur.localiser.return_value = ("France", None, "Paris")
+    cache = GeolocalisationEnCache(fournisseur)
+
+    cache.localiser("2001:db8:1:1::1")
+    cache.localiser("2001:db8:1:ffff::1")  # même /48
+    cache.localiser("2001:db8:2::1")       # autre /48
+
+    assert fournisseur.localiser.call_count == 2
+
+
+def test_cache_negatif_erreur_fournisseur():
+    """Une erreur du fournisseur est mise en cache pour tout le préfixe."""
+    fournisseur = MagicMock()
+    fournisseur.localiser.side_effect = ErreurGeolocalisation("timeout")
+    cache = GeolocalisationEnCache(fournisseur)
+
+    assert cache.localiser("8.8.8.8") == INCONNU
+    assert cache.localiser("8.8.8.9") == INCONNU
+    assert cache.localiser("8.8.8.8") == INCONNU
+
+    assert fournisseur.localiser.call_count == 1
+    assert cache.statistiques()["erreurs_fournisseur"] == 1
+
+
+def test_cache_adresse_inconnue_reste_au_niveau_exact():
+    """Une adresse absente du fournisseur ne masque pas ses voisines."""
+    fournisseur = MagicMock()
+    fournisseur.localiser.side_effect = [INCONNU, ("France", "Bretagne", "Rennes")]
+    cache = GeolocalisationEnCache(fournisseur)
+
+    assert cache.localiser("10.0.0.1") == INCONNU
+    assert cache.localiser("10.0.0.1") == INCONNU
+    assert cache.localiser("10.0.0.2") == ("France", "Bretagne", "Rennes")
+    assert fournisseur.localiser.call_count == 2
+
+
+def test_ip_api_lever_erreurs():
+    import requests
+    with patch("utils.geolocalisation.requests.get", side_effect=requests.exceptions.Timeout()):
+        with pytest.raises(ErreurGeolocalisation):
+            GeolocalisationIpApi(lever_erreurs=True).localiser("8.8.8.8")
@@ -0,0 +1,58 @@
+import os
+from datetime import datetime, timezone
+
+from business_object.log_scan import LogScan
+from utils.journal_scans import JournalScans, decoder, encoder
+
+
+def test_encoder_decoder_aller_retour():
+    date_scan = datetime(2025, 11, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    log_scan = LogScan(
+        id_qrcode=7,
+        client_host="1.2.3.4",
+        user_agent="Mozilla\t5.0\n",
+        referer=None,
+        accept_language="fr-FR",
+        geo_city="Rennes",
+        date_scan=date_scan,
+        geo_enrichi=False,
+    )
+
+    (lu,), ignores = decoder(encoder(log_scan) + encoder(LogScan(id_qrcode=8, date_scan=date_scan))[:-1])
+
+    assert ignores > 0  # second enregistrement tronqué
+    assert lu.id_qrcode == 7
+    assert lu.date_scan == date_scan
+    assert lu.user_agent == "Mozilla\t5.0\n"
+    assert lu.referer is None
+    assert lu.geo_city == "Rennes"
+    assert lu.geo_enrichi is False
+
+
+def test_segment_actif_non_reserve_puis_scelle(tmp_path):
+    journal = JournalScans(str(tmp_path))
+    journal.ajouter(LogScan(id_qrcode=1))
+    journal.ajouter(LogScan(id_qrcode=2))
+    (nom,) = journal.segments()
+
+    with journal.reserver(nom) as contenu:
+        assert contenu is None  # en cours d'écriture
+
+    assert journal.sceller() == nom
+    with journal.reserver(nom) as contenu:
+        logs, ignores = contenu
+        assert [ls.id_qrcode for ls in logs] == [1, 2]
+        assert ignores == 0
+        journal.supprimer(nom)
+    assert journal.segments() == []
+
+
+def test_rotation_par_taille(tmp_path):
+    journal = JournalScans(str(tmp_path), taille_segment_max=1024)
+    for _ in range(50):
+        journal.ajouter(LogScan(id_qrcode=1, user_agent="x" * 100))
+
+    assert len(journal.segments()) > 1
+    assert journal.taille_en_attente() == sum(
+        os.path.getsize(tmp_path / nom) for nom in journal.segments()
+    )
@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from utils.single_flight import SingleFlight
+
+
+def test_appels_synchrones_concurrents_partages():
+    vols = SingleFlight()
+    appels = []
+    depart = threading.Event()
+
+    def lecture():
+        appels.append(1)
+        depart.wait(1)
+        return "cible"
+
+    resultats = []
+    threads = [threading.Thread(target=lambda: resultats.append(vols.executer(1, lecture))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    while vols.statistiques()["partages"] < 7:
+        time.sleep(0.001)
+    depart.set()
+    for t in threads:
+        t.join()
+
+    assert resultats == ["cible"] * 8
+    assert len(appels) == 1
+    assert vols.statistiques() == {"executions": 1, "partages": 7, "en_cours": 0}
+
+    # La clé est libérée : l'appel suivant est de nouveau exécuté
+    assert vols.executer(1, lambda: "autre") == "autre"
+
+
+def test_exception_partagee_puis_cle_liberee():
+    vols = SingleFlight()
+    with pytest.raises(ValueError):
+        vols.executer("k", lambda: (_ for _ in ()).throw(ValueError("base indisponible")))
+    assert vols.executer("k", lambda: 1) == 1
+
+
+def test_appels_asynchrones_concurrents_partages():
+    vols = SingleFlight()
+    appels = []
+
+    async def lecture(valeur):
+        appels.append(valeur)
+        await asyncio.sleep(0.01)
+        return valeur
+
+    async def scenario():
+        meme_cle = [vols.executer_async(1, lambda: lecture("a")) for _ in range(5)]
+        autre_cle = vols.executer_async(2, lambda: lecture("b"))
+        return await asyncio.gather(*meme_cle, autre_cle)
+
+    assert asyncio.run(scenario()) == ["a"] * 5 + ["b"]
+    assert appels == ["a", "b"]
+    assert vols.statistiques()["partages"] == 4
+
+
+def test_annulation_du_meneur_ne_prive_pas_les_suiveurs():
+    vols = SingleFlight()
+
+    async def lecture():
+        await asyncio.sleep(0.01)
+        return 42
+
+    async def scenario():
+        meneur = asyncio.ensure_future(vols.executer_async(1, lecture))
+        await asyncio.sleep(0)
+        suiveur = asyncio.ensure_future(vols.executer_async(1, lecture))
+        await asyncio.sleep(0)
+        meneur.cancel()
+        return await suiveur
+
+    assert asyncio.run(scenario()) == 42
+
+
+def test_oublier_lance_un_nouvel_appel():
+    vols = SingleFlight()
+
+    async def scenario():
+        ancien = asyncio.ensure_future(vols.executer_async(1, lambda: asyncio.sleep(0.01, "ancien")))
+        await asyncio.sleep(0)
+        vols.oublier(1)
+        nouveau = await vols.executer_async(1, lambda: asyncio.sleep(0, "nouveau"))
+        return await ancien, nouveau
+
+    assert asyncio.run(scenario()) == ("ancien", "nouveau")
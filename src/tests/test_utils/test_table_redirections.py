@@ -0,0 +1,104 @@
+import os
+
+from utils.table_redirections import Redirection, TableRedirections
+
+
+def _table(tmp_path):
+    # verification_s=0 : chaque recherche détecte un fichier remplacé
+    return TableRedirections(str(tmp_path / "redirections.bin"), verification_s=0)
+
+
+def test_construire_et_chercher(tmp_path):
+    table = _table(tmp_path)
+
+    nb = table.construire([
+        (1, "https://ex.com", True, 3, 1, None),
+        (4, "ex.org/page", False, 7, 2, 3600),
+    ])
+
+    assert nb == 2
+    assert len(table) == 5
+    assert table.chercher(1) == Redirection("https://ex.com", True, 3)
+    # URL sans schéma normalisée
+    assert table.chercher(4) == Redirection("http://ex.org/page", False, 7, 2, 3600)
+    assert table.chercher(2) is None
+    assert table.chercher(99) is None
+    assert table.statistiques()["succes"] == 2
+    assert table.statistiques()["echecs"] == 2
+
+
+def test_table_absente(tmp_path):
+    table = _table(tmp_path)
+
+    assert table.chercher(1) is None
+    assert len(table) == 0
+
+
+def test_mettre_a_jour_modifie_ajoute_et_supprime(tmp_path):
+    table = _table(tmp_path)
+    table.construire([(1, "https://ex.com", True, 3, 1, None)])
+
+    table.mettre_a_jour(1, "https://nouveau.com", False, 3, version=2, cache_max_age=0)
+    table.mettre_a_jour(10, "https://dix.com", True, 5)
+    table.mettre_a_jour(42, None)
+
+    assert table.chercher(1) == Redirection("https://nouveau.com", False, 3, 2, 0)
+    assert table.chercher(10) == Redirection("https://dix.com", True, 5)
+    assert len(table) == 11
+
+    table.mettre_a_jour(10, None)
+    assert table.chercher(10) is None
+
+
+def test_mettre_a_jour_sans_table_existante(tmp_path):
+    table = _table(tmp_path)
+
+    table.mettre_a_jour(2, "https://ex.com", True, 1)
+
+    assert table.chercher(2) == Redirection("https://ex.com", True, 1)
+
+
+def test_un_autre_lecteur_voit_les_modifications(tmp_path):
+    """Deux instances (deux workers) partagent le même fichier."""
+    ecrivain = _table(tmp_path)
+    lecteur = _table(tmp_path)
+    ecrivain.construire([(1, "https://ex.com", True, 3, 1, None)])
+    assert lecteur.chercher(1).url == "https://ex.com"
+
+    ecrivain.mettre_a_jour(1, "https://autre.com", True, 3)
+
+    assert lecteur.chercher(1).url == "https://autre.com"
+    assert lecteur.statistiques()["rechargements"] == 2
+
+
+def test_fichier_invalide_ignore(tmp_path):
+    chemin = tmp_path / "redirections.bin"
+    chemin.write_bytes(b"pas une table de redirections")
+    table = TableRedirections(str(chemin), verification_s=0)
+
+    assert table.chercher(1) is None
+    assert not [f for f in os.listdir(tmp_path) if f.startswith(".redirections-")]
+
+
+def test_blob_compacte_apres_modifications(tmp_path):
+    """Les URL remplacées ne s'accumulent pas : le fichier reste borné."""
+    table = _table(tmp_path)
+    table.construire([(1, "https://ex.com/a", True, 3, 1, None), (2, "https://ex.com/b", False, 4, 1, None)])
+
+    for i in range(200):
+        table.mettre_a_jour(1, f"https://ex.com/a/{i:04d}", True, 3, version=i + 2)
+
+    assert table.chercher(1) == Redirection("https://ex.com/a/0199", True, 3, 201)
+    assert table.chercher(2) == Redirection("https://ex.com/b", False, 4)
+    vivantes = len("https://ex.com/a/0199") + len("https://ex.com/b")
+    assert os.path.getsize(tmp_path / "redirections.bin") < 1024 + 2 * vivantes
+
+
+def test_ids_du_proprietaire(tmp_path):
+    table = _table(tmp_path)
+    table.construire([(1, "https://a.com", True, 3, 1, None), (2, "https://b.com", True, 4, 1, None),
+                      (5, "https://c.com", False, 3, 1, None)])
+    table.mettre_a_jour(5, None)
+
+    assert table.ids_du_proprietaire(3) == [1]
+    assert table.ids_du_proprietaire(9) == []
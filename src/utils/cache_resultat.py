@@ -0,0 +1,213 @@
+import inspect
+import os
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Protocol, Tuple
+
+from utils.cache_ttl import CacheTTL
+
+# Valeurs par défaut des caches de DAO (DAO_CACHE_TTL_S = 0 les désactive tous)
+TTL_DEFAUT_S = float(os.getenv("DAO_CACHE_TTL_S", 30))
+TAILLE_DEFAUT = int(os.getenv("DAO_CACHE_TAILLE", 10000))
+
+
+class BackendCache(Protocol):
+    """
+    Stockage utilisé par `cache_resultat`.
+
+    CacheTTL (LRU en mémoire du processus) est le backend par défaut ; un
+    backend partagé entre processus (ex. Redis) doit offrir les mêmes méthodes.
+    """
+
+    def lire(self, cle: Hashable) -> Tuple[bool, Any]: ...
+
+    def ecrire(self, cle: Hashable, valeur: Any, ttl: Optional[float] = None) -> None: ...
+
+    def invalider(self, cle: Hashable) -> bool: ...
+
+    def vider(self) -> None: ...
+
+    def statistiques(self) -> dict: ...
+
+
+class _RegistreTags:
+    """
+    Générations des tags invalidés.
+
+    Chaque invalidation attribue au tag un numéro croissant ; une entrée
+    mémorise le numéro courant au début de son chargement et n'est valide que
+    si aucun de ses tags n'a été invalidé depuis (y compris pendant le
+    chargement). Le registre est borné : le numéro d'un tag oublié devient
+    le plancher sous lequel toute entrée est considérée comme périmée.
+    """
+
+    def __init__(self, taille_max: int = 100_000):
+        self.taille_max = taille_max
+        self._numero = 0
+        self._plancher = 0
+        self._tags: "OrderedDict[str, int]" = OrderedDict()
+        self._verrou = threading.Lock()
+
+    def courant(self) -> int:
+        with self._verrou:
+            return self._numero
+
+    def invalider(self, tags: Iterable[str]) -> None:
+        with self._verrou:
+            for tag in tags:
+                self._numero += 1
+                self._tags[tag] = self._numero
+                self._tags.move_to_end(tag)
+            while len(self._tags) > self.taille_max:
+                _, numero = self._tags.popitem(last=False)
+                self._plancher = max(self._plancher, numero)
+
+    def tout_invalider(self) -> None:
+        with self._verrou:
+            self._numero += 1
+            self._plancher = self._numero
+
+    def valide(self, tags: Iterable[str], numero: int) -> bool:
+        with self._verrou:
+            if numero < self._plancher:
+                return False
+            return all(self._tags.get(tag, 0) <= numero for tag in tags)
+
+
+_registre = _RegistreTags()
+_caches: Dict[str, BackendCache] = {}
+
+
+def cache_resultat(
+    ttl: Optional[float] = None,
+    taille_max: Optional[int] = None,
+    cle: Optional[Callable[..., Hashable]] = None,
+    tags: Optional[Callable[..., Iterable[str]]] = None,
+    cacher_si: Callable[[Any], bool] = lambda resultat: resultat is not None,
+    copier: Optional[Callable[[Any], Any]] = None,
+    backend: Optional[BackendCache] = None,
+    nom: Optional[str] = None,
+):
+    """
+    Décorateur de mise en cache « read-through » d'une méthode de DAO
+    (synchrone ou coroutine).
+
+    À placer sous `@log` : un appel servi par le cache reste journalisé.
+
+    Paramètres
+    ----------
+    ttl : float, optionnel
+        Durée de vie (s) d'un résultat (défaut DAO_CACHE_TTL_S) ; 0 désactive le cache.
+    taille_max : int, optionnel
+        Nombre maximal de résultats conservés par le backend par défaut
+        (défaut DAO_CACHE_TAILLE).
+    cle : Callable, optionnel
+        Calcule la clé à partir des arguments de la méthode (sans self) ;
+        par défaut, les arguments positionnels et nommés.
+    tags : Callable, optionnel
+        Calcule, à partir des mêmes arguments, les tags de l'entrée
+        (ex. "utilisateur:3") ; `invalider_tag` périme toutes les entrées
+        qui portent un tag.
+    cacher_si : Callable[[Any], bool], optionnel
+        Résultats à conserver ; par défaut tous sauf None (les DAO renvoient
+        None en cas d'erreur).
+    copier : Callable, optionnel
+        Copie appliquée au résultat conservé et à chaque résultat servi par
+        le cache (ex. `copy.copy`) quand les appelants peuvent le modifier.
+    backend : BackendCache, optionnel
+        Stockage ; par défaut un CacheTTL propre à la méthode. Deux méthodes
+        équivalentes (ex. variantes synchrone et asynchrone) peuvent partager
+        le même (`backend=Classe.methode.cache`, même `nom`).
+    nom : str, optionnel
+        Nom du cache dans `statistiques_caches()` (défaut : Classe.methode).
+
+    Notes
+    -----
+    `methode.precharger(resultat, *args)` insère un résultat déjà connu.
+    Sans `copier`, les résultats en cache sont partagés entre appelants :
+    ils ne doivent pas être modifiés.
+    """
+
+    duree = TTL_DEFAUT_S if ttl is None else float(ttl)
+
+    def decorateur(func):
+        nom_cache = nom or func.__qualname__
+        # `is None` : un CacheTTL vide est faux (__len__), il doit quand même être partagé
+        stockage = backend if backend is not None else CacheTTL(taille_max=taille_max or TAILLE_DEFAUT, ttl=duree, ttl_negatif=0)
+        _caches[nom_cache] = stockage
+
+        def cle_de(args, kwargs):
+            if cle is not None:
+                return nom_cache, cle(*args, **kwargs)
+            return nom_cache, args, tuple(sorted(kwargs.items()))
+
+        def lire(args, kwargs):
+            """Retourne (clé, trouvé, valeur) ; une entrée dont un tag a été invalidé est évincée."""
+            cle_entree = cle_de(args, kwargs)
+            trouve, entree = stockage.lire(cle_entree)
+            if trouve:
+                numero, valeur = entree
+                if _registre.valide(tags(*args, **kwargs) if tags is not None else (), numero):
+                    return cle_entree, True, copier(valeur) if copier is not None else valeur
+                stockage.invalider(cle_entree)
+            return cle_entree, False, None
+
+        def ecrire(cle_entree, numero, valeur) -> None:
+            if cacher_si(valeur):
+                stockage.ecrire(cle_entree, (numero, copier(valeur) if copier is not None else valeur), ttl=duree)
+
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def wrapper(self, *args, **kwargs):
+                if duree <= 0:
+                    return await func(self, *args, **kwargs)
+                cle_entree, trouve, valeur = lire(args, kwargs)
+                if trouve:
+                    return valeur
+                # Numéro relevé avant la lecture : une invalidation pendant celle-ci périme l'entrée
+                numero = _registre.courant()
+                valeur = await func(self, *args, **kwargs)
+                ecrire(cle_entree, numero, valeur)
+                return valeur
+        else:
+            @wraps(func)
+            def wrapper(self, *args, **kwargs):
+                if duree <= 0:
+                    return func(self, *args, **kwargs)
+                cle_entree, trouve, valeur = lire(args, kwargs)
+                if trouve:
+                    return valeur
+                numero = _registre.courant()
+                valeur = func(self, *args, **kwargs)
+                ecrire(cle_entree, numero, valeur)
+                return valeur
+
+        def precharger(valeur, *args, **kwargs) -> None:
+            """Insère le résultat connu d'un appel (ex. lu en lot lors du préchauffage)."""
+            if duree > 0:
+                ecrire(cle_de(args, kwargs), _registre.courant(), valeur)
+
+        wrapper.cache = stockage
+        wrapper.precharger = precharger
+        return wrapper
+
+    return decorateur
+
+
+def invalider_tag(*tags: str) -> None:
+    """Périme, dans tous les caches, les entrées portant l'un des tags."""
+    _registre.invalider(tags)
+
+
+def vider_caches() -> None:
+    """Vide tous les caches de résultats (ex. après une réinitialisation de la base)."""
+    # Les lectures en cours ne pourront pas réinsérer une valeur antérieure
+    _registre.tout_invalider()
+    for stockage in _caches.values():
+        stockage.vider()
+
+
+def statistiques_caches() -> Dict[str, dict]:
+    """Compteurs (succès, échecs, taille…) de chaque cache de résultats."""
+    return {nom_cache: stockage.statistiques() for nom_cache, stockage in _caches.items()}
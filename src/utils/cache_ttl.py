@@ -0,0 +1,177 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+
+class CacheTTL:
+    """
+    Cache mémoire borné (LRU) avec durée de vie (TTL) par entrée.
+
+    - taille_max : nombre maximal d'entrées ; au-delà, la moins récemment
+      utilisée est évincée.
+    - ttl : durée de vie (secondes) d'une entrée.
+    - ttl_negatif : durée de vie d'une entrée dont la valeur est None
+      (cache négatif : « cet identifiant n'existe pas »). 0 désactive le cache négatif.
+
+    Thread-safe. Les compteurs (succès, échecs, évictions, expirations)
+    sont exposés par `statistiques()`.
+
+    Générations : chaque invalidation attribue à la clé un numéro croissant.
+    Un chargeur relève `generation()` avant de lire la source et le passe à
+    `ecrire` : si la clé a été invalidée entre-temps, la valeur (lue avant la
+    modification) n'est pas mise en cache. Les numéros des clés invalidées
+    sont bornés à `taille_max` ; celui d'une clé oubliée devient le plancher
+    sous lequel toute écriture est refusée.
+    """
+
+    def __init__(
+        self,
+        taille_max: int = 1024,
+        ttl: float = 60.0,
+        ttl_negatif: Optional[float] = None,
+        horloge: Callable[[], float] = time.monotonic,
+    ):
+        self.taille_max = max(1, int(taille_max))
+        self.ttl = float(ttl)
+        self.ttl_negatif = self.ttl if ttl_negatif is None else float(ttl_negatif)
+        self._horloge = horloge
+        self._entrees: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._verrou = threading.Lock()
+        self._numero = 0
+        self._plancher = 0
+        self._invalidees: "OrderedDict[Hashable, int]" = OrderedDict()
+
+        self._succes = 0
+        self._echecs = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    def lire(self, cle: Hashable) -> Tuple[bool, Any]:
+        """
+        Lit une entrée.
+
+        Retour
+        ------
+        Tuple[bool, Any]
+            (True, valeur) si l'entrée est présente et non expirée
+            (la valeur peut être None : entrée négative),
+            (False, None) sinon.
+        """
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is None:
+                self._echecs += 1
+                return False, None
+            expiration, valeur = entree
+            if expiration <= self._horloge():
+                del self._entrees[cle]
+                self._expirations += 1
+                self._echecs += 1
+                return False, None
+            self._entrees.move_to_end(cle)
+            self._succes += 1
+            return True, valeur
+
+    def generation(self) -> int:
+        """Numéro courant, à relever avant de charger une valeur (voir `ecrire`)."""
+        with self._verrou:
+            return self._numero
+
+    def ecrire(self, cle: Hashable, valeur: Any, ttl: Optional[float] = None,
+               generation: Optional[int] = None) -> None:
+        """
+        Écrit une entrée.
+
+        Paramètres
+        ----------
+        cle : Hashable
+            Clé de l'entrée.
+        valeur : Any
+            Valeur ; None est mise en cache négatif (ttl_negatif).
+        ttl : float, optionnel
+            Durée de vie spécifique à cette entrée (secondes).
+        generation : int, optionnel
+            Numéro relevé par `generation()` avant le chargement de la valeur ;
+            l'écriture est ignorée si la clé a été invalidée depuis.
+        """
+        if ttl is None:
+            ttl = self.ttl_negatif if valeur is None else self.ttl
+        if ttl <= 0:
+            return
+        with self._verrou:
+            if generation is not None and (
+                generation < self._plancher or self._invalidees.get(cle, 0) > generation
+            ):
+                return
+            self._entrees[cle] = (self._horloge() + ttl, valeur)
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille_max:
+                self._entrees.popitem(last=False)
+                self._evictions += 1
+
+    def obtenir(self, cle: Hashable, chargeur: Callable[[], Any]) -> Any:
+        """
+        Lecture « read-through » : renvoie la valeur en cache, sinon appelle
+        `chargeur()`, met le résultat en cache et le renvoie.
+
+        Une invalidation de la clé pendant `chargeur()` n'est pas écrasée :
+        le résultat est renvoyé mais pas mis en cache.
+        """
+        trouve, valeur = self.lire(cle)
+        if trouve:
+            return valeur
+        generation = self.generation()
+        valeur = chargeur()
+        self.ecrire(cle, valeur, generation=generation)
+        return valeur
+
+    def invalider(self, cle: Hashable) -> bool:
+        """Supprime une entrée (et périme ses chargements en cours). Retourne True si elle était présente."""
+        with self._verrou:
+            self._numero += 1
+            self._invalidees[cle] = self._numero
+            self._invalidees.move_to_end(cle)
+            while len(self._invalidees) > self.taille_max:
+                _, numero = self._invalidees.popitem(last=False)
+                self._plancher = max(self._plancher, numero)
+            present = self._entrees.pop(cle, None) is not None
+            if present:
+                self._invalidations += 1
+            return present
+
+    def vider(self) -> None:
+        """Supprime toutes les entrées (les compteurs sont conservés)."""
+        with self._verrou:
+            self._invalidations += len(self._entrees)
+            self._entrees.clear()
+            self._numero += 1
+            self._plancher = self._numero
+            self._invalidees.clear()
+
+    def __len__(self) -> int:
+        return len(self._entrees)
+
+    def statistiques(self) -> dict:
+        """
+        Retourne les compteurs du cache.
+
+        Retour
+        ------
+        dict
+            taille, taille_max, succes, echecs, taux_succes, evictions,
+            expirations, invalidations.
+        """
+        with self._verrou:
+            total = self._succes + self._echecs
+            return {
+                "taille": len(self._entrees),
+                "taille_max": self.taille_max,
+                "succes": self._succes,
+                "echecs": self._echecs,
+                "taux_succes": round(self._succes / total, 4) if total else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "invalidations": self._invalidations,
+            }
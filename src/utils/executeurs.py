@@ -0,0 +1,194 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# Taille par défaut des exécuteurs nommés (EXECUTEUR_<NOM>_TAILLE la remplace)
+TAILLES_DEFAUT = {
+    # Travail bloquant en base (psycopg2) : autant de threads que de connexions
+    "bdd": int(os.getenv("POSTGRES_POOL_MAX", 10)),
+    # Rendu d'images (PIL) : gourmand en CPU, peu de threads suffisent
+    "rendu": 2,
+}
+
+
+class Executeur:
+    """
+    Pool de threads borné et nommé, attendu par les routes asynchrones.
+
+    Les appels bloquants (requêtes psycopg2, rendu PIL, appels HTTP) qui
+    s'exécuteraient sur la boucle d'événements y sont déportés : la boucle
+    continue de servir les autres requêtes (scans) pendant ce temps. Deux
+    exécuteurs séparés (base, rendu) évitent qu'une rafale de rendus lents
+    occupe tous les threads des lectures en base.
+
+    Le pool est créé au premier appel et recréé après `arreter()`.
+    L'attente en file (soumission -> début) et la durée d'exécution de
+    chaque appel sont mesurées et exposées par `metriques()`.
+    """
+
+    def __init__(self, nom: str, taille: int):
+        """
+        Paramètres
+        ----------
+        nom : str
+            Nom de l'exécuteur (préfixe des threads, clé des métriques).
+        taille : int
+            Nombre maximal de threads ; les appels au-delà attendent en file.
+        """
+        self.nom = nom
+        self.taille = max(1, int(taille))
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._verrou = threading.Lock()
+
+        # --- Compteurs ---
+        self._en_attente = 0
+        self._en_cours = 0
+        self._nb_executes = 0
+        self._nb_erreurs = 0
+        self._nb_annules = 0
+        self._attente_totale_ms = 0.0
+        self._attente_max_ms = 0.0
+        self._execution_totale_ms = 0.0
+        self._execution_max_ms = 0.0
+
+    def _obtenir_pool(self) -> ThreadPoolExecutor:
+        with self._verrou:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.taille, thread_name_prefix=f"executeur-{self.nom}"
+                )
+            return self._pool
+
+    async def executer(self, fonction: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Exécute `fonction(*args, **kwargs)` dans un thread du pool et attend son résultat.
+
+        Retour
+        ------
+        Any
+            Le résultat de la fonction ; son exception est relancée.
+
+        Notes
+        -----
+        Comme `asyncio.to_thread`, la fonction voit les variables de contexte
+        de l'appelant. Un appel annulé avant d'avoir démarré est retiré de
+        la file ; déjà démarré, il va à son terme.
+        """
+        contexte = contextvars.copy_context()
+        soumission = time.perf_counter()
+
+        def tache():
+            debut = time.perf_counter()
+            with self._verrou:
+                self._en_attente -= 1
+                self._en_cours += 1
+                attente_ms = (debut - soumission) * 1000
+                self._attente_totale_ms += attente_ms
+                self._attente_max_ms = max(self._attente_max_ms, attente_ms)
+            succes = False
+            try:
+                resultat = contexte.run(fonction, *args, **kwargs)
+                succes = True
+                return resultat
+            finally:
+                execution_ms = (time.perf_counter() - debut) * 1000
+                with self._verrou:
+                    self._en_cours -= 1
+                    self._nb_executes += 1
+                    if not succes:
+                        self._nb_erreurs += 1
+                    self._execution_totale_ms += execution_ms
+                    self._execution_max_ms = max(self._execution_max_ms, execution_ms)
+
+        pool = self._obtenir_pool()
+        with self._verrou:
+            self._en_attente += 1
+        try:
+            futur = pool.submit(tache)
+        except RuntimeError:
+            # Pool arrêté entre-temps : en_attente reste juste
+            with self._verrou:
+                self._en_attente -= 1
+            raise
+        try:
+            return await asyncio.wrap_future(futur)
+        except asyncio.CancelledError:
+            if futur.cancel():
+                with self._verrou:
+                    self._en_attente -= 1
+                    self._nb_annules += 1
+            raise
+
+    def arreter(self, attendre: bool = True) -> None:
+        """Arrête les threads (après les appels en cours et en file si `attendre`)."""
+        with self._verrou:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=attendre)
+
+    def metriques(self) -> dict:
+        """
+        Retourne les compteurs.
+
+        Retour
+        ------
+        dict
+            taille, en_attente, en_cours, saturation (en_cours / taille),
+            executes, erreurs, annules, attente_ms et execution_ms (moyenne / max).
+        """
+        with self._verrou:
+            termines = self._nb_executes
+            return {
+                "taille": self.taille,
+                "en_attente": self._en_attente,
+                "en_cours": self._en_cours,
+                "saturation": round(self._en_cours / self.taille, 3),
+                "executes": termines,
+                "erreurs": self._nb_erreurs,
+                "annules": self._nb_annules,
+                "attente_ms": {
+                    "moyenne": round(self._attente_totale_ms / termines, 3) if termines else 0.0,
+                    "max": round(self._attente_max_ms, 3),
+                },
+                "execution_ms": {
+                    "moyenne": round(self._execution_totale_ms / termines, 3) if termines else 0.0,
+                    "max": round(self._execution_max_ms, 3),
+                },
+            }
+
+
+_executeurs: Dict[str, Executeur] = {}
+_verrou_registre = threading.Lock()
+
+
+def executeur(nom: str) -> Executeur:
+    """
+    Exécuteur nommé du processus, créé à la première demande.
+
+    Sa taille est lue dans EXECUTEUR_<NOM>_TAILLE (ex. EXECUTEUR_BDD_TAILLE),
+    sinon dans TAILLES_DEFAUT (4 pour un nom inconnu).
+    """
+    with _verrou_registre:
+        if nom not in _executeurs:
+            taille = int(os.getenv(f"EXECUTEUR_{nom.upper()}_TAILLE", TAILLES_DEFAUT.get(nom, 4)))
+            _executeurs[nom] = Executeur(nom, taille)
+        return _executeurs[nom]
+
+
+def arreter_executeurs() -> None:
+    """Arrête les threads de tous les exécuteurs (recréés au prochain appel)."""
+    with _verrou_registre:
+        executeurs = list(_executeurs.values())
+    for e in executeurs:
+        e.arreter()
+
+
+def metriques_executeurs() -> Dict[str, dict]:
+    """Compteurs de chaque exécuteur nommé."""
+    with _verrou_registre:
+        executeurs = dict(_executeurs)
+    return {nom: e.metriques() for nom, e in executeurs.items()}
@@ -0,0 +1,160 @@
+# utils/export_redirections.py
+import argparse
+import logging
+import os
+import re
+import tempfile
+from typing import Dict, Optional, Tuple
+
+import dotenv
+
+from dao.qrcode_dao import QRCodeDao
+from utils.table_redirections import normaliser_url
+
+logger = logging.getLogger(__name__)
+
+_ENTETE = "# export_redirections revision={revision}\n"
+_MOTIF_ENTETE = re.compile(r"^# export_redirections revision=(\d+)$")
+_MOTIF_LIGNE = re.compile(r'^"([^"]*)" "([^"]*)";$')
+# Caractères acceptés dans une valeur de map nginx entre guillemets
+# ($ y serait interprété comme une variable ; ces QR restent servis par l'API)
+_URL_EXPORTABLE = re.compile(r"^[!#%&'()*+,\-./0-9:;=?@A-Z\[\]_a-z~]+$")
+
+
+class ExportRedirections:
+    """
+    Export des redirections des QR codes statiques (type_qrcode = False) vers
+    un fichier de map de reverse proxy, pour que `/scan/{id}` soit servi sans
+    passer par l'application.
+
+    Format (directive `map` de nginx, à inclure) :
+
+        # export_redirections revision=<filigrane>
+        "/scan/2" "https://exemple.com/page";
+
+    - Incrémental : la révision exportée est le filigrane (qrcode.revision,
+      alimentée par qrcode_revision_seq). Un export ne lit que les QR codes
+      modifiés ou supprimés depuis : son coût est proportionnel aux changements.
+    - Atomique : le fichier est réécrit dans un temporaire puis remplacé par
+      `os.replace`, et seulement s'il a changé ; le proxy voit l'ancienne ou
+      la nouvelle map, jamais un fichier partiel.
+    - Les `recouvrement` dernières révisions sont relues à chaque export :
+      une transaction validée après une autre de révision plus élevée n'est
+      pas manquée (appliquer deux fois un changement est sans effet).
+    """
+
+    def __init__(self, chemin: str, prefixe: str = "/scan/", recouvrement: int = 1000,
+                 dao: Optional[QRCodeDao] = None):
+        self.chemin = chemin
+        self.prefixe = prefixe
+        self.recouvrement = max(0, int(recouvrement))
+        self._dao = dao
+
+    def lancer(self, complet: bool = False) -> dict:
+        """
+        Met à jour le fichier de map.
+
+        Paramètres
+        ----------
+        complet : bool, par défaut False
+            Ignore le fichier existant et relit toute la table.
+
+        Retour
+        ------
+        dict
+            revision (nouveau filigrane), entrees, changements (lignes lues),
+            ignorees (URL non exportables, laissées à l'API), reecrit.
+        """
+        entrees, revision_initiale = ({}, 0) if complet else self._lire()
+        depuis = max(0, revision_initiale - self.recouvrement)
+        initiales = dict(entrees)
+        revision = revision_initiale
+
+        nb_changements = 0
+        ignorees = set()
+        for id_qrcode, url, rev in (self._dao or QRCodeDao()).iterer_redirections_statiques(depuis):
+            nb_changements += 1
+            revision = max(revision, rev)
+            url = normaliser_url(url) if url is not None else None
+            if url is not None and not _URL_EXPORTABLE.match(url):
+                ignorees.add(id_qrcode)
+                url = None
+            else:
+                ignorees.discard(id_qrcode)
+            if url is None:
+                entrees.pop(id_qrcode, None)
+            else:
+                entrees[id_qrcode] = url
+
+        reecrit = (complet or entrees != initiales or revision != revision_initiale
+                   or not os.path.exists(self.chemin))
+        if reecrit:
+            self._ecrire(entrees, revision)
+        if ignorees:
+            logger.warning(f"{len(ignorees)} redirection(s) non exportable(s), servie(s) par l'API : {sorted(ignorees)}")
+        logger.info(
+            f"Export des redirections : {nb_changements} changement(s) depuis la révision {depuis}, "
+            f"{len(entrees)} entrée(s), révision {revision}"
+        )
+        return {
+            "revision": revision,
+            "entrees": len(entrees),
+            "changements": nb_changements,
+            "ignorees": len(ignorees),
+            "reecrit": reecrit,
+        }
+
+    # ------------------------------------------------------------------
+    # Fichier
+    # ------------------------------------------------------------------
+
+    def _lire(self) -> Tuple[Dict[int, str], int]:
+        """Relit la map existante : (id_qrcode -> url, révision). Vide si absente ou illisible."""
+        entrees: Dict[int, str] = {}
+        try:
+            with open(self.chemin, encoding="utf-8") as f:
+                entete = _MOTIF_ENTETE.match(f.readline().rstrip("\n"))
+                if not entete:
+                    logger.warning(f"Map {self.chemin} sans en-tête de révision : export complet")
+                    return {}, 0
+                for ligne in f:
+                    correspondance = _MOTIF_LIGNE.match(ligne.rstrip("\n"))
+                    if not correspondance or not correspondance.group(1).startswith(self.prefixe):
+                        logger.warning(f"Map {self.chemin} : ligne inattendue, export complet")
+                        return {}, 0
+                    entrees[int(correspondance.group(1)[len(self.prefixe):])] = correspondance.group(2)
+        except FileNotFoundError:
+            return {}, 0
+        except ValueError:
+            logger.warning(f"Map {self.chemin} illisible : export complet")
+            return {}, 0
+        return entrees, int(entete.group(1))
+
+    def _ecrire(self, entrees: Dict[int, str], revision: int) -> None:
+        dossier = os.path.dirname(os.path.abspath(self.chemin))
+        os.makedirs(dossier, exist_ok=True)
+        fd, temporaire = tempfile.mkstemp(dir=dossier, prefix=".redirections-map-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(_ENTETE.format(revision=revision))
+                for id_qrcode in sorted(entrees):
+                    f.write(f'"{self.prefixe}{id_qrcode}" "{entrees[id_qrcode]}";\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(temporaire, 0o644)
+            os.replace(temporaire, self.chemin)
+        except BaseException:
+            if os.path.exists(temporaire):
+                os.remove(temporaire)
+            raise
+
+
+if __name__ == "__main__":
+    dotenv.load_dotenv()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Export des redirections statiques vers une map de reverse proxy")
+    parser.add_argument("chemin", nargs="?", default=os.getenv("QR_EXPORT_MAP", "static/redirections.map"))
+    parser.add_argument("--prefixe", default=os.getenv("QR_EXPORT_PREFIXE", "/scan/"))
+    parser.add_argument("--complet", action="store_true", help="ignore la map existante et relit toute la table")
+    args = parser.parse_args()
+    print(ExportRedirections(args.chemin, prefixe=args.prefixe).lancer(complet=args.complet))
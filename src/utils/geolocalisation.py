@@ -0,0 +1,423 @@
+# utils/geolocalisation.py
+import csv
+import logging
+import os
+import socket
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from typing import List, Optional, Tuple
+
+import requests
+
+from utils.cache_ttl import CacheTTL
+
+logger = logging.getLogger(__name__)
+
+Lieu = Tuple[Optional[str], Optional[str], Optional[str]]  # (pays, region, ville)
+INCONNU: Lieu = (None, None, None)
+
+
+class ErreurGeolocalisation(Exception):
+    """Erreur levée par un fournisseur lorsque la recherche n'a pas pu aboutir."""
+    pass
+
+
+_PREFIXE_IPV4_MAPPEE = 0xFFFF << 32  # ::ffff:a.b.c.d
+
+
+def ip_vers_entier(ip: str) -> Tuple[int, int]:
+    """
+    Convertit une adresse textuelle en (version, entier).
+
+    Les adresses IPv6 « IPv4-mappées » (::ffff:a.b.c.d) sont ramenées en IPv4.
+    Lève ValueError si l'adresse est invalide.
+    """
+    try:
+        return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, ip), "big")
+    except OSError:
+        pass
+    try:
+        n = int.from_bytes(socket.inet_pton(socket.AF_INET6, ip), "big")
+    except OSError:
+        raise ValueError(f"Adresse IP invalide : {ip!r}")
+    if n >> 32 == 0xFFFF:
+        return 4, n - _PREFIXE_IPV4_MAPPEE
+    return 6, n
+
+
+class _TablesIntervalles:
+    """
+    Tables triées d'intervalles [debut, fin] -> indice de lieu.
+
+    IPv4 : tableaux compacts array('I') (4 octets par borne).
+    IPv6 : les bornes sur 128 bits ne tiennent pas dans un array ; elles sont
+    gardées dans des listes d'entiers triées (même recherche dichotomique).
+    Les triplets (pays, region, ville) sont dédupliqués dans `lieux`.
+    """
+
+    def __init__(self):
+        self.debuts_v4 = array("I")
+        self.fins_v4 = array("I")
+        self.lieux_v4 = array("I")
+        self.debuts_v6: List[int] = []
+        self.fins_v6: List[int] = []
+        self.lieux_v6 = array("I")
+        self.lieux: List[Lieu] = []
+
+    def __len__(self) -> int:
+        return len(self.debuts_v4) + len(self.debuts_v6)
+
+    def chercher(self, version: int, n: int) -> Lieu:
+        if version == 4:
+            debuts, fins, lieux = self.debuts_v4, self.fins_v4, self.lieux_v4
+        else:
+            debuts, fins, lieux = self.debuts_v6, self.fins_v6, self.lieux_v6
+        i = bisect_right(debuts, n) - 1
+        if i >= 0 and n <= fins[i]:
+            return self.lieux[lieux[i]]
+        return INCONNU
+
+
+def charger_tables(chemin: str) -> _TablesIntervalles:
+    """
+    Charge un fichier CSV `ip_debut,ip_fin,pays,region,ville` en tables triées.
+
+    Paramètres
+    ----------
+    chemin : str
+        Fichier CSV (UTF-8). Une éventuelle ligne d'en-tête est ignorée, ainsi
+        que les lignes invalides ou mélangeant IPv4 et IPv6. Les champs vides
+        deviennent None.
+
+    Retour
+    ------
+    _TablesIntervalles
+        Tables prêtes pour la recherche dichotomique.
+    """
+    plages_v4, plages_v6 = [], []
+    index_lieux = {}
+    tables = _TablesIntervalles()
+
+    with open(chemin, newline="", encoding="utf-8") as f:
+        for num_ligne, ligne in enumerate(csv.reader(f), start=1):
+            if len(ligne) < 2:
+                continue
+            try:
+                v_debut, debut = ip_vers_entier(ligne[0].strip())
+                v_fin, fin = ip_vers_entier(ligne[1].strip())
+            except ValueError:
+                if num_ligne > 1:
+                    logger.warning(f"Géolocalisation : ligne {num_ligne} ignorée ({ligne[:2]})")
+                continue
+            if v_debut != v_fin or fin < debut:
+                logger.warning(f"Géolocalisation : plage invalide ligne {num_ligne}")
+                continue
+
+            champs = [c.strip() or None for c in ligne[2:5]]
+            lieu = tuple(champs + [None] * (3 - len(champs)))
+            idx = index_lieux.get(lieu)
+            if idx is None:
+                idx = index_lieux[lieu] = len(tables.lieux)
+                tables.lieux.append(lieu)
+            (plages_v4 if v_debut == 4 else plages_v6).append((debut, fin, idx))
+
+    plages_v4.sort()
+    plages_v6.sort()
+    for debut, fin, idx in plages_v4:
+        tables.debuts_v4.append(debut)
+        tables.fins_v4.append(fin)
+        tables.lieux_v4.append(idx)
+    for debut, fin, idx in plages_v6:
+        tables.debuts_v6.append(debut)
+        tables.fins_v6.append(fin)
+        tables.lieux_v6.append(idx)
+    return tables
+
+
+class GeolocalisationLocale:
+    """
+    Moteur de géolocalisation hors ligne (aucun appel réseau).
+
+    Le jeu de données est chargé en mémoire dans des tables d'intervalles
+    triées ; une recherche est une dichotomie (quelques microsecondes).
+    Le fichier est rechargé à chaud lorsqu'il change sur le disque
+    (vérification au plus toutes les `intervalle_verification_s` secondes,
+    dans un thread d'arrière-plan : la recherche qui la déclenche n'attend
+    pas la relecture du fichier), ou à la demande via `recharger()`.
+    """
+
+    def __init__(self, chemin: str, intervalle_verification_s: float = 30.0):
+        self.chemin = chemin
+        self.intervalle_verification_s = intervalle_verification_s
+        self._tables = _TablesIntervalles()
+        self._mtime: Optional[float] = None
+        self._prochaine_verification = time.monotonic() + intervalle_verification_s
+        self._verrou = threading.Lock()
+        self._rechargement: Optional[threading.Thread] = None
+        self.recharger()
+
+    def recharger(self) -> bool:
+        """
+        (Re)charge le jeu de données ; les recherches en cours continuent sur
+        l'ancienne version jusqu'à la bascule (remplacement atomique).
+
+        Retour
+        ------
+        bool
+            True si le chargement a réussi, False sinon (fichier absent ou
+            illisible : l'ancienne version est conservée).
+        """
+        with self._verrou:
+            try:
+                mtime = os.path.getmtime(self.chemin)
+                tables = charger_tables(self.chemin)
+            except OSError as e:
+                logger.warning(f"Jeu de géolocalisation indisponible ({self.chemin}) : {e}")
+                return False
+            except (ValueError, csv.Error) as e:
+                # Fichier en cours d'écriture ou corrompu : nouvel essai à son prochain changement
+                logger.error(f"Jeu de géolocalisation illisible ({self.chemin}), version précédente conservée : {e}")
+                self._mtime = mtime
+                return False
+            self._tables = tables
+            self._mtime = mtime
+            logger.info(f"Géolocalisation locale : {len(tables)} plages chargées depuis {self.chemin}")
+            return True
+
+    def recharger_si_modifie(self) -> bool:
+        """Recharge le fichier si sa date de modification a changé."""
+        try:
+            mtime = os.path.getmtime(self.chemin)
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        return self.recharger()
+
+    def _verifier_en_arriere_plan(self) -> None:
+        """Lance `recharger_si_modifie` dans un thread, sauf si une vérification est déjà en cours."""
+        with self._verrou:
+            if self._rechargement is not None and self._rechargement.is_alive():
+                return
+            self._rechargement = threading.Thread(
+                target=self.recharger_si_modifie, name="rechargement-geoip", daemon=True
+            )
+            self._rechargement.start()
+
+    def localiser(self, ip: str) -> Lieu:
+        """
+        Retourne (pays, region, ville) pour une adresse IPv4 ou IPv6.
+
+        Retour
+        ------
+        Lieu
+            Triplet de chaînes, ou (None, None, None) si l'adresse est
+            invalide ou absente du jeu de données.
+        """
+        maintenant = time.monotonic()
+        if maintenant >= self._prochaine_verification:
+            self._prochaine_verification = maintenant + self.intervalle_verification_s
+            self._verifier_en_arriere_plan()
+        try:
+            version, n = ip_vers_entier(ip)
+        except ValueError:
+            return INCONNU
+        return self._tables.chercher(version, n)
+
+    def __len__(self) -> int:
+        return len(self._tables)
+
+
+class GeolocalisationIpApi:
+    """
+    Fournisseur externe ip-api.com (appel HTTP bloquant).
+    Conservé comme alternative ; le moteur local est à privilégier.
+
+    Avec `lever_erreurs=True`, les erreurs réseau lèvent ErreurGeolocalisation
+    au lieu de renvoyer INCONNU (utile derrière GeolocalisationEnCache, qui
+    met alors l'échec en cache pour tout le préfixe réseau).
+    """
+
+    def __init__(self, timeout: float = 0.5, lever_erreurs: bool = False):
+        self.timeout = timeout
+        self.lever_erreurs = lever_erreurs
+
+    def localiser(self, ip: str) -> Lieu:
+        try:
+            response = requests.get(
+                f"http://ip-api.com/json/{ip}?fields=status,country,regionName,city",
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            data = response.json()
+            if data.get("status") == "success":
+                return (data.get("country"), data.get("regionName"), data.get("city"))
+            logger.warning(f"Échec de la géolocalisation pour l'IP {ip}: {data.get('message')}")
+            return INCONNU
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Erreur lors de l'appel à l'API de géolocalisation pour {ip}: {e}")
+            if self.lever_erreurs:
+                raise ErreurGeolocalisation(str(e)) from e
+            return INCONNU
+
+
+class GeolocalisationEnCache:
+    """
+    Cache borné devant un fournisseur de géolocalisation.
+
+    Recherche dans l'ordre :
+    1. l'adresse exacte ;
+    2. son préfixe réseau (/24 en IPv4, /48 en IPv6) : des scans provenant du
+       même NAT d'opérateur ou du même réseau de bureau partagent le résultat ;
+    3. le fournisseur, dont le résultat est mis en cache aux deux niveaux.
+
+    Les échecs sont mis en cache négatif (ttl_negatif) : une adresse
+    inconnue au niveau exact, une erreur du fournisseur au niveau du préfixe,
+    pour ne pas harceler un fournisseur défaillant.
+    """
+
+    def __init__(
+        self,
+        fournisseur,
+        taille_max: int = 50000,
+        ttl: float = 3600.0,
+        ttl_negatif: float = 300.0,
+        longueur_prefixe_v4: int = 24,
+        longueur_prefixe_v6: int = 48,
+    ):
+        self.fournisseur = fournisseur
+        self._decalage = {4: 32 - longueur_prefixe_v4, 6: 128 - longueur_prefixe_v6}
+        self._exact = CacheTTL(taille_max=taille_max, ttl=ttl, ttl_negatif=ttl_negatif)
+        self._prefixes = CacheTTL(taille_max=taille_max, ttl=ttl, ttl_negatif=ttl_negatif)
+        self._verrou = threading.Lock()
+        self._succes_exact = 0
+        self._succes_prefixe = 0
+        self._appels_fournisseur = 0
+        self._erreurs_fournisseur = 0
+
+    def localiser(self, ip: str) -> Lieu:
+        """Retourne (pays, region, ville), en évitant le fournisseur autant que possible."""
+        trouve, lieu = self._exact.lire(ip)
+        if trouve:
+            self._compter("_succes_exact")
+            return lieu or INCONNU
+
+        try:
+            version, n = ip_vers_entier(ip)
+            cle_prefixe = (version, n >> self._decalage[version])
+        except ValueError:
+            cle_prefixe = None
+
+        if cle_prefixe is not None:
+            trouve, lieu = self._prefixes.lire(cle_prefixe)
+            if trouve:
+                self._compter("_succes_prefixe")
+                self._exact.ecrire(ip, lieu)
+                return lieu or INCONNU
+
+        self._compter("_appels_fournisseur")
+        try:
+            lieu = self.fournisseur.localiser(ip)
+        except Exception as e:
+            self._compter("_erreurs_fournisseur")
+            logger.warning(f"Fournisseur de géolocalisation en échec pour {ip} : {e}")
+            self._exact.ecrire(ip, None)
+            if cle_prefixe is not None:
+                self._prefixes.ecrire(cle_prefixe, None)
+            return INCONNU
+
+        if lieu == INCONNU:
+            self._exact.ecrire(ip, None)
+        else:
+            self._exact.ecrire(ip, lieu)
+            if cle_prefixe is not None:
+                self._prefixes.ecrire(cle_prefixe, lieu)
+        return lieu
+
+    def _compter(self, compteur: str) -> None:
+        with self._verrou:
+            setattr(self, compteur, getattr(self, compteur) + 1)
+
+    def statistiques(self) -> dict:
+        """Compteurs du cache (taux de succès global et par niveau)."""
+        with self._verrou:
+            succes = self._succes_exact + self._succes_prefixe
+            total = succes + self._appels_fournisseur
+            return {
+                "succes_exact": self._succes_exact,
+                "succes_prefixe": self._succes_prefixe,
+                "appels_fournisseur": self._appels_fournisseur,
+                "erreurs_fournisseur": self._erreurs_fournisseur,
+                "taux_succes": round(succes / total, 4) if total else 0.0,
+                "cache_exact": self._exact.statistiques(),
+                "cache_prefixes": self._prefixes.statistiques(),
+            }
+
+
+def creer_fournisseur(nom: Optional[str] = None, chemin: Optional[str] = None):
+    """
+    Construit le fournisseur de géolocalisation configuré.
+
+    Paramètres
+    ----------
+    nom : str, optionnel
+        "locale" (défaut) ou "ip-api". Lu dans GEO_FOURNISSEUR si absent.
+    chemin : str, optionnel
+        Jeu de données du moteur local. Lu dans GEOIP_DATASET si absent.
+
+    Notes
+    -----
+    Un fournisseur externe est toujours placé derrière GeolocalisationEnCache
+    (GEO_CACHE_TAILLE, GEO_CACHE_TTL_S, GEO_CACHE_TTL_NEGATIF_S). Le moteur
+    local n'en a pas besoin : une recherche coûte déjà quelques microsecondes.
+    Si le jeu de données du moteur local est absent, ip-api est utilisé à sa place.
+    """
+    nom = nom or os.getenv("GEO_FOURNISSEUR", "locale")
+    chemin = chemin or os.getenv("GEOIP_DATASET", "data/geoip.csv")
+    if nom != "ip-api" and not os.path.isfile(chemin):
+        logger.error(
+            f"Jeu de géolocalisation introuvable ({chemin}, variable GEOIP_DATASET) : "
+            "repli sur le fournisseur ip-api"
+        )
+        nom = "ip-api"
+    if nom == "ip-api":
+        return GeolocalisationEnCache(
+            GeolocalisationIpApi(lever_erreurs=True),
+            taille_max=int(os.getenv("GEO_CACHE_TAILLE", 50000)),
+            ttl=float(os.getenv("GEO_CACHE_TTL_S", 3600)),
+            ttl_negatif=float(os.getenv("GEO_CACHE_TTL_NEGATIF_S", 300)),
+        )
+    return GeolocalisationLocale(chemin)
+
+
+if __name__ == "__main__":
+    # Benchmark : python src/utils/geolocalisation.py [nb_plages] [nb_recherches]
+    import random
+    import sys
+    import tempfile
+    import ipaddress
+
+    nb_plages = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    nb_recherches = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+    pas = (2**32) // nb_plages
+
+    with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as f:
+        for i in range(nb_plages):
+            debut = i * pas
+            f.write(f"{ipaddress.IPv4Address(debut)},{ipaddress.IPv4Address(debut + pas - 1)},"
+                    f"Pays{i % 200},Region{i % 3000},Ville{i % 40000}\n")
+        chemin_bench = f.name
+
+    t0 = time.perf_counter()
+    moteur = GeolocalisationLocale(chemin_bench)
+    print(f"Chargement de {len(moteur)} plages : {time.perf_counter() - t0:.2f} s")
+
+    ips = [str(ipaddress.IPv4Address(random.getrandbits(32))) for _ in range(nb_recherches)]
+    t0 = time.perf_counter()
+    for ip in ips:
+        moteur.localiser(ip)
+    duree = time.perf_counter() - t0
+    print(f"{nb_recherches} recherches : {duree * 1e6 / nb_recherches:.2f} µs par recherche")
+    os.remove(chemin_bench)
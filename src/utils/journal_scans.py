@@ -0,0 +1,251 @@
+# utils/journal_scans.py
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from business_object.log_scan import LogScan
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:  # Windows : un seul processus par dossier de journal
+    fcntl = None
+    HAS_FCNTL = False
+
+logger = logging.getLogger(__name__)
+
+EXTENSION = ".seg"
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECONDE = timedelta(microseconds=1)
+
+# Enregistrement : longueur et CRC32 de la charge utile, puis la charge utile
+_ENTETE = struct.Struct("<II")
+# Charge utile : id_qrcode, date du scan (µs depuis l'epoch UTC), geo_enrichi,
+# puis 7 chaînes préfixées par leur longueur (0xFFFF = None)
+_FIXE = struct.Struct("<IqB")
+_LONGUEUR = struct.Struct("<H")
+_NONE = 0xFFFF
+_CHAMPS = (
+    "client_host", "user_agent", "referer", "accept_language",
+    "geo_country", "geo_region", "geo_city",
+)
+
+
+def encoder(log_scan: LogScan) -> bytes:
+    """Encode un scan en enregistrement binaire (en-tête + charge utile)."""
+    date_scan = log_scan.date_scan or datetime.now(timezone.utc)
+    if date_scan.tzinfo is None:
+        date_scan = date_scan.replace(tzinfo=timezone.utc)
+    morceaux = [_FIXE.pack(
+        log_scan.id_qrcode,
+        (date_scan - _EPOCH) // _MICROSECONDE,
+        1 if log_scan.geo_enrichi else 0,
+    )]
+    for champ in _CHAMPS:
+        valeur = getattr(log_scan, champ)
+        if valeur is None:
+            morceaux.append(_LONGUEUR.pack(_NONE))
+            continue
+        donnees = str(valeur).encode("utf-8")[:_NONE - 1]
+        morceaux.append(_LONGUEUR.pack(len(donnees)))
+        morceaux.append(donnees)
+    charge = b"".join(morceaux)
+    return _ENTETE.pack(len(charge), zlib.crc32(charge)) + charge
+
+
+def decoder(contenu: bytes) -> Tuple[List[LogScan], int]:
+    """
+    Décode les enregistrements d'un segment.
+
+    Retour
+    ------
+    Tuple[List[LogScan], int]
+        Les scans lus, et le nombre d'octets ignorés en fin de segment
+        (enregistrement tronqué ou corrompu, par exemple après un arrêt brutal).
+    """
+    logs: List[LogScan] = []
+    position = 0
+    while position + _ENTETE.size <= len(contenu):
+        longueur, crc = _ENTETE.unpack_from(contenu, position)
+        debut = position + _ENTETE.size
+        charge = contenu[debut:debut + longueur]
+        if len(charge) < longueur or zlib.crc32(charge) != crc:
+            break
+        id_qrcode, micros, geo_enrichi = _FIXE.unpack_from(charge, 0)
+        curseur = _FIXE.size
+        valeurs = {}
+        for champ in _CHAMPS:
+            (n,) = _LONGUEUR.unpack_from(charge, curseur)
+            curseur += _LONGUEUR.size
+            if n == _NONE:
+                valeurs[champ] = None
+            else:
+                valeurs[champ] = charge[curseur:curseur + n].decode("utf-8", errors="ignore")
+                curseur += n
+        logs.append(LogScan(
+            id_qrcode=id_qrcode,
+            date_scan=_EPOCH + micros * _MICROSECONDE,
+            geo_enrichi=bool(geo_enrichi),
+            **valeurs,
+        ))
+        position = debut + longueur
+    return logs, len(contenu) - position
+
+
+class JournalScans:
+    """
+    Journal local des scans, en segments binaires à ajout seul.
+
+    - `ajouter` écrit un enregistrement dans le segment actif (écriture
+      tamponnée, sans appel système bloquant) ; `synchroniser` le rend durable
+      (flush + fsync groupé pour tous les scans écrits depuis le dernier appel).
+    - Un segment est scellé quand il atteint `taille_segment_max` octets, ou
+      par `sceller()` ; il peut alors être chargé en base puis supprimé.
+    - Le segment actif est verrouillé (fcntl) par le processus qui l'écrit :
+      plusieurs workers peuvent partager le dossier, et le segment d'un
+      processus arrêté brutalement redevient chargeable.
+
+    Les segments sont nommés `<horodatage ns>-<pid>.seg` : uniques et triés
+    par ordre de création.
+    """
+
+    def __init__(self, dossier: str, taille_segment_max: int = 4 * 1024 * 1024):
+        self.dossier = dossier
+        self.taille_segment_max = max(1024, int(taille_segment_max))
+        os.makedirs(dossier, exist_ok=True)
+
+        self._verrou = threading.Lock()
+        self._fichier = None
+        self._nom_actif: Optional[str] = None
+        self._debut_actif = 0.0
+        self._taille_actif = 0
+        self._non_synchronises = 0
+
+    # ------------------------------------------------------------------
+    # Écriture
+    # ------------------------------------------------------------------
+
+    def ajouter(self, log_scan: LogScan) -> None:
+        """Ajoute un scan au segment actif (créé si besoin). Lève OSError si le disque refuse."""
+        enregistrement = encoder(log_scan)
+        with self._verrou:
+            if self._fichier is None:
+                self._ouvrir_segment()
+            self._fichier.write(enregistrement)
+            self._taille_actif += len(enregistrement)
+            self._non_synchronises += 1
+            if self._taille_actif >= self.taille_segment_max:
+                self._sceller()
+
+    def synchroniser(self) -> int:
+        """
+        Rend durables les scans écrits depuis le dernier appel (fsync groupé).
+
+        Retour
+        ------
+        int
+            Nombre de scans synchronisés.
+        """
+        with self._verrou:
+            if self._fichier is None or not self._non_synchronises:
+                return 0
+            self._fichier.flush()
+            os.fsync(self._fichier.fileno())
+            nb, self._non_synchronises = self._non_synchronises, 0
+            return nb
+
+    def sceller(self) -> Optional[str]:
+        """Synchronise et ferme le segment actif ; retourne son nom (None s'il n'y en a pas)."""
+        with self._verrou:
+            return self._sceller()
+
+    def age_segment_actif(self) -> float:
+        """Âge (secondes) du segment actif, 0 s'il n'y en a pas."""
+        with self._verrou:
+            return time.monotonic() - self._debut_actif if self._fichier is not None else 0.0
+
+    def _ouvrir_segment(self) -> None:
+        nom = f"{time.time_ns():020d}-{os.getpid()}{EXTENSION}"
+        temporaire = os.path.join(self.dossier, f".{nom}")
+        fichier = open(temporaire, "ab")
+        if HAS_FCNTL:
+            fcntl.flock(fichier, fcntl.LOCK_EX)
+        # Verrouillé avant d'être visible : aucun chargeur ne peut le prendre vide
+        os.rename(temporaire, os.path.join(self.dossier, nom))
+        self._fichier, self._nom_actif = fichier, nom
+        self._debut_actif = time.monotonic()
+        self._taille_actif = 0
+
+    def _sceller(self) -> Optional[str]:
+        if self._fichier is None:
+            return None
+        fichier, nom = self._fichier, self._nom_actif
+        self._fichier, self._nom_actif = None, None
+        try:
+            fichier.flush()
+            os.fsync(fichier.fileno())
+        finally:
+            fichier.close()  # libère aussi le verrou
+        self._non_synchronises = 0
+        return nom
+
+    # ------------------------------------------------------------------
+    # Lecture (chargeur)
+    # ------------------------------------------------------------------
+
+    def segments(self) -> List[str]:
+        """Noms des segments présents (y compris le segment actif), du plus ancien au plus récent."""
+        try:
+            noms = os.listdir(self.dossier)
+        except FileNotFoundError:
+            return []
+        return sorted(n for n in noms if n.endswith(EXTENSION) and not n.startswith("."))
+
+    def taille_en_attente(self) -> int:
+        """Taille totale (octets) des segments présents."""
+        total = 0
+        for nom in self.segments():
+            try:
+                total += os.path.getsize(os.path.join(self.dossier, nom))
+            except FileNotFoundError:
+                pass
+        return total
+
+    @contextmanager
+    def reserver(self, nom: str):
+        """
+        Réserve un segment scellé pour le charger.
+
+        Produit (yield) le couple (scans, octets ignorés), ou None si le segment
+        est en cours d'écriture, réservé par un autre chargeur, ou déjà supprimé.
+        La réservation est levée à la sortie du bloc.
+        """
+        if nom == self._nom_actif:
+            yield None
+            return
+        try:
+            fichier = open(os.path.join(self.dossier, nom), "rb")
+        except FileNotFoundError:
+            yield None
+            return
+        with fichier:
+            if HAS_FCNTL:
+                try:
+                    fcntl.flock(fichier, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    yield None
+                    return
+            yield decoder(fichier.read())
+
+    def supprimer(self, nom: str) -> None:
+        """Supprime un segment chargé (à appeler pendant sa réservation)."""
+        try:
+            os.remove(os.path.join(self.dossier, nom))
+        except FileNotFoundError:
+            pass
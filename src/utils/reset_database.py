@@ -5,6 +5,7 @@ from unittest import mock
 
 from utils.log_decorator import log
 from utils.singleton import Singleton
+from utils.cache_resultat import vider_caches
 from dao.db_connection import DBConnection
 from service.utilisateur_service import UtilisateurService
 
@@ -59,6 +60,9 @@ class ResetDatabase(metaclass=Singleton):
             logging.info(e)
             raise
 
+        # Les résultats mis en cache par les DAO proviennent de l'ancienne base
+        vider_caches()
+
         # Post-traitement: hashage des mots de passe via le service
         utilisateur_service = UtilisateurService()
         for u in utilisateur_service.lister_tous(inclure_mdp=True):
@@ -0,0 +1,149 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _Vol:
+    """Appel synchrone en cours : résultat ou exception partagés avec les suiveurs."""
+
+    __slots__ = ("fin", "resultat", "erreur")
+
+    def __init__(self):
+        self.fin = threading.Event()
+        self.resultat = None
+        self.erreur = None
+
+
+class SingleFlight:
+    """
+    Regroupement des appels concurrents identiques (« single-flight »).
+
+    Les appelants simultanés d'une même clé partagent un seul appel en cours :
+    le premier (meneur) exécute la fonction, les suivants attendent et
+    reçoivent le même résultat (ou la même exception). Une fois l'appel
+    terminé, la clé est libérée : l'appel suivant est de nouveau exécuté
+    (la mise en cache des résultats reste le rôle de CacheTTL).
+
+    Évite qu'un QR code devenu viral, absent du cache, déclenche des
+    centaines de lectures identiques en base au même instant.
+
+    - `executer` : appelants synchrones (threads).
+    - `executer_async` : coroutines d'une même boucle d'événements ; l'appel
+      partagé tourne dans une tâche, il n'est pas annulé si le meneur l'est.
+
+    Thread-safe. Les compteurs sont exposés par `statistiques()`.
+    """
+
+    def __init__(self):
+        self._vols: Dict[Hashable, _Vol] = {}
+        self._taches: Dict[Hashable, asyncio.Future] = {}
+        self._verrou = threading.Lock()
+
+        self._executions = 0
+        self._partages = 0
+
+    def executer(self, cle: Hashable, fonction: Callable[[], Any]) -> Any:
+        """
+        Exécute `fonction()`, ou attend l'appel déjà en cours pour `cle`.
+
+        Paramètres
+        ----------
+        cle : Hashable
+            Identifie les appels équivalents.
+        fonction : Callable[[], Any]
+            Appel à partager (ex. lecture en base).
+
+        Retour
+        ------
+        Any
+            Le résultat de l'appel partagé ; son exception est relancée chez
+            tous les appelants.
+        """
+        with self._verrou:
+            vol = self._vols.get(cle)
+            meneur = vol is None
+            if meneur:
+                vol = self._vols[cle] = _Vol()
+            else:
+                self._partages += 1
+
+        if not meneur:
+            vol.fin.wait()
+            if vol.erreur is not None:
+                raise vol.erreur
+            return vol.resultat
+
+        try:
+            vol.resultat = fonction()
+            return vol.resultat
+        except BaseException as e:
+            vol.erreur = e
+            raise
+        finally:
+            with self._verrou:
+                if self._vols.get(cle) is vol:
+                    del self._vols[cle]
+                self._executions += 1
+            vol.fin.set()
+
+    async def executer_async(self, cle: Hashable, fabrique: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Variante asynchrone de `executer`.
+
+        Paramètres
+        ----------
+        cle : Hashable
+            Identifie les appels équivalents.
+        fabrique : Callable[[], Awaitable[Any]]
+            Crée la coroutine à partager ; appelée seulement par le meneur.
+
+        Notes
+        -----
+        Un appel en cours dans une autre boucle d'événements n'est pas
+        partagé : l'appelant exécute alors le sien.
+        """
+        boucle = asyncio.get_running_loop()
+        with self._verrou:
+            tache = self._taches.get(cle)
+            if tache is not None and tache.get_loop() is boucle:
+                self._partages += 1
+            else:
+                tache = boucle.create_task(fabrique())
+                self._taches[cle] = tache
+                tache.add_done_callback(lambda t: self._terminer(cle, t))
+        return await asyncio.shield(tache)
+
+    def _terminer(self, cle: Hashable, tache: asyncio.Future) -> None:
+        with self._verrou:
+            if self._taches.get(cle) is tache:
+                del self._taches[cle]
+            self._executions += 1
+        if not tache.cancelled():
+            tache.exception()  # marque l'exception comme récupérée si aucun appelant n'attend plus
+
+    def oublier(self, cle: Hashable) -> None:
+        """
+        Détache l'appel en cours pour `cle` : les appelants suivants lancent un
+        nouvel appel (à utiliser après une modification de la donnée lue).
+        Les appelants déjà en attente reçoivent le résultat de l'ancien appel.
+        """
+        with self._verrou:
+            self._vols.pop(cle, None)
+            self._taches.pop(cle, None)
+
+    def statistiques(self) -> dict:
+        """
+        Retourne les compteurs.
+
+        Retour
+        ------
+        dict
+            executions (appels réellement exécutés), partages (appelants
+            servis par un appel en cours), en_cours.
+        """
+        with self._verrou:
+            return {
+                "executions": self._executions,
+                "partages": self._partages,
+                "en_cours": len(self._vols) + len(self._taches),
+            }
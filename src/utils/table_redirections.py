@@ -0,0 +1,310 @@
+# utils/table_redirections.py
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:  # Windows : verrou limité au processus
+    fcntl = None
+    HAS_FCNTL = False
+
+logger = logging.getLogger(__name__)
+
+# En-tête : magic, version, réservé, nombre d'entrées, octets morts du blob
+# (URL remplacées ou supprimées), taille du blob
+_ENTETE = struct.Struct("<4sHHIIQ")
+# Entrée (indexée par id_qrcode) : offset et longueur de l'URL dans le blob, propriétaire, drapeaux,
+# version du QR code, durée de cache HTTP
+_ENTREE = struct.Struct("<IIIIII")
+_MAGIC = b"QRRT"
+_VERSION = 2
+
+PRESENT = 0x1
+SUIVI = 0x2
+
+# Durée de cache absente (cache_max_age NULL)
+_SANS_MAX_AGE = 0xFFFFFFFF
+
+
+class Redirection(NamedTuple):
+    """Entrée lue dans la table : URL normalisée, QR suivi ou non, propriétaire, version, durée de cache."""
+    url: str
+    suivi: bool
+    id_proprietaire: int
+    version: int = 1
+    cache_max_age: Optional[int] = None
+
+
+def normaliser_url(url: str) -> str:
+    """Ajoute le schéma http:// si l'URL n'en a pas (comme la route de scan)."""
+    if url.startswith("http://") or url.startswith("https://"):
+        return url
+    return f"http://{url}"
+
+
+def _max_age_brut(cache_max_age: Optional[int]) -> int:
+    return _SANS_MAX_AGE if cache_max_age is None else int(cache_max_age)
+
+
+def _serialiser(entrees: bytearray, blob: bytes, octets_morts: int = 0) -> bytes:
+    nb = len(entrees) // _ENTREE.size
+    return _ENTETE.pack(_MAGIC, _VERSION, 0, nb, octets_morts, len(blob)) + bytes(entrees) + blob
+
+
+def _compacter(entrees: bytearray, blob: bytes) -> bytes:
+    """Réécrit le blob avec les seules URL encore référencées (offsets des entrées mis à jour)."""
+    compact = bytearray()
+    for position in range(0, len(entrees), _ENTREE.size):
+        offset, longueur, id_proprietaire, drapeaux, version, max_age = _ENTREE.unpack_from(entrees, position)
+        if not drapeaux & PRESENT:
+            continue
+        _ENTREE.pack_into(entrees, position, len(compact), longueur, id_proprietaire, drapeaux, version, max_age)
+        compact += blob[offset:offset + longueur]
+    return bytes(compact)
+
+
+class TableRedirections:
+    """
+    Table id_qrcode -> (drapeaux, URL normalisée) dans un fichier binaire
+    projeté en mémoire (mmap).
+
+    Format : en-tête, tableau d'entrées de taille fixe indexé par id_qrcode
+    (recherche en O(1)), puis blob des URL en UTF-8. Tous les workers
+    projettent le même fichier : une seule copie dans le cache de pages.
+
+    - `construire` écrit une table complète ; `mettre_a_jour` applique une
+      modification (copie + ajout en fin de blob) sans relire la base. Les
+      URL remplacées restent dans le blob (octets morts) jusqu'à ce qu'elles
+      en occupent la moitié : le blob est alors compacté.
+    - Les écritures passent par un fichier temporaire puis `os.replace` :
+      un lecteur voit toujours une table entière. Elles sont sérialisées
+      entre processus par un verrou fcntl (quand il est disponible).
+    - Chaque lecteur vérifie au plus toutes les `verification_s` secondes si
+      le fichier a été remplacé, et le reprojette le cas échéant.
+    """
+
+    def __init__(self, chemin: str, verification_s: float = 1.0):
+        self.chemin = chemin
+        self.verification_s = float(verification_s)
+        self._verrou = threading.Lock()
+        # (carte, nombre d'entrées, début du blob) : remplacée d'un bloc, un
+        # lecteur ne mélange jamais deux versions du fichier
+        self._projection: Optional[Tuple[mmap.mmap, int, int]] = None
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._prochaine_verification = 0.0
+
+        # --- Compteurs ---
+        self._succes = 0
+        self._echecs = 0
+        self._rechargements = 0
+
+    # ------------------------------------------------------------------
+    # Écriture
+    # ------------------------------------------------------------------
+
+    def construire(self, lignes: Iterable[Tuple]) -> int:
+        """
+        Écrit une table complète.
+
+        Paramètres
+        ----------
+        lignes : Iterable[Tuple]
+            (id_qrcode, url, type_qrcode, id_proprietaire, version, cache_max_age)
+            de chaque QR code (QRCodeDao.lister_redirections).
+
+        Retour
+        ------
+        int
+            Nombre de QR codes écrits.
+        """
+        lignes = list(lignes)
+        nb = (max(id_qr for id_qr, *_ in lignes) + 1) if lignes else 0
+        entrees = bytearray(nb * _ENTREE.size)
+        blob = bytearray()
+        for id_qr, url, suivi, id_proprietaire, version, cache_max_age in lignes:
+            donnees = normaliser_url(url).encode("utf-8")
+            _ENTREE.pack_into(
+                entrees, id_qr * _ENTREE.size,
+                len(blob), len(donnees), int(id_proprietaire), PRESENT | (SUIVI if suivi else 0),
+                int(version), _max_age_brut(cache_max_age),
+            )
+            blob += donnees
+        with self._verrou_fichier():
+            self._remplacer(_serialiser(entrees, bytes(blob)))
+        return len(lignes)
+
+    def mettre_a_jour(self, id_qrcode: int, url: Optional[str], suivi: bool = True,
+                      id_proprietaire: int = 0, version: int = 1,
+                      cache_max_age: Optional[int] = None) -> None:
+        """
+        Met à jour (ou supprime si url est None) l'entrée d'un QR code.
+
+        La nouvelle URL est ajoutée en fin de blob ; l'ancienne devient des
+        octets morts, récupérés par compactage quand ils dépassent la moitié
+        du blob (taille du fichier bornée à environ deux fois les URL vivantes).
+        """
+        with self._verrou_fichier():
+            try:
+                with open(self.chemin, "rb") as f:
+                    contenu = f.read()
+                _, _, _, nb, octets_morts, taille_blob = _ENTETE.unpack_from(contenu, 0)
+            except FileNotFoundError:
+                contenu, nb, octets_morts, taille_blob = _ENTETE.pack(_MAGIC, _VERSION, 0, 0, 0, 0), 0, 0, 0
+
+            debut_blob = _ENTETE.size + nb * _ENTREE.size
+            entrees = bytearray(contenu[_ENTETE.size:debut_blob])
+            blob = contenu[debut_blob:debut_blob + taille_blob]
+
+            if id_qrcode >= nb:
+                if url is None:
+                    return
+                entrees += bytes((id_qrcode + 1 - nb) * _ENTREE.size)
+            _, ancienne_longueur, _, drapeaux, _, _ = _ENTREE.unpack_from(entrees, id_qrcode * _ENTREE.size)
+            if drapeaux & PRESENT:
+                octets_morts += ancienne_longueur
+
+            if url is None:
+                _ENTREE.pack_into(entrees, id_qrcode * _ENTREE.size, 0, 0, 0, 0, 0, 0)
+            else:
+                donnees = normaliser_url(url).encode("utf-8")
+                _ENTREE.pack_into(
+                    entrees, id_qrcode * _ENTREE.size,
+                    len(blob), len(donnees), int(id_proprietaire), PRESENT | (SUIVI if suivi else 0),
+                    int(version), _max_age_brut(cache_max_age),
+                )
+                blob += donnees
+            if octets_morts * 2 > len(blob):
+                blob, octets_morts = _compacter(entrees, blob), 0
+            self._remplacer(_serialiser(entrees, blob, octets_morts))
+
+    def _remplacer(self, contenu: bytes) -> None:
+        dossier = os.path.dirname(os.path.abspath(self.chemin))
+        os.makedirs(dossier, exist_ok=True)
+        fd, temporaire = tempfile.mkstemp(dir=dossier, prefix=".redirections-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(contenu)
+            os.replace(temporaire, self.chemin)
+        except BaseException:
+            if os.path.exists(temporaire):
+                os.remove(temporaire)
+            raise
+        # Le processus qui écrit voit sa modification immédiatement
+        self._prochaine_verification = 0.0
+
+    @contextmanager
+    def _verrou_fichier(self):
+        with self._verrou:
+            if not HAS_FCNTL:
+                yield
+                return
+            with open(f"{self.chemin}.lock", "a") as verrou:
+                fcntl.flock(verrou, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(verrou, fcntl.LOCK_UN)
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def chercher(self, id_qrcode: int) -> Optional[Redirection]:
+        """
+        Recherche O(1) d'un QR code.
+
+        Retour
+        ------
+        Optional[Redirection]
+            L'entrée si le QR code figure dans la table, None sinon (absent,
+            supprimé, ou table indisponible).
+        """
+        self._verifier()
+        projection = self._projection
+        if projection is None or not 0 <= id_qrcode < projection[1]:
+            self._echecs += 1
+            return None
+        carte, _, debut_blob = projection
+        offset, longueur, id_proprietaire, drapeaux, version, max_age = _ENTREE.unpack_from(
+            carte, _ENTETE.size + id_qrcode * _ENTREE.size
+        )
+        if not drapeaux & PRESENT:
+            self._echecs += 1
+            return None
+        debut = debut_blob + offset
+        self._succes += 1
+        return Redirection(
+            carte[debut:debut + longueur].decode("utf-8"),
+            bool(drapeaux & SUIVI),
+            id_proprietaire,
+            version,
+            None if max_age == _SANS_MAX_AGE else max_age,
+        )
+
+    def ids_du_proprietaire(self, id_proprietaire: int) -> List[int]:
+        """QR codes de la table appartenant à un utilisateur (parcours complet du tableau d'entrées)."""
+        self._verifier()
+        projection = self._projection
+        if projection is None:
+            return []
+        carte, _, debut_blob = projection
+        return [
+            id_qr
+            for id_qr, (_, _, proprietaire, drapeaux, _, _) in enumerate(
+                _ENTREE.iter_unpack(carte[_ENTETE.size:debut_blob])
+            )
+            if drapeaux & PRESENT and proprietaire == id_proprietaire
+        ]
+
+    def _verifier(self) -> None:
+        """Reprojette le fichier s'il a été remplacé (au plus toutes les verification_s)."""
+        maintenant = time.monotonic()
+        if maintenant < self._prochaine_verification:
+            return
+        self._prochaine_verification = maintenant + self.verification_s
+        try:
+            st = os.stat(self.chemin)
+        except FileNotFoundError:
+            self._projection, self._signature = None, None
+            return
+        signature = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if signature == self._signature:
+            return
+        with self._verrou:
+            try:
+                with open(self.chemin, "rb") as f:
+                    carte = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                magic, version, _, nb, _, _ = _ENTETE.unpack_from(carte, 0)
+                if magic != _MAGIC or version != _VERSION:
+                    raise ValueError(f"format de table inattendu ({magic!r}, v{version})")
+            except Exception as e:
+                logger.warning(f"Table de redirections illisible ({self.chemin}) : {e}")
+                self._projection, self._signature = None, None
+                return
+            # L'ancienne projection est libérée quand plus aucun lecteur ne la référence
+            self._projection = (carte, nb, _ENTETE.size + nb * _ENTREE.size)
+            self._signature = signature
+            self._rechargements += 1
+
+    def __len__(self) -> int:
+        self._verifier()
+        projection = self._projection
+        return projection[1] if projection is not None else 0
+
+    def statistiques(self) -> dict:
+        """Retourne entrees (taille du tableau), succes, echecs, rechargements."""
+        projection = self._projection
+        return {
+            "entrees": projection[1] if projection is not None else 0,
+            "succes": self._succes,
+            "echecs": self._echecs,
+            "rechargements": self._rechargements,
+        }
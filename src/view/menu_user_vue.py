@@ -29,6 +29,22 @@ class MenuUtilisateurVue(VueAbstraite):
         return {"Authorization": f"Bearer {token}"}
     # --- FIN AJOUT ---
 
+    def _lister_mes_qrcodes(self, auth_headers):
+        """
+        Récupère tous les QR codes de l'utilisateur, page par page (en-tête X-Next-After).
+        La taille de page est celle du serveur (QR_PAGE_TAILLE, bornée par QR_PAGE_TAILLE_MAX).
+        """
+        endpoint = f"{API_BASE_URL.rstrip('/')}/qrcode/utilisateur/me"
+        qrcodes, params = [], {}
+        while True:
+            response = requests.get(endpoint, headers=auth_headers, params=params, timeout=10)
+            response.raise_for_status()
+            qrcodes.extend(response.json())
+            suivant = response.headers.get("X-Next-After")
+            if not suivant:
+                return qrcodes
+            params["after"] = suivant
+
     def _build_scan_url(self, qr_id: int) -> str:
         # ... (inchangé) ...
         scan_base = os.getenv("SCAN_BASE_URL")
@@ -138,9 +154,7 @@ class MenuUtilisateurVue(VueAbstraite):
                     # MODIFIÉ : Utilisation de la nouvelle route "/me" et des headers
                     list_endpoint = f"{API_BASE_URL.rstrip('/')}/qrcode/utilisateur/me"
                     print(f"Appel de l'API GET {list_endpoint} pour lister vos QRs...")
-                    list_response = requests.get(list_endpoint, headers=auth_headers, timeout=10)
-                    list_response.raise_for_status()
-                    mes_qr_data = list_response.json()
+                    mes_qr_data = self._lister_mes_qrcodes(auth_headers)
                     
                     if not mes_qr_data:
                         return MenuUtilisateurVue("Vous n'avez aucun QR code à modifier.")
@@ -216,10 +230,7 @@ class MenuUtilisateurVue(VueAbstraite):
                     # MODIFIÉ : Utilisation de la nouvelle route "/me" et des headers
                     list_endpoint = f"{API_BASE_URL.rstrip('/')}/qrcode/utilisateur/me"
                     print(f"Appel de l'API GET {list_endpoint} pour lister vos QRs...")
-                    list_response = requests.get(list_endpoint, headers=auth_headers, timeout=10)
-                    list_response.raise_for_status()
-                    
-                    mes_qr_data = list_response.json()
+                    mes_qr_data = self._lister_mes_qrcodes(auth_headers)
                     
                     if not mes_qr_data:
                         return MenuUtilisateurVue("Vous n'avez aucun QR code à supprimer.")
@@ -303,10 +314,7 @@ class MenuUtilisateurVue(VueAbstraite):
                     api_endpoint = f"{API_BASE_URL.rstrip('/')}/qrcode/utilisateur/me"
                     print(f"Appel de l'API GET {api_endpoint}...")
 
-                    response = requests.get(api_endpoint, headers=auth_headers, timeout=10)
-                    response.raise_for_status() 
-
-                    qrs_data = response.json()
+                    qrs_data = self._lister_mes_qrcodes(auth_headers)
                     if not qrs_data:
                         return MenuUtilisateurVue(f"Aucun QR code trouvé pour {nom_user} via l'API.")
 
@@ -397,10 +405,7 @@ class MenuUtilisateurVue(VueAbstraite):
                     # MODIFIÉ : Utilisation de la nouvelle route "/me" et des headers
                     list_endpoint = f"{API_BASE_URL.rstrip('/')}/qrcode/utilisateur/me"
                     print(f"Appel de l'API GET {list_endpoint} pour lister vos QRs...")
-                    list_response = requests.get(list_endpoint, headers=auth_headers, timeout=10)
-                    list_response.raise_for_status()
-                    
-                    mes_qr_data = list_response.json()
+                    mes_qr_data = self._lister_mes_qrcodes(auth_headers)
                     qr_suivis = [q for q in mes_qr_data if q.get("type_qrcode") is True]
                     
                     if not qr_suivis: